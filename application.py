@@ -8,6 +8,7 @@ and decorator-based hooks instead of the old OnAWBase system.
 Includes MCP (Model Context Protocol) support for AI language model integration.
 """
 
+import hmac
 import os
 import sys
 import logging
@@ -26,20 +27,45 @@ load_dotenv()
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "shared_hooks"))
 
 from shared_hooks import register_all_shared_hooks  # noqa: E402
-
-# Configure logging
-logging.basicConfig(stream=sys.stderr, level=os.getenv("LOG_LEVEL", "INFO"))
+from shared_hooks.app import bot_router, property_pages, result_cache  # noqa: E402
+from shared_hooks.app.trust_types import MCP_CLIENT_PERMISSIONS, MCP_CLIENT_TRUST_TYPE  # noqa: E402
+from log_pipeline import configure_logging  # noqa: E402
+from dynamodb_clients import configure_pynamodb, dynamodb, pool_stats  # noqa: E402
+import consistency  # noqa: E402
+import www_cache  # noqa: E402
+import static_assets  # noqa: E402
+import compression  # noqa: E402
+import permission_matcher  # noqa: E402
+import auth_revocation  # noqa: E402
+import trust_cache  # noqa: E402
+import mcp_auth_cache  # noqa: E402
+import discovery  # noqa: E402
+import creator_index  # noqa: E402
+import storage  # noqa: E402
+from storage import attributes as storage_attributes  # noqa: E402
+
+# Configure logging: structured JSON records written by a background thread
+# (see log_pipeline.py for LOG_FORMAT, LOG_SAMPLING and LOG_RATE_LIMITS)
+configure_logging(os.getenv("LOG_LEVEL", "INFO"))
 LOG = logging.getLogger()
-LOG.setLevel(os.getenv("LOG_LEVEL", "INFO"))
 
 # Suppress noisy urllib3 connection pool debug logs
 logging.getLogger("urllib3.connectionpool").setLevel(logging.WARNING)
 
+# Storage backend: dynamodb (default), postgresql, or memory for in-process
+# tests and benchmarks (see storage/__init__.py)
+DATABASE_BACKEND = storage.install(os.getenv("DATABASE_BACKEND", "dynamodb"))
+
+# Size ActingWeb's DynamoDB connection pools to the request threads before first use
+# (see dynamodb_clients.py for DYNAMODB_POOL_SIZE and pool metrics)
+if DATABASE_BACKEND == "dynamodb":
+    configure_pynamodb()
+
 # Create ActingWeb app with fluent configuration
 aw_app = (
     ActingWebApp(
         aw_type="urn:actingweb:actingweb.io:actingwebdemo",
-        database="dynamodb",
+        database=DATABASE_BACKEND,
         fqdn=os.getenv("APP_HOST_FQDN", "localhost:5000"),
         proto=os.getenv("APP_HOST_PROTOCOL", "https://"),
     )
@@ -81,20 +107,25 @@ aw_app = (
     .with_legacy_property_index(enable=False)  # Use new lookup table instead of legacy GSI
 )
 
+# Payment state and revocation markers need an atomic create-if-absent
+# write; refuse a backend without one now rather than in a webhook
+# (see storage/attributes.py)
+storage_attributes.check(aw_app.get_config())
+
 # Configure OAuth2 provider and trust relationship settings
 oauth_provider = os.getenv("OAUTH_PROVIDER", "google")  # "google" or "github"
 try:
     config_obj = aw_app.get_config()
     config_obj.oauth2_provider = oauth_provider
-    LOG.info(f"OAuth2 provider configured: {oauth_provider}")
+    LOG.info("OAuth2 provider configured: %s", oauth_provider)
 
     # Configure trust relationship settings
     config_obj.default_relationship = "friend"
     config_obj.auto_accept_default_relationship = True
-    LOG.info(f"Trust auto-approval enabled for relationship: {config_obj.default_relationship}")
+    LOG.info("Trust auto-approval enabled for relationship: %s", config_obj.default_relationship)
     LOG.info("Trust requests with other relationships will require manual approval")
 except Exception as e:
-    LOG.error(f"Failed to configure OAuth2/trust settings: {e}")
+    LOG.error("Failed to configure OAuth2/trust settings: %s", e)
 
 # Initialize OAuth2 state manager at startup (for MCP OAuth flows)
 # This ensures the encryption key is created before any OAuth flows begin
@@ -104,9 +135,31 @@ try:
     state_manager = get_oauth2_state_manager(aw_app.get_config())
     LOG.info("OAuth2 state manager initialized successfully")
 except Exception as e:
-    LOG.warning(f"OAuth2 state manager initialization skipped: {e}")
+    LOG.warning("OAuth2 state manager initialization skipped: %s", e)
     # Continue anyway - non-MCP OAuth flows will still work
 
+# Trust type permission rules are compiled once and decisions memoized
+# (see permission_matcher.py, PERMISSION_MATCHER=library disables)
+permission_matcher.install()
+
+# Revoking a token or trust in one worker reaches the other workers'
+# authentication caches through a per-actor marker in storage (see
+# auth_revocation.py for AUTH_REVOCATION_CHECK_INTERVAL)
+auth_revocation.install(aw_app.get_config())
+
+# Trust records are cached for peer authentication and trust type lookups
+# (see trust_cache.py, TRUST_CACHE=off disables)
+trust_cache.install()
+
+# Validated MCP bearer tokens are cached by token hash, bounded by token
+# expiry (see mcp_auth_cache.py, MCP_TOKEN_CACHE=off disables)
+mcp_auth_cache.install()
+
+# Login lookups of an actor by creator (email) are cached, and concurrent
+# first logins for one email single-flighted (see creator_index.py,
+# CREATOR_CACHE=off disables)
+creator_index.install()
+
 # Configure unified access control with MCP trust types
 # This controls what AI assistants can access via the MCP protocol
 try:
@@ -114,43 +167,42 @@ try:
 
     # MCP client trust type: read-only access excluding sensitive properties
     access_control.add_trust_type(
-        name="mcp_client",
+        name=MCP_CLIENT_TRUST_TYPE,
         display_name="AI Assistant",
         description="AI assistant with read-only access to search actor properties. Sensitive data like tokens and email are excluded.",
-        permissions={
-            "properties": {
-                "patterns": ["*"],  # Allow access to all properties
-                "operations": ["read"],  # Read-only access
-                "excluded_patterns": [
-                    "email",
-                    "auth_token",
-                    "oauth_token",
-                    "access_token",
-                    "refresh_token",
-                    "_*",  # Internal properties
-                ],
-            },
-            "methods": ["get_*", "list_*", "search_*"],  # Read operations only
-            "tools": ["search"],  # Only the search MCP tool
-            "resources": [],  # No resource access
-            "prompts": ["*"],  # All prompts available
-        },
+        permissions=MCP_CLIENT_PERMISSIONS,  # shared_hooks/app/trust_types.py
         oauth_scope="mcp",
     )
 
     # Configure OAuth2 trust type selection for MCP clients
     access_control.configure_oauth2_trust_types(
-        allowed_trust_types=["mcp_client"],
-        default_trust_type="mcp_client",
+        allowed_trust_types=[MCP_CLIENT_TRUST_TYPE],
+        default_trust_type=MCP_CLIENT_TRUST_TYPE,
     )
 
     LOG.info("MCP access control configured with mcp_client trust type")
 except Exception as e:
-    LOG.warning(f"MCP access control configuration skipped: {e}")
+    LOG.warning("MCP access control configuration skipped: %s", e)
 
 # Register all shared hooks
 register_all_shared_hooks(aw_app)
 
+# Cached hook results are invalidated again once a /properties write has
+# completed (see shared_hooks/app/result_cache.py)
+result_cache.install()
+
+# The owner's list_properties/delete_properties calls see every property,
+# and /www/properties renders without reading them (see
+# shared_hooks/app/property_pages.py)
+property_pages.install()
+
+# /bot answers 503 when the bot worker pool is saturated (see shared_hooks/app/bot_router.py)
+bot_router.install()
+
+# Method/action listings and MCP tools/prompts lists are built once per
+# permission rule set (see discovery.py, DISCOVERY_CACHE=off disables)
+discovery.install()
+
 # Create Flask app
 app = Flask(__name__, static_url_path="/static")
 
@@ -158,20 +210,110 @@ app = Flask(__name__, static_url_path="/static")
 # This ensures request.url uses https:// when behind a proxy that terminates SSL
 app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1, x_proto=1, x_host=1, x_prefix=1)  # type: ignore[assignment]
 
+# gzip/brotli for JSON and HTML responses (see compression.py, COMPRESSION=off disables)
+compression.init_flask(app)
 
-# Health check endpoint for monitoring
-@app.route("/health")
-def health_check():
-    """Health check endpoint for monitoring."""
+# Eventually consistent reads for read-only methods and MCP reads; writes and
+# trust stay strong (see consistency.py, READ_CONSISTENCY=strong disables)
+consistency.init_flask(app, aw_app)
+
+# Cached /www page renders with ETags (see www_cache.py)
+www_cache.init_flask(app)
+
+# Content-hashed, precompressed assets under /static/dist (see static_assets.py)
+static_assets.init_flask(app)
+
+
+def health_status(integration_name):
+    """Liveness check for load balancers and monitoring; reads nothing."""
     return {
         "status": "healthy",
-        "integration": "flask",
+        "integration": integration_name,
         "mcp_enabled": True,
         "mcp_tools": ["search"],
         "version": "1.0.0-mcp",
     }
 
 
+def runtime_stats(authorization):
+    """
+    Cache, pool and storage counters of this process; returns (body, status code).
+
+    They describe the deployment (backends, cache sizes, actor counts), so
+    unlike /health they need authorization: "Bearer <STATS_SECRET>".
+    """
+    stats_secret = os.getenv("STATS_SECRET", "")
+    if not stats_secret:
+        return {"error": "STATS_SECRET not configured"}, 503
+
+    scheme, _, provided = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(provided.strip().encode(), stats_secret.encode()):
+        return {"error": "Invalid or missing secret"}, 403
+
+    return {
+        "database": DATABASE_BACKEND,
+        "storage": storage.stats(DATABASE_BACKEND),
+        "dynamodb_pool": {
+            key: value for key, value in pool_stats().items() if key != "pools"
+        },
+        "read_consistency": consistency.stats(),
+        "www_cache": www_cache.stats(),
+        "compression": compression.stats(),
+        "permissions": permission_matcher.stats(),
+        "mcp_tokens": mcp_auth_cache.stats(),
+        "trusts": trust_cache.stats(),
+        "revocations": auth_revocation.stats(),
+        "discovery": discovery.stats(),
+        "creators": creator_index.stats(),
+    }, 200
+
+
+def verify_email(token):
+    """Verify an email token; returns (body, status code)."""
+    from shared_hooks.app.callback_hooks import verify_email_token
+
+    if not token:
+        return {"status": "error", "message": "Missing verification token"}, 400
+
+    result = verify_email_token(token, aw_app.get_config())
+    return result, 200 if result["status"] == "success" else 400
+
+
+# Health check endpoint for monitoring
+@app.route("/health")
+def health_check():
+    """Health check endpoint for monitoring."""
+    return health_status("flask")
+
+
+@app.route("/health/stats")
+def health_stats():
+    """
+    Runtime counters (pools, caches, storage) of the worker that answers.
+
+    Usage: GET /health/stats with Authorization: Bearer <STATS_SECRET>
+    """
+    from flask import request
+
+    return runtime_stats(request.headers.get("Authorization", ""))
+
+
+# App-level email verification (the token identifies the actor)
+@app.route("/callbacks/email_verify", methods=["GET", "POST"])
+def email_verify():
+    """
+    Verify an email address from a link issued by request_email_verification.
+
+    Usage: GET /callbacks/email_verify?token=<token>
+    """
+    from flask import request
+
+    token = request.args.get("token", "")
+    if not token and request.is_json:
+        token = (request.get_json(silent=True) or {}).get("token", "")
+    return verify_email(token)
+
+
 # Custom error handlers
 @app.errorhandler(404)
 def not_found(_error):
@@ -183,19 +325,31 @@ def internal_error(_error):
     return {"error": "Internal server error"}, 500
 
 
-# Nuke endpoint for test environment cleanup
-@app.route("/nuke", methods=["GET"])
-def nuke_all_actors():
+def _scan_dynamodb_actors():
+    """Return {id, creator} of every actor with a paginated boto3 scan."""
+    # Get table name from environment (same as ActingWeb uses).
+    # The shared registry honors AWS_DB_HOST for local DynamoDB.
+    table_prefix = os.getenv("AWS_DB_PREFIX", "demo_actingweb")
+    table = dynamodb.table(f"{table_prefix}_actors")
+
+    response = table.scan(ProjectionExpression="id, creator")
+    all_actors = response.get("Items", [])
+    while "LastEvaluatedKey" in response:
+        response = table.scan(
+            ProjectionExpression="id, creator",
+            ExclusiveStartKey=response["LastEvaluatedKey"],
+        )
+        all_actors.extend(response.get("Items", []))
+    return all_actors
+
+
+def nuke_actors(provided_secret):
     """
-    Delete all actors and their data from DynamoDB.
+    Delete all actors and their data from the database.
 
     This is a destructive operation intended for test environments only.
-    Requires a secret parameter matching the NUKE_SECRET environment variable.
-
-    Usage: GET /nuke?secret=<NUKE_SECRET>
+    provided_secret must match the NUKE_SECRET environment variable.
     """
-    import boto3
-    from flask import request
     from actingweb import actor
 
     # Verify secret
@@ -203,43 +357,34 @@ def nuke_all_actors():
     if not nuke_secret:
         return {"error": "NUKE_SECRET not configured"}, 503
 
-    provided_secret = request.args.get("secret", "")
     if not provided_secret or provided_secret != nuke_secret:
         return {"error": "Invalid or missing secret"}, 403
 
     # Get config
     config = aw_app.get_config()
 
-    # Scan all actors using boto3
     deleted = []
     skipped = []
     errors = []
 
     try:
-        # Configure boto3 to use local DynamoDB if AWS_DB_HOST is set
-        dynamodb_config = {}
-        db_host = os.getenv("AWS_DB_HOST")
-        if db_host:
-            dynamodb_config["endpoint_url"] = db_host
-
-        dynamodb = boto3.resource("dynamodb", **dynamodb_config)
-
-        # Get table name from environment (same as ActingWeb uses)
-        table_prefix = os.getenv("AWS_DB_PREFIX", "demo_actingweb")
-        table_name = f"{table_prefix}_actors"
-        table = dynamodb.Table(table_name)  # type: ignore[attr-defined]
-
-        # Scan all actors
-        response = table.scan(ProjectionExpression="id, creator")
-        all_actors = response.get("Items", [])
-
-        # Handle pagination
-        while "LastEvaluatedKey" in response:
-            response = table.scan(
-                ProjectionExpression="id, creator",
-                ExclusiveStartKey=response["LastEvaluatedKey"],
-            )
-            all_actors.extend(response.get("Items", []))
+        # Backends with a bulk delete remove all actors in one statement
+        # (without running actor delete hooks, which the demo only logs)
+        purged = storage.purge_actors(DATABASE_BACKEND, keep_prefix="_actingweb_")
+        if purged is not None:
+            LOG.info("Nuked %d actors in bulk", len(purged))
+            return {
+                "status": "complete",
+                "deleted": len(purged),
+                "skipped": 0,
+                "errors": 0,
+                "details": {"deleted": purged, "skipped": [], "errors": []},
+            }
+
+        if DATABASE_BACKEND == "dynamodb":
+            all_actors = _scan_dynamodb_actors()
+        else:
+            all_actors = config.DbActor.DbActorList().fetch() or []
 
         if not all_actors:
             return {
@@ -264,12 +409,12 @@ def nuke_all_actors():
                 if a.id:
                     a.delete()
                     deleted.append({"id": actor_id, "creator": creator})
-                    LOG.info(f"Nuked actor: {actor_id} ({creator})")
+                    LOG.info("Nuked actor: %s (%s)", actor_id, creator)
                 else:
                     skipped.append({"id": actor_id, "creator": creator, "reason": "not found"})
             except Exception as e:
                 errors.append({"id": actor_id, "creator": creator, "error": str(e)})
-                LOG.error(f"Error deleting actor {actor_id}: {e}")
+                LOG.error("Error deleting actor %s: %s", actor_id, e)
 
         return {
             "status": "complete",
@@ -284,10 +429,23 @@ def nuke_all_actors():
         }
 
     except Exception as e:
-        LOG.error(f"Nuke operation failed: {e}")
+        LOG.error("Nuke operation failed: %s", e)
         return {"error": f"Nuke operation failed: {str(e)}"}, 500
 
 
+# Nuke endpoint for test environment cleanup
+@app.route("/nuke", methods=["GET"])
+def nuke_all_actors():
+    """
+    Delete all actors and their data from the database (test environments only).
+
+    Usage: GET /nuke?secret=<NUKE_SECRET>
+    """
+    from flask import request
+
+    return nuke_actors(request.args.get("secret", ""))
+
+
 # Integrate with Flask
 integration = aw_app.integrate_flask(app)
 
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+ASGI entry point for the ActingWeb demo.
+
+Serves the same ActingWeb app as application.py (same configuration, hooks
+and storage backend) through ActingWeb's FastAPI integration instead of
+Flask under uwsgi:
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5000 --workers 2
+
+Under uwsgi a request holds one of the worker threads for its whole
+lifetime, including time spent waiting on OAuth token exchanges, peer trust
+callbacks and subscription fan-out. Under ASGI, requests are coroutines on
+an event loop:
+
+- ActingWeb's sync handlers (database access, outbound HTTP) run in its
+  handler thread pool (ASGI_HANDLER_WORKERS threads per process).
+- Method, action and MCP tool requests use ActingWeb's async handlers, which
+  await async hooks (``async def``) directly on the event loop.
+- Sync hooks, which includes everything in shared_hooks, would block the
+  event loop when called from those async handlers. They are wrapped to run
+  in a separate pool (ASGI_HOOK_WORKERS threads) instead, unchanged.
+
+Hooks may be registered as ``async def`` with the usual decorators. Under
+Flask, ActingWeb runs async hooks to completion with asyncio.run().
+
+Settings:
+    ASGI_HANDLER_WORKERS: ActingWeb handler threads per process (default 32)
+    ASGI_HOOK_WORKERS: Threads for sync hooks called from async handlers (default 32)
+"""
+
+import asyncio
+import contextvars
+import functools
+import inspect
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from fastapi.staticfiles import StaticFiles
+from starlette.concurrency import run_in_threadpool
+
+import application
+import consistency
+import static_assets
+import www_cache
+
+logger = logging.getLogger(__name__)
+
+ASGI_HANDLER_WORKERS = int(os.getenv("ASGI_HANDLER_WORKERS", "32"))
+
+ASGI_HOOK_WORKERS = int(os.getenv("ASGI_HOOK_WORKERS", "32"))
+
+# Hook tables that ActingWeb's async handlers execute from the event loop
+ASYNC_HOOK_TABLES = ("_method_hooks", "_action_hooks")
+
+_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_pid: Optional[int] = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor, _executor_pid
+    with _lock:
+        # uvicorn --workers forks; threads don't survive into the child
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(max_workers=ASGI_HOOK_WORKERS, thread_name_prefix="aw-hook")
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def offload(hook: Callable[..., Any]) -> Callable[..., Any]:
+    """Wrap a sync hook into a coroutine function that runs it in the hook pool."""
+
+    @functools.wraps(hook)
+    async def offloaded(*args: Any, **kwargs: Any) -> Any:
+        # Run under a copy of the caller's context (MCP runtime context,
+        # read consistency), which worker threads don't inherit
+        ctx = contextvars.copy_context()
+        call = functools.partial(ctx.run, hook, *args, **kwargs)
+        return await asyncio.get_running_loop().run_in_executor(_get_executor(), call)
+
+    offloaded.__offloaded__ = hook  # type: ignore[attr-defined]
+    return offloaded
+
+
+def offload_sync_hooks(hooks: Any) -> int:
+    """
+    Make the sync method and action hooks of a hook registry safe to await.
+
+    functools.wraps keeps the hook's name, signature and MCP metadata, so
+    tool listings and permission checks see the original hook.
+
+    Returns:
+        The number of hooks wrapped
+    """
+    wrapped = 0
+    for table_name in ASYNC_HOOK_TABLES:
+        table: Dict[str, List[Callable[..., Any]]] = getattr(hooks, table_name, {})
+        for funcs in table.values():
+            for i, func in enumerate(funcs):
+                if not inspect.iscoroutinefunction(func):
+                    funcs[i] = offload(func)
+                    wrapped += 1
+    return wrapped
+
+
+aw_app = application.aw_app
+
+logger.info("Running %d sync hooks in the hook pool", offload_sync_hooks(aw_app.hooks))
+
+app = FastAPI(title="ActingWeb Demo", docs_url=None, redoc_url=None, openapi_url=None)
+# /static/dist before the /static mount, which would shadow it
+static_assets.init_fastapi(app)
+app.mount("/static", StaticFiles(directory=os.path.join(os.path.dirname(__file__), "static")), name="static")
+
+consistency.init_fastapi(app, aw_app)
+
+
+def _json(result: Any) -> JSONResponse:
+    """Turn a Flask-style (body, status) result into a response."""
+    body, status = result if isinstance(result, tuple) else (result, 200)
+    return JSONResponse(body, status_code=status)
+
+
+# Registered before ActingWeb's routes, so they win over /{actor_id}
+@app.get("/health")
+async def health_check() -> JSONResponse:
+    """Health check endpoint for monitoring."""
+    return _json(await run_in_threadpool(application.health_status, "fastapi"))
+
+
+@app.get("/health/stats")
+async def health_stats(request: Request) -> JSONResponse:
+    """Runtime counters of this worker (Authorization: Bearer <STATS_SECRET>)."""
+    return _json(await run_in_threadpool(application.runtime_stats, request.headers.get("authorization", "")))
+
+
+@app.api_route("/callbacks/email_verify", methods=["GET", "POST"])
+async def email_verify(request: Request) -> JSONResponse:
+    """Verify an email address from a link issued by request_email_verification."""
+    token = request.query_params.get("token", "")
+    if not token and request.headers.get("content-type", "").startswith("application/json"):
+        try:
+            body = await request.json()
+        except ValueError:
+            body = None
+        token = body.get("token", "") if isinstance(body, dict) else ""
+    return _json(await run_in_threadpool(application.verify_email, token))
+
+
+@app.get("/nuke")
+async def nuke_all_actors(request: Request) -> JSONResponse:
+    """Delete all actors and their data from the database (test environments only)."""
+    return _json(await run_in_threadpool(application.nuke_actors, request.query_params.get("secret", "")))
+
+
+integration = aw_app.with_thread_pool_workers(ASGI_HANDLER_WORKERS).integrate_fastapi(
+    app, templates_dir=os.path.join(os.path.dirname(__file__), "templates")
+)
+
+if integration.templates is not None:
+    static_assets.install(integration.templates.env)
+    www_cache.init_fastapi(app, integration.templates.env)
@@ -0,0 +1,174 @@
+"""
+Per-actor revocation marker, shared by every worker through storage.
+
+trust_cache.py and mcp_auth_cache.py cache peer and MCP authentication per
+process. Evicting an entry only reached the process that ran the eviction,
+so a trust deleted or a token revoked through one worker kept
+authenticating in the others until their entries expired.
+
+Each actor now has a revocation marker in storage (attribute bucket
+``_auth_revocation``), a random value rewritten by every eviction for the
+actor (revoke()):
+
+- A cache entry remembers the actor's marker as it was before the storage
+  read it was filled from (stamp(), which creates the marker if the actor
+  has none yet). A marker first seen after that read may already include
+  a revocation the read missed, so the entry is not cached.
+- Before a cached entry is served, the marker is compared with the actor's
+  current one (current()); an entry filled under another marker is dropped
+  and the request authenticates against storage.
+- current() reads the marker at most once per AUTH_REVOCATION_CHECK_INTERVAL
+  seconds per actor and process, so a revocation reaches every worker within
+  that interval instead of the cache TTL. 0 reads it on every cached hit.
+- If the marker can't be read, cached entries are not served and nothing is
+  cached. A deleted actor has no marker, which matches no entry.
+
+Without install() (no config), the caches are per process as before.
+
+Settings:
+    AUTH_REVOCATION_CHECK_INTERVAL: Seconds a worker reuses an actor's marker (default 2)
+    AUTH_REVOCATION_MAX_ACTORS: Markers remembered per process (default 10000)
+"""
+
+import logging
+import os
+import time
+import uuid
+from typing import Any, Dict, Optional, Tuple
+
+from actingweb.db import get_attribute
+
+from storage.attributes import create_attr
+
+logger = logging.getLogger(__name__)
+
+# Longest a revocation made in another worker goes unnoticed here
+AUTH_REVOCATION_CHECK_INTERVAL = float(os.getenv("AUTH_REVOCATION_CHECK_INTERVAL", "2"))
+
+AUTH_REVOCATION_MAX_ACTORS = int(os.getenv("AUTH_REVOCATION_MAX_ACTORS", "10000"))
+
+# Where an actor's marker is stored
+MARKER_BUCKET = "_auth_revocation"
+MARKER_NAME = "marker"
+
+_config: Optional[Any] = None
+
+# actor_id -> (marker, when it was read)
+_markers: Dict[str, Tuple[str, float]] = {}
+
+_stats = {"reads": 0, "read_errors": 0, "revocations": 0}
+
+
+def install(config: Any) -> None:
+    """Share revocations through the storage backend of config."""
+    global _config
+    _config = config
+
+
+def _read(actor_id: str) -> Optional[str]:
+    """The stored marker ("" if the actor has none), or None if storage failed."""
+    assert _config is not None
+    _stats["reads"] += 1
+    try:
+        stored = get_attribute(_config).get_attr(actor_id=actor_id, bucket=MARKER_BUCKET, name=MARKER_NAME)
+    except Exception as e:
+        _stats["read_errors"] += 1
+        logger.warning("Failed to read revocation marker of %s: %s", actor_id, e)
+        return None
+    data = stored.get("data") if stored else None
+    return str(data.get("marker") or "") if isinstance(data, dict) else ""
+
+
+def _remember(actor_id: str, marker: str) -> None:
+    if actor_id not in _markers and len(_markers) >= AUTH_REVOCATION_MAX_ACTORS:
+        _markers.clear()
+    _markers[actor_id] = (marker, time.time())
+
+
+def current(actor_id: str) -> Optional[str]:
+    """
+    The actor's marker, read from storage at most once per check interval.
+
+    Returns:
+        The marker, "" if the actor has none (or without install()),
+        None if storage could not be read
+    """
+    if _config is None:
+        return ""
+    known = _markers.get(actor_id)
+    if known is not None and time.time() - known[1] < AUTH_REVOCATION_CHECK_INTERVAL:
+        return known[0]
+    marker = _read(actor_id)
+    if marker is not None:
+        _remember(actor_id, marker)
+    return marker
+
+
+def stamp(actor_id: str, read_at: Optional[float] = None) -> Optional[str]:
+    """
+    The marker to store with an entry filled from storage.
+
+    Creates the actor's marker if it has none, so that deleting the actor
+    (and its attributes) invalidates the entry.
+
+    Args:
+        actor_id: The actor the entry belongs to
+        read_at: When the storage read started, if stamp() is called after it
+            (default: stamp() is called before the read)
+
+    Returns:
+        The marker, or None if the entry must not be cached
+    """
+    before = _markers.get(actor_id)
+    marker = current(actor_id)
+    if marker is None or _config is None:
+        return marker
+    if marker and read_at is not None and (before is None or before[1] > read_at or before[0] != marker):
+        return None
+    if marker:
+        return marker
+    created = uuid.uuid4().hex
+    try:
+        if create_attr(_config, actor_id, MARKER_BUCKET, MARKER_NAME, {"marker": created}):
+            _remember(actor_id, created)
+            return created
+    except Exception as e:
+        logger.warning("Failed to create revocation marker of %s: %s", actor_id, e)
+        return None
+    marker = _read(actor_id)
+    if marker:
+        _remember(actor_id, marker)
+    return marker or None
+
+
+def matches(actor_id: str, marker: Optional[str]) -> bool:
+    """True if an entry stamped with marker may still be served."""
+    return marker is not None and marker == current(actor_id)
+
+
+def revoke(actor_id: Optional[str]) -> None:
+    """Invalidate every worker's cached authentication of an actor."""
+    if _config is None or not actor_id:
+        return
+    marker = uuid.uuid4().hex
+    _stats["revocations"] += 1
+    try:
+        get_attribute(_config).set_attr(
+            actor_id=actor_id, bucket=MARKER_BUCKET, name=MARKER_NAME, data={"marker": marker}
+        )
+    except Exception as e:
+        # The local eviction still happened; other workers keep their entries until TTL
+        logger.error("Failed to write revocation marker of %s: %s", actor_id, e)
+        _markers.pop(actor_id, None)
+        return
+    _remember(actor_id, marker)
+
+
+def stats() -> Dict[str, Any]:
+    """Return revocation marker counters for monitoring."""
+    return {
+        "shared": _config is not None,
+        "check_interval": AUTH_REVOCATION_CHECK_INTERVAL,
+        "actors": len(_markers),
+        **_stats,
+    }
@@ -0,0 +1,364 @@
+"""
+Response compression for the WSGI app.
+
+CompressionMiddleware compresses response bodies (search results, property
+listings, /nuke reports) for clients that accept it:
+
+- Encoding from ``Accept-Encoding`` (q-values honoured): brotli if the
+  brotli package is installed and the client prefers it, else gzip.
+- Only content types in COMPRESSIBLE_TYPES, and only bodies of at least
+  COMPRESS_MIN_SIZE bytes. When the app doesn't send a Content-Length, the
+  first chunks are held back until the threshold is reached or the body
+  ends; nothing beyond that is buffered.
+- Streaming: each chunk the app yields is fed to the compressor and
+  whatever it emits is passed on, so large bodies are never held in
+  memory.
+- Responses that are already encoded, partial (206), empty (HEAD, 204,
+  304), or marked ``Cache-Control: no-transform`` pass through.
+- Responses under UNCOMPRESSED_PATH_PREFIXES (the OAuth and MCP
+  authorization endpoints) are never compressed: they carry CSRF state,
+  codes and tokens next to request parameters an attacker can choose, so
+  their compressed length would leak the secrets (BREACH).
+
+A strong ETag becomes weak on compressed responses (the bytes differ from
+the uncompressed representation); If-None-Match uses weak comparison, so
+conditional requests still get 304.
+
+Bytes in and out are counted for /health/stats (stats()).
+
+On Lambda, API Gateway/CloudFront compress responses, so the middleware is
+off unless COMPRESSION=on. Under uwsgi, /static/dist never reaches it
+(static-map, see static_assets.py).
+
+Settings:
+    COMPRESSION: auto (default; off on Lambda), on or off
+    COMPRESS_MIN_SIZE: Smallest body to compress in bytes (default 1024)
+    COMPRESS_LEVEL: gzip level 1-9 (default 6)
+    COMPRESS_BROTLI_QUALITY: brotli quality 0-11 (default 4)
+"""
+
+import itertools
+import logging
+import os
+import threading
+import zlib
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import brotli  # type: ignore[import-not-found]
+
+    BROTLI_AVAILABLE = True
+except ImportError:
+    brotli = None
+    BROTLI_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# "auto" compresses except on Lambda, "on"/"off" force it
+COMPRESSION = os.getenv("COMPRESSION", "auto").lower()
+
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))
+
+COMPRESS_LEVEL = int(os.getenv("COMPRESS_LEVEL", "6"))
+
+# Low qualities compress about as well as gzip -6, at a similar speed
+COMPRESS_BROTLI_QUALITY = int(os.getenv("COMPRESS_BROTLI_QUALITY", "4"))
+
+# Media types (without parameters) worth compressing
+COMPRESSIBLE_TYPES = {
+    "application/json",
+    "application/problem+json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+    "text/css",
+    "text/html",
+    "text/javascript",
+    "text/plain",
+    "text/xml",
+}
+
+# Request paths whose responses hold secrets next to reflected input (BREACH)
+UNCOMPRESSED_PATH_PREFIXES = ("/oauth", "/mcp")
+
+# Statuses without a body, or whose body must not be re-encoded
+_PASS_STATUSES = {"204", "206", "304"}
+
+Headers = List[Tuple[str, str]]
+
+
+def enabled() -> bool:
+    """True if responses should be compressed in this environment."""
+    if COMPRESSION == "auto":
+        return not os.getenv("AWS_LAMBDA_FUNCTION_NAME")
+    return COMPRESSION in ("on", "true", "1")
+
+
+def negotiate(accept_encoding: str, candidates: Optional[Iterable[str]] = None) -> Optional[str]:
+    """
+    Pick the client's preferred coding from an Accept-Encoding header.
+
+    Args:
+        accept_encoding: The header value; q-values are honored, q=0 refuses a coding
+        candidates: Codings we can send, preferred first on equal q (default:
+            "br" if brotli is installed, then "gzip")
+
+    Returns:
+        The coding to send, or None for identity
+    """
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.lower().split(","):
+        coding, _, params = item.strip().partition(";")
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[coding.strip()] = q
+    if candidates is None:
+        candidates = ["br", "gzip"] if BROTLI_AVAILABLE else ["gzip"]
+    best: Optional[str] = None
+    best_q = 0.0
+    for coding in candidates:
+        q = weights.get(coding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+class _Compressor:
+    """Streaming compressor with the zlib compressobj interface."""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=COMPRESS_BROTLI_QUALITY)
+        else:
+            # wbits 16+ writes a gzip header and trailer
+            self._zlib = zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._brotli.process(data)
+        return self._zlib.compress(data)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._brotli.finish()
+        return self._zlib.flush()
+
+
+class CompressionStats:
+    """Counters of compressed responses and bytes saved."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.compressed = 0
+        self.skipped = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.by_encoding: Dict[str, int] = {}
+
+    def record(self, encoding: str, bytes_in: int, bytes_out: int) -> None:
+        with self._lock:
+            self.compressed += 1
+            self.bytes_in += bytes_in
+            self.bytes_out += bytes_out
+            self.by_encoding[encoding] = self.by_encoding.get(encoding, 0) + 1
+
+    def skip(self) -> None:
+        with self._lock:
+            self.skipped += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "compressed_responses": self.compressed,
+                "skipped_responses": self.skipped,
+                "by_encoding": dict(self.by_encoding),
+                "bytes_in": self.bytes_in,
+                "bytes_out": self.bytes_out,
+                "bytes_saved": self.bytes_in - self.bytes_out,
+                "ratio": round(self.bytes_out / self.bytes_in, 3) if self.bytes_in else None,
+            }
+
+
+compression_stats = CompressionStats()
+
+
+def _header(headers: Headers, name: str) -> Optional[str]:
+    name = name.lower()
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+def _compressible(status: str, headers: Headers) -> bool:
+    if status[:3] in _PASS_STATUSES:
+        return False
+    if _header(headers, "Content-Encoding") or _header(headers, "Content-Range"):
+        return False
+    if "no-transform" in (_header(headers, "Cache-Control") or "").lower():
+        return False
+    media_type = (_header(headers, "Content-Type") or "").split(";")[0].strip().lower()
+    if media_type not in COMPRESSIBLE_TYPES:
+        return False
+    length = _header(headers, "Content-Length")
+    return length is None or not length.isdigit() or int(length) >= COMPRESS_MIN_SIZE
+
+
+def _compressed_headers(headers: Headers, encoding: str) -> Headers:
+    result: Headers = []
+    vary = None
+    for key, value in headers:
+        lower = key.lower()
+        if lower == "content-length":
+            continue
+        if lower == "vary":
+            vary = value
+            continue
+        if lower == "etag" and not value.startswith("W/"):
+            value = f"W/{value}"
+        result.append((key, value))
+    if vary is None:
+        result.append(("Vary", "Accept-Encoding"))
+    elif "accept-encoding" not in vary.lower() and vary.strip() != "*":
+        result.append(("Vary", f"{vary}, Accept-Encoding"))
+    else:
+        result.append(("Vary", vary))
+    result.append(("Content-Encoding", encoding))
+    return result
+
+
+class _CompressedResponse:
+    """
+    Response iterable that decides on compression once the status, headers
+    and enough of the body are known, and then compresses as it streams.
+    """
+
+    def __init__(self, body: Iterable[bytes], encoding: str, state: Dict[str, Any], start_response: Callable[..., Any]):
+        self._body = body
+        self._encoding = encoding
+        self._state = state
+        self._start_response = start_response
+
+    def _pass(self, held: List[bytes], chunks: Iterator[bytes]) -> Iterator[bytes]:
+        state = self._state
+        # Without a status the app never called start_response; the server reports that
+        if "status" in state and not state.get("written"):
+            self._start_response(state["status"], state["headers"], state.get("exc_info"))
+        compression_stats.skip()
+        yield from held
+        yield from chunks
+
+    def __iter__(self) -> Iterator[bytes]:
+        state = self._state
+        chunks = iter(self._body)
+        held: List[bytes] = []
+        held_size = 0
+        exhausted = False
+        if "status" not in state:
+            # Apps may call start_response when the body is first iterated
+            try:
+                held.append(next(chunks))
+                held_size = len(held[0])
+            except StopIteration:
+                exhausted = True
+        if "status" not in state or state.get("written") or not _compressible(state["status"], state["headers"]):
+            yield from self._pass(held, chunks)
+            return
+        # Hold back chunks until the body is known to reach the threshold
+        while not exhausted and held_size < COMPRESS_MIN_SIZE:
+            try:
+                chunk = next(chunks)
+            except StopIteration:
+                exhausted = True
+                break
+            held.append(chunk)
+            held_size += len(chunk)
+        if held_size < COMPRESS_MIN_SIZE:
+            yield from self._pass(held, chunks)
+            return
+
+        self._start_response(
+            state["status"], _compressed_headers(state["headers"], self._encoding), state.get("exc_info")
+        )
+        compressor = _Compressor(self._encoding)
+        bytes_in = bytes_out = 0
+        for chunk in itertools.chain(held, chunks):
+            bytes_in += len(chunk)
+            out = compressor.compress(chunk)
+            if out:
+                bytes_out += len(out)
+                yield out
+        out = compressor.finish()
+        bytes_out += len(out)
+        compression_stats.record(self._encoding, bytes_in, bytes_out)
+        yield out
+
+    def close(self) -> None:
+        close = getattr(self._body, "close", None)
+        if close is not None:
+            close()
+
+
+class CompressionMiddleware:
+    """WSGI middleware that compresses responses for clients that accept it."""
+
+    def __init__(self, app: Callable[..., Any]):
+        self.app = app
+
+    def __call__(self, environ: Dict[str, Any], start_response: Callable[..., Any]) -> Iterable[bytes]:
+        encoding = negotiate(environ.get("HTTP_ACCEPT_ENCODING", ""))
+        if (
+            encoding is None
+            or environ.get("REQUEST_METHOD") == "HEAD"
+            or environ.get("PATH_INFO", "").startswith(UNCOMPRESSED_PATH_PREFIXES)
+        ):
+            return self.app(environ, start_response)
+
+        state: Dict[str, Any] = {}
+
+        def _start_response(status: str, headers: Headers, exc_info: Any = None) -> Callable[[bytes], Any]:
+            state.update(status=status, headers=headers, exc_info=exc_info)
+
+            def write(data: bytes) -> Any:
+                # Legacy write() bodies bypass compression
+                if not state.get("written"):
+                    state["written"] = start_response(status, headers, exc_info)
+                return state["written"](data)
+
+            return write
+
+        body = self.app(environ, _start_response)
+        if "status" in state and not state.get("written") and not _compressible(state["status"], state["headers"]):
+            # Return the app's own iterable, so wsgi.file_wrapper (sendfile) still applies
+            start_response(state["status"], state["headers"], state.get("exc_info"))
+            compression_stats.skip()
+            return body
+        return _CompressedResponse(body, encoding, state, start_response)
+
+
+def init_flask(flask_app: Any) -> bool:
+    """
+    Compress the responses of a Flask app.
+
+    Returns:
+        False if compression is disabled in this environment
+    """
+    if not enabled():
+        logger.info("Response compression disabled (COMPRESSION=%s)", COMPRESSION)
+        return False
+    flask_app.wsgi_app = CompressionMiddleware(flask_app.wsgi_app)
+    return True
+
+
+def stats() -> Dict[str, Any]:
+    """Return compression counters for monitoring."""
+    return {"enabled": enabled(), "brotli": BROTLI_AVAILABLE, **compression_stats.snapshot()}
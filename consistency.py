@@ -0,0 +1,226 @@
+"""
+Read consistency policy for DynamoDB access.
+
+ActingWeb's DynamoDB backend asks for strongly consistent reads everywhere.
+A strongly consistent read costs twice the read capacity of an eventually
+consistent one, and it must be served by the partition leader, which hurts
+tail latency. Most of our traffic is read-only methods and MCP tool calls.
+They can safely see data that is a fraction of a second old.
+
+The policy:
+
+- Requests to read-only methods (``POST /{actor_id}/methods/{name}`` where the
+  hook is annotated ``readOnlyHint: True``) and read-only MCP requests
+  (tools/call of a read-only tool, list/get/read requests) run with
+  eventually consistent reads.
+- Everything else stays strongly consistent: actions, property writes,
+  callbacks, the www UI and all other endpoints.
+- Some reads are always strong, even inside an eventual request:
+    * trust and peer-trustee tables, so permission checks and trust
+      approval/revocation take effect immediately
+    * attributes of the ActingWeb system actors (OAuth/MCP tokens, state
+      nonces), so a revoked token can't be accepted from a stale replica
+    * methods listed in STRONG_METHODS, which read back what the actor just
+      wrote (e.g. get_job_status)
+    * cached hooks computing a result shortly after the actor's cached
+      results were invalidated by a write (result_cache.py), so a replica
+      that hasn't seen the write can't be cached for the whole TTL
+
+Writes are unaffected; DynamoDB writes and conditional updates are always
+strongly consistent.
+
+The policy is applied by wrapping PynamoDB's TableConnection.get_item and
+query, the two calls the ActingWeb backend makes with consistent_read=True.
+Set READ_CONSISTENCY=strong to disable it.
+"""
+
+import contextvars
+import functools
+import json
+import logging
+import os
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# "auto" applies the policy, "strong" keeps every read strongly consistent
+READ_CONSISTENCY = os.getenv("READ_CONSISTENCY", "auto").lower()
+
+# Tables whose reads are always strongly consistent
+STRONG_TABLE_SUFFIXES = ("_trusts", "_peertrustees")
+
+# Hash keys (actor ids) whose reads are always strongly consistent
+STRONG_HASH_KEY_PREFIX = "_actingweb"
+
+# Read-only methods that must see their own actor's latest writes
+STRONG_METHODS = {"get_job_status"}
+
+# MCP requests that only read
+READ_ONLY_MCP_METHODS = {
+    "tools/list",
+    "prompts/list",
+    "prompts/get",
+    "resources/list",
+    "resources/templates/list",
+    "resources/read",
+}
+
+_consistency: "contextvars.ContextVar[str]" = contextvars.ContextVar("read_consistency", default="strong")
+
+_stats = {"eventual_reads": 0, "strong_reads": 0}
+
+
+def current() -> str:
+    """Return the read consistency of the current request ("strong" or "eventual")."""
+    return _consistency.get()
+
+
+@contextmanager
+def eventually_consistent() -> Iterator[None]:
+    """Run a block with eventually consistent reads (where the policy allows)."""
+    token = _consistency.set("eventual")
+    try:
+        yield
+    finally:
+        _consistency.reset(token)
+
+
+@contextmanager
+def strongly_consistent() -> Iterator[None]:
+    """Run a block with strongly consistent reads, whatever the request's policy."""
+    token = _consistency.set("strong")
+    try:
+        yield
+    finally:
+        _consistency.reset(token)
+
+
+def _use_eventual(table_name: str, hash_key: Any) -> bool:
+    if _consistency.get() != "eventual":
+        return False
+    if table_name.endswith(STRONG_TABLE_SUFFIXES):
+        return False
+    return not (isinstance(hash_key, str) and hash_key.startswith(STRONG_HASH_KEY_PREFIX))
+
+
+def _apply_policy(read: Any) -> Any:
+    @functools.wraps(read)
+    def wrapper(self: Any, hash_key: Any, *args: Any, **kwargs: Any) -> Any:
+        if kwargs.get("consistent_read"):
+            if _use_eventual(self.table_name, hash_key):
+                kwargs["consistent_read"] = False
+                _stats["eventual_reads"] += 1
+            else:
+                _stats["strong_reads"] += 1
+        return read(self, hash_key, *args, **kwargs)
+
+    wrapper._consistency_policy = True  # type: ignore[attr-defined]
+    return wrapper
+
+
+def install() -> bool:
+    """
+    Apply the policy to PynamoDB reads.
+
+    Returns:
+        False if disabled by READ_CONSISTENCY=strong or PynamoDB is unavailable
+    """
+    if READ_CONSISTENCY == "strong":
+        return False
+    try:
+        from pynamodb.connection.table import TableConnection
+    except ImportError:
+        return False
+    for name in ("get_item", "query"):
+        read = getattr(TableConnection, name)
+        if not getattr(read, "_consistency_policy", False):
+            setattr(TableConnection, name, _apply_policy(read))
+    return True
+
+
+class ConsistencyPolicy:
+    """Decides the read consistency of an incoming request."""
+
+    def __init__(self, aw_app: Any):
+        self.aw_app = aw_app
+        self._read_only: Optional[Set[str]] = None
+
+    def read_only_methods(self) -> Set[str]:
+        """Method hooks annotated readOnlyHint (minus STRONG_METHODS), computed once."""
+        if self._read_only is None:
+            from actingweb.interface.hooks import get_hook_metadata
+
+            names = set()
+            for name, funcs in getattr(self.aw_app.hooks, "_method_hooks", {}).items():
+                annotations = [get_hook_metadata(func).annotations or {} for func in funcs]
+                if annotations and all(a.get("readOnlyHint") for a in annotations):
+                    names.add(name)
+            self._read_only = names - STRONG_METHODS
+        return self._read_only
+
+    def for_request(self, method: str, path: str, body: Any = None) -> str:
+        """Return "eventual" or "strong" for a request."""
+        parts = path.strip("/").split("/")
+        if len(parts) == 3 and parts[1] == "methods" and method in ("GET", "POST"):
+            return "eventual" if parts[2] in self.read_only_methods() else "strong"
+        if parts == ["mcp"] and method == "POST" and isinstance(body, dict):
+            rpc_method = body.get("method")
+            if rpc_method in READ_ONLY_MCP_METHODS:
+                return "eventual"
+            if rpc_method == "tools/call":
+                params = body.get("params")
+                tool = params.get("name") if isinstance(params, dict) else None
+                if tool in self.read_only_methods():
+                    return "eventual"
+        return "strong"
+
+
+def init_flask(flask_app: Any, aw_app: Any) -> None:
+    """Apply the policy to each Flask request."""
+    from flask import g, request
+
+    if not install():
+        logger.info("Read consistency policy disabled; all reads are strongly consistent")
+        return
+    policy = ConsistencyPolicy(aw_app)
+
+    @flask_app.before_request
+    def _set_read_consistency() -> None:
+        body = request.get_json(silent=True) if request.path == "/mcp" else None
+        g.read_consistency_token = _consistency.set(policy.for_request(request.method, request.path, body))
+
+    @flask_app.teardown_request
+    def _reset_read_consistency(_exc: Optional[BaseException]) -> None:
+        token = g.pop("read_consistency_token", None)
+        if token is not None:
+            _consistency.reset(token)
+
+
+def init_fastapi(fastapi_app: Any, aw_app: Any) -> None:
+    """Apply the policy to each request of the ASGI app (see asgi.py)."""
+    if not install():
+        logger.info("Read consistency policy disabled; all reads are strongly consistent")
+        return
+    policy = ConsistencyPolicy(aw_app)
+
+    @fastapi_app.middleware("http")
+    async def _set_read_consistency(request: Any, call_next: Any) -> Any:
+        body = None
+        if request.url.path == "/mcp" and request.method == "POST":
+            try:
+                body = json.loads(await request.body() or b"null")
+            except ValueError:
+                body = None
+        # ActingWeb runs sync handlers in its thread pool with a copy of
+        # this context, so the setting reaches the PynamoDB reads
+        token = _consistency.set(policy.for_request(request.method, request.url.path, body))
+        try:
+            return await call_next(request)
+        finally:
+            _consistency.reset(token)
+
+
+def stats() -> Dict[str, Any]:
+    """Return read counters for monitoring."""
+    return {"policy": READ_CONSISTENCY, **_stats}
@@ -0,0 +1,273 @@
+"""
+Creator -> actor lookups for unique-creator, email-as-creator logins.
+
+application.py enables ``with_unique_creator`` and ``with_email_as_creator``,
+so every login maps an email (or provider id) to its one actor before it
+proceeds: the OAuth2 callback, the SPA and native token exchanges, the MCP
+authorization server and ``POST /oauth/email`` all call
+Actor.get_from_creator(), some of them twice (a probe, then
+lookup_or_create_actor_by_identifier()). Each call is a creator index query
+(a DynamoDB GSI query plus one read per match) before the actor row is read.
+
+install() puts an in-process index in front of that query:
+
+- Creator -> actor ids, for CREATOR_CACHE_TTL seconds. A repeat login
+  resolves the actor ids in memory and reads the actor row by key, so a
+  deleted actor or a changed passphrase is never served from the index.
+  Ids that no longer load drop the entry and fall back to the query.
+- Creators without an actor are remembered for CREATOR_NEGATIVE_TTL
+  seconds. A negative entry only answers probes: the lookup-or-create
+  paths always ask storage before creating, and Actor.create() keeps its
+  own uniqueness query, so an actor created by another process is never
+  duplicated.
+- Concurrent misses for the same creator share one query (single-flight),
+  and lookup-or-create runs under a per-creator lock, so a burst of
+  first-time logins for one email makes one actor and a handful of queries.
+
+Creating, deleting or renaming an actor (Actor.create/delete/modify) drops
+its creator's entry. Like the other caches here this is per process: the
+lock does not span workers, and another worker's negative entry can hide a
+new actor from its probes for up to CREATOR_NEGATIVE_TTL seconds.
+
+Settings:
+    CREATOR_CACHE: on (default) or off (every lookup queries storage)
+    CREATOR_CACHE_TTL: Seconds a creator's actor ids are reused (default 300)
+    CREATOR_NEGATIVE_TTL: Seconds a creator without actor is remembered (default 5)
+    CREATOR_CACHE_MAX_ENTRIES: Creators cached per process (default 10000)
+"""
+
+import contextvars
+import hashlib
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# "on" caches creator lookups, "off" leaves them to ActingWeb
+CREATOR_CACHE = os.getenv("CREATOR_CACHE", "on").lower()
+
+CREATOR_CACHE_TTL = float(os.getenv("CREATOR_CACHE_TTL", "300"))
+
+# Kept short: another process may create the actor meanwhile
+CREATOR_NEGATIVE_TTL = float(os.getenv("CREATOR_NEGATIVE_TTL", "5"))
+
+CREATOR_CACHE_MAX_ENTRIES = int(os.getenv("CREATOR_CACHE_MAX_ENTRIES", "10000"))
+
+# Seconds a lookup waits for a concurrent query of the same creator before running its own
+FLIGHT_TIMEOUT = 10.0
+
+# Lock stripes for lookup-or-create (creators hash onto these)
+LOCK_STRIPES = 64
+
+_stats = {"hits": 0, "negative_hits": 0, "misses": 0, "shared": 0, "evicted": 0, "stale": 0}
+
+# Set while a lookup-or-create runs: negative entries are not trusted there
+_creating: contextvars.ContextVar[bool] = contextvars.ContextVar("creator_index_creating", default=False)
+
+
+def normalize_creator(creator: str) -> str:
+    """Creator as stored (emails are lower-cased, as in ActingWeb)."""
+    return creator.lower() if "@" in creator else creator
+
+
+def _actor_ids(found: Any) -> Tuple[str, ...]:
+    """Sorted actor ids of a DbActor.get_by_creator() result."""
+    if not found:
+        return ()
+    records = found if isinstance(found, list) else [found]
+    return tuple(sorted(record["id"] for record in records if record and record.get("id")))
+
+
+class _Flight:
+    """One in-progress query that concurrent lookups wait for."""
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.ids: Optional[Tuple[str, ...]] = None
+
+
+class CreatorIndex:
+    """Creator -> actor ids with negative entries and single-flight queries."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Tuple[Tuple[str, ...], float]] = {}
+        self._flights: Dict[str, _Flight] = {}
+        # Bumped by every eviction; a query that overlapped one is not stored
+        self._generation = 0
+        self._stripes = [threading.RLock() for _ in range(LOCK_STRIPES)]
+
+    def lookup(self, creator: str, query: Callable[[], Tuple[str, ...]], trust_negative: bool = True) -> Tuple[str, ...]:
+        """
+        Actor ids of a creator, from the index or from query().
+
+        Args:
+            creator: Normalized creator
+            query: Reads the actor ids from storage
+            trust_negative: Answer "no actor" from a negative entry
+        """
+        entry = self._entries.get(creator)
+        if entry is not None and time.time() < entry[1]:
+            if entry[0]:
+                _stats["hits"] += 1
+                return entry[0]
+            if trust_negative:
+                _stats["negative_hits"] += 1
+                return ()
+        with self._lock:
+            flight = self._flights.get(creator)
+            leader = flight is None
+            if leader:
+                flight = self._flights[creator] = _Flight()
+            generation = self._generation
+        assert flight is not None
+        if not leader:
+            if flight.done.wait(FLIGHT_TIMEOUT) and flight.ids is not None:
+                _stats["shared"] += 1
+                return flight.ids
+            return query()
+        _stats["misses"] += 1
+        try:
+            ids = query()
+            flight.ids = ids
+            self._store(creator, ids, generation)
+            return ids
+        finally:
+            with self._lock:
+                self._flights.pop(creator, None)
+            flight.done.set()
+
+    def _store(self, creator: str, ids: Tuple[str, ...], generation: int) -> None:
+        now = time.time()
+        expires = now + (CREATOR_CACHE_TTL if ids else CREATOR_NEGATIVE_TTL)
+        with self._lock:
+            if generation != self._generation:
+                return
+            if creator not in self._entries and len(self._entries) >= CREATOR_CACHE_MAX_ENTRIES:
+                expired = [key for key, entry in self._entries.items() if entry[1] <= now]
+                for key in expired or list(self._entries)[: len(self._entries) // 2]:
+                    self._entries.pop(key, None)
+            self._entries[creator] = (ids, expires)
+
+    def evict(self, creator: Optional[str]) -> None:
+        """Forget a creator's entry (and any query for it in flight)."""
+        with self._lock:
+            self._generation += 1
+            if creator and self._entries.pop(normalize_creator(creator), None) is not None:
+                _stats["evicted"] += 1
+
+    def creating(self, creator: str) -> Any:
+        """Per-creator lock held while looking up or creating its actor."""
+        digest = hashlib.sha256(creator.encode("utf-8")).digest()
+        return self._stripes[int.from_bytes(digest[:4], "big") % LOCK_STRIPES]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+creator_index = CreatorIndex()
+
+
+def _cached_get_from_creator(original: Any) -> Any:
+    from actingweb.db import get_actor
+
+    def get_from_creator(self: Any, creator: Optional[str] = None) -> bool:
+        if not self.config or not creator:
+            return original(self, creator)
+        key = normalize_creator(creator)
+        config = self.config
+
+        def query() -> Tuple[str, ...]:
+            return _actor_ids(get_actor(config).get_by_creator(creator=key))
+
+        ids = creator_index.lookup(key, query, trust_negative=not _creating.get())
+        for actor_id in ids:
+            self.actor = None
+            self.get(actor_id=actor_id)
+            if self.id:
+                return True
+        if ids:
+            # Deleted (or purged) since it was indexed
+            _stats["stale"] += 1
+            creator_index.evict(key)
+            return original(self, creator)
+        self.id = None
+        self.creator = None
+        self.passphrase = None
+        return False
+
+    get_from_creator._creator_index = True  # type: ignore[attr-defined]
+    return get_from_creator
+
+
+def _single_flight(original: Any) -> Any:
+    """Run a lookup-or-create under its creator's lock, asking storage before creating."""
+
+    def lookup_or_create(self: Any, identifier: str, *args: Any, **kwargs: Any) -> Any:
+        if not identifier:
+            return original(self, identifier, *args, **kwargs)
+        token = _creating.set(True)
+        try:
+            with creator_index.creating(normalize_creator(identifier)):
+                return original(self, identifier, *args, **kwargs)
+        finally:
+            _creating.reset(token)
+
+    lookup_or_create._creator_index = True  # type: ignore[attr-defined]
+    return lookup_or_create
+
+
+def _evicting(original: Any, name: str) -> Any:
+    """Drop the actor's creator entry (before and after a rename) around an Actor method."""
+
+    def method(self: Any, *args: Any, **kwargs: Any) -> Any:
+        before = self.creator
+        try:
+            return original(self, *args, **kwargs)
+        finally:
+            creator_index.evict(before)
+            if self.creator != before:
+                creator_index.evict(self.creator)
+
+    method.__name__ = name
+    method._creator_index = True  # type: ignore[attr-defined]
+    return method
+
+
+def install() -> bool:
+    """
+    Cache creator lookups and single-flight lookup-or-create per creator.
+
+    Returns:
+        False if disabled by CREATOR_CACHE=off
+    """
+    if CREATOR_CACHE == "off":
+        return False
+    from actingweb.actor import Actor
+    from actingweb.oauth2 import OAuth2Authenticator
+    from actingweb.oauth2_server.oauth2_server import ActingWebOAuth2Server
+
+    patches = [(Actor, "get_from_creator", _cached_get_from_creator)]
+    patches += [(Actor, name, lambda f, name=name: _evicting(f, name)) for name in ("create", "delete", "modify")]
+    patches += [
+        (OAuth2Authenticator, "lookup_or_create_actor_by_identifier", _single_flight),
+        (ActingWebOAuth2Server, "_get_or_create_actor_for_email", _single_flight),
+    ]
+    for cls, attribute, wrap in patches:
+        original = getattr(cls, attribute)
+        if not getattr(original, "_creator_index", False):
+            setattr(cls, attribute, wrap(original))
+    return True
+
+
+def stats() -> Dict[str, Any]:
+    """Return creator index counters for monitoring."""
+    return {"enabled": CREATOR_CACHE != "off", "creators": len(creator_index), **_stats}
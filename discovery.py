@@ -0,0 +1,316 @@
+"""
+Cached discovery manifests for methods, actions and MCP tools/prompts.
+
+Clients discover what an actor offers before calling it: ``GET
+/{actor_id}/methods`` and ``GET /{actor_id}/actions`` list the registered
+hooks with their schemas, and MCP clients send ``tools/list`` and
+``prompts/list`` at the start of every session. ActingWeb rebuilds each of
+these from the hook decorators on every request, and for a peer checks
+every listed name against its permissions one evaluation (and one trust
+lookup) at a time.
+
+The hooks only change at registration, and a listing only depends on the
+caller's permission rules for that kind of hook. This module keeps:
+
+- methods/actions: the JSON body of each listing, serialized once per rule
+  set (the owner's unfiltered listing, and one per trust type or per-peer
+  override), with a strong ETag. A GET with a matching ``If-None-Match``
+  gets 304 Not Modified; any other GET writes the stored bytes.
+- tools/list, prompts/list: ActingWeb's own result, once per rule set. The
+  JSON-RPC envelope carries the request id, so the integration still
+  serializes the response; only the listing is reused. Tools with per-actor
+  or per-client metadata (visibility_predicate, description_predicate,
+  allowed_clients, client_descriptions) turn the tools cache off, since
+  their listing isn't a function of the rules alone.
+
+Under ASGI (asgi.py) ActingWeb uses AsyncMethodsHandler/AsyncActionsHandler,
+whose get_async() builds the listing itself; install() routes their
+listings through the same cached get(), so both servers answer alike.
+AsyncMCPHandler uses the patched MCPHandler list methods.
+
+Authentication and the handlers' own permission checks run on every
+request as before; a rule set is looked up per request (trust type plus any
+per-peer override, see PermissionEvaluator._get_effective_permissions), so
+a changed trust type or override picks another manifest. Registering hooks
+after startup rebuilds the manifests.
+
+Settings:
+    DISCOVERY_CACHE: on (default) or off (ActingWeb builds every listing)
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from actingweb import auth
+from actingweb.mcp.decorators import get_mcp_metadata, is_mcp_exposed
+from actingweb.permission_evaluator import PermissionResult, get_permission_evaluator
+
+logger = logging.getLogger(__name__)
+
+# "on" serves cached listings, "off" leaves discovery to ActingWeb
+DISCOVERY_CACHE = os.getenv("DISCOVERY_CACHE", "on").lower()
+
+# Listing kind -> (permission category, operation ActingWeb checks for it)
+LISTINGS = {
+    "methods": ("methods", "call"),
+    "actions": ("actions", "execute"),
+}
+
+# MCP tool metadata that makes tools/list depend on the actor or client
+_PER_CALLER_TOOL_METADATA = ("visibility_predicate", "description_predicate", "allowed_clients", "client_descriptions")
+
+# Key of the owner's (unfiltered) listings
+OWNER = "*"
+
+_stats = {"hits": 0, "misses": 0, "not_modified": 0, "fallbacks": 0}
+
+
+class Manifest:
+    """One serialized listing and its ETag."""
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def _rules_key(rules: Any) -> str:
+    return json.dumps(rules, sort_keys=True, default=repr)
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match comparison (weak, as for GET)."""
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+class ManifestCache:
+    """Listings per hook registry, kind and rule set."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._signature: Optional[Tuple[int, int, int]] = None
+        self._manifests: Dict[Tuple[str, str], Manifest] = {}
+        self._mcp_lists: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        self._tools_cacheable = True
+
+    def _sync(self, hooks: Any) -> None:
+        """Drop everything when hooks were registered since the last build."""
+        signature = (id(hooks), len(hooks._method_hooks), len(hooks._action_hooks))
+        if signature == self._signature:
+            return
+        with self._lock:
+            self._manifests.clear()
+            self._mcp_lists.clear()
+            self._tools_cacheable = not any(
+                metadata.get(key)
+                for hook_list in hooks._action_hooks.values()
+                for hook in hook_list
+                if is_mcp_exposed(hook)
+                for metadata in [get_mcp_metadata(hook) or {}]
+                for key in _PER_CALLER_TOOL_METADATA
+            )
+            self._signature = signature
+
+    def listing(self, hooks: Any, evaluator: Any, kind: str, rules: Any) -> Manifest:
+        """
+        The ``{kind: [...]}`` listing for a rule set (OWNER for no filtering).
+
+        A name is listed when ActingWeb's evaluator allows it under the rules,
+        as evaluate_method_access/evaluate_action_access would.
+        """
+        self._sync(hooks)
+        key = (kind, OWNER if rules is OWNER else _rules_key(rules))
+        manifest = self._manifests.get(key)
+        if manifest is not None:
+            _stats["hits"] += 1
+            return manifest
+        _stats["misses"] += 1
+        entries = hooks.get_method_metadata_list() if kind == "methods" else hooks.get_action_metadata_list()
+        if rules is not OWNER:
+            operation = LISTINGS[kind][1]
+            entries = [
+                entry
+                for entry in entries
+                if rules
+                and evaluator._evaluate_rules(rules, entry.get("name", ""), operation) == PermissionResult.ALLOWED
+            ]
+        manifest = Manifest(json.dumps({kind: entries}).encode("utf-8"))
+        with self._lock:
+            self._manifests[key] = manifest
+        return manifest
+
+    def mcp_list(self, hooks: Any, kind: str, rules: Any, build: Callable[[], List[Dict[str, Any]]]) -> Any:
+        """ActingWeb's tools/prompts listing for a rule set, built on first use; None if not cacheable."""
+        self._sync(hooks)
+        if kind == "tools" and not self._tools_cacheable:
+            return None
+        key = (kind, _rules_key(rules))
+        listing = self._mcp_lists.get(key)
+        if listing is not None:
+            _stats["hits"] += 1
+            return listing
+        _stats["misses"] += 1
+        listing = build()
+        with self._lock:
+            self._mcp_lists[key] = listing
+        return listing
+
+    def size(self) -> int:
+        return len(self._manifests) + len(self._mcp_lists)
+
+
+manifests = ManifestCache()
+
+
+def _peer_rules(config: Any, actor_id: str, peer_id: str, category: str) -> Tuple[Any, Any]:
+    """(evaluator, the peer's rules for a category or None)."""
+    evaluator = get_permission_evaluator(config)
+    permissions = evaluator._get_effective_permissions(actor_id, peer_id)
+    return evaluator, (permissions or {}).get(category)
+
+
+def _request_header(request: Any, name: str) -> str:
+    name = name.lower()
+    for key, value in (getattr(request, "headers", None) or {}).items():
+        if key.lower() == name:
+            return value
+    return ""
+
+
+def _listing_get(original: Any, kind: str, check_permission: str) -> Any:
+    """Wrap a handler's get() so the listing (no name) is served from the manifest cache."""
+
+    def get(self: Any, actor_id: str, name: str = "") -> None:
+        if name or not self.hooks or self.request.get("_method") in ("PUT", "POST"):
+            return original(self, actor_id, name)
+        # Authentication and the permission check exactly as in ActingWeb's get()
+        auth_result = self._authenticate_dual_context(actor_id, kind, kind, name=name, add_response=False)
+        if (
+            not auth_result.actor
+            or not auth_result.auth_obj
+            or (auth_result.auth_obj.response["code"] != 200 and auth_result.auth_obj.response["code"] != 401)
+        ):
+            auth.add_auth_response(appreq=self, auth_obj=auth_result.auth_obj)
+            return None
+        check = auth_result.auth_obj
+        if not getattr(self, check_permission)(actor_id, check, name):
+            if self.response:
+                self.response.set_status(403, "Forbidden")
+            return None
+        if not self._get_actor_interface(auth_result.actor):
+            if self.response:
+                self.response.set_status(404, "Not found")
+            return None
+
+        peer_id = check.acl.get("peerid", "") if hasattr(check, "acl") else ""
+        try:
+            if peer_id:
+                evaluator, rules = _peer_rules(self.config, actor_id, peer_id, LISTINGS[kind][0])
+                manifest = manifests.listing(self.hooks, evaluator, kind, rules)
+            else:
+                manifest = manifests.listing(self.hooks, None, kind, OWNER)
+        except Exception as e:
+            logger.warning("Discovery cache unavailable for %s listing: %s", kind, e)
+            _stats["fallbacks"] += 1
+            return original(self, actor_id, name)
+
+        if not self.response:
+            return None
+        self.response.headers["ETag"] = manifest.etag
+        # Listings need authentication: clients may keep them, but must revalidate
+        self.response.headers["Cache-Control"] = "private, no-cache"
+        if _etag_matches(_request_header(self.request, "If-None-Match"), manifest.etag):
+            # No JSON Content-Type: the FastAPI integration would write "{}" as the body
+            _stats["not_modified"] += 1
+            self.response.set_status(304, "Not Modified")
+            return None
+        self.response.headers["Content-Type"] = "application/json"
+        self.response.set_status(200, "OK")
+        self.response.write(manifest.body)
+        return None
+
+    get._discovery_cache = True  # type: ignore[attr-defined]
+    return get
+
+
+def _async_listing_get(original: Any) -> Any:
+    """Wrap an async handler's get_async() so the listing goes through the cached get()."""
+
+    async def get_async(self: Any, actor_id: str, name: str = "") -> None:
+        if name or not self.hooks or self.request.get("_method") in ("PUT", "POST"):
+            return await original(self, actor_id, name)
+        # ActingWeb's get_async() authenticates synchronously too, and a listing runs no hook
+        return self.get(actor_id, name)
+
+    get_async._discovery_cache = True  # type: ignore[attr-defined]
+    return get_async
+
+
+def _mcp_listing(original: Any, kind: str, category: str) -> Any:
+    """Wrap MCPHandler._handle_tools_list/_handle_prompts_list with the per-rule-set cache."""
+
+    def handle(self: Any, request_id: Any, actor: Any) -> Dict[str, Any]:
+        if not self.hooks:
+            return original(self, request_id, actor)
+        peer_id = self._peer_id_for_list(actor, f"{kind}/list")
+        if not peer_id:
+            return {"jsonrpc": "2.0", "id": request_id, "result": {kind: []}}
+        try:
+            _, rules = _peer_rules(self.config, actor.id, peer_id, category)
+
+            def build() -> List[Dict[str, Any]]:
+                return original(self, request_id, actor)["result"][kind]
+
+            listing = manifests.mcp_list(self.hooks, kind, rules, build)
+        except Exception as e:
+            logger.warning("Discovery cache unavailable for %s/list: %s", kind, e)
+            listing = None
+        if listing is None:
+            _stats["fallbacks"] += 1
+            return original(self, request_id, actor)
+        return {"jsonrpc": "2.0", "id": request_id, "result": {kind: listing}}
+
+    handle._discovery_cache = True  # type: ignore[attr-defined]
+    return handle
+
+
+def install() -> bool:
+    """
+    Serve method/action listings and MCP tools/prompts lists from the manifest cache.
+
+    Returns:
+        False if disabled by DISCOVERY_CACHE=off
+    """
+    if DISCOVERY_CACHE == "off":
+        return False
+    from actingweb.handlers.actions import ActionsHandler
+    from actingweb.handlers.async_actions import AsyncActionsHandler
+    from actingweb.handlers.async_methods import AsyncMethodsHandler
+    from actingweb.handlers.mcp import MCPHandler
+    from actingweb.handlers.methods import MethodsHandler
+
+    patches = (
+        (MethodsHandler, "get", lambda f: _listing_get(f, "methods", "_check_method_permission")),
+        (ActionsHandler, "get", lambda f: _listing_get(f, "actions", "_check_action_permission")),
+        (AsyncMethodsHandler, "get_async", _async_listing_get),
+        (AsyncActionsHandler, "get_async", _async_listing_get),
+        (MCPHandler, "_handle_tools_list", lambda f: _mcp_listing(f, "tools", "tools")),
+        (MCPHandler, "_handle_prompts_list", lambda f: _mcp_listing(f, "prompts", "prompts")),
+    )
+    for cls, attribute, wrap in patches:
+        original = getattr(cls, attribute)
+        if not getattr(original, "_discovery_cache", False):
+            setattr(cls, attribute, wrap(original))
+    return True
+
+
+def stats() -> Dict[str, Any]:
+    """Return discovery cache counters for monitoring."""
+    return {"enabled": DISCOVERY_CACHE != "off", "manifests": manifests.size(), **_stats}
@@ -0,0 +1,246 @@
+"""
+Shared DynamoDB clients for the ActingWeb demo.
+
+ActingWeb's DynamoDB backend uses PynamoDB models, each of which lazily
+creates one botocore client with a connection pool of PynamoDB's default size
+(10), independent of how many threads serve requests. Code in the app that
+talks to DynamoDB directly (e.g. /nuke) used to build a new boto3 resource
+per call, paying for credential resolution and a TLS handshake each time.
+
+This module provides:
+
+- A process-wide registry with one thread-safe botocore client (and per-thread
+  boto3 resources, which are not thread-safe) built from a single session.
+  The client uses TCP keep-alive and a connection pool sized to the number of
+  request threads, so each thread can hold a connection without waiting.
+- configure_pynamodb(), which applies the same pool size to ActingWeb's
+  PynamoDB models and drops clients inherited across a fork, so uwsgi
+  workers never share sockets with the master.
+- pool_stats(), which reports connections in use per pool and how often a
+  pool was full (urllib3 then opens an extra connection and discards it
+  after the request, i.e. the pool is too small).
+
+Clients live at module level, so on AWS Lambda they are reused by every warm
+invocation of the same container.
+
+Environment variables:
+    DYNAMODB_POOL_SIZE: Connections per client (default: uwsgi ``threads``
+        when running under uwsgi, else 10)
+    DYNAMODB_CONNECT_TIMEOUT / DYNAMODB_READ_TIMEOUT: Seconds (default 5 / 10)
+    AWS_DB_HOST: Endpoint URL of a local DynamoDB
+    AWS_DEFAULT_REGION: Region (default us-west-1, as ActingWeb)
+"""
+
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_SIZE = 10
+
+# urllib3 logs this when a connection is returned to a full pool
+_POOL_FULL_MESSAGE = "Connection pool is full"
+
+
+def default_pool_size() -> int:
+    """Return DYNAMODB_POOL_SIZE, or the uwsgi thread count, or DEFAULT_POOL_SIZE."""
+    configured = os.getenv("DYNAMODB_POOL_SIZE")
+    if configured:
+        return max(1, int(configured))
+    try:
+        import uwsgi  # type: ignore[import-not-found]
+
+        threads = uwsgi.opt.get("threads")
+        if isinstance(threads, bytes):
+            threads = threads.decode()
+        if threads:
+            # One connection per request thread plus one for background workers
+            return max(1, int(threads)) + 1
+    except (ImportError, ValueError, AttributeError):
+        pass
+    return DEFAULT_POOL_SIZE
+
+
+class _PoolFullCounter(logging.Filter):
+    """Count urllib3 "Connection pool is full" warnings without suppressing them."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.count = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.msg and str(record.msg).startswith(_POOL_FULL_MESSAGE):
+            self.count += 1
+        return True
+
+
+_pool_full = _PoolFullCounter()
+logging.getLogger("urllib3.connectionpool").addFilter(_pool_full)
+
+
+class DynamoDBRegistry:
+    """
+    Process-wide DynamoDB client and resources.
+
+    Everything is created on first use and re-created in a forked child.
+    """
+
+    def __init__(self, pool_size: Optional[int] = None):
+        self.pool_size = pool_size or default_pool_size()
+        self._lock = threading.Lock()
+        self._pid: Optional[int] = None
+        self._session: Any = None
+        self._client: Any = None
+        self._local = threading.local()
+
+    def _config(self) -> Any:
+        from botocore.config import Config
+
+        return Config(
+            max_pool_connections=self.pool_size,
+            tcp_keepalive=True,
+            connect_timeout=float(os.getenv("DYNAMODB_CONNECT_TIMEOUT", "5")),
+            read_timeout=float(os.getenv("DYNAMODB_READ_TIMEOUT", "10")),
+            retries={"mode": "standard", "max_attempts": 4},
+        )
+
+    def _connection_args(self) -> Dict[str, Any]:
+        args: Dict[str, Any] = {"region_name": os.getenv("AWS_DEFAULT_REGION", "us-west-1")}
+        if os.getenv("AWS_DB_HOST"):
+            args["endpoint_url"] = os.getenv("AWS_DB_HOST")
+        return args
+
+    def session(self) -> Any:
+        """Return this process's boto3 session (credentials are resolved once)."""
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    import boto3
+
+                    self._session = boto3.session.Session()
+                    self._client = None
+                    self._local = threading.local()
+                    self._pid = os.getpid()
+        return self._session
+
+    def client(self) -> Any:
+        """Return the shared, thread-safe DynamoDB client."""
+        session = self.session()
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = session.client("dynamodb", config=self._config(), **self._connection_args())
+        return self._client
+
+    def resource(self) -> Any:
+        """Return this thread's DynamoDB resource (boto3 resources are not thread-safe)."""
+        session = self.session()
+        resource = getattr(self._local, "resource", None)
+        if resource is None:
+            with self._lock:
+                # Session.resource() isn't thread-safe either
+                resource = session.resource("dynamodb", config=self._config(), **self._connection_args())
+            self._local.resource = resource
+        return resource
+
+    def table(self, name: str) -> Any:
+        """Return a Table for this thread."""
+        return self.resource().Table(name)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return pool usage of the shared client and the PynamoDB model clients."""
+        pools: List[Dict[str, Any]] = []
+        if self._client is not None and self._pid == os.getpid():
+            pools.extend(_client_pools("registry", self._client))
+        for model in _pynamodb_models():
+            connection = getattr(model, "_connection", None)
+            client = getattr(getattr(connection, "connection", None), "_client", None)
+            if client is not None:
+                pools.extend(_client_pools(model.__name__, client))
+        return {
+            "pool_size": self.pool_size,
+            "pools": pools,
+            "in_use": sum(p["in_use"] for p in pools),
+            "pool_full_events": _pool_full.count,
+        }
+
+
+def _client_pools(owner: str, client: Any) -> List[Dict[str, Any]]:
+    """Describe the urllib3 pools behind a botocore client (best effort, private APIs)."""
+    try:
+        manager = client._endpoint.http_session._manager
+        containers = [manager] + list(client._endpoint.http_session._proxy_managers.values())
+    except AttributeError:
+        return []
+    pools = []
+    for container in containers:
+        for key in list(container.pools.keys()):
+            pool = container.pools.get(key)
+            if pool is None or pool.pool is None:
+                continue
+            # The queue holds idle connections plus None placeholders for
+            # connections not yet opened; what is missing is checked out
+            in_use = pool.pool.maxsize - pool.pool.qsize()
+            pools.append({
+                "owner": owner,
+                "host": pool.host,
+                "maxsize": pool.pool.maxsize,
+                "in_use": in_use,
+                "opened": pool.num_connections,
+                "requests": pool.num_requests,
+                "saturated": in_use >= pool.pool.maxsize,
+            })
+    return pools
+
+
+def _pynamodb_models() -> List[Any]:
+    """Return ActingWeb's PynamoDB model classes (empty if the backend isn't importable)."""
+    try:
+        from pynamodb.models import Model
+
+        import actingweb.db.dynamodb as backend
+    except ImportError:
+        return []
+    return [
+        value for value in vars(backend).values()
+        if isinstance(value, type) and issubclass(value, Model) and value is not Model
+    ]
+
+
+def _reset_pynamodb_connections() -> None:
+    for model in _pynamodb_models():
+        model._connection = None
+
+
+_fork_hook_registered = False
+
+
+def configure_pynamodb(pool_size: Optional[int] = None) -> None:
+    """
+    Size the connection pools of ActingWeb's PynamoDB models and make them fork-safe.
+
+    Call before the first database access. Models that set their own
+    max_pool_connections keep it.
+    """
+    size = pool_size or dynamodb.pool_size
+    for model in _pynamodb_models():
+        if getattr(model.Meta, "max_pool_connections", None) is None:
+            model.Meta.max_pool_connections = size
+        # Rebuild with the new size if a client was already created
+        model._connection = None
+    global _fork_hook_registered
+    if not _fork_hook_registered:
+        os.register_at_fork(after_in_child=_reset_pynamodb_connections)
+        _fork_hook_registered = True
+    logger.debug("PynamoDB connection pools sized to %s", size)
+
+
+def pool_stats() -> Dict[str, Any]:
+    """Return DynamoDB connection pool metrics for this process."""
+    return dynamodb.stats()
+
+
+# Process-wide registry
+dynamodb = DynamoDBRegistry()
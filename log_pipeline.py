@@ -0,0 +1,281 @@
+"""
+Structured, non-blocking logging for the ActingWeb demo.
+
+Replaces the synchronous stderr StreamHandler from logging.basicConfig with:
+
+- A queue handler on the request path. It renders the message of a record
+  that passed the level, sampling and rate limits (msg % args, so the
+  queued record holds no references to the caller's objects), enqueues it
+  and never blocks: when the queue is full, records are dropped and counted.
+- A listener thread that formats records (as JSON or plain text) and writes
+  them to stderr, so the JSON encoding and the write happen off the request
+  thread.
+- Per-logger sampling and rate limits, applied before a record is queued.
+
+Use lazy %-style arguments rather than f-strings so that nothing is formatted
+when the level is disabled or the record is sampled out:
+
+    logger.debug("Received subscription data: id=%s, data=%s", sub_id, data)
+
+Structured fields can be added with ``extra``; they appear as top-level keys
+in the JSON output:
+
+    logger.info("Search done", extra={"actor_id": actor.id, "results": 3})
+
+Queued records are flushed when the process exits normally (atexit). uwsgi
+doesn't run atexit handlers when it reloads or recycles a worker
+(max-requests, harakiri, touch-reload), so the handler also registers its
+flush as ``uwsgi.atexit``, which uwsgi calls on worker shutdown; a worker
+killed outright (SIGKILL) still loses what was queued.
+
+Environment variables:
+    LOG_LEVEL: Root log level (default INFO)
+    LOG_FORMAT: "json" (default) or "text"
+    LOG_ASYNC: "false" to log synchronously (e.g. when debugging the logging
+        itself). Defaults to "false" on AWS Lambda, where a background thread
+        is frozen between invocations and queued records could be lost.
+    LOG_QUEUE_SIZE: Maximum queued records before dropping (default 10000)
+    LOG_SAMPLING: Comma-separated logger=rate pairs, e.g.
+        "shared_hooks.protocol.subscription_hooks=0.1". Only DEBUG and INFO
+        records are sampled.
+    LOG_RATE_LIMITS: Comma-separated logger=records_per_second pairs, e.g.
+        "actingweb=200". Applies to all levels.
+
+Logger names match by prefix, so "shared_hooks" covers all hook modules.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
+
+# LogRecord attributes that are not user-supplied "extra" fields
+_RESERVED_ATTRS = frozenset(
+    vars(logging.LogRecord("", 0, "", 0, "", (), None)).keys()
+) | {"message", "asctime", "taskName"}
+
+
+def _parse_pairs(value: str) -> Dict[str, float]:
+    """Parse "name=1.5,other=2" into {"name": 1.5, "other": 2.0}."""
+    pairs: Dict[str, float] = {}
+    for item in value.split(","):
+        name, sep, number = item.strip().rpartition("=")
+        if not sep:
+            continue
+        try:
+            pairs[name.strip()] = float(number)
+        except ValueError:
+            continue
+    return pairs
+
+
+def _lookup(table: Dict[str, Any], logger_name: str) -> Any:
+    """Return the value of the longest dotted prefix of logger_name in table."""
+    name = logger_name
+    while name:
+        if name in table:
+            return table[name]
+        name = name.rpartition(".")[0]
+    return table.get("", None)
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line, including ``extra`` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Drop records by per-logger sample rate and rate limit.
+
+    Sampling only applies below WARNING, so warnings and errors are never
+    sampled out. Rate limits use a token bucket per configured logger prefix
+    and apply to all levels.
+    """
+
+    def __init__(
+        self,
+        sampling: Optional[Dict[str, float]] = None,
+        rate_limits: Optional[Dict[str, float]] = None,
+    ):
+        super().__init__()
+        self.sampling = sampling or {}
+        self.rate_limits = rate_limits or {}
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+        self.sampled_out = 0
+        self.rate_limited = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.sampling and record.levelno < logging.WARNING:
+            rate = _lookup(self.sampling, record.name)
+            if rate is not None and random.random() >= rate:
+                self.sampled_out += 1
+                return False
+
+        if self.rate_limits:
+            name = record.name
+            while name and name not in self.rate_limits:
+                name = name.rpartition(".")[0]
+            if name in self.rate_limits:
+                return self._take_token(name, self.rate_limits[name])
+        return True
+
+    def _take_token(self, name: str, per_second: float) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.get(name, (per_second, now))
+            tokens = min(per_second, tokens + (now - last) * per_second)
+            if tokens < 1:
+                self._buckets[name] = (tokens, now)
+                self.rate_limited += 1
+                return False
+            self._buckets[name] = (tokens - 1, now)
+            return True
+
+
+class AsyncQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler that defers all formatting to the listener thread.
+
+    Unlike the stdlib QueueHandler it does not format the message before
+    queueing, and it never blocks the caller. The listener thread is started
+    lazily in each process, because uwsgi forks workers after the app is
+    imported and threads started before the fork do not survive it.
+    """
+
+    def __init__(self, target: logging.Handler, maxsize: int = 10000):
+        super().__init__(queue.Queue(maxsize=maxsize))
+        self.target = target
+        self.dropped = 0
+        self._listener: Optional[logging.handlers.QueueListener] = None
+        self._pid: Optional[int] = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_listener(self) -> None:
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            # After a fork the parent's queue may hold records and its listener
+            # thread is gone; start clean in this process.
+            self.queue = queue.Queue(maxsize=self.queue.maxsize)  # type: ignore[attr-defined]
+            self._listener = logging.handlers.QueueListener(
+                self.queue, self.target, respect_handler_level=True
+            )
+            self._listener.start()
+            self._pid = os.getpid()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Render the message now: args may be mutated by the caller (or not be
+        # thread-safe to read) once the log call returns.
+        record.msg = record.getMessage()
+        record.args = None
+        # Render tracebacks now: exc_info holds frames that are not safe to
+        # keep around and can't be formatted after the stack unwinds.
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        self._ensure_listener()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def stop(self) -> None:
+        """Flush queued records and stop the listener thread."""
+        if self._listener is not None and self._pid == os.getpid():
+            self._listener.stop()
+            self._listener = None
+            self._pid = None
+
+
+def _register_uwsgi_atexit(flush: Any) -> None:
+    """Run flush on uwsgi worker shutdown too, after any uwsgi.atexit already set."""
+    try:
+        import uwsgi  # type: ignore[import-not-found]
+    except ImportError:
+        return
+    previous = getattr(uwsgi, "atexit", None)
+
+    def _atexit() -> None:
+        if callable(previous):
+            previous()
+        flush()
+
+    uwsgi.atexit = _atexit
+
+
+def configure_logging(level: Optional[str] = None) -> logging.Handler:
+    """
+    Configure the root logger with the structured, non-blocking pipeline.
+
+    Replaces any handlers installed by logging.basicConfig.
+
+    Args:
+        level: Root log level (defaults to LOG_LEVEL or INFO)
+
+    Returns:
+        The handler installed on the root logger
+    """
+    level = level or os.getenv("LOG_LEVEL", "INFO")
+
+    stream_handler = logging.StreamHandler(sys.stderr)
+    if os.getenv("LOG_FORMAT", "json").lower() == "text":
+        stream_handler.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+    else:
+        stream_handler.setFormatter(JsonFormatter())
+
+    handler: logging.Handler
+    default_async = "false" if os.getenv("AWS_LAMBDA_FUNCTION_NAME") else "true"
+    if os.getenv("LOG_ASYNC", default_async).lower() == "false":
+        handler = stream_handler
+    else:
+        handler = AsyncQueueHandler(
+            stream_handler, maxsize=int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+        )
+        atexit.register(handler.stop)
+        _register_uwsgi_atexit(handler.stop)
+
+    handler.addFilter(
+        SamplingFilter(
+            sampling=_parse_pairs(os.getenv("LOG_SAMPLING", "")),
+            rate_limits=_parse_pairs(os.getenv("LOG_RATE_LIMITS", "")),
+        )
+    )
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
+    return handler
@@ -0,0 +1,260 @@
+"""
+Validated MCP bearer tokens, cached by token hash.
+
+MCP clients authenticate with ActingWeb access tokens (``oauth_scope="mcp"``,
+see application.py). ActingWeb's MCP handler keeps validated tokens in an
+in-process dict for five minutes, but:
+
+- the dict is keyed by the raw bearer token, so every live token sits in
+  process memory in the clear;
+- an entry lives its five minutes even when the token expires sooner, so
+  an expired token keeps authenticating from a warm process;
+- every tool call still looks up the caller's trust row to resolve its
+  trust type (PermissionEvaluator._lookup_trust_type_from_database).
+
+install() replaces the handler's dict with a TokenCache:
+
+- Entries are keyed by the SHA-256 of the token and hold the resolved
+  actor, client, trust type and scopes (plus ActingWeb's token data).
+- An entry expires after MCP_TOKEN_CACHE_TTL seconds or
+  MCP_TOKEN_EXPIRY_MARGIN seconds before the token does, whichever is
+  first; an entry for an already expired token is never stored.
+- Revocation and logout (MCPHandler.clear_token_from_cache) and trust
+  deletion (evict_mcp_caches_for_actor) evict through the handler's own
+  calls, which now land here; evicting an actor also drops its cached
+  trust records (trust_cache.py).
+- Evicting an actor, and revoking an access token
+  (ActingWebTokenManager.revoke_token), rewrites the actor's revocation
+  marker in storage. An entry is only served while the actor's marker is
+  the one it was filled under (auth_revocation.py); otherwise the actor's
+  MCP caches in this process are dropped and the token is validated
+  again. Other workers notice within AUTH_REVOCATION_CHECK_INTERVAL
+  seconds (default 2). A refresh replacing an access token is not a
+  revocation: the old token stays cached until its entry expires.
+
+With the trust type of the client's trust cached by trust_cache.py, a
+steady-state MCP call reads neither the token store nor the trust table,
+only the revocation marker once per check interval.
+
+Settings:
+    MCP_TOKEN_CACHE: on (default) or off (ActingWeb's own cache only)
+    MCP_TOKEN_CACHE_TTL: Seconds a validation is reused (default 120)
+    MCP_TOKEN_EXPIRY_MARGIN: Seconds before token expiry an entry is dropped (default 5)
+    MCP_TOKEN_CACHE_MAX_ENTRIES: Cached tokens per process (default 10000)
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, FrozenSet, Iterator, Optional
+
+import auth_revocation
+from trust_cache import trust_cache
+
+logger = logging.getLogger(__name__)
+
+# "on" caches validations by token hash, "off" leaves ActingWeb's cache alone
+MCP_TOKEN_CACHE = os.getenv("MCP_TOKEN_CACHE", "on").lower()
+
+# Kept below ActingWeb's five-minute cache TTL, which still applies on top
+MCP_TOKEN_CACHE_TTL = float(os.getenv("MCP_TOKEN_CACHE_TTL", "120"))
+
+MCP_TOKEN_EXPIRY_MARGIN = float(os.getenv("MCP_TOKEN_EXPIRY_MARGIN", "5"))
+
+MCP_TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("MCP_TOKEN_CACHE_MAX_ENTRIES", "10000"))
+
+_stats = {"hits": 0, "misses": 0, "expired": 0, "evicted": 0, "revoked": 0}
+
+# ActingWeb's evict_mcp_caches_for_actor, which drops an actor's entries in this process only
+_evict_local: Optional[Any] = None
+
+
+def token_key(token: str) -> str:
+    """Cache key of a bearer token."""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def _scopes(token_data: Dict[str, Any]) -> FrozenSet[str]:
+    scope = token_data.get("scope") or ""
+    return frozenset(scope.split()) if isinstance(scope, str) else frozenset(scope)
+
+
+class TokenCache:
+    """
+    Validated tokens by token hash, with the dict interface the MCP handler uses.
+
+    The handler stores ``{actor_id, client_id, token_data, cached_at}`` under
+    the raw token and reads, pops and scans entries; keys handed back by
+    copy() are hashes, and pop()/del accept either.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+
+    def _key(self, token: str) -> str:
+        return token if token in self._entries else token_key(token)
+
+    def _live(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.time() >= entry["expires"]:
+            self._entries.pop(key, None)
+            _stats["expired"] += 1
+            return None
+        actor_id = entry.get("actor_id")
+        if actor_id and not auth_revocation.matches(actor_id, entry["marker"]):
+            # Revoked through another worker: drop the handler's actor and
+            # trust entries too, which it would otherwise serve on refill
+            self._entries.pop(key, None)
+            _stats["revoked"] += 1
+            if _evict_local is not None:
+                _evict_local(actor_id)
+            return None
+        return entry
+
+    def get(self, token: str, default: Any = None) -> Any:
+        entry = self._live(token_key(token))
+        return default if entry is None else entry
+
+    def __contains__(self, token: object) -> bool:
+        # The handler tests membership, then reads the entry
+        if isinstance(token, str) and self._live(token_key(token)) is not None:
+            return True
+        _stats["misses"] += 1
+        return False
+
+    def __getitem__(self, token: str) -> Dict[str, Any]:
+        entry = self.get(token)
+        if entry is None:
+            raise KeyError("token not cached")
+        _stats["hits"] += 1
+        return entry
+
+    def __setitem__(self, token: str, data: Dict[str, Any]) -> None:
+        token_data = data.get("token_data") or {}
+        now = time.time()
+        expires = now + MCP_TOKEN_CACHE_TTL
+        expires_at = token_data.get("expires_at")
+        if isinstance(expires_at, (int, float)):
+            expires = min(expires, expires_at - MCP_TOKEN_EXPIRY_MARGIN)
+        if expires <= now:
+            return
+        # The handler stores the entry after validating the token; cached_at
+        # is when its validation started
+        marker = auth_revocation.stamp(data["actor_id"], data.get("cached_at", now)) if data.get("actor_id") else ""
+        if marker is None:
+            return
+        entry = {
+            **data,
+            "trust_type": token_data.get("trust_type"),
+            "scopes": _scopes(token_data),
+            "expires": expires,
+            "marker": marker,
+        }
+        key = token_key(token)
+        with self._lock:
+            if key not in self._entries and len(self._entries) >= MCP_TOKEN_CACHE_MAX_ENTRIES:
+                self._prune(now)
+            self._entries[key] = entry
+
+    def _prune(self, now: float) -> None:
+        """Drop expired entries, or the oldest half if none have expired."""
+        expired = [key for key, entry in self._entries.items() if entry["expires"] <= now]
+        if not expired:
+            expired = sorted(self._entries, key=lambda key: self._entries[key]["expires"])[: len(self._entries) // 2]
+        for key in expired:
+            self._entries.pop(key, None)
+        _stats["evicted"] += len(expired)
+
+    def __delitem__(self, token: str) -> None:
+        if self.pop(token, None) is None:
+            raise KeyError("token not cached")
+
+    def pop(self, token: str, default: Any = None) -> Any:
+        entry = self._entries.pop(self._key(token), None)
+        if entry is None:
+            return default
+        _stats["evicted"] += 1
+        return entry
+
+    def copy(self) -> Dict[str, Dict[str, Any]]:
+        return self._entries.copy()
+
+    def items(self) -> Any:
+        return self._entries.copy().items()
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._entries.copy())
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+token_cache = TokenCache()
+
+
+def _evicting(original: Any) -> Any:
+    def evict_mcp_caches_for_actor(actor_id: str) -> int:
+        # Also rewrites the actor's revocation marker
+        trust_cache.evict_actor(actor_id)
+        return original(actor_id)
+
+    evict_mcp_caches_for_actor._mcp_auth_cache = True  # type: ignore[attr-defined]
+    return evict_mcp_caches_for_actor
+
+
+def _revoking(original: Any) -> Any:
+    """Rewrite the owning actor's revocation marker after an access token is revoked."""
+
+    def revoke_token(self: Any, token: str, token_type_hint: Optional[str] = None) -> bool:
+        actor_id = None
+        if token.startswith(self.token_prefix):
+            token_data = self._load_access_token(token)
+            actor_id = token_data.get("actor_id") if token_data else None
+        try:
+            return bool(original(self, token, token_type_hint))
+        finally:
+            # Refresh tokens evict their actor through evict_mcp_caches_for_actor
+            auth_revocation.revoke(actor_id)
+
+    revoke_token._mcp_auth_cache = True  # type: ignore[attr-defined]
+    return revoke_token
+
+
+def install() -> bool:
+    """
+    Cache MCP token validations by token hash.
+
+    Returns:
+        False if disabled by MCP_TOKEN_CACHE=off
+    """
+    if MCP_TOKEN_CACHE == "off":
+        return False
+    global _evict_local
+    from actingweb.handlers import mcp
+    from actingweb.oauth2_server.token_manager import ActingWebTokenManager
+
+    if not isinstance(mcp._token_cache, TokenCache):
+        mcp._token_cache = token_cache  # type: ignore[assignment]
+    if not getattr(mcp.evict_mcp_caches_for_actor, "_mcp_auth_cache", False):
+        _evict_local = mcp.evict_mcp_caches_for_actor
+        mcp.evict_mcp_caches_for_actor = _evicting(mcp.evict_mcp_caches_for_actor)
+    if not getattr(ActingWebTokenManager.revoke_token, "_mcp_auth_cache", False):
+        ActingWebTokenManager.revoke_token = _revoking(ActingWebTokenManager.revoke_token)  # type: ignore[method-assign]
+    return True
+
+
+def stats() -> Dict[str, Any]:
+    """Return token cache counters for monitoring."""
+    return {
+        "enabled": MCP_TOKEN_CACHE != "off",
+        "tokens": len(token_cache),
+        **_stats,
+    }
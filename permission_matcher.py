@@ -0,0 +1,329 @@
+"""
+Compiled permission rules for trust types.
+
+ActingWeb's PermissionEvaluator checks a target (property name, method,
+tool, prompt) against the rules of a trust type by trying each glob of
+``denied``, ``allowed``, ``patterns`` and ``excluded_patterns`` in turn. The
+``mcp_client`` trust type in application.py has six excluded patterns, and
+MCP reads check every property they touch, so filtering a large property
+set costs patterns x properties regex matches.
+
+This module replaces that loop:
+
+- Each rule set (e.g. the ``properties`` rules of ``mcp_client``) is
+  compiled once into one regex alternation per pattern list. Rule sets are
+  looked up by identity, then by content, so the base permissions of a
+  trust type and a per-peer override with the same content share one
+  compiled matcher.
+- Decisions are memoized per compiled rule set and (target, operation).
+  All peers of a trust type share the rule set, so the second check of a
+  property name, by any of them, is one dict lookup.
+
+Decisions are the same as the evaluator's own: denied patterns first, then
+allowed, then patterns/operations/excluded_patterns; ``*`` matches
+anything, ``?`` one character, a pattern ending in ``://`` also matches as
+a prefix, and identifiers with control characters are denied. Rule sets the
+compiler doesn't understand (non-string patterns) fall back to the
+evaluator's own code.
+
+Trust type lookups and per-peer overrides are unchanged; only the matching
+of names against the resulting rules is replaced.
+
+projection() turns a rule set into what a storage read may skip for one
+operation (see Projection and storage/projection.py), so names a trust type
+can never read are left out of the query rather than filtered afterwards.
+
+Settings:
+    PERMISSION_MATCHER: compiled (default) or library (ActingWeb's matching)
+    PERMISSION_MEMO_MAX_ENTRIES: Memoized decisions per rule set (default 65536)
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from actingweb.identifiers import has_control_characters
+from actingweb.permission_evaluator import PermissionEvaluator, PermissionResult
+
+logger = logging.getLogger(__name__)
+
+# "compiled" replaces the evaluator's pattern matching, "library" keeps it
+PERMISSION_MATCHER = os.getenv("PERMISSION_MATCHER", "compiled").lower()
+
+# Bound on memoized decisions per rule set; target names can be peer-chosen,
+# so the memo is cleared when it fills up rather than growing without limit
+PERMISSION_MEMO_MAX_ENTRIES = int(os.getenv("PERMISSION_MEMO_MAX_ENTRIES", "65536"))
+
+# Bound on compiled rule sets kept per lookup table
+MAX_RULE_SETS = 256
+
+_stats = {"compiled": 0, "decisions": 0, "memo_hits": 0, "fallbacks": 0}
+
+
+def _glob(pattern: str) -> str:
+    """Regex for a glob, with the evaluator's semantics (whole string, ``*`` and ``?`` match newlines)."""
+    fragment = re.escape(pattern).replace(r"\*", ".*").replace(r"\?", ".")
+    if pattern.endswith("://"):
+        # URI-like patterns also match as a prefix
+        return f"(?:{fragment}\\Z|{re.escape(pattern)}.*)"
+    return f"(?:{fragment}\\Z)"
+
+
+class PatternSet:
+    """A list of globs compiled into one regex alternation."""
+
+    def __init__(self, patterns: Any):
+        if patterns is None:
+            patterns = []
+        if not isinstance(patterns, (list, tuple)) or not all(isinstance(p, str) for p in patterns):
+            raise TypeError(f"Unsupported pattern list: {patterns!r}")
+        self.patterns: Tuple[str, ...] = tuple(patterns)
+        self.match_all = "*" in self.patterns
+        self._regex = re.compile("|".join(_glob(p) for p in self.patterns), re.DOTALL) if self.patterns else None
+
+    def matches(self, target: str) -> bool:
+        if self.match_all:
+            return True
+        return self._regex is not None and self._regex.match(target) is not None
+
+
+class RuleMatcher:
+    """Compiled form of one permission rule set, with memoized decisions."""
+
+    def __init__(self, rules: Dict[str, Any]):
+        self.denied = PatternSet(rules["denied"]) if "denied" in rules else None
+        self.allowed = PatternSet(rules["allowed"]) if "allowed" in rules else None
+        self.patterns: Optional[PatternSet] = None
+        self.excluded: Optional[PatternSet] = None
+        self.operations: Optional[FrozenSet[str]] = None
+        if "patterns" in rules and "operations" in rules:
+            operations = rules["operations"]
+            if not isinstance(operations, (list, tuple, set, frozenset)):
+                raise TypeError(f"Unsupported operations: {operations!r}")
+            self.patterns = PatternSet(rules["patterns"])
+            self.excluded = PatternSet(rules.get("excluded_patterns") or [])
+            self.operations = frozenset(operations)
+        self._decisions: Dict[Tuple[str, str], PermissionResult] = {}
+        self._projections: Dict[str, "Projection"] = {}
+
+    def _decide(self, target: str, operation: str) -> PermissionResult:
+        if has_control_characters(target):
+            logger.warning("Denying %s on identifier %r: identifiers must not contain control characters", operation, target)
+            return PermissionResult.DENIED
+        if self.denied is not None and self.denied.matches(target):
+            return PermissionResult.DENIED
+        if self.allowed is not None and self.allowed.matches(target):
+            return PermissionResult.ALLOWED
+        if self.patterns is not None and self.operations is not None and self.excluded is not None:
+            if operation not in self.operations:
+                return PermissionResult.DENIED
+            if self.patterns.matches(target):
+                return PermissionResult.DENIED if self.excluded.matches(target) else PermissionResult.ALLOWED
+            # An empty target is a listing request; the listing filters each item
+            return PermissionResult.NOT_FOUND if target == "" else PermissionResult.DENIED
+        return PermissionResult.NOT_FOUND
+
+    def decide(self, target: str, operation: str) -> PermissionResult:
+        """Return the PermissionResult for an operation on a target."""
+        key = (target, operation)
+        result = self._decisions.get(key)
+        _stats["decisions"] += 1
+        if result is not None:
+            _stats["memo_hits"] += 1
+            return result
+        result = self._decide(target, operation)
+        if len(self._decisions) >= PERMISSION_MEMO_MAX_ENTRIES:
+            self._decisions.clear()
+        self._decisions[key] = result
+        return result
+
+    def allows(self, target: str, operation: str = "read") -> bool:
+        return self.decide(target, operation) == PermissionResult.ALLOWED
+
+    def filter(self, targets: Iterable[str], operation: str = "read") -> List[str]:
+        """Return the targets the rules allow, in order."""
+        return [target for target in targets if self.allows(target, operation)]
+
+
+def _literal(pattern: str) -> Optional[Tuple[str, bool]]:
+    """(text, is_prefix) for a literal name or a ``prefix*`` glob, None for other globs."""
+    if pattern.endswith("://"):
+        return (pattern, True) if "*" not in pattern and "?" not in pattern else None
+    is_prefix = pattern.endswith("*")
+    body = pattern[:-1] if is_prefix else pattern
+    if "*" in body or "?" in body:
+        return None
+    return body, is_prefix
+
+
+class Projection:
+    """
+    The part of a rule set a storage read can apply, for one operation.
+
+    Attributes:
+        exclude_names: Names never allowed (literal ``denied`` entries, and
+            literal ``excluded_patterns`` when no ``allowed`` list overrides them)
+        exclude_prefixes: Name prefixes never allowed (``prefix*`` entries of the same)
+        include_prefixes: Every allowed name starts with one of these; None
+            if the rules allow names no prefix describes (``*``, inner globs)
+
+    The projection only narrows a read; allows() (the compiled rules) still
+    decides each name that comes back, so globs the projection can't express
+    are enforced exactly.
+    """
+
+    def __init__(self, matcher: RuleMatcher, operation: str):
+        self._matcher = matcher
+        self.operation = operation
+        names: List[str] = []
+        prefixes: List[str] = []
+        exclusions = [matcher.denied]
+        if matcher.allowed is None:
+            # allowed entries win over excluded_patterns, so those only exclude without them
+            exclusions.append(matcher.excluded)
+        for pattern_set in exclusions:
+            for pattern in pattern_set.patterns if pattern_set is not None else ():
+                literal = _literal(pattern)
+                if literal is not None:
+                    (prefixes if literal[1] else names).append(literal[0])
+        self.exclude_names: Tuple[str, ...] = tuple(dict.fromkeys(names))
+        self.exclude_prefixes: Tuple[str, ...] = tuple(dict.fromkeys(prefixes))
+
+        sources = [matcher.allowed]
+        if matcher.operations is not None and operation in matcher.operations:
+            sources.append(matcher.patterns)
+        include: Optional[List[str]] = []
+        for pattern_set in sources:
+            for pattern in pattern_set.patterns if pattern_set is not None else ():
+                literal = _literal(pattern)
+                if literal is None or literal[0] == "":
+                    include = None
+                    break
+                include.append(literal[0])  # type: ignore[union-attr]
+            if include is None:
+                break
+        if "" in self.exclude_prefixes:
+            include = []
+        self.include_prefixes: Optional[Tuple[str, ...]] = None if include is None else tuple(dict.fromkeys(include))
+
+    @property
+    def empty(self) -> bool:
+        """True if the rules allow no name at all for this operation."""
+        return self.include_prefixes == ()
+
+    def include_for(self, prefix: str) -> Optional[Tuple[str, ...]]:
+        """include_prefixes narrowed to names that also start with prefix."""
+        if not prefix:
+            return self.include_prefixes
+        if self.include_prefixes is None:
+            return (prefix,)
+        narrowed = []
+        for include in self.include_prefixes:
+            if prefix.startswith(include):
+                narrowed.append(prefix)
+            elif include.startswith(prefix):
+                narrowed.append(include)
+        return tuple(dict.fromkeys(narrowed))
+
+    def allows(self, name: str) -> bool:
+        return self._matcher.allows(name, self.operation)
+
+    def filter(self, properties: Dict[str, Any]) -> Dict[str, Any]:
+        """Return the properties whose names the rules allow."""
+        return {name: value for name, value in properties.items() if self.allows(name)}
+
+
+class _Compiler:
+    """Compiled rule sets, looked up by rules object identity, then by content."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        # id(rules) -> (rules, matcher); holding rules keeps the id from being
+        # reused. Rule dicts are treated as immutable once evaluated (trust
+        # types are replaced, not edited in place).
+        self._by_identity: Dict[int, Tuple[Dict[str, Any], RuleMatcher]] = {}
+        self._by_content: Dict[str, RuleMatcher] = {}
+
+    def get(self, rules: Dict[str, Any]) -> RuleMatcher:
+        entry = self._by_identity.get(id(rules))
+        if entry is not None and entry[0] is rules:
+            return entry[1]
+        key = json.dumps(rules, sort_keys=True, default=repr)
+        with self._lock:
+            matcher = self._by_content.get(key)
+            if matcher is None:
+                matcher = RuleMatcher(rules)
+                _stats["compiled"] += 1
+                if len(self._by_content) >= MAX_RULE_SETS:
+                    self._by_content.clear()
+                self._by_content[key] = matcher
+            if len(self._by_identity) >= MAX_RULE_SETS:
+                self._by_identity.clear()
+            self._by_identity[id(rules)] = (rules, matcher)
+        return matcher
+
+    def clear(self) -> None:
+        with self._lock:
+            self._by_identity.clear()
+            self._by_content.clear()
+
+    def size(self) -> int:
+        return len(self._by_content)
+
+
+compiler = _Compiler()
+
+
+def compile_rules(rules: Dict[str, Any]) -> RuleMatcher:
+    """Return the compiled matcher for a permission rule set (compiled once)."""
+    return compiler.get(rules)
+
+
+def projection(rules: Dict[str, Any], operation: str = "read") -> Projection:
+    """Return the storage projection of a rule set for an operation (derived once)."""
+    matcher = compiler.get(rules)
+    result = matcher._projections.get(operation)
+    if result is None:
+        result = matcher._projections[operation] = Projection(matcher, operation)
+    return result
+
+
+def _compiled_evaluate_rules(original: Any) -> Any:
+    def _evaluate_rules(
+        self: Any, permission_rules: Dict[str, Any], target: str, operation: str, suppress_logging: bool = False
+    ) -> PermissionResult:
+        if isinstance(permission_rules, dict) and isinstance(target, str) and isinstance(operation, str):
+            try:
+                matcher = compiler.get(permission_rules)
+            except (TypeError, ValueError, re.error) as e:
+                logger.debug("Not compiling permission rules %r: %s", permission_rules, e)
+            else:
+                return matcher.decide(target, operation)
+        _stats["fallbacks"] += 1
+        return original(self, permission_rules, target, operation, suppress_logging)
+
+    _evaluate_rules._compiled_matcher = True  # type: ignore[attr-defined]
+    return _evaluate_rules
+
+
+def install() -> bool:
+    """
+    Use compiled rules in ActingWeb's PermissionEvaluator.
+
+    Returns:
+        False if disabled by PERMISSION_MATCHER=library
+    """
+    if PERMISSION_MATCHER == "library":
+        return False
+    original = PermissionEvaluator._evaluate_rules
+    if not getattr(original, "_compiled_matcher", False):
+        PermissionEvaluator._evaluate_rules = _compiled_evaluate_rules(original)  # type: ignore[method-assign]
+    return True
+
+
+def stats() -> Dict[str, Any]:
+    """Return matcher counters for monitoring."""
+    return {"matcher": PERMISSION_MATCHER, "rule_sets": compiler.size(), **_stats}
@@ -1,4 +1,17 @@
 #!/bin/sh
 
 cd /src
-uwsgi uwsgi.ini
+# Content-hashed, precompressed copies of static/ in static/dist
+python static_assets.py build || echo "static asset build failed; serving unversioned /static"
+# Webhook events are journaled before they are applied (shared_hooks/app/webhook_ingest.py);
+# outside the dev profile the journal must be on storage that survives the container
+if [ "${SERVER_PROFILE:-production}" != "dev" ] && [ -z "$WEBHOOK_JOURNAL_DIR" ]; then
+    echo "WEBHOOK_JOURNAL_DIR must be set (a persistent directory) outside SERVER_PROFILE=dev" >&2
+    exit 1
+fi
+# SERVER=asgi serves asgi.py with uvicorn instead of application.py with uwsgi
+if [ "$SERVER" = "asgi" ]; then
+    exec uvicorn asgi:app --host 0.0.0.0 --port 5000 --workers "${ASGI_WORKERS:-2}"
+fi
+# SERVER_PROFILE picks a uwsgi.ini profile: production (default), high-load or dev
+exec uwsgi --ini "uwsgi.ini:${SERVER_PROFILE:-production}"
@@ -9,10 +9,14 @@ Actions are invoked via: POST /{actor_id}/actions/{action_name}
 with JSON body containing the action parameters.
 
 Available Actions:
+- search: The search method, also registered as an action so it is an MCP tool (see method_hooks.py)
 - log_message: Log a message at specified level (info/warning/error)
-- send_notification: Simulate sending a notification (email/sms/push)
+- send_notification: Simulate sending a notification (email/sms/push), optionally queued or broadcast
+- request_email_verification: Issue an expiring email verification token and email the link
+- delete_properties: Delete a set of properties in one call
 
 Note: For internal state modifications, use the /properties endpoint directly.
+delete_properties is the exception: /properties deletes one property or all.
 For read-only operations, use /methods instead.
 
 Example usage with curl:
@@ -26,11 +30,18 @@ Example usage with curl:
 """
 
 import logging
+import time
 from datetime import datetime
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
 from actingweb.interface.actor_interface import ActorInterface
 
+from .email_tokens import email_token_store
+from .job_queue import job_queue
+from .notifications import MAX_RECIPIENTS, delivery_engine
+from .property_pages import MAX_DELETE_NAMES, delete_properties
+from .result_cache import idempotent
+
 logger = logging.getLogger(__name__)
 
 
@@ -73,6 +84,7 @@ def register_action_hooks(app):
             "openWorldHint": False,
         },
     )
+    @idempotent
     def handle_log_message_action(
         actor: ActorInterface, action_name: str, data: Dict[str, Any]
     ) -> Optional[Dict[str, Any]]:
@@ -91,12 +103,15 @@ def register_action_hooks(app):
         message = data.get("message", "")
         level = data.get("level", "info").upper()
 
-        if level == "ERROR":
-            logger.error(f"Actor {actor.id if actor else 'unknown'}: {message}")
-        elif level == "WARNING":
-            logger.warning(f"Actor {actor.id if actor else 'unknown'}: {message}")
-        else:
-            logger.info(f"Actor {actor.id if actor else 'unknown'}: {message}")
+        actor_id = actor.id if actor else "unknown"
+        log_level = {"ERROR": logging.ERROR, "WARNING": logging.WARNING}.get(level, logging.INFO)
+        logger.log(
+            log_level,
+            "Actor %s: %s",
+            actor_id,
+            message,
+            extra={"actor_id": actor_id, "event": "log_message"},
+        )
 
         return {
             "status": "logged",
@@ -107,7 +122,10 @@ def register_action_hooks(app):
 
     @app.action_hook(
         "send_notification",
-        description="Simulate sending a notification via email, SMS, or push (no actual notification sent).",
+        description=(
+            "Simulate sending a notification via email, SMS, or push (no actual notification sent "
+            "unless a provider is configured). Pass recipients to broadcast in batches."
+        ),
         input_schema={
             "type": "object",
             "properties": {
@@ -115,6 +133,12 @@ def register_action_hooks(app):
                     "type": "string",
                     "description": "Notification recipient (email, phone number, or device ID)",
                 },
+                "recipients": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "maxItems": MAX_RECIPIENTS,
+                    "description": "Broadcast: list of recipients, delivered in batched provider calls",
+                },
                 "message": {
                     "type": "string",
                     "description": "Notification message content",
@@ -125,17 +149,28 @@ def register_action_hooks(app):
                     "description": "Notification type",
                     "default": "email",
                 },
+                "async": {
+                    "type": "boolean",
+                    "description": "Queue the notification and return a job handle immediately (look up with get_job_status)",
+                    "default": False,
+                },
             },
-            "required": ["recipient", "message"],
+            "required": ["message"],
         },
         output_schema={
             "type": "object",
             "properties": {
-                "status": {"type": "string", "enum": ["sent", "failed"], "description": "Delivery status"},
-                "recipient": {"type": "string", "description": "Notification recipient"},
+                "status": {"type": "string", "enum": ["sent", "partial", "failed", "queued"], "description": "Delivery status"},
+                "recipient": {"type": "string", "description": "Notification recipient (empty for broadcasts)"},
                 "message": {"type": "string", "description": "Notification message"},
                 "type": {"type": "string", "description": "Notification type used"},
                 "timestamp": {"type": "string", "format": "date-time", "description": "When the notification was sent"},
+                "job_id": {"type": "string", "description": "Job handle when sent with async=true"},
+                "count": {"type": "integer", "description": "Broadcast: number of recipients"},
+                "sent": {"type": "integer", "description": "Broadcast: notifications delivered"},
+                "failed": {"type": "integer", "description": "Broadcast: notifications that failed"},
+                "provider_calls": {"type": "integer", "description": "Broadcast: batched provider calls made"},
+                "error": {"type": "string", "description": "Error message if the notification could not be queued"},
             },
             "required": ["status", "recipient", "message", "type", "timestamp"],
         },
@@ -146,6 +181,7 @@ def register_action_hooks(app):
             "openWorldHint": True,
         },
     )
+    @idempotent
     def handle_send_notification_action(
         actor: ActorInterface, action_name: str, data: Dict[str, Any]
     ) -> Optional[Dict[str, Any]]:
@@ -156,30 +192,278 @@ def register_action_hooks(app):
 
         Parameters:
             recipient (str): Notification recipient (required for success)
+            recipients (list): Broadcast to many recipients instead of one,
+                at most MAX_RECIPIENTS
             message (str): Notification message (required for success)
             type (str): Notification type - "email", "sms", or "push" (default: "email")
+            async (bool): Queue the notification instead of sending it on the
+                request thread (default: false)
 
         Returns:
             {status, recipient, message, type, timestamp}
+            Broadcast: {status, count, sent, failed, provider_calls, ...}
+            With async=true: {status: "queued", job_id, ...} - poll the
+            get_job_status method with the job_id for the delivery result
 
-        Note: This is a simulation - no actual notification is sent.
+        Delivery goes through the batching delivery engine (see notifications.py).
+        Note: This is a simulation unless a provider URL is configured.
         """
         recipient = data.get("recipient", "")
+        recipients = data.get("recipients")
         message = data.get("message", "")
         notification_type = data.get("type", "email")
+        now = datetime.now().isoformat()
 
-        # Simulate sending notification
-        success = bool(recipient and message)
+        if recipients is not None and not isinstance(recipients, list):
+            return {
+                "status": "failed",
+                "recipient": "",
+                "message": message,
+                "type": notification_type,
+                "timestamp": now,
+                "error": "recipients must be an array",
+            }
+        if recipients is not None and len(recipients) > MAX_RECIPIENTS:
+            return {
+                "status": "failed",
+                "recipient": "",
+                "message": message,
+                "type": notification_type,
+                "timestamp": now,
+                "error": f"At most {MAX_RECIPIENTS} recipients per broadcast",
+            }
 
-        # Log the notification
-        logger.info(
-            f"Sending {notification_type} notification to {recipient}: {message}"
-        )
+        if not data.get("async"):
+            if recipients is not None:
+                return broadcast_notification(recipients, message, notification_type)
+            return deliver_notification(recipient, message, notification_type)
 
+        if recipients is not None:
+            job = job_queue.submit(
+                action_name,
+                actor.id or "",
+                broadcast_notification,
+                recipients,
+                message,
+                notification_type,
+                config=actor.config,
+            )
+        elif job_queue.run_inline:
+            job = job_queue.submit(
+                action_name,
+                actor.id or "",
+                deliver_notification,
+                recipient,
+                message,
+                notification_type,
+                config=actor.config,
+            )
+        else:
+            # Single async sends are buffered so concurrent ones share provider calls
+            job = job_queue.create(action_name, actor.id or "", config=actor.config)
+            job_id = job["job_id"]
+            accepted = delivery_engine.submit(
+                {"recipient": recipient, "message": message, "type": notification_type},
+                callback=lambda result: job_queue.complete(job_id, result=result),
+            )
+            if not accepted:
+                job_queue.complete(job_id, error="Notification buffer is full")
+                job = None
+
+        if job is None:
+            return {
+                "status": "failed",
+                "recipient": recipient,
+                "message": message,
+                "type": notification_type,
+                "timestamp": now,
+                "error": "Notification queue is full, retry later",
+            }
         return {
-            "status": "sent" if success else "failed",
+            "status": job["status"],
+            "job_id": job["job_id"],
             "recipient": recipient,
             "message": message,
             "type": notification_type,
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": job["created_at"],
         }
+
+    @app.action_hook(
+        "request_email_verification",
+        description=(
+            "Issue a single-use email verification token and email the verification link "
+            "(simulated delivery, like send_notification)."
+        ),
+        input_schema={
+            "type": "object",
+            "properties": {
+                "email": {
+                    "type": "string",
+                    "description": "Address to verify; must be the actor's email property or creator (the default)",
+                },
+            },
+        },
+        output_schema={
+            "type": "object",
+            "properties": {
+                "status": {"type": "string", "enum": ["sent", "failed"], "description": "Delivery status"},
+                "email": {"type": "string", "description": "Address the link was sent to"},
+                "expires_at": {"type": "string", "format": "date-time", "description": "When the token expires"},
+                "error": {"type": "string", "description": "Error message if no link could be sent"},
+            },
+            "required": ["status"],
+        },
+        annotations={
+            "readOnlyHint": False,
+            "destructiveHint": False,
+            "idempotentHint": False,
+            "openWorldHint": True,
+        },
+    )
+    @idempotent
+    def handle_request_email_verification_action(
+        actor: ActorInterface, action_name: str, data: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Issue an email verification token and send the link.
+
+        Endpoint: POST /{actor_id}/actions/request_email_verification
+
+        Parameters:
+            email (str): Address to verify (optional)
+
+        Returns:
+            {status, email, expires_at} or {status: "failed", error}
+
+        The link points to the app-level /callbacks/email_verify endpoint, so
+        it works without the actor id. It is only sent to the actor's own
+        address and never returned to the caller: whoever can call this
+        action must not be able to verify an address they don't own.
+        Tokens expire after EMAIL_VERIFY_TOKEN_TTL.
+        """
+        email = actor.properties.get("email", "") if actor.properties is not None else ""
+        email = email or (actor.creator if actor.creator and "@" in actor.creator else "")
+        if not email:
+            return {"status": "failed", "error": "No email address to verify"}
+        requested = data.get("email")
+        if requested and str(requested).strip().lower() != email.lower():
+            return {"status": "failed", "error": "Email does not match the actor's email address"}
+
+        token = email_token_store.issue(actor.id or "", actor.config, email=email)
+        verify_url = f"{actor.config.root}callbacks/email_verify?token={token}"
+        result = deliver_notification(email, f"Verify your email address: {verify_url}", "email")
+        if result["status"] != "sent":
+            return {"status": "failed", "email": email, "error": result.get("error", "Delivery failed")}
+        return {
+            "status": "sent",
+            "email": email,
+            "expires_at": datetime.fromtimestamp(time.time() + email_token_store.ttl).isoformat(),
+        }
+
+    @app.action_hook(
+        "delete_properties",
+        description="Delete a set of this actor's properties in one call. Protected properties are left in place.",
+        input_schema={
+            "type": "object",
+            "properties": {
+                "names": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "maxItems": MAX_DELETE_NAMES,
+                    "description": "Names of the properties to delete",
+                },
+            },
+            "required": ["names"],
+        },
+        output_schema={
+            "type": "object",
+            "properties": {
+                "deleted": {"type": "array", "items": {"type": "string"}, "description": "Deleted properties"},
+                "blocked": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "Properties that may not be deleted (protected, sensitive or internal)",
+                },
+                "missing": {"type": "array", "items": {"type": "string"}, "description": "Properties that didn't exist"},
+                "error": {"type": "string", "description": "Error message if the request was invalid"},
+            },
+        },
+        annotations={
+            "readOnlyHint": False,
+            "destructiveHint": True,
+            "idempotentHint": True,
+            "openWorldHint": False,
+        },
+    )
+    def handle_delete_properties_action(
+        actor: ActorInterface, action_name: str, data: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Delete several properties in one request (used by the /www properties page).
+
+        Endpoint: POST /{actor_id}/actions/delete_properties
+
+        Parameters:
+            names (list): Property names, at most MAX_DELETE_NAMES
+
+        Returns:
+            {deleted, blocked, missing}
+
+        /properties can delete one property or all of them; this is the
+        batch in between. Each name goes through the property delete hooks,
+        as DELETE /{actor_id}/properties/{name} would. The actor itself can
+        delete any property, list properties included; peers and MCP
+        clients only what mcp_client may read (see property_pages.py).
+        """
+        names = data.get("names")
+        if not isinstance(names, list) or not all(isinstance(name, str) for name in names):
+            return {"error": "names must be a list of property names", "deleted": [], "blocked": [], "missing": []}
+        if len(names) > MAX_DELETE_NAMES:
+            return {
+                "error": f"At most {MAX_DELETE_NAMES} properties per call",
+                "deleted": [],
+                "blocked": [],
+                "missing": [],
+            }
+        return delete_properties(app.hooks, actor, names)
+
+
+def deliver_notification(recipient: str, message: str, notification_type: str) -> Dict[str, Any]:
+    """
+    Deliver a single notification through the delivery engine.
+
+    Runs on the request thread for synchronous calls and on a job_queue
+    worker for async calls on Lambda.
+    """
+    return delivery_engine.deliver(
+        [{"recipient": recipient, "message": message, "type": notification_type}]
+    )[0]
+
+
+def broadcast_notification(recipients: List[str], message: str, notification_type: str) -> Dict[str, Any]:
+    """
+    Deliver one message to many recipients in batched provider calls.
+
+    Returns a summary rather than per-recipient results.
+    """
+    counters = {"provider_calls": 0}
+    results = delivery_engine.deliver(
+        [{"recipient": r, "message": message, "type": notification_type} for r in recipients],
+        counters=counters,
+    )
+    sent = sum(1 for r in results if r.get("status") == "sent")
+    failed = len(results) - sent
+
+    logger.info("Broadcast %s notification to %s recipients: %s sent, %s failed", notification_type, len(results), sent, failed)
+
+    return {
+        "status": "sent" if not failed else ("failed" if not sent else "partial"),
+        "recipient": "",
+        "message": message,
+        "type": notification_type,
+        "timestamp": datetime.now().isoformat(),
+        "count": len(results),
+        "sent": sent,
+        "failed": failed,
+        "provider_calls": counters["provider_calls"],
+    }
@@ -0,0 +1,221 @@
+"""
+Event router for the application-level /bot callback.
+
+Chat platforms (Slack, Discord, ...) push every workspace event to one
+endpoint, often hundreds per second. The router keeps the per-request work
+small:
+
+- The bot configuration is read from the ActingWeb config and validated once
+  per process, not on every POST.
+- Events are dispatched by type through a dict built at registration time,
+  so routing is a single lookup regardless of how many handlers exist.
+- Handlers registered with ``heavy=True`` run on a bounded worker pool and
+  the platform gets its acknowledgement immediately. When the pool's queue
+  is full the event is rejected with 503 so the platform retries later.
+
+ActingWeb's hook registry turns any truthy hook result other than a dict
+into True, so a status returned by the hook would be answered as 204.
+install() wraps BotHandler.post() to apply the status the router recorded
+for the request instead; without install() a rejected event is acknowledged
+and lost.
+
+The event type is taken from the Slack Events API envelope
+(``body.event.type``) when present, otherwise from ``body.type``.
+
+Usage:
+    @bot_router.on("message", heavy=True)
+    def handle_message(event, data):
+        ...
+
+    @app.app_callback_hook("bot")
+    def handle_bot_callback(data):
+        return bot_router.dispatch(data)
+"""
+
+import contextvars
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# Worker threads per process for heavy handlers
+BOT_WORKERS = int(os.getenv("BOT_WORKERS", "4"))
+
+# Heavy events waiting for a worker before the router answers 503
+BOT_MAX_PENDING = int(os.getenv("BOT_MAX_PENDING", "1000"))
+
+# Background threads do not survive the end of a Lambda invocation
+RUN_INLINE = bool(os.getenv("AWS_LAMBDA_FUNCTION_NAME"))
+
+BotHandler = Callable[[Dict[str, Any], Dict[str, Any]], Any]
+
+_UNSET = object()
+
+# Status the router answered for the current /bot request, applied by the wrapped BotHandler.post()
+_response_status: contextvars.ContextVar[Optional[int]] = contextvars.ContextVar("bot_response_status", default=None)
+
+
+def event_type(body: Any) -> str:
+    """Return the event type of a bot platform payload."""
+    if not isinstance(body, dict):
+        return "unknown"
+    event = body.get("event")
+    if isinstance(event, dict) and event.get("type"):
+        return str(event["type"])
+    return str(body.get("type", "unknown"))
+
+
+class BotRouter:
+    """
+    Dispatch table for bot events with a bounded worker pool.
+
+    The executor is created on first use, since uwsgi forks workers after
+    the app is imported.
+    """
+
+    def __init__(
+        self,
+        workers: int = BOT_WORKERS,
+        max_pending: int = BOT_MAX_PENDING,
+        run_inline: bool = RUN_INLINE,
+    ):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.run_inline = run_inline
+        self._routes: Dict[str, Tuple[BotHandler, bool]] = {}
+        self._get_config: Optional[Callable[[], Any]] = None
+        self._bot_config: Any = _UNSET
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.dispatched = 0
+        self.rejected = 0
+        self.unhandled = 0
+
+    def on(self, name: str, heavy: bool = False) -> Callable[[BotHandler], BotHandler]:
+        """Register handler(event, data) for an event type."""
+
+        def decorator(func: BotHandler) -> BotHandler:
+            self._routes[name] = (func, heavy)
+            return func
+
+        return decorator
+
+    def configure(self, get_config: Callable[[], Any]) -> None:
+        """Set the config source; the bot config is re-validated on next use."""
+        self._get_config = get_config
+        self._bot_config = _UNSET
+
+    def bot_config(self) -> Optional[Dict[str, Any]]:
+        """Return the validated bot config, or None if the bot is not configured."""
+        if self._bot_config is _UNSET:
+            with self._lock:
+                if self._bot_config is _UNSET:
+                    self._bot_config = self._load_bot_config()
+        return self._bot_config
+
+    def _load_bot_config(self) -> Optional[Dict[str, Any]]:
+        config = self._get_config() if self._get_config else None
+        bot = getattr(config, "bot", None) if config else None
+        if not isinstance(bot, dict) or not bot.get("token"):
+            logger.warning("Bot is not configured; /bot callbacks will be rejected")
+            return None
+        return dict(bot)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="aw-bot")
+            return self._executor
+
+    def dispatch(self, data: Dict[str, Any]) -> Union[bool, int]:
+        """
+        Route a /bot callback.
+
+        Args:
+            data: Hook data from ActingWeb ({method, path, bot_token, body})
+
+        Returns:
+            True to acknowledge, False if the bot is not configured, or 503 if
+            the worker pool is saturated
+        """
+        if data.get("method") != "POST" or self.bot_config() is None:
+            return False
+
+        body = data.get("body")
+        name = event_type(body)
+        route = self._routes.get(name)
+        if route is None:
+            # Acknowledge unknown events so the platform doesn't disable the endpoint
+            self.unhandled += 1
+            logger.debug("No bot handler for event type %s", name)
+            return True
+
+        handler, heavy = route
+        event = body.get("event", body) if isinstance(body, dict) else {}
+        self.dispatched += 1
+        if not heavy or self.run_inline:
+            self._run(name, handler, event, data)
+            return True
+
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                logger.warning("Bot worker pool saturated (%s pending), rejecting %s event", self._pending, name)
+                _response_status.set(503)
+                return 503
+            self._pending += 1
+        self._get_executor().submit(self._run_pooled, name, handler, event, data)
+        return True
+
+    def _run(self, name: str, handler: BotHandler, event: Dict[str, Any], data: Dict[str, Any]) -> None:
+        try:
+            handler(event, data)
+        except Exception as e:
+            logger.error("Bot handler for %s failed: %s", name, e)
+
+    def _run_pooled(self, name: str, handler: BotHandler, event: Dict[str, Any], data: Dict[str, Any]) -> None:
+        with self._lock:
+            self._pending -= 1
+        self._run(name, handler, event, data)
+
+    def stats(self) -> Dict[str, int]:
+        """Return routing counters for monitoring."""
+        with self._lock:
+            return {
+                "routes": len(self._routes),
+                "pending": self._pending,
+                "dispatched": self.dispatched,
+                "rejected": self.rejected,
+                "unhandled": self.unhandled,
+            }
+
+
+# Process-wide router for the /bot endpoint
+bot_router = BotRouter()
+
+
+def _answering_status(original: Any) -> Any:
+    def post(self: Any, path: str) -> None:
+        token = _response_status.set(None)
+        try:
+            original(self, path)
+            status = _response_status.get()
+            if status is not None and self.response:
+                self.response.set_status(status)
+        finally:
+            _response_status.reset(token)
+
+    post._bot_router = True  # type: ignore[attr-defined]
+    return post
+
+
+def install() -> None:
+    """Make ActingWeb's /bot handler answer the status the router returned (e.g. 503)."""
+    from actingweb.handlers.bot import BotHandler
+
+    if not getattr(BotHandler.post, "_bot_router", False):
+        BotHandler.post = _answering_status(BotHandler.post)
@@ -0,0 +1,189 @@
+"""
+Vectorized bulk evaluation for the calculate method.
+
+Evaluates many (a, b, operation) triples in one pass instead of one HTTP
+request per calculation. Uses NumPy when it is installed and falls back to
+plain Python otherwise; both paths return the same result shape.
+
+Accepted payloads (see handle_calculate_method):
+    Column-oriented: {"a": [1, 2, 3], "b": [4, 5, 0], "operation": "divide"}
+    Per-element ops: {"a": [1, 2], "b": [3, 4], "operation": ["add", "multiply"]}
+    Row-oriented:    {"items": [{"a": 1, "b": 2, "operation": "add"}, ...]}
+
+Scalars are broadcast against arrays, so {"a": [1, 2, 3], "b": 10} works.
+
+Per-element failures (division by zero, unsupported operation, a result
+that overflows to infinity or is not a number) do not abort the batch: the
+element's result is null, error_mask is true at its index and errors holds
+the message at the same index. Infinity and NaN are not valid JSON, so they
+are never returned.
+"""
+
+import logging
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None  # type: ignore[assignment]
+    NUMPY_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+OPERATIONS = ("add", "subtract", "multiply", "divide")
+
+NOT_FINITE = "Result is not a finite number"
+
+# Upper bound on elements per request to keep a single call bounded
+MAX_BULK_SIZE = 100_000
+
+
+def is_bulk_request(data: Dict[str, Any]) -> bool:
+    """Return True if the calculate payload uses the bulk form."""
+    return (
+        "items" in data
+        or isinstance(data.get("a"), list)
+        or isinstance(data.get("b"), list)
+        or isinstance(data.get("operation"), list)
+    )
+
+
+def _to_columns(data: Dict[str, Any]) -> Tuple[List[Any], List[Any], List[Any]]:
+    """Normalize a bulk payload into three equally long columns."""
+    if "items" in data:
+        items = data.get("items") or []
+        if not isinstance(items, list):
+            raise ValueError("items must be an array")
+        return (
+            [item.get("a", 0) for item in items],
+            [item.get("b", 0) for item in items],
+            [item.get("operation", "add") for item in items],
+        )
+
+    columns = [data.get("a", 0), data.get("b", 0), data.get("operation", "add")]
+    lengths = {len(col) for col in columns if isinstance(col, list)}
+    if len(lengths) > 1:
+        raise ValueError(f"Array lengths differ: {sorted(lengths)}")
+    size = lengths.pop() if lengths else 1
+    a, b, ops = (col if isinstance(col, list) else [col] * size for col in columns)
+    return a, b, ops
+
+
+def _evaluate_numpy(
+    a: List[Any], b: List[Any], ops: List[Any]
+) -> Tuple[List[Optional[float]], List[bool], List[Optional[str]]]:
+    """Evaluate all elements with NumPy array operations."""
+    a_arr = np.asarray(a, dtype=np.float64)
+    b_arr = np.asarray(b, dtype=np.float64)
+    ops_arr = np.asarray(ops, dtype=str)
+    size = len(ops)
+
+    values = np.zeros(size, dtype=np.float64)
+    error_mask = np.zeros(size, dtype=bool)
+    errors: List[Optional[str]] = [None] * size
+
+    known = np.zeros(size, dtype=bool)
+    # Overflow (and inf/nan inputs) show up as non-finite values below
+    with np.errstate(all="ignore"):
+        for op in OPERATIONS:
+            sel = ops_arr == op
+            if not sel.any():
+                continue
+            known |= sel
+            if op == "add":
+                values[sel] = a_arr[sel] + b_arr[sel]
+            elif op == "subtract":
+                values[sel] = a_arr[sel] - b_arr[sel]
+            elif op == "multiply":
+                values[sel] = a_arr[sel] * b_arr[sel]
+            else:
+                zero = sel & (b_arr == 0)
+                ok = sel & ~zero
+                values[ok] = a_arr[ok] / b_arr[ok]
+                error_mask |= zero
+                for i in np.flatnonzero(zero):
+                    errors[i] = "Division by zero"
+
+    not_finite = known & ~error_mask & ~np.isfinite(values)
+    error_mask |= not_finite
+    for i in np.flatnonzero(not_finite):
+        errors[i] = NOT_FINITE
+
+    unknown = ~known
+    error_mask |= unknown
+    for i in np.flatnonzero(unknown):
+        errors[i] = f"Unsupported operation: {ops[i]}"
+
+    results: List[Optional[float]] = values.tolist()
+    for i in np.flatnonzero(error_mask):
+        results[i] = None
+    return results, error_mask.tolist(), errors
+
+
+def _evaluate_python(
+    a: List[Any], b: List[Any], ops: List[Any]
+) -> Tuple[List[Optional[float]], List[bool], List[Optional[str]]]:
+    """Evaluate all elements in plain Python (used when NumPy is missing)."""
+    results: List[Optional[float]] = []
+    error_mask: List[bool] = []
+    errors: List[Optional[str]] = []
+
+    for x, y, op in zip(a, b, ops):
+        x, y = float(x), float(y)
+        error = None
+        if op == "add":
+            value: Optional[float] = x + y
+        elif op == "subtract":
+            value = x - y
+        elif op == "multiply":
+            value = x * y
+        elif op == "divide":
+            value = x / y if y != 0 else None
+            if value is None:
+                error = "Division by zero"
+        else:
+            value = None
+            error = f"Unsupported operation: {op}"
+        if value is not None and not math.isfinite(value):
+            value = None
+            error = NOT_FINITE
+        results.append(value)
+        error_mask.append(error is not None)
+        errors.append(error)
+
+    return results, error_mask, errors
+
+
+def calculate_bulk(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Evaluate a bulk calculate payload.
+
+    Returns:
+        {results, error_mask, errors, count, error_count, engine}
+        {error} if the payload itself is malformed
+    """
+    try:
+        a, b, ops = _to_columns(data)
+        if len(ops) > MAX_BULK_SIZE:
+            return {"error": f"Too many elements: {len(ops)} (max {MAX_BULK_SIZE})"}
+
+        if NUMPY_AVAILABLE:
+            results, error_mask, errors = _evaluate_numpy(a, b, ops)
+            engine = "numpy"
+        else:
+            results, error_mask, errors = _evaluate_python(a, b, ops)
+            engine = "python"
+    except (AttributeError, TypeError, ValueError) as e:
+        return {"error": str(e)}
+
+    return {
+        "results": results,
+        "error_mask": error_mask,
+        "errors": errors,
+        "count": len(results),
+        "error_count": sum(error_mask),
+        "engine": engine,
+    }
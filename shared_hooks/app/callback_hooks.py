@@ -22,19 +22,100 @@ Example usage:
     https://your-app.com/{actor_id}/callbacks/email_verify?token=abc123
 
     # The service calls your callback when the event occurs
+
+SMS and payment webhooks are acknowledged as soon as the event is journaled;
+see webhook_ingest.py.
 """
 
 import logging
 from datetime import datetime
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Union
 from actingweb.interface.actor_interface import ActorInterface
 
+from .bot_router import bot_router
+from .email_tokens import email_token_store
+from .payment_ledger import PAYMENT_STATUSES, record_payment_event
+from .result_cache import invalidate_actor
+from .webhook_ingest import webhook_ingestor
+
 logger = logging.getLogger(__name__)
 
 
+def _mark_email_verified(actor: ActorInterface) -> None:
+    if actor.properties is not None:
+        actor.properties.email_verified = True
+        actor.properties.email_verified_at = datetime.now().isoformat()
+        invalidate_actor(actor.id)
+
+
+def verify_email_token(token: str, config: Any, actor: Optional[ActorInterface] = None) -> Dict[str, Any]:
+    """
+    Consume an email verification token and mark the actor's email as verified.
+
+    The token alone identifies the actor. If actor is given, the token must
+    have been issued for it.
+
+    Returns:
+        {"status": "success", "message", "actor_id"} or {"status": "error", "message"}
+    """
+    record = email_token_store.consume(token, config, actor_id=actor.id if actor is not None else None)
+    if record is None:
+        return {"status": "error", "message": "Invalid or expired verification token"}
+    if actor is None:
+        actor = ActorInterface.get_by_id(record["actor_id"], config)
+        if actor is None:
+            return {"status": "error", "message": "Invalid or expired verification token"}
+    _mark_email_verified(actor)
+    return {
+        "status": "success",
+        "message": "Email verified successfully",
+        "actor_id": actor.id,
+    }
+
+
+def apply_sms_message(actor: ActorInterface, data: Dict[str, Any]) -> None:
+    """Store an ingested SMS in the actor's sms_messages property."""
+    if actor.properties is None:
+        return
+    message_id = data.get("MessageSid", data.get("message_id", ""))
+    messages = actor.properties.get("sms_messages", [])
+    if not isinstance(messages, list):
+        messages = []
+    # Provider retries that reached another process are skipped here
+    if message_id and any(m.get("message_id") == message_id for m in messages if isinstance(m, dict)):
+        return
+    messages.append({
+        "from": data.get("From", data.get("from", "unknown")),
+        "body": data.get("Body", data.get("body", "")),
+        "message_id": message_id,
+        "received_at": datetime.now().isoformat(),
+    })
+    # Keep last 100 messages
+    actor.properties.sms_messages = messages[-100:]
+    invalidate_actor(actor.id)
+
+
+def apply_payment_event(actor: ActorInterface, data: Dict[str, Any]) -> None:
+    """Log an ingested payment event and update the actor's payment state."""
+    if record_payment_event(actor, data) is not None:
+        invalidate_actor(actor.id)
+
+
 def register_callback_hooks(app):
     """Register callback hooks with the ActingWeb application."""
 
+    webhook_ingestor.register("sms_webhook", apply_sms_message, app.get_config)
+    webhook_ingestor.register("payment_webhook", apply_payment_event, app.get_config)
+    bot_router.configure(app.get_config)
+
+    @bot_router.on("message", heavy=True)
+    @bot_router.on("app_mention", heavy=True)
+    def handle_bot_message(event: Dict[str, Any], data: Dict[str, Any]) -> None:
+        """Handle a chat message sent to the bot."""
+        logger.info("Bot %s from %s in %s", event.get("type"), event.get("user"), event.get("channel"))
+        # In a real implementation, map the platform user to an actor and
+        # handle the command, replying with data["bot_token"]
+
     @app.callback_hook("email_verify")
     def handle_email_verification(
         actor: ActorInterface, name: str, data: Dict[str, Any]
@@ -45,8 +126,14 @@ def register_callback_hooks(app):
         Endpoint: GET/POST /{actor_id}/callbacks/email_verify
 
         Use case: When creating an actor, send a verification email with a link
-        containing a token. When the user clicks the link, this callback is
-        triggered to verify their email address.
+        containing a token (see the request_email_verification action). When
+        the user clicks the link, this callback is triggered to verify their
+        email address.
+
+        Tokens are looked up by hash in email_token_store, expire after
+        EMAIL_VERIFY_TOKEN_TTL and can be used once. The app-level
+        /callbacks/email_verify?token= endpoint accepts the same tokens
+        without an actor id in the URL.
 
         Parameters:
             token: Verification token from the email link
@@ -57,38 +144,31 @@ def register_callback_hooks(app):
 
         Example flow:
             1. Actor created with email "user@example.com"
-            2. App sends email with link: /callbacks/email_verify?token=abc123
+            2. request_email_verification issues a token and emails the link
             3. User clicks link, this callback validates the token
             4. Actor's email_verified property is set to true
         """
         token = data.get("token", "")
 
-        logger.info(f"Email verification callback for actor {actor.id}: token={token[:8]}...")
+        logger.info("Email verification callback for actor %s: token=%s...", actor.id, token[:8])
 
         if not token:
             return {"status": "error", "message": "Missing verification token"}
 
-        # In a real implementation, you would:
-        # 1. Validate the token against a stored value
-        # 2. Check token expiration
-        # 3. Mark the email as verified
-
-        # Demo implementation - just check if token exists
-        stored_token = actor.properties.get("email_verification_token", "")
-        if token == stored_token:
-            if actor.properties is not None:
-                actor.properties.email_verified = True
-                actor.properties.email_verified_at = datetime.now().isoformat()
+        result = verify_email_token(token, actor.config, actor=actor)
+        if result["status"] == "success":
+            return result
+
+        # Tokens set directly as a property by older code paths
+        stored_token = actor.properties.get("email_verification_token", "") if actor.properties is not None else ""
+        if stored_token and token == stored_token:
+            _mark_email_verified(actor)
             return {
                 "status": "success",
                 "message": "Email verified successfully",
                 "actor_id": actor.id,
             }
-        else:
-            return {
-                "status": "error",
-                "message": "Invalid or expired verification token",
-            }
+        return result
 
     @app.callback_hook("sms_webhook")
     def handle_sms_webhook(
@@ -108,6 +188,10 @@ def register_callback_hooks(app):
             Body: SMS message content
             MessageSid: Unique message identifier
 
+        The message is journaled and acknowledged immediately, then stored in
+        the sms_messages property by a background consumer. Retries with a
+        MessageSid that was already received are dropped.
+
         Returns:
             Acknowledgment response for the SMS provider
 
@@ -115,30 +199,18 @@ def register_callback_hooks(app):
             Register https://your-app.com/{actor_id}/callbacks/sms_webhook
             with Twilio. Incoming SMS to your number triggers this callback.
         """
-        sender = data.get("From", data.get("from", "unknown"))
-        body = data.get("Body", data.get("body", ""))
         message_id = data.get("MessageSid", data.get("message_id", ""))
 
-        logger.info(f"SMS webhook for actor {actor.id}: from={sender}, body={body[:50]}...")
-
-        # Store the incoming message
-        if actor.properties is not None:
-            messages = actor.properties.get("sms_messages", [])
-            if not isinstance(messages, list):
-                messages = []
-            messages.append({
-                "from": sender,
-                "body": body,
-                "message_id": message_id,
-                "received_at": datetime.now().isoformat(),
-            })
-            # Keep last 100 messages
-            actor.properties.sms_messages = messages[-100:]
+        logger.info("SMS webhook for actor %s: message_id=%s", actor.id, message_id)
+
+        # Journal the message and acknowledge now; it is stored in the background
+        outcome = webhook_ingestor.ingest(actor, name, message_id, data)
 
         return {
             "status": "received",
             "message_id": message_id,
             "actor_id": actor.id,
+            "duplicate": outcome == "duplicate",
         }
 
     @app.callback_hook("payment_webhook")
@@ -157,6 +229,11 @@ def register_callback_hooks(app):
             type: Event type (e.g., "payment_intent.succeeded")
             data: Event data containing payment details
 
+        Known events are journaled and acknowledged immediately, then appended
+        to the actor's payment event log by a background consumer (see
+        payment_ledger.py). Retries with an event id that was already
+        received are dropped.
+
         Returns:
             Acknowledgment response for the payment provider
 
@@ -164,33 +241,20 @@ def register_callback_hooks(app):
         """
         event_type = data.get("type", "unknown")
 
-        logger.info(f"Payment webhook for actor {actor.id}: type={event_type}")
-
-        # Handle different payment events
-        if event_type == "payment_intent.succeeded":
-            if actor.properties is not None:
-                actor.properties.payment_status = "paid"
-                actor.properties.last_payment_at = datetime.now().isoformat()
-            return {"status": "processed", "event": event_type}
+        logger.info("Payment webhook for actor %s: type=%s", actor.id, event_type)
 
-        elif event_type == "payment_intent.payment_failed":
-            if actor.properties is not None:
-                actor.properties.payment_status = "failed"
-            return {"status": "processed", "event": event_type}
-
-        elif event_type == "charge.refunded":
-            if actor.properties is not None:
-                actor.properties.payment_status = "refunded"
-            return {"status": "processed", "event": event_type}
-
-        else:
+        if event_type not in PAYMENT_STATUSES:
             # Acknowledge unknown events (don't fail the webhook)
-            logger.warning(f"Unhandled payment event type: {event_type}")
+            logger.warning("Unhandled payment event type: %s", event_type)
             return {"status": "ignored", "event": event_type}
 
+        # Journal the event and acknowledge now; it is applied in the background
+        outcome = webhook_ingestor.ingest(actor, name, data.get("id", ""), data)
+        return {"status": "accepted", "event": event_type, "duplicate": outcome == "duplicate"}
+
     # Application-level callback hooks (no actor context)
     @app.app_callback_hook("bot")
-    def handle_bot_callback(data: Dict[str, Any]) -> bool:
+    def handle_bot_callback(data: Dict[str, Any]) -> Union[bool, int]:
         """
         Handle bot platform webhooks (application-level, no actor context).
 
@@ -207,28 +271,15 @@ def register_callback_hooks(app):
             method: HTTP method (only POST is processed)
             body: Bot platform webhook payload
 
+        Events are routed by type through bot_router (see bot_router.py);
+        message handlers run on a bounded worker pool.
+
         Returns:
-            True to acknowledge successful processing
-            False if bot is not configured or processing failed
+            True to acknowledge the event
+            False if bot is not configured
+            503 if the bot worker pool is saturated
 
         Configuration Required:
             APP_BOT_TOKEN environment variable must be set
         """
-        if data.get("method") == "POST":
-            # Safety valve - make sure bot is configured
-            config = app.get_config()
-            if (
-                not config
-                or not config.bot
-                or not config.bot.get("token")
-                or len(config.bot.get("token", "")) == 0
-            ):
-                logger.warning("Bot callback received but bot is not configured")
-                return False
-
-            # Process bot request
-            logger.debug("Bot callback received")
-            # In a real implementation, parse the bot payload and route to
-            # the appropriate actor or handle the command
-            return True
-        return False
+        return bot_router.dispatch(data)
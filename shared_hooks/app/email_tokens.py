@@ -0,0 +1,151 @@
+"""
+Email-verification token index with expiry.
+
+Verification links carry an opaque token. The store maps the token to the
+actor it was issued for, so a link needs no actor id and verification is a
+single lookup instead of a read of the actor's properties:
+
+    token = email_token_store.issue(actor.id, actor.config, email="user@example.com")
+    # Email https://host/callbacks/email_verify?token=<token>
+
+    record = email_token_store.consume(token, config)
+    # {"actor_id": ..., "email": ..., "expires_at": ...} or None
+
+Only a SHA-256 hash of the token is stored, so a leaked store does not leak
+usable links. Records live in a global attribute bucket of the ActingWeb
+system actor with a storage TTL. The stored record is the only copy: every
+process reads it from storage, and consuming a token is a conditional
+delete of the record, so a token is accepted once even if the same link is
+opened in several workers at the same time.
+
+Tokens expire after EMAIL_VERIFY_TOKEN_TTL seconds and are single-use. A
+background sweeper keeps a min-heap of the expiry times of tokens issued by
+this process and wakes up only when the earliest one expires. It deletes
+the stored record, so backends without native TTL don't accumulate stale
+tokens. Lookups also check the expiry, so a token is never accepted late
+even if the sweeper or the storage TTL has not caught up.
+"""
+
+import hashlib
+import heapq
+import logging
+import os
+import secrets
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Token lifetime in seconds
+TOKEN_TTL = int(os.getenv("EMAIL_VERIFY_TOKEN_TTL", "86400"))
+
+# Global attribute bucket (on the ActingWeb system actor) holding token records
+TOKEN_BUCKET = "email_verify_tokens"
+
+
+def token_hash(token: str) -> str:
+    """Return the key a token is stored under."""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def _bucket(config: Any) -> Any:
+    from actingweb.attribute import Attributes
+    from actingweb.constants import ACTINGWEB_SYSTEM_ACTOR
+
+    return Attributes(actor_id=ACTINGWEB_SYSTEM_ACTOR, bucket=TOKEN_BUCKET, config=config)
+
+
+class EmailTokenStore:
+    """
+    Token records in storage with TTL expiry and a heap-based sweeper.
+
+    The sweeper thread is started on first use, since uwsgi forks workers
+    after the app is imported.
+    """
+
+    def __init__(self, ttl: int = TOKEN_TTL):
+        self.ttl = ttl
+        # (expires_at, token hash, config) of tokens issued by this process
+        self._heap: List[Tuple[float, str, Any]] = []
+        self._cond = threading.Condition()
+        self._sweeper: Optional[threading.Thread] = None
+        self.swept = 0
+
+    def issue(self, actor_id: str, config: Any, email: str = "", ttl: Optional[int] = None) -> str:
+        """
+        Create a verification token for an actor.
+
+        Returns:
+            The token to put in the verification link
+        """
+        token = secrets.token_urlsafe(32)
+        key = token_hash(token)
+        lifetime = ttl or self.ttl
+        record = {"actor_id": actor_id, "email": email, "expires_at": time.time() + lifetime}
+        _bucket(config).set_attr(name=key, data=record, ttl_seconds=lifetime)
+        with self._cond:
+            self._ensure_sweeper()
+            heapq.heappush(self._heap, (record["expires_at"], key, config))
+            if self._heap[0][1] == key:
+                self._cond.notify()
+        return token
+
+    def resolve(self, token: str, config: Any) -> Optional[Dict[str, Any]]:
+        """Return the stored record of a valid token without consuming it."""
+        if not token:
+            return None
+        stored = _bucket(config).get_attr(name=token_hash(token))
+        record = stored.get("data") if stored else None
+        if not isinstance(record, dict) or record.get("expires_at", 0) < time.time():
+            return None
+        return record
+
+    def consume(self, token: str, config: Any, actor_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Return the record of a valid token and invalidate the token.
+
+        The stored record is removed with a conditional delete, so of
+        concurrent requests with the same token (in any process) exactly one
+        gets the record. If actor_id is given, tokens issued for other actors
+        are rejected and left untouched.
+        """
+        record = self.resolve(token, config)
+        if record is None or (actor_id is not None and record["actor_id"] != actor_id):
+            return None
+        if not _bucket(config).delete_attr_conditional(name=token_hash(token)):
+            return None  # Consumed by a concurrent request
+        return record
+
+    def _ensure_sweeper(self) -> None:
+        # Caller holds self._cond
+        if self._sweeper is None or not self._sweeper.is_alive():
+            self._sweeper = threading.Thread(target=self._sweep_loop, name="aw-token-sweeper", daemon=True)
+            self._sweeper.start()
+
+    def _sweep_loop(self) -> None:
+        while True:
+            with self._cond:
+                while not self._heap or self._heap[0][0] > time.time():
+                    timeout = self._heap[0][0] - time.time() if self._heap else None
+                    self._cond.wait(timeout)
+                expired = []
+                while self._heap and self._heap[0][0] <= time.time():
+                    _, key, config = heapq.heappop(self._heap)
+                    expired.append((key, config))
+            for key, config in expired:
+                # Consumed tokens are already gone; only actual removals count
+                try:
+                    if _bucket(config).delete_attr_conditional(name=key):
+                        self.swept += 1
+                except Exception as e:
+                    logger.warning("Could not delete expired verification token: %s", e)
+
+    def stats(self) -> Dict[str, int]:
+        """Return sweeper counters for monitoring."""
+        with self._cond:
+            return {"scheduled": len(self._heap), "swept": self.swept}
+
+
+# Process-wide token store
+email_token_store = EmailTokenStore()
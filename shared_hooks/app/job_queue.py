@@ -0,0 +1,237 @@
+"""
+In-process job queue for actions with slow external effects.
+
+Actions marked ``openWorldHint: True`` (e.g. send_notification) talk to
+outside providers whose latency would otherwise land on the caller's request
+thread. With only a handful of uwsgi threads per process, a burst of such
+calls starves the Flask workers. Instead, the action submits the work here
+and immediately returns a job handle:
+
+    {"job_id": "job-...", "status": "queued", ...}
+
+Jobs run on a bounded worker pool. Their state (queued, running, succeeded,
+failed) can be looked up by job id via the get_job_status method.
+
+Finished jobs are also written to the actor's internal attribute bucket
+JOB_BUCKET with a TTL, so a status lookup served by another uwsgi process
+(or after a restart) still finds the result. Queued and running jobs are
+only known to the process that accepted them.
+
+On AWS Lambda there is no life after the response is sent, so jobs run
+inline and the returned handle already carries the final status.
+"""
+
+import logging
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Worker threads per process
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+
+# Jobs waiting for a worker before submissions are rejected
+JOB_MAX_PENDING = int(os.getenv("JOB_MAX_PENDING", "1000"))
+
+# How long finished jobs can be looked up (seconds)
+JOB_RETENTION = int(os.getenv("JOB_RETENTION", "86400"))
+
+# Upper bound on job records kept in memory per process
+JOB_MAX_RECORDS = 10000
+
+# Attribute bucket holding finished job records
+JOB_BUCKET = "_jobs"
+
+# Background threads do not survive the end of a Lambda invocation
+RUN_INLINE = bool(os.getenv("AWS_LAMBDA_FUNCTION_NAME"))
+
+
+class JobQueue:
+    """
+    Bounded worker pool with a job status table.
+
+    The executor is created on first use rather than at import time, because
+    uwsgi forks workers after importing the app and threads started before
+    the fork do not exist in the children.
+    """
+
+    def __init__(
+        self,
+        workers: int = JOB_WORKERS,
+        max_pending: int = JOB_MAX_PENDING,
+        run_inline: bool = RUN_INLINE,
+    ):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.run_inline = run_inline
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._configs: Dict[str, Any] = {}
+        self._pending = 0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="aw-job"
+                )
+            return self._executor
+
+    def submit(
+        self,
+        kind: str,
+        actor_id: str,
+        func: Callable[..., Dict[str, Any]],
+        *args: Any,
+        config: Any = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Queue func(*args) as a job owned by actor_id.
+
+        Args:
+            kind: Job type, e.g. the action name
+            actor_id: Actor that owns the job (only it can look the job up)
+            func: Callable returning a JSON-serializable result dict
+            config: ActingWeb config, used to persist the finished job
+
+        Returns:
+            A copy of the job record, or None if the queue is full
+        """
+        with self._lock:
+            if not self.run_inline and self._pending >= self.max_pending:
+                logger.warning("Job queue full (%s pending), rejecting %s for actor %s", self._pending, kind, actor_id)
+                return None
+            self._pending += 1
+            job = self._new_job(kind, actor_id, config)
+            snapshot = dict(job)
+
+        if self.run_inline:
+            self._run(job["job_id"], func, args)
+            return self.get(job["job_id"], actor_id)
+
+        self._get_executor().submit(self._run, job["job_id"], func, args)
+        return snapshot
+
+    def create(self, kind: str, actor_id: str, config: Any = None) -> Dict[str, Any]:
+        """
+        Register a queued job that is executed elsewhere.
+
+        For work that is queued by another component (e.g. the notification
+        delivery engine), which reports back with complete().
+
+        Returns:
+            A copy of the job record
+        """
+        with self._lock:
+            return dict(self._new_job(kind, actor_id, config))
+
+    def _new_job(self, kind: str, actor_id: str, config: Any) -> Dict[str, Any]:
+        # Caller holds self._lock
+        job_id = f"job-{uuid.uuid4().hex}"
+        job: Dict[str, Any] = {
+            "job_id": job_id,
+            "kind": kind,
+            "actor_id": actor_id,
+            "status": "queued",
+            "created_at": datetime.now().isoformat(),
+        }
+        self._jobs[job_id] = job
+        self._configs[job_id] = config
+        while len(self._jobs) > JOB_MAX_RECORDS:
+            old_id, _ = self._jobs.popitem(last=False)
+            self._configs.pop(old_id, None)
+        return job
+
+    def start(self, job_id: str) -> None:
+        """Mark a job as picked up by a worker."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and job["status"] == "queued":
+                job["status"] = "running"
+                job["started_at"] = datetime.now().isoformat()
+
+    def complete(
+        self, job_id: str, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None
+    ) -> None:
+        """Record the outcome of a job and persist it."""
+        update: Dict[str, Any] = (
+            {"status": "failed", "error": error} if error else {"status": "succeeded", "result": result}
+        )
+        update["finished_at"] = datetime.now().isoformat()
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job.update(update)
+            record = dict(job)
+            config = self._configs.pop(job_id, None)
+        if config is None or self.run_inline:
+            self._persist(record, config)
+        else:
+            # Keep storage writes off callers such as the notification flusher
+            self._get_executor().submit(self._persist, record, config)
+
+    def _run(self, job_id: str, func: Callable[..., Dict[str, Any]], args: Any) -> None:
+        with self._lock:
+            self._pending -= 1
+        self.start(job_id)
+        try:
+            result = func(*args)
+        except Exception as e:
+            logger.error("Job %s failed: %s", job_id, e)
+            self.complete(job_id, error=str(e))
+            return
+        self.complete(job_id, result=result)
+
+    def _persist(self, record: Dict[str, Any], config: Any) -> None:
+        """Store a finished job in the actor's attribute bucket."""
+        if config is None:
+            return
+        try:
+            from actingweb.attribute import Attributes
+
+            Attributes(actor_id=record["actor_id"], bucket=JOB_BUCKET, config=config).set_attr(
+                name=record["job_id"], data=record, ttl_seconds=JOB_RETENTION
+            )
+        except Exception as e:
+            logger.warning("Could not persist job %s: %s", record['job_id'], e)
+
+    def get(self, job_id: str, actor_id: str, config: Any = None) -> Optional[Dict[str, Any]]:
+        """
+        Look up a job owned by actor_id.
+
+        Falls back to the persisted record when the job is not known to this
+        process. Returns None if the job does not exist or belongs to another actor.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return dict(job) if job["actor_id"] == actor_id else None
+
+        if config is None:
+            return None
+        try:
+            from actingweb.attribute import Attributes
+
+            stored = Attributes(actor_id=actor_id, bucket=JOB_BUCKET, config=config).get_attr(name=job_id)
+        except Exception as e:
+            logger.warning("Could not load job %s: %s", job_id, e)
+            return None
+        if not stored or not isinstance(stored.get("data"), dict):
+            return None
+        return stored["data"]
+
+    def stats(self) -> Dict[str, int]:
+        """Return queue counters for monitoring."""
+        with self._lock:
+            return {"pending": self._pending, "records": len(self._jobs), "workers": self.workers}
+
+
+# Process-wide job queue shared by all actions
+job_queue = JobQueue()
@@ -8,12 +8,15 @@ Methods are invoked via: POST /{actor_id}/methods/{method_name}
 with JSON body containing the method parameters.
 
 Available Methods:
-- calculate: Perform arithmetic operations (add/subtract/multiply/divide)
+- calculate: Perform arithmetic operations (add/subtract/multiply/divide), single or bulk
 - greet: Return a personalized greeting with actor info
 - get_status: Return comprehensive actor status summary
 - echo: Echo back input data (useful for testing)
-- search: Search actor properties by keyword (also exposed as MCP tool)
+- search: Search actor properties by keyword (also an action and MCP tool)
+- list_properties: Page through actor properties by name, with filters
 - schedule_task: Schedule a task for the robot to execute at a specific time
+- get_job_status: Look up a queued job (e.g. send_notification with async=true)
+- get_payment_state: Current payment state from the payment event log
 
 Example usage with curl:
     curl -X POST https://host/{actor_id}/methods/calculate \\
@@ -37,10 +40,75 @@ from typing import Any, Dict, List, Optional
 from actingweb.interface.actor_interface import ActorInterface
 from actingweb.mcp import mcp_tool
 
+from .bulk_calculate import calculate_bulk, is_bulk_request
+from .job_queue import job_queue
+from .payment_ledger import PaymentLedger, public_state
+from .property_pages import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    page_size,
+    read_lists,
+    read_page,
+    read_properties,
+    visible_value,
+)
+from .result_cache import cached, idempotent, invalidate_actor
+
 logger = logging.getLogger(__name__)
 
-# Properties to exclude from MCP search results (sensitive data)
-MCP_EXCLUDED_PROPERTIES = ["email", "auth_token", "oauth_token", "access_token", "refresh_token"]
+
+# The search tool, declared once: registered as the "search" method and,
+# since ActingWeb lists and calls MCP tools from action hooks, as an action
+SEARCH_TOOL: Dict[str, Any] = dict(
+    description=(
+        "Search across this actor's properties by keyword. "
+        "Returns matching property names and values. "
+        "Use '*' to list all properties. "
+        "Sensitive properties like tokens and email are excluded from results."
+    ),
+    input_schema={
+        "type": "object",
+        "properties": {
+            "query": {
+                "type": "string",
+                "description": "Search query - matches against property names and values. Use '*' to list all.",
+            },
+            "limit": {
+                "type": "integer",
+                "description": "Maximum number of results to return (default: 20)",
+                "default": 20,
+            },
+        },
+        "required": ["query"],
+    },
+    output_schema={
+        "type": "object",
+        "properties": {
+            "query": {"type": "string", "description": "The search query used"},
+            "results": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "property": {"type": "string", "description": "Property name"},
+                        "value": {"description": "Property value"},
+                        "match_type": {"type": "string", "enum": ["name", "value", "all"], "description": "How the match was found"},
+                    },
+                },
+                "description": "Matching properties",
+            },
+            "count": {"type": "integer", "description": "Number of results returned"},
+            "truncated": {"type": "boolean", "description": "Whether results were truncated due to limit"},
+            "error": {"type": "string", "description": "Error message if search failed"},
+        },
+    },
+    annotations={
+        "readOnlyHint": True,
+        "destructiveHint": False,
+        "idempotentHint": True,
+        "openWorldHint": False,
+    },
+)
 
 
 def register_method_hooks(app):
@@ -48,26 +116,44 @@ def register_method_hooks(app):
 
     @app.method_hook(
         "calculate",
-        description="Perform arithmetic operations (add, subtract, multiply, divide) on two numbers.",
+        description=(
+            "Perform arithmetic operations (add, subtract, multiply, divide) on two numbers. "
+            "Pass arrays for a, b and/or operation (or an items array) to evaluate many calculations in one call."
+        ),
         input_schema={
             "type": "object",
             "properties": {
                 "a": {
-                    "type": "number",
-                    "description": "First operand",
+                    "type": ["number", "array"],
+                    "items": {"type": "number"},
+                    "description": "First operand, or an array of first operands for bulk mode",
                     "default": 0,
                 },
                 "b": {
-                    "type": "number",
-                    "description": "Second operand",
+                    "type": ["number", "array"],
+                    "items": {"type": "number"},
+                    "description": "Second operand, or an array of second operands for bulk mode",
                     "default": 0,
                 },
                 "operation": {
-                    "type": "string",
+                    "type": ["string", "array"],
                     "enum": ["add", "subtract", "multiply", "divide"],
-                    "description": "Arithmetic operation to perform",
+                    "items": {"type": "string", "enum": ["add", "subtract", "multiply", "divide"]},
+                    "description": "Arithmetic operation to perform, or one operation per element in bulk mode",
                     "default": "add",
                 },
+                "items": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "a": {"type": "number"},
+                            "b": {"type": "number"},
+                            "operation": {"type": "string", "enum": ["add", "subtract", "multiply", "divide"]},
+                        },
+                    },
+                    "description": "Row-oriented bulk mode: list of {a, b, operation} objects",
+                },
             },
         },
         output_schema={
@@ -77,6 +163,24 @@ def register_method_hooks(app):
                 "operation": {"type": "string", "description": "Operation performed"},
                 "a": {"type": "number", "description": "First operand used"},
                 "b": {"type": "number", "description": "Second operand used"},
+                "results": {
+                    "type": "array",
+                    "items": {"type": ["number", "null"]},
+                    "description": "Bulk mode: one result per element (null where the element failed)",
+                },
+                "error_mask": {
+                    "type": "array",
+                    "items": {"type": "boolean"},
+                    "description": "Bulk mode: true where the element failed",
+                },
+                "errors": {
+                    "type": "array",
+                    "items": {"type": ["string", "null"]},
+                    "description": "Bulk mode: error message per element (null where it succeeded)",
+                },
+                "count": {"type": "integer", "description": "Bulk mode: number of elements evaluated"},
+                "error_count": {"type": "integer", "description": "Bulk mode: number of failed elements"},
+                "engine": {"type": "string", "enum": ["numpy", "python"], "description": "Bulk mode: evaluation engine used"},
                 "error": {"type": "string", "description": "Error message if operation failed"},
             },
         },
@@ -87,6 +191,7 @@ def register_method_hooks(app):
             "openWorldHint": False,
         },
     )
+    @cached
     def handle_calculate_method(
         actor: ActorInterface, method_name: str, data: Dict[str, Any]
     ) -> Optional[Dict[str, Any]]:
@@ -106,7 +211,16 @@ def register_method_hooks(app):
 
         Example:
             {"a": 10, "b": 5, "operation": "multiply"} -> {"result": 50, "operation": "multiply"}
+
+        Bulk mode:
+            If a, b or operation is an array, or an items array is given, all
+            elements are evaluated in one vectorized pass (see bulk_calculate).
+            {"a": [1, 4], "b": [2, 0], "operation": "divide"}
+                -> {"results": [0.5, null], "error_mask": [false, true], ...}
         """
+        if is_bulk_request(data):
+            return calculate_bulk(data)
+
         try:
             a = data.get("a", 0)
             b = data.get("b", 0)
@@ -295,86 +409,7 @@ def register_method_hooks(app):
 
     # MCP Tools - exposed to AI language models via Model Context Protocol
 
-    @app.method_hook(
-        "search",
-        description=(
-            "Search across this actor's properties by keyword. "
-            "Returns matching property names and values. "
-            "Use '*' to list all properties. "
-            "Sensitive properties like tokens and email are excluded from results."
-        ),
-        input_schema={
-            "type": "object",
-            "properties": {
-                "query": {
-                    "type": "string",
-                    "description": "Search query - matches against property names and values. Use '*' to list all.",
-                },
-                "limit": {
-                    "type": "integer",
-                    "description": "Maximum number of results to return (default: 20)",
-                    "default": 20,
-                },
-            },
-            "required": ["query"],
-        },
-        output_schema={
-            "type": "object",
-            "properties": {
-                "query": {"type": "string", "description": "The search query used"},
-                "results": {
-                    "type": "array",
-                    "items": {
-                        "type": "object",
-                        "properties": {
-                            "property": {"type": "string", "description": "Property name"},
-                            "value": {"description": "Property value"},
-                            "match_type": {"type": "string", "enum": ["name", "value", "all"], "description": "How the match was found"},
-                        },
-                    },
-                    "description": "Matching properties",
-                },
-                "count": {"type": "integer", "description": "Number of results returned"},
-                "truncated": {"type": "boolean", "description": "Whether results were truncated due to limit"},
-                "error": {"type": "string", "description": "Error message if search failed"},
-            },
-        },
-        annotations={
-            "readOnlyHint": True,
-            "destructiveHint": False,
-            "idempotentHint": True,
-            "openWorldHint": False,
-        },
-    )
-    @mcp_tool(
-        description=(
-            "Search across this actor's properties by keyword. "
-            "Returns matching property names and values. "
-            "Use '*' to list all properties. "
-            "Sensitive properties like tokens and email are excluded from results."
-        ),
-        input_schema={
-            "type": "object",
-            "properties": {
-                "query": {
-                    "type": "string",
-                    "description": "Search query - matches against property names and values. Use '*' to list all.",
-                },
-                "limit": {
-                    "type": "integer",
-                    "description": "Maximum number of results to return (default: 20)",
-                    "default": 20,
-                },
-            },
-            "required": ["query"],
-        },
-        annotations={
-            "readOnlyHint": True,
-            "destructiveHint": False,
-            "idempotentHint": True,
-            "openWorldHint": False,
-        },
-    )
+    @app.method_hook("search", **SEARCH_TOOL)
     def handle_search_method(
         actor: ActorInterface, method_name: str, data: Dict[str, Any]
     ) -> Dict[str, Any]:
@@ -391,7 +426,9 @@ def register_method_hooks(app):
         Returns:
             {query, results: [{property, value, match_type}], count, truncated}
 
-        Note: Sensitive properties (email, tokens) are automatically excluded.
+        Note: Sensitive properties (email, tokens) are automatically excluded:
+        only properties the mcp_client trust type may read are loaded
+        (trust_types.py).
         This method is also exposed as an MCP tool for AI assistants.
         """
         query = data.get("query", "").strip().lower()
@@ -403,24 +440,15 @@ def register_method_hooks(app):
         # Treat '*' as "list all"
         list_all = query == "*"
 
-        logger.info(f"Search for actor {actor.id}: query='{query}', limit={limit}, list_all={list_all}")
+        logger.info("Search for actor %s: query='%s', limit=%s, list_all=%s", actor.id, query, limit, list_all)
 
         results: List[Dict[str, Any]] = []
 
         try:
-            # Get all properties using to_dict()
-            all_props = actor.properties.to_dict() if actor.properties is not None else {}
-
-            if all_props is None:
-                all_props = {}
+            # Excluded/sensitive and internal properties are never read
+            all_props = read_properties(actor) if actor.properties is not None else {}
 
             for prop_name, prop_value in all_props.items():
-                # Skip excluded/sensitive properties
-                if prop_name in MCP_EXCLUDED_PROPERTIES:
-                    continue
-                if prop_name.startswith("_"):  # Skip internal properties
-                    continue
-
                 # Convert value to string for searching
                 value_str = str(prop_value) if prop_value is not None else ""
 
@@ -435,7 +463,7 @@ def register_method_hooks(app):
                     if len(results) >= limit:
                         break
 
-            logger.info(f"Search found {len(results)} results for '{query}'")
+            logger.info("Search found %s results for '%s'", len(results), query)
 
             return {
                 "query": query,
@@ -445,9 +473,129 @@ def register_method_hooks(app):
             }
 
         except Exception as e:
-            logger.error(f"Search failed: {e}")
+            logger.error("Search failed: %s", e)
             return {"error": f"Search failed: {str(e)}", "results": []}
 
+    # The same handler as the "search" MCP tool (no output_schema: the tool
+    # result carries no structuredContent)
+    mcp_tool(
+        description=SEARCH_TOOL["description"],
+        input_schema=SEARCH_TOOL["input_schema"],
+        annotations=SEARCH_TOOL["annotations"],
+    )(handle_search_method)
+    app.action_hook("search", **SEARCH_TOOL)(handle_search_method)
+
+    @app.method_hook(
+        "list_properties",
+        description=(
+            "List this actor's properties one page at a time, ordered by name. "
+            "Pass the returned next_cursor to get the following page. "
+            "Sensitive and internal properties are not listed, except to the actor itself."
+        ),
+        input_schema={
+            "type": "object",
+            "properties": {
+                "cursor": {
+                    "type": ["string", "null"],
+                    "description": "next_cursor from the previous page; omit for the first page",
+                },
+                "limit": {
+                    "type": "integer",
+                    "description": f"Properties per page (default {DEFAULT_PAGE_SIZE}, max {MAX_PAGE_SIZE})",
+                    "default": DEFAULT_PAGE_SIZE,
+                },
+                "query": {
+                    "type": "string",
+                    "description": "Only properties whose name or value contains this text (case-insensitive)",
+                },
+                "prefix": {"type": "string", "description": "Only properties whose name starts with this"},
+            },
+        },
+        output_schema={
+            "type": "object",
+            "properties": {
+                "properties": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "name": {"type": "string", "description": "Property name"},
+                            "value": {"description": "Property value"},
+                        },
+                    },
+                    "description": "Properties on this page",
+                },
+                "next_cursor": {"type": ["string", "null"], "description": "Cursor of the next page, null on the last page"},
+                "total": {
+                    "type": ["integer", "null"],
+                    "description": "Number of properties matching the filters; null when storage was read a page at a time",
+                },
+                "lists": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "name": {"type": "string", "description": "List property name"},
+                            "items": {"type": ["integer", "null"], "description": "Number of items"},
+                        },
+                    },
+                    "description": "List properties matching the filters, on the actor's own first page only",
+                },
+            },
+        },
+        annotations={
+            "readOnlyHint": True,
+            "destructiveHint": False,
+            "idempotentHint": True,
+            "openWorldHint": False,
+        },
+    )
+    def handle_list_properties_method(
+        actor: ActorInterface, method_name: str, data: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        List properties a page at a time (used by the /www properties page).
+
+        Endpoint: POST /{actor_id}/methods/list_properties
+
+        Parameters:
+            cursor (str): next_cursor of the previous page
+            limit (int): Page size (default 50, max 200)
+            query (str): Name/value filter
+            prefix (str): Name prefix filter
+
+        Returns:
+            {properties: [{name, value}], next_cursor, total, lists: [{name, items}]}
+
+        The actor itself sees every property, and its first page (no cursor)
+        names the list properties; peers and MCP clients see what mcp_client
+        may read and no lists (see property_pages.py).
+
+        Property "get" hooks run on the returned rows only; a row they hide
+        is dropped from the page, so a page can be shorter than limit and
+        still have a next_cursor.
+
+        Not result-cached: the page is read from storage a page at a time,
+        and cached pages could outlive writes made through another worker.
+        """
+        cursor = data.get("cursor") or None
+        query = str(data.get("query") or "")
+        prefix = str(data.get("prefix") or "")
+        rows, next_cursor, total = read_page(
+            actor,
+            cursor=cursor,
+            limit=page_size(data.get("limit", DEFAULT_PAGE_SIZE)),
+            query=query,
+            prefix=prefix,
+        )
+        page = []
+        for name, value in rows:
+            value = visible_value(app.hooks, actor, name, value)
+            if value is not None:
+                page.append({"name": name, "value": value})
+        lists = [] if cursor else read_lists(actor, query=query, prefix=prefix)
+        return {"properties": page, "next_cursor": next_cursor, "total": total, "lists": lists}
+
     # 1X NEO Robot Task Scheduling
 
     @app.method_hook(
@@ -511,6 +659,7 @@ def register_method_hooks(app):
             "openWorldHint": False,
         },
     )
+    @idempotent
     def handle_schedule_task_method(
         actor: ActorInterface, method_name: str, data: Dict[str, Any]
     ) -> Dict[str, Any]:
@@ -601,10 +750,14 @@ def register_method_hooks(app):
             })
 
             actor.properties.scheduled_tasks = scheduled_tasks
+            invalidate_actor(actor.id)
 
         logger.info(
-            f"Scheduled task {reference_id} for actor {actor.id}: "
-            f"'{description}' at {timestamp_str}"
+            "Scheduled task %s for actor %s: '%s' at %s",
+            reference_id,
+            actor.id,
+            description,
+            timestamp_str,
         )
 
         return {
@@ -613,3 +766,130 @@ def register_method_hooks(app):
             "message": f"Task '{description}' has been scheduled successfully.",
             "scheduled_for": timestamp_str,
         }
+
+    @app.method_hook(
+        "get_job_status",
+        description="Look up the status and result of a queued job (e.g. send_notification with async=true).",
+        input_schema={
+            "type": "object",
+            "properties": {
+                "job_id": {
+                    "type": "string",
+                    "description": "Job handle returned when the job was queued",
+                },
+            },
+            "required": ["job_id"],
+        },
+        output_schema={
+            "type": "object",
+            "properties": {
+                "job_id": {"type": "string", "description": "Job handle"},
+                "kind": {"type": "string", "description": "What queued the job (e.g. the action name)"},
+                "status": {
+                    "type": "string",
+                    "enum": ["queued", "running", "succeeded", "failed", "not_found"],
+                    "description": "Current job status",
+                },
+                "result": {"type": "object", "description": "Job result once succeeded"},
+                "error": {"type": "string", "description": "Error message if the job failed or was not found"},
+                "created_at": {"type": "string", "format": "date-time", "description": "When the job was queued"},
+                "started_at": {"type": "string", "format": "date-time", "description": "When a worker picked up the job"},
+                "finished_at": {"type": "string", "format": "date-time", "description": "When the job finished"},
+            },
+            "required": ["job_id", "status"],
+        },
+        annotations={
+            "readOnlyHint": True,
+            "destructiveHint": False,
+            "idempotentHint": False,
+            "openWorldHint": False,
+        },
+    )
+    def handle_get_job_status_method(
+        actor: ActorInterface, method_name: str, data: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Look up a queued job.
+
+        Endpoint: POST /{actor_id}/methods/get_job_status
+
+        Parameters:
+            job_id (str): Job handle returned by an async action (required)
+
+        Returns:
+            {job_id, kind, status, result, error, created_at, started_at, finished_at}
+            {job_id, status: "not_found", error} if the job is unknown or
+            belongs to another actor
+
+        Jobs are only visible to the actor that queued them.
+        """
+        job_id = data.get("job_id", "")
+        if not job_id:
+            return {"job_id": "", "status": "not_found", "error": "Missing required field: job_id"}
+
+        job = job_queue.get(job_id, actor.id or "", config=actor.config)
+        if job is None:
+            return {"job_id": job_id, "status": "not_found", "error": "Unknown job"}
+        job.pop("actor_id", None)
+        return job
+
+    @app.method_hook(
+        "get_payment_state",
+        description="Return the actor's current payment state, materialized from its payment event log.",
+        input_schema={
+            "type": "object",
+            "properties": {
+                "include_history": {
+                    "type": "boolean",
+                    "description": "Also return all logged payment events (default false)",
+                },
+            },
+        },
+        output_schema={
+            "type": "object",
+            "properties": {
+                "status": {
+                    "type": ["string", "null"],
+                    "enum": ["paid", "failed", "refunded", None],
+                    "description": "Status set by the most recent payment event",
+                },
+                "seq": {"type": "integer", "description": "Sequence number of the last logged event"},
+                "last_payment_at": {"type": ["number", "null"], "description": "Provider timestamp of the latest successful payment"},
+                "amount_paid": {"type": "number", "description": "Sum of successful payment amounts"},
+                "amount_refunded": {"type": "number", "description": "Refunded amount"},
+                "currency": {"type": ["string", "null"], "description": "Currency of the latest event"},
+                "counts": {"type": "object", "description": "Number of logged events per event type"},
+                "history": {"type": "array", "items": {"type": "object"}, "description": "Logged events in sequence order"},
+            },
+            "required": ["status", "seq"],
+        },
+        annotations={
+            "readOnlyHint": True,
+            "destructiveHint": False,
+            "idempotentHint": True,
+            "openWorldHint": False,
+        },
+    )
+    def handle_get_payment_state_method(
+        actor: ActorInterface, method_name: str, data: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Return the payment state snapshot.
+
+        Endpoint: POST /{actor_id}/methods/get_payment_state
+
+        Parameters:
+            include_history (bool): Also return the full event log (default false)
+
+        Returns:
+            {status, seq, status_at, last_payment_at, amount_paid, amount_refunded,
+             currency, counts[, history]}
+
+        Reading the snapshot is a single storage fetch; the history requires
+        reading the whole event log.
+        """
+        ledger = PaymentLedger(actor.id or "", actor.config)
+        result = public_state(ledger.state())
+        if data.get("include_history"):
+            result["history"] = ledger.history()
+        return result
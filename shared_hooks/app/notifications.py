@@ -0,0 +1,312 @@
+"""
+Batched notification delivery for the send_notification action.
+
+Sending notifications one provider call at a time makes a large broadcast
+cost one round trip per recipient. The DeliveryEngine instead groups pending
+notifications by channel (email, sms, push) and recipient domain, and hands
+each group to the channel's provider in batches:
+
+- deliver(): Deliver a list of notifications now, in as few provider calls
+  as possible. Used for synchronous sends and broadcasts.
+- submit(): Buffer a single notification. Buffers are flushed when a group
+  reaches BATCH_SIZE or its oldest entry is FLUSH_INTERVAL seconds old, and
+  a callback receives each notification's result. Used for async sends.
+
+Providers:
+- StubProvider: Local provider that accepts every well-formed notification
+  without any network I/O. Used when no provider URL is configured, and in tests.
+- HttpProvider: Posts batches as JSON to a provider endpoint over a pooled,
+  keep-alive requests.Session, so connections are reused across batches.
+
+A broadcast may name at most MAX_RECIPIENTS recipients (NOTIFY_MAX_RECIPIENTS,
+default 10000); send_notification rejects larger ones before anything is sent.
+
+Configure an HTTP provider per channel with environment variables:
+    NOTIFY_EMAIL_URL, NOTIFY_SMS_URL, NOTIFY_PUSH_URL
+    NOTIFY_EMAIL_TOKEN, ... (optional bearer token)
+"""
+
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CHANNELS = ("email", "sms", "push")
+
+# Maximum notifications per provider call
+BATCH_SIZE = int(os.getenv("NOTIFY_BATCH_SIZE", "500"))
+
+# Maximum time a buffered notification waits for its batch to fill (seconds)
+FLUSH_INTERVAL = float(os.getenv("NOTIFY_FLUSH_INTERVAL", "0.5"))
+
+# Maximum recipients of one broadcast
+MAX_RECIPIENTS = int(os.getenv("NOTIFY_MAX_RECIPIENTS", "10000"))
+
+# Maximum notifications buffered by submit() before new ones are rejected
+MAX_BUFFERED = int(os.getenv("NOTIFY_MAX_BUFFERED", "100000"))
+
+# Pooled connections per provider
+POOL_SIZE = int(os.getenv("NOTIFY_POOL_SIZE", "10"))
+
+# Provider request timeout (seconds)
+PROVIDER_TIMEOUT = float(os.getenv("NOTIFY_TIMEOUT", "10"))
+
+Notification = Dict[str, Any]
+ResultCallback = Callable[[Dict[str, Any]], None]
+
+
+def group_key(notification: Notification) -> Tuple[str, str]:
+    """Return the (channel, recipient domain) batching key of a notification."""
+    channel = notification.get("type", "email")
+    recipient = str(notification.get("recipient", ""))
+    domain = recipient.rsplit("@", 1)[-1].lower() if channel == "email" and "@" in recipient else ""
+    return channel, domain
+
+
+def _result(notification: Notification, status: str, error: Optional[str] = None) -> Dict[str, Any]:
+    result = {
+        "status": status,
+        "recipient": notification.get("recipient", ""),
+        "message": notification.get("message", ""),
+        "type": notification.get("type", "email"),
+        "timestamp": datetime.now().isoformat(),
+    }
+    if error:
+        result["error"] = error
+    return result
+
+
+class StubProvider:
+    """
+    Local provider that simulates delivery without network I/O.
+
+    Every notification with a recipient and message is reported as sent.
+    Each call is recorded in ``batches`` as (channel, batch size) so tests
+    and benchmarks can count provider calls.
+    """
+
+    def __init__(self) -> None:
+        self.batches: List[Tuple[str, int]] = []
+        self._lock = threading.Lock()
+
+    def send_batch(self, channel: str, notifications: List[Notification]) -> List[Dict[str, Any]]:
+        with self._lock:
+            self.batches.append((channel, len(notifications)))
+        logger.info("Sending %s %s notification(s)", len(notifications), channel)
+        return [
+            _result(n, "sent") if n.get("recipient") and n.get("message") else _result(n, "failed", "Missing recipient or message")
+            for n in notifications
+        ]
+
+
+class HttpProvider:
+    """
+    Provider reached over HTTP with a pooled, keep-alive session.
+
+    Each batch is posted as {"channel": ..., "messages": [{recipient, message}, ...]}.
+    The provider may answer with {"results": [{"status": "sent"|"failed", "error": ...}, ...]}
+    in the same order; any other 2xx answer counts as all sent.
+    """
+
+    def __init__(self, url: str, token: str = "", pool_size: int = POOL_SIZE, timeout: float = PROVIDER_TIMEOUT):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.url = url
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        if token:
+            self.session.headers["Authorization"] = f"Bearer {token}"
+
+    def send_batch(self, channel: str, notifications: List[Notification]) -> List[Dict[str, Any]]:
+        payload = {
+            "channel": channel,
+            "messages": [{"recipient": n.get("recipient", ""), "message": n.get("message", "")} for n in notifications],
+        }
+        try:
+            response = self.session.post(self.url, json=payload, timeout=self.timeout)
+            response.raise_for_status()
+        except Exception as e:
+            logger.error("%s provider call failed for %s notification(s): %s", channel, len(notifications), e)
+            return [_result(n, "failed", str(e)) for n in notifications]
+
+        try:
+            body = response.json()
+        except ValueError:
+            body = {}
+        provider_results = body.get("results") if isinstance(body, dict) else None
+        if not isinstance(provider_results, list) or len(provider_results) != len(notifications):
+            return [_result(n, "sent") for n in notifications]
+        return [
+            _result(n, r.get("status", "sent"), r.get("error")) if isinstance(r, dict) else _result(n, "sent")
+            for n, r in zip(notifications, provider_results)
+        ]
+
+
+def providers_from_env() -> Dict[str, Any]:
+    """Build one provider per channel from NOTIFY_<CHANNEL>_URL, defaulting to the stub."""
+    stub = StubProvider()
+    providers: Dict[str, Any] = {}
+    for channel in CHANNELS:
+        url = os.getenv(f"NOTIFY_{channel.upper()}_URL", "")
+        if url:
+            providers[channel] = HttpProvider(url, token=os.getenv(f"NOTIFY_{channel.upper()}_TOKEN", ""))
+        else:
+            providers[channel] = stub
+    return providers
+
+
+class DeliveryEngine:
+    """
+    Groups notifications by (channel, recipient domain) and delivers them in batches.
+
+    The flusher thread that drains submit() buffers is started on first use,
+    since uwsgi forks workers after the app is imported.
+    """
+
+    def __init__(
+        self,
+        providers: Optional[Dict[str, Any]] = None,
+        batch_size: int = BATCH_SIZE,
+        flush_interval: float = FLUSH_INTERVAL,
+        max_buffered: int = MAX_BUFFERED,
+    ):
+        self.providers = providers if providers is not None else providers_from_env()
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffered = max_buffered
+        self._cond = threading.Condition()
+        self._buffers: Dict[Tuple[str, str], List[Tuple[Notification, Optional[ResultCallback]]]] = {}
+        self._oldest: Dict[Tuple[str, str], float] = {}
+        self._flusher: Optional[threading.Thread] = None
+        self._buffered = 0
+        self.provider_calls = 0
+        self.delivered = 0
+
+    def deliver(
+        self, notifications: List[Notification], counters: Optional[Dict[str, int]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Deliver notifications now and return one result per notification, in input order.
+
+        If counters is given, its "provider_calls" entry is incremented per batch sent.
+        """
+        groups: Dict[Tuple[str, str], List[int]] = {}
+        for index, notification in enumerate(notifications):
+            groups.setdefault(group_key(notification), []).append(index)
+
+        results: List[Dict[str, Any]] = [{}] * len(notifications)
+        for (channel, _domain), indexes in groups.items():
+            for start in range(0, len(indexes), self.batch_size):
+                chunk = indexes[start:start + self.batch_size]
+                batch_results = self._send(channel, [notifications[i] for i in chunk])
+                if counters is not None:
+                    counters["provider_calls"] = counters.get("provider_calls", 0) + 1
+                for i, result in zip(chunk, batch_results):
+                    results[i] = result
+        return results
+
+    def _send(self, channel: str, batch: List[Notification]) -> List[Dict[str, Any]]:
+        provider = self.providers.get(channel)
+        if provider is None:
+            return [_result(n, "failed", f"Unsupported notification type: {channel}") for n in batch]
+        with self._cond:
+            self.provider_calls += 1
+            self.delivered += len(batch)
+        try:
+            return provider.send_batch(channel, batch)
+        except Exception as e:
+            logger.error("%s provider raised for %s notification(s): %s", channel, len(batch), e)
+            return [_result(n, "failed", str(e)) for n in batch]
+
+    def submit(self, notification: Notification, callback: Optional[ResultCallback] = None) -> bool:
+        """
+        Buffer a notification for batched delivery.
+
+        callback(result) runs on the flusher thread after delivery.
+
+        Returns:
+            False if the buffers are full and the notification was rejected
+        """
+        key = group_key(notification)
+        with self._cond:
+            if self._buffered >= self.max_buffered:
+                return False
+            self._ensure_flusher()
+            buffer = self._buffers.setdefault(key, [])
+            if not buffer:
+                self._oldest[key] = time.monotonic()
+            buffer.append((notification, callback))
+            self._buffered += 1
+            if len(buffer) >= self.batch_size:
+                self._cond.notify()
+        return True
+
+    def _ensure_flusher(self) -> None:
+        # Caller holds self._cond
+        if self._flusher is None or not self._flusher.is_alive():
+            self._flusher = threading.Thread(target=self._flush_loop, name="aw-notify-flusher", daemon=True)
+            self._flusher.start()
+
+    def _take_due(self, force: bool = False) -> List[Tuple[str, List[Tuple[Notification, Optional[ResultCallback]]]]]:
+        # Caller holds self._cond
+        now = time.monotonic()
+        due = []
+        for key in list(self._buffers):
+            buffer = self._buffers[key]
+            if force or len(buffer) >= self.batch_size or now - self._oldest[key] >= self.flush_interval:
+                while buffer:
+                    due.append((key[0], buffer[:self.batch_size]))
+                    del buffer[:self.batch_size]
+                del self._buffers[key]
+                del self._oldest[key]
+        self._buffered -= sum(len(entries) for _, entries in due)
+        return due
+
+    def _flush_loop(self) -> None:
+        while True:
+            with self._cond:
+                # A batch may have filled before this thread first waited,
+                # in which case its notify() was missed
+                due = self._take_due()
+                if not due:
+                    self._cond.wait(self.flush_interval)
+                    due = self._take_due()
+            self._deliver_batches(due)
+
+    def _deliver_batches(self, due: List[Tuple[str, List[Tuple[Notification, Optional[ResultCallback]]]]]) -> None:
+        for channel, entries in due:
+            results = self._send(channel, [n for n, _ in entries])
+            for (_, callback), result in zip(entries, results):
+                if callback is None:
+                    continue
+                try:
+                    callback(result)
+                except Exception as e:
+                    logger.error("Notification result callback failed: %s", e)
+
+    def flush(self) -> None:
+        """Deliver everything buffered by submit() now, on the calling thread."""
+        with self._cond:
+            due = self._take_due(force=True)
+        self._deliver_batches(due)
+
+    def stats(self) -> Dict[str, int]:
+        """Return delivery counters for monitoring."""
+        with self._cond:
+            return {
+                "buffered": self._buffered,
+                "provider_calls": self.provider_calls,
+                "delivered": self.delivered,
+            }
+
+
+# Process-wide delivery engine shared by all actors
+delivery_engine = DeliveryEngine()
@@ -0,0 +1,252 @@
+"""
+Per-actor, event-sourced payment state.
+
+Payment providers deliver webhooks at least once and in no particular order,
+so overwriting payment_status with whatever event arrives last can leave the
+wrong final state (e.g. a late "payment_failed" retry after "succeeded"), and
+the history is lost.
+
+Instead, every payment event is appended to the actor's payment event log and
+folded into a materialized snapshot:
+
+- Event log: attribute bucket EVENT_BUCKET, one item per event named by its
+  zero-padded sequence number. Sequence numbers are assigned monotonically
+  per actor from the snapshot.
+- Snapshot: attribute STATE_NAME in STATE_BUCKET holding the current state
+  and the sequence number of the last event folded into it. It is created
+  with a create-if-absent write (storage/attributes.py) and then updated
+  with a compare-and-swap, each attempt starting from a fresh read of the
+  stored snapshot, so concurrent writers from different processes never
+  reuse a sequence number.
+
+The fold is order-insensitive: the status comes from the event with the
+latest provider timestamp (Stripe's ``created``), ties broken by sequence, so
+an event that arrives late never overrides a newer one. Refunds are tracked
+per charge, since Stripe reports the cumulative refunded amount of one
+charge, and amount_refunded is their sum. Each event is folded
+into the snapshot incrementally in O(1), reading the current state costs one
+item fetch, and replay() only reads the events logged after the snapshot.
+
+The actor's payment_status and last_payment_at properties are kept as a
+read-only view of the snapshot for the UI and property consumers.
+"""
+
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from actingweb.db import get_attribute
+
+from storage.attributes import create_attr
+
+logger = logging.getLogger(__name__)
+
+# Attribute bucket with one item per payment event
+EVENT_BUCKET = "_payment_events"
+
+# Attribute bucket and name of the materialized snapshot
+STATE_BUCKET = "_payment_state"
+STATE_NAME = "current"
+
+# Payment event types and the status they set
+PAYMENT_STATUSES = {
+    "payment_intent.succeeded": "paid",
+    "payment_intent.payment_failed": "failed",
+    "charge.refunded": "refunded",
+}
+
+# Provider event ids remembered in the snapshot for duplicate detection
+RECENT_EVENT_IDS = 100
+
+# Snapshot compare-and-swap attempts before giving up
+CAS_ATTEMPTS = 5
+
+
+def _event_name(seq: int) -> str:
+    return f"{seq:012d}"
+
+
+def empty_state() -> Dict[str, Any]:
+    """Return the state of an actor without payment events."""
+    return {
+        "seq": 0,
+        "status": None,
+        "status_at": None,
+        "status_seq": 0,
+        "last_payment_at": None,
+        "amount_paid": 0,
+        "amount_refunded": 0,
+        "refunds": {},
+        "currency": None,
+        "counts": {},
+        "recent_event_ids": [],
+    }
+
+
+def to_event(data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Reduce a provider webhook payload to a compact log entry.
+
+    Returns None for event types that don't affect payment state.
+    """
+    event_type = data.get("type", "")
+    if event_type not in PAYMENT_STATUSES:
+        return None
+    payload = data.get("data")
+    obj = payload.get("object", {}) if isinstance(payload, dict) else {}
+    if not isinstance(obj, dict):
+        obj = {}
+    created = data.get("created")
+    return {
+        "event_id": data.get("id", ""),
+        "type": event_type,
+        "created": float(created) if isinstance(created, (int, float)) else time.time(),
+        "amount": obj.get("amount_received", obj.get("amount")),
+        "amount_refunded": obj.get("amount_refunded"),
+        "charge_id": obj.get("id", ""),
+        "currency": obj.get("currency"),
+    }
+
+
+def fold(state: Dict[str, Any], event: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Apply one logged event (with its "seq") to a state and return the new state.
+
+    The result does not depend on the order in which events are folded.
+    """
+    state = dict(state, counts=dict(state["counts"]), refunds=dict(state.get("refunds") or {}))
+    if not state["refunds"] and state["amount_refunded"]:
+        # Snapshot from before refunds were tracked per charge
+        state["refunds"][""] = state["amount_refunded"]
+    seq = event["seq"]
+    state["seq"] = max(state["seq"], seq)
+    state["counts"][event["type"]] = state["counts"].get(event["type"], 0) + 1
+
+    if state["status_at"] is None or (event["created"], seq) > (state["status_at"], state["status_seq"]):
+        state["status"] = PAYMENT_STATUSES[event["type"]]
+        state["status_at"] = event["created"]
+        state["status_seq"] = seq
+
+    if event["type"] == "payment_intent.succeeded":
+        state["last_payment_at"] = max(state["last_payment_at"] or 0, event["created"])
+        if isinstance(event.get("amount"), (int, float)):
+            state["amount_paid"] += event["amount"]
+    elif event["type"] == "charge.refunded" and isinstance(event.get("amount_refunded"), (int, float)):
+        # Stripe reports the cumulative refunded amount of the charge
+        charge = event.get("charge_id") or event.get("event_id") or str(seq)
+        state["refunds"][charge] = max(state["refunds"].get(charge, 0), event["amount_refunded"])
+        state["amount_refunded"] = sum(state["refunds"].values())
+    if event.get("currency"):
+        state["currency"] = event["currency"]
+
+    if event.get("event_id"):
+        state["recent_event_ids"] = (state["recent_event_ids"] + [event["event_id"]])[-RECENT_EVENT_IDS:]
+    return state
+
+
+class PaymentLedger:
+    """Payment event log and snapshot of one actor."""
+
+    def __init__(self, actor_id: str, config: Any):
+        from actingweb.attribute import Attributes
+
+        self.actor_id = actor_id
+        self.config = config
+        self._events = Attributes(actor_id=actor_id, bucket=EVENT_BUCKET, config=config)
+        self._state = Attributes(actor_id=actor_id, bucket=STATE_BUCKET, config=config)
+
+    def state(self) -> Dict[str, Any]:
+        """Return the current snapshot (one item fetch)."""
+        stored = self._state.get_attr(name=STATE_NAME)
+        if stored and isinstance(stored.get("data"), dict):
+            return stored["data"]
+        return empty_state()
+
+    def _read_state(self) -> Optional[Dict[str, Any]]:
+        """The stored snapshot, read from storage (not the Attributes cache)."""
+        stored = get_attribute(self.config).get_attr(actor_id=self.actor_id, bucket=STATE_BUCKET, name=STATE_NAME)
+        current = stored.get("data") if stored else None
+        return current if isinstance(current, dict) else None
+
+    def append(self, event: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Log an event and fold it into the snapshot.
+
+        Returns:
+            The new state, or None if the event id was already logged
+        """
+        for _ in range(CAS_ATTEMPTS):
+            current = self._read_state()
+            state = current if current is not None else empty_state()
+            if event.get("event_id") and event["event_id"] in state["recent_event_ids"]:
+                logger.info("Payment event %s already logged for actor %s", event["event_id"], self.actor_id)
+                return None
+
+            logged = dict(event, seq=state["seq"] + 1)
+            new_state = dict(fold(state, logged), last_event=logged)
+            if current is None:
+                if not create_attr(self.config, self.actor_id, STATE_BUCKET, STATE_NAME, new_state):
+                    continue  # Another writer created the snapshot first; re-read
+            elif not self._state.conditional_update_attr(name=STATE_NAME, old_data=current, new_data=new_state):
+                continue  # Another writer took this sequence number; re-read
+            # The snapshot owns the sequence number now, so the log item can't collide
+            self._events.set_attr(name=_event_name(logged["seq"]), data=logged)
+            return new_state
+        raise RuntimeError(f"Payment snapshot for actor {self.actor_id} kept changing; giving up")
+
+    def replay(self) -> Dict[str, Any]:
+        """
+        Rebuild the snapshot from itself plus any events logged after it.
+
+        Also restores the log item of the snapshot's last event if a crash
+        happened between the snapshot write and the log write.
+        """
+        state = self.state()
+        last_event = state.get("last_event")
+        if last_event and not self._events.get_attr(name=_event_name(last_event["seq"])):
+            self._events.set_attr(name=_event_name(last_event["seq"]), data=last_event)
+
+        seq = state["seq"] + 1
+        while True:
+            stored = self._events.get_attr(name=_event_name(seq))
+            if not stored or not isinstance(stored.get("data"), dict):
+                break
+            state = fold(state, stored["data"])
+            seq += 1
+        return state
+
+    def history(self) -> List[Dict[str, Any]]:
+        """Return all logged events in sequence order."""
+        bucket = self._events.get_bucket() or {}
+        events = [item["data"] for item in bucket.values() if item and isinstance(item.get("data"), dict)]
+        return sorted(events, key=lambda event: event["seq"])
+
+
+def record_payment_event(actor: Any, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Log a provider payment webhook for an actor and refresh its payment properties.
+
+    Returns:
+        The new state, or None if the event was ignored or already logged
+    """
+    event = to_event(data)
+    if event is None or not actor.id:
+        return None
+    state = PaymentLedger(actor.id, actor.config).append(event)
+    if state is None:
+        return None
+
+    if actor.properties is not None:
+        if actor.properties.get("payment_status") != state["status"]:
+            actor.properties.payment_status = state["status"]
+        if state["last_payment_at"]:
+            last_payment_at = datetime.fromtimestamp(state["last_payment_at"]).isoformat()
+            if actor.properties.get("last_payment_at") != last_payment_at:
+                actor.properties.last_payment_at = last_payment_at
+    return state
+
+
+def public_state(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Return a snapshot without bookkeeping fields, for API responses."""
+    return {key: value for key, value in state.items() if key not in ("recent_event_ids", "last_event", "status_seq", "refunds")}
@@ -28,6 +28,8 @@ import logging
 from typing import Any, List, Optional
 from actingweb.interface.actor_interface import ActorInterface
 
+from .result_cache import invalidate_actor
+
 logger = logging.getLogger(__name__)
 
 # Properties that should be hidden from external access
@@ -69,13 +71,13 @@ def register_property_hooks(app):
         elif operation in ["put", "post"]:
             # Validate email format
             if isinstance(value, str) and "@" in value:
-                logger.info(f"Actor {actor.id} email changed to {value.lower()}")
+                logger.info("Actor %s email changed to %s", actor.id, value.lower())
                 return value.lower()
-            logger.warning(f"Invalid email format rejected for actor {actor.id}")
+            logger.warning("Invalid email format rejected for actor %s", actor.id)
             return None
         elif operation == "delete":
             # Protect email from deletion
-            logger.warning(f"Attempted to delete protected email property for actor {actor.id}")
+            logger.warning("Attempted to delete protected email property for actor %s", actor.id)
             return None
         return value
 
@@ -92,6 +94,7 @@ def register_property_hooks(app):
         - Protects PROP_PROTECT properties from deletion
         - Blocks PUT/POST on PROP_HIDE properties
         - Parses JSON strings into objects for PUT/POST
+        - Invalidates cached method results on any write
 
         Parameters:
             actor: The ActorInterface instance
@@ -110,12 +113,17 @@ def register_property_hooks(app):
         # Apply protection rules
         if property_name in PROP_PROTECT:
             if operation == "delete":
-                logger.warning(f"Blocked deletion of protected property '{property_name}' for actor {actor.id}")
+                logger.warning("Blocked deletion of protected property '%s' for actor %s", property_name, actor.id)
                 return None
             elif operation in ["put", "post"] and property_name in PROP_HIDE:
-                logger.warning(f"Blocked modification of hidden property '{property_name}' for actor {actor.id}")
+                logger.warning("Blocked modification of hidden property '%s' for actor %s", property_name, actor.id)
                 return None
 
+        # Any write makes cached method results for this actor stale (invalidated
+        # again once the write is done, see result_cache.install())
+        if operation in ["put", "post", "delete"]:
+            invalidate_actor(actor.id)
+
         # Handle JSON string conversion for PUT/POST
         if operation in ["put", "post"]:
             if isinstance(value, str):
@@ -0,0 +1,298 @@
+"""
+Paginated property listing and bulk property deletion.
+
+The /www properties page used to render every property of the actor in one
+response and delete them one DELETE request at a time. The page now loads
+rows in pages through the ``list_properties`` method and removes a selection
+of properties with one ``delete_properties`` action call.
+
+Listing:
+- Properties are ordered by name (case-sensitive), and a page continues
+  after the last name of the previous one (``cursor``). Unlike an offset,
+  the cursor stays valid while rows before it are deleted or added.
+- ``query`` matches property names and values (case-insensitive, as in
+  search); ``prefix`` restricts the listing to names that start with it.
+- The actor's own calls (the page itself, authenticated as the owner) list
+  every property. Calls from a peer or MCP client list only what the
+  ``mcp_client`` trust type may read (see trust_types.py): sensitive and
+  internal properties are left out of the storage read itself. install()
+  tells the two apart by the caller's auth context. Property "get" hooks
+  apply too, so a property hidden from GET /properties is hidden here.
+- For the owner, the first page also names the list properties and their
+  lengths (``lists``); their items are read on /properties/{name}.
+- The cursor and page size go down to storage where the backend reads in
+  name order (memory, sqlite, dynamodb; see storage/projection.py), so a
+  page reads about one page of rows. There the total number of matching
+  properties is not known and is returned as None. Other backends read the
+  whole listing and page it here.
+
+Deletion:
+- Every name goes through the property "delete" hooks, exactly like
+  DELETE /{actor_id}/properties/{name}; protected properties are reported
+  as blocked and left in place. Properties the caller can't list can't be
+  deleted this way either. The owner can delete whole list properties too.
+- Subscribers get one diff per deleted property.
+
+The page itself is rendered without reading any property: ActingWeb's www
+handler reads every property and list of the actor for
+/{actor_id}/www/properties, which the page no longer uses, so install()
+answers that path with the template URLs only. (The www callback hook of
+ui_hooks.py can't do this: it runs only for paths the handler has no page
+for.)
+"""
+
+import bisect
+import contextvars
+import functools
+import inspect
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from actingweb.interface.actor_interface import ActorInterface
+from storage.projection import fetch_list_names, fetch_properties, fetch_properties_page
+
+from .result_cache import invalidate_actor
+from .trust_types import mcp_property_projection, owner_property_projection
+
+logger = logging.getLogger(__name__)
+
+# Rows per page when the caller doesn't ask for a size
+DEFAULT_PAGE_SIZE = 50
+
+# Upper bound on rows per page and names per delete_properties call
+MAX_PAGE_SIZE = 200
+
+MAX_DELETE_NAMES = 500
+
+# True while a method or action hook runs for the actor itself (no peer)
+_owner_call: contextvars.ContextVar[bool] = contextvars.ContextVar("property_pages_owner_call", default=False)
+
+
+def property_projection() -> Any:
+    """The projection of the current hook call: every property for the owner, mcp_client's otherwise."""
+    return owner_property_projection() if _owner_call.get() else mcp_property_projection()
+
+
+def read_properties(actor: ActorInterface, prefix: str = "", projection: Optional[Any] = None) -> Dict[str, Any]:
+    """
+    Read the actor's properties (stored values, names starting with prefix).
+
+    Args:
+        projection: Which properties; default what mcp_client may read
+    """
+    if projection is None:
+        projection = mcp_property_projection()
+    return fetch_properties(actor.config, actor.id, projection, prefix=prefix)
+
+
+def read_lists(actor: ActorInterface, query: str = "", prefix: str = "") -> List[Dict[str, Any]]:
+    """
+    Name the actor's list properties, for the owner only.
+
+    Returns:
+        [{"name": ..., "items": length}] in name order ([] for other callers)
+    """
+    if not _owner_call.get() or actor.property_lists is None:
+        return []
+    query = query.strip().lower()
+    lists = []
+    for name in fetch_list_names(actor.config, actor.id):
+        if not name.startswith(prefix) or (query and query != "*" and query not in name.lower()):
+            continue
+        try:
+            items = len(getattr(actor.property_lists, name))
+        except Exception as e:
+            logger.warning("Failed to read list property %s of %s: %s", name, actor.id, e)
+            items = None
+        lists.append({"name": name, "items": items})
+    return lists
+
+
+def _matches(name: str, value: Any, query: str) -> bool:
+    if not query or query == "*":
+        return True
+    value_str = str(value) if value is not None else ""
+    return query in name.lower() or query in value_str.lower()
+
+
+def page_size(limit: Any) -> int:
+    """Clamp a requested page size to 1..MAX_PAGE_SIZE."""
+    try:
+        size = int(limit)
+    except (TypeError, ValueError):
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(MAX_PAGE_SIZE, size))
+
+
+def list_page(
+    properties: Dict[str, Any],
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    query: str = "",
+    prefix: str = "",
+) -> Tuple[List[Tuple[str, Any]], Optional[str], int]:
+    """
+    Select one page of properties (as returned by read_properties()).
+
+    Returns:
+        (rows as (name, value), cursor of the next page or None, number of matching properties)
+    """
+    query = query.strip().lower()
+    names = sorted(
+        name
+        for name, value in properties.items()
+        if name.startswith(prefix) and _matches(name, value, query)
+    )
+    start = bisect.bisect_right(names, cursor) if cursor else 0
+    selected = names[start : start + limit]
+    next_cursor = selected[-1] if selected and start + limit < len(names) else None
+    return [(name, properties[name]) for name in selected], next_cursor, len(names)
+
+
+def read_page(
+    actor: ActorInterface,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    query: str = "",
+    prefix: str = "",
+) -> Tuple[List[Tuple[str, Any]], Optional[str], Optional[int]]:
+    """
+    Read one page of the caller's properties (property_projection()), from storage where possible.
+
+    Returns:
+        (rows as (name, value), cursor of the next page or None,
+        number of matching properties or None when only the page was read)
+    """
+    if actor.properties is None:
+        return [], None, 0
+    query = query.strip().lower()
+    keep = None if not query or query == "*" else lambda name, value: _matches(name, value, query)
+    projection = property_projection()
+    page = fetch_properties_page(
+        actor.config, actor.id, projection, prefix=prefix, after=cursor, limit=limit, keep=keep
+    )
+    if page is not None:
+        rows, next_cursor = page
+        return list(rows), next_cursor, None
+    return list_page(
+        read_properties(actor, prefix, projection), cursor=cursor, limit=limit, query=query, prefix=prefix
+    )
+
+
+def visible_value(hooks: Any, actor: ActorInterface, name: str, value: Any) -> Any:
+    """Run the property "get" hooks; None means the property is hidden."""
+    if hooks is None:
+        return value
+    return hooks.execute_property_hooks(name, "get", actor, value, [name])
+
+
+def delete_properties(hooks: Any, actor: ActorInterface, names: List[str]) -> Dict[str, Any]:
+    """
+    Delete properties by name, through the property "delete" hooks.
+
+    The owner may name list properties as well; each is deleted whole.
+
+    Returns:
+        {deleted: [...], blocked: [...], missing: [...]}
+    """
+    deleted: List[str] = []
+    blocked: List[str] = []
+    missing: List[str] = []
+    store = actor.properties
+    projection = property_projection()
+    lists = actor.property_lists if _owner_call.get() else None
+    current = read_properties(actor, projection=projection) if store is not None else {}
+    for name in dict.fromkeys(names):
+        if not isinstance(name, str) or not projection.allows(name):
+            blocked.append(str(name))
+            continue
+        if name in current:
+            value = current[name]
+        elif lists is not None and lists.exists(name):
+            list_prop = getattr(lists, name)
+            value = list_prop.to_list()
+        else:
+            missing.append(name)
+            continue
+        if hooks is not None and hooks.execute_property_hooks(name, "delete", actor, value, [name]) is None:
+            blocked.append(name)
+            continue
+        if name in current:
+            del store[name]  # type: ignore[index]
+        else:
+            list_prop.delete()
+        deleted.append(name)
+    if deleted:
+        invalidate_actor(actor.id)
+        logger.info("Deleted %s properties for actor %s", len(deleted), actor.id)
+    return {"deleted": deleted, "blocked": blocked, "missing": missing}
+
+
+def _owner_dispatch(original: Callable[..., Any]) -> Callable[..., Any]:
+    """Mark a method/action hook dispatch as the owner's when no peer makes it."""
+
+    def is_owner(auth_context: Optional[Dict[str, Any]]) -> bool:
+        return auth_context is not None and not auth_context.get("peer_id")
+
+    if inspect.iscoroutinefunction(original):
+
+        @functools.wraps(original)
+        async def dispatch_async(self: Any, name: str, actor: Any, data: Any, auth_context: Any = None) -> Any:
+            token = _owner_call.set(is_owner(auth_context))
+            try:
+                return await original(self, name, actor, data, auth_context)
+            finally:
+                _owner_call.reset(token)
+
+        dispatch_async._property_pages = True  # type: ignore[attr-defined]
+        return dispatch_async
+
+    @functools.wraps(original)
+    def dispatch(self: Any, name: str, actor: Any, data: Any, auth_context: Any = None) -> Any:
+        token = _owner_call.set(is_owner(auth_context))
+        try:
+            return original(self, name, actor, data, auth_context)
+        finally:
+            _owner_call.reset(token)
+
+    dispatch._property_pages = True  # type: ignore[attr-defined]
+    return dispatch
+
+
+def _www_get(original: Callable[..., Any]) -> Callable[..., Any]:
+    """Render /www/properties from the template URLs alone; other paths as before."""
+
+    @functools.wraps(original)
+    def get(self: Any, actor_id: str, path: str) -> None:
+        if path != "properties":
+            return original(self, actor_id, path)
+        myself = self.require_authenticated_actor(actor_id, "www", "GET", path)
+        if not myself:
+            return None
+        if not self.config.ui:
+            if self.response:
+                self.response.set_status(404, "Web interface is not enabled")
+            return None
+        self.response.template_values = {"id": myself.id, **self._get_consistent_urls(actor_id)}
+        return None
+
+    get._property_pages = True  # type: ignore[attr-defined]
+    return get
+
+
+def install() -> None:
+    """Tell owner calls from peer calls in the hooks, and skip the www property read."""
+    from actingweb.handlers.www import WwwHandler
+    from actingweb.interface.hooks import HookRegistry
+
+    for method in (
+        "execute_method_hooks",
+        "execute_action_hooks",
+        "execute_method_hooks_async",
+        "execute_action_hooks_async",
+    ):
+        original = getattr(HookRegistry, method, None)
+        if original is not None and not getattr(original, "_property_pages", False):
+            setattr(HookRegistry, method, _owner_dispatch(original))
+    if not getattr(WwwHandler.get, "_property_pages", False):
+        WwwHandler.get = _www_get(WwwHandler.get)  # type: ignore[method-assign]
@@ -0,0 +1,406 @@
+"""
+Result cache for idempotent method and action hooks.
+
+Methods and actions annotated with ``idempotentHint: True`` return the same
+result for the same input, so repeated calls from retrying AI clients can be
+answered from memory instead of recomputing and hitting storage again.
+
+Two decorators are provided:
+
+- cached: Cache results keyed by (actor_id, hook name, canonicalized params)
+  with a per-hook TTL from CACHE_TTLS. Any property write on the actor
+  invalidates its cached results.
+- idempotent: Honor an ``Idempotency-Key`` request header for hooks that are
+  NOT idempotent (e.g. schedule_task, send_notification). The first result
+  for a key is stored and replayed for retries carrying the same key, so the
+  side effect happens only once.
+
+Cached hooks also honor ``Idempotency-Key``, so a client can use the header
+uniformly across all hooks.
+
+Usage:
+    @app.method_hook("calculate", ...)
+    @cached
+    def handle_calculate_method(actor, method_name, data):
+        ...
+
+    @app.action_hook("send_notification", ...)
+    @idempotent
+    def handle_send_notification_action(actor, action_name, data):
+        ...
+
+Code that writes actor properties outside the /properties endpoint should
+call invalidate_actor(actor.id) so cached reads see the change. install()
+invalidates once more after every /properties write has completed, and a
+result computed while its actor was invalidated is never stored, so a read
+that raced a write can't cache the old value.
+
+Results larger than MAX_RESULT_BYTES (e.g. a big bulk calculate) are not
+cached, and the cache as a whole is bounded by MAX_BYTES as well as by
+MAX_ENTRIES (sizes are measured as serialized JSON).
+
+Read-only requests may read eventually consistent replicas (consistency.py).
+A replica can still return the value from before a write, so a result
+computed within STRONG_READ_WINDOW seconds of its actor's last invalidation
+is computed with strongly consistent reads; otherwise the pre-write value
+could be cached for the whole TTL right after the write invalidated it.
+
+Like the cache itself, Idempotency-Key records live in process memory. With
+several worker processes (the uwsgi production profiles), a retry that lands
+on another process runs the hook again; clients that need exactly-once side
+effects across processes must not rely on the header alone.
+"""
+
+import copy
+import functools
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import nullcontext
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import consistency
+
+logger = logging.getLogger(__name__)
+
+# Cache lifetime in seconds per hook name. Hooks not listed use DEFAULT_TTL.
+# Only hooks whose result can't change with the actor's state are cached:
+# the cache and its invalidation are per process, so a result read from
+# storage (search, get_status, list_properties) could outlive a write made
+# through another worker for the whole TTL. greet and echo return a
+# timestamp, and log_message has a side effect (it only honors
+# Idempotency-Key, see idempotent).
+CACHE_TTLS = {
+    "calculate": 3600.0,  # Pure function of its inputs
+}
+DEFAULT_TTL = 30.0
+
+# How long a result is replayed for a given Idempotency-Key
+IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_KEY_TTL", "86400"))
+
+# How long a retry waits for an in-flight call with the same key to finish
+IDEMPOTENCY_WAIT = 30.0
+
+# Upper bound on stored entries; least recently used entries are evicted first
+MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "10000"))
+
+# Upper bound on the serialized size of all cached results
+MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Results larger than this (serialized) are not cached
+MAX_RESULT_BYTES = int(os.getenv("RESULT_CACHE_MAX_RESULT_BYTES", str(256 * 1024)))
+
+# Seconds after an invalidation during which cached hooks read strongly consistent
+STRONG_READ_WINDOW = float(os.getenv("RESULT_CACHE_STRONG_READ_WINDOW", "5"))
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+
+
+class ResultCache:
+    """
+    Thread-safe, bounded TTL cache for hook results.
+
+    Invalidation is O(1): each actor has a generation counter that is part of
+    every result key, so bumping the generation orphans all of the actor's
+    entries. Orphaned entries are never hit again and age out through the
+    LRU bound or their TTL.
+    """
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, max_bytes: int = MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # key -> (expires, result, serialized size)
+        self._results: "OrderedDict[Tuple[Any, ...], Tuple[float, Any, int]]" = OrderedDict()
+        self._bytes = 0
+        self._generations: Dict[str, int] = {}
+        # actor_id -> time.monotonic() of its last invalidation
+        self._invalidated_at: Dict[str, float] = {}
+        self._idempotency: "OrderedDict[Tuple[str, str, str], Tuple[float, str, Any]]" = OrderedDict()
+        self._in_flight: Dict[Tuple[str, str, str], threading.Event] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def generation(self, actor_id: str) -> int:
+        """Current invalidation generation of an actor."""
+        return self._generations.get(actor_id, 0)
+
+    def recently_invalidated(self, actor_id: str, window: float = STRONG_READ_WINDOW) -> bool:
+        """True if the actor was invalidated less than window seconds ago."""
+        invalidated = self._invalidated_at.get(actor_id)
+        return invalidated is not None and time.monotonic() - invalidated < window
+
+    def _result_key(self, actor_id: str, name: str, fingerprint: str) -> Tuple[Any, ...]:
+        return (actor_id, self._generations.get(actor_id, 0), name, fingerprint)
+
+    def _drop(self, key: Tuple[Any, ...]) -> None:
+        entry = self._results.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+    def get(self, actor_id: str, name: str, fingerprint: str) -> Tuple[bool, Any]:
+        """Return (found, result) for a cached hook call."""
+        with self._lock:
+            key = self._result_key(actor_id, name, fingerprint)
+            entry = self._results.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return False, None
+            self._results.move_to_end(key)
+            self.hits += 1
+            return True, copy.deepcopy(entry[1])
+
+    def put(
+        self, actor_id: str, name: str, fingerprint: str, result: Any, ttl: float, generation: Optional[int] = None
+    ) -> bool:
+        """
+        Store a hook result for ttl seconds.
+
+        Not stored if it is larger than MAX_RESULT_BYTES, or if the actor was
+        invalidated since generation (taken before the result was computed).
+        """
+        size = len(json.dumps(result, separators=(",", ":"), default=str))
+        if size > MAX_RESULT_BYTES:
+            return False
+        with self._lock:
+            if generation is not None and generation != self._generations.get(actor_id, 0):
+                return False
+            key = self._result_key(actor_id, name, fingerprint)
+            self._drop(key)
+            self._results[key] = (time.monotonic() + ttl, copy.deepcopy(result), size)
+            self._bytes += size
+            while len(self._results) > self.max_entries or self._bytes > self.max_bytes:
+                self._drop(next(iter(self._results)))
+            return True
+
+    def invalidate_actor(self, actor_id: str) -> None:
+        """Drop all cached results for an actor (idempotency records are kept)."""
+        now = time.monotonic()
+        with self._lock:
+            self._generations[actor_id] = self._generations.get(actor_id, 0) + 1
+            if actor_id not in self._invalidated_at and len(self._invalidated_at) >= self.max_entries:
+                self._invalidated_at = {
+                    key: at for key, at in self._invalidated_at.items() if now - at < STRONG_READ_WINDOW
+                }
+            self._invalidated_at[actor_id] = now
+
+    def begin_idempotent(
+        self, key: Tuple[str, str, str], fingerprint: str
+    ) -> Tuple[str, Any]:
+        """
+        Claim an idempotency key before running the hook.
+
+        Returns:
+            ("run", None) if the caller should execute the hook and then call
+            finish_idempotent(); ("replay", result) if a stored result exists;
+            ("conflict", None) if the key was used with different parameters.
+        """
+        while True:
+            with self._lock:
+                entry = self._idempotency.get(key)
+                if entry is not None and entry[0] < time.monotonic():
+                    del self._idempotency[key]
+                    entry = None
+                if entry is not None:
+                    if entry[1] != fingerprint:
+                        return "conflict", None
+                    return "replay", copy.deepcopy(entry[2])
+                pending = self._in_flight.get(key)
+                if pending is None:
+                    self._in_flight[key] = threading.Event()
+                    return "run", None
+            # Another request with the same key is running; wait for its result
+            if not pending.wait(IDEMPOTENCY_WAIT):
+                return "conflict", None
+
+    def finish_idempotent(
+        self, key: Tuple[str, str, str], fingerprint: str, result: Any
+    ) -> None:
+        """Store the result for an idempotency key and release waiting retries."""
+        with self._lock:
+            if result is not None:
+                self._idempotency[key] = (
+                    time.monotonic() + IDEMPOTENCY_TTL,
+                    fingerprint,
+                    copy.deepcopy(result),
+                )
+                self._idempotency.move_to_end(key)
+                while len(self._idempotency) > self.max_entries:
+                    self._idempotency.popitem(last=False)
+            pending = self._in_flight.pop(key, None)
+        if pending is not None:
+            pending.set()
+
+    def clear(self) -> None:
+        """Drop all entries (mainly for tests)."""
+        with self._lock:
+            self._results.clear()
+            self._bytes = 0
+            self._generations.clear()
+            self._invalidated_at.clear()
+            self._idempotency.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Return cache counters for monitoring."""
+        with self._lock:
+            return {
+                "entries": len(self._results),
+                "bytes": self._bytes,
+                "idempotency_keys": len(self._idempotency),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+# Process-wide cache shared by all hooks
+result_cache = ResultCache()
+
+
+def invalidate_actor(actor_id: Optional[str]) -> None:
+    """Invalidate cached hook results for an actor after its properties change."""
+    if actor_id:
+        result_cache.invalidate_actor(actor_id)
+
+
+def canonicalize(data: Any) -> str:
+    """Return a stable digest of hook parameters (key order does not matter)."""
+    encoded = json.dumps(data, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def _get_idempotency_key() -> Optional[str]:
+    """Return the Idempotency-Key header of the current request, if any."""
+    try:
+        from flask import has_request_context, request
+    except ImportError:
+        return None
+    if not has_request_context():
+        return None
+    return request.headers.get(IDEMPOTENCY_HEADER) or None
+
+
+def _run_with_idempotency_key(
+    func: Callable[..., Any], actor: Any, name: str, data: Any, fingerprint: str
+) -> Tuple[bool, Any]:
+    """
+    Run a hook under the request's Idempotency-Key, if one was sent.
+
+    Returns (handled, result). handled is False when no key was sent and the
+    caller should run the hook normally.
+    """
+    idempotency_key = _get_idempotency_key()
+    if not idempotency_key:
+        return False, None
+
+    actor_id = actor.id if actor else ""
+    key = (actor_id, name, idempotency_key)
+    outcome, result = result_cache.begin_idempotent(key, fingerprint)
+    if outcome == "replay":
+        logger.debug("Replaying %s for actor %s (Idempotency-Key match)", name, actor_id)
+        return True, result
+    if outcome == "conflict":
+        logger.warning("Idempotency-Key reused with different parameters for %s on actor %s", name, actor_id)
+        return True, {"error": f"{IDEMPOTENCY_HEADER} was already used with different parameters"}
+
+    result = None
+    try:
+        result = func(actor, name, data)
+    finally:
+        # Failed calls are not stored, so a retry runs the hook again
+        stored = result if not (isinstance(result, dict) and "error" in result) else None
+        result_cache.finish_idempotent(key, fingerprint, stored)
+    return True, result
+
+
+def cached(func: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Cache results of an idempotent method or action hook.
+
+    The TTL is looked up in CACHE_TTLS by hook name. Results carrying an
+    "error" key are not cached, so transient failures are retried. Shortly
+    after the actor was invalidated the hook runs with strongly consistent
+    reads (STRONG_READ_WINDOW).
+    """
+
+    @functools.wraps(func)
+    def wrapper(actor: Any, name: str, data: Dict[str, Any]) -> Any:
+        fingerprint = canonicalize(data)
+        handled, result = _run_with_idempotency_key(func, actor, name, data, fingerprint)
+        if handled:
+            return result
+
+        actor_id = actor.id if actor else ""
+        found, result = result_cache.get(actor_id, name, fingerprint)
+        if found:
+            return result
+
+        generation = result_cache.generation(actor_id)
+        strong = result_cache.recently_invalidated(actor_id) and consistency.current() == "eventual"
+        with consistency.strongly_consistent() if strong else nullcontext():
+            result = func(actor, name, data)
+        if result is not None and not (isinstance(result, dict) and "error" in result):
+            result_cache.put(actor_id, name, fingerprint, result, CACHE_TTLS.get(name, DEFAULT_TTL), generation)
+        return result
+
+    return wrapper
+
+
+def idempotent(func: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Deduplicate retries of a non-idempotent hook using the Idempotency-Key header.
+
+    Calls without the header run normally every time.
+    """
+
+    @functools.wraps(func)
+    def wrapper(actor: Any, name: str, data: Dict[str, Any]) -> Any:
+        handled, result = _run_with_idempotency_key(func, actor, name, data, canonicalize(data))
+        if handled:
+            return result
+        return func(actor, name, data)
+
+    return wrapper
+
+
+# ActingWeb handlers whose requests write properties: (module, class, methods)
+_WRITE_HANDLERS = (
+    ("actingweb.handlers.properties", "PropertiesHandler", ("put", "post", "delete")),
+    ("actingweb.handlers.properties", "PropertyListItemsHandler", ("post",)),
+)
+
+
+def _invalidating(original: Callable[..., Any]) -> Callable[..., Any]:
+    @functools.wraps(original)
+    def handler(self: Any, actor_id: str, *args: Any, **kwargs: Any) -> Any:
+        try:
+            return original(self, actor_id, *args, **kwargs)
+        finally:
+            invalidate_actor(actor_id)
+
+    handler._result_cache = True  # type: ignore[attr-defined]
+    return handler
+
+
+def install() -> None:
+    """
+    Invalidate an actor's cached results after each /properties write.
+
+    The property hook invalidates before the write as well; this second
+    invalidation orphans anything a concurrent read cached in between.
+    """
+    import importlib
+
+    for module_name, class_name, methods in _WRITE_HANDLERS:
+        cls = getattr(importlib.import_module(module_name), class_name)
+        for method in methods:
+            original = getattr(cls, method)
+            if not getattr(original, "_result_cache", False):
+                setattr(cls, method, _invalidating(original))
@@ -0,0 +1,79 @@
+"""
+Trust type permission specs of the app.
+
+application.py registers these with ActingWeb's AccessControlConfig, and
+the hooks derive their property reads from the same dicts, so what a trust
+type may read is declared once:
+
+- MCP_CLIENT_PERMISSIONS: the ``mcp_client`` trust type of AI assistants.
+- mcp_property_projection(): its ``properties`` rules as a storage
+  projection (permission_matcher.projection). search reads properties
+  through it with storage.projection.fetch_properties(), and so do
+  list_properties and delete_properties when a peer or MCP client calls
+  them, so sensitive and internal properties are left out of the storage
+  read instead of being loaded and skipped.
+- owner_property_projection(): every property, for the actor's own calls
+  (the /www properties page; see property_pages.py).
+
+Changing an excluded pattern here changes the MCP permission check and
+the search/list results together; the owner's properties page is not
+affected.
+"""
+
+import logging
+from typing import Any, Dict
+
+import permission_matcher
+
+logger = logging.getLogger(__name__)
+
+MCP_CLIENT_TRUST_TYPE = "mcp_client"
+
+# Read-only access excluding sensitive properties
+MCP_CLIENT_PERMISSIONS: Dict[str, Any] = {
+    "properties": {
+        "patterns": ["*"],  # Allow access to all properties
+        "operations": ["read"],  # Read-only access
+        "excluded_patterns": [
+            "email",
+            "auth_token",
+            "oauth_token",
+            "access_token",
+            "refresh_token",
+            "_*",  # Internal properties
+        ],
+    },
+    # Read operations only. Job and payment lookups are per-actor records
+    # that happen to be named get_*; they are not for AI assistants.
+    "methods": {
+        "allowed": ["get_*", "list_*", "search_*"],
+        "denied": ["get_job_status", "get_payment_state"],
+    },
+    "tools": ["search"],  # Only the search MCP tool
+    "resources": [],  # No resource access
+    "prompts": ["*"],  # All prompts available
+}
+
+
+def property_rules(permissions: Dict[str, Any]) -> Dict[str, Any]:
+    """The ``properties`` rules of a spec, with a plain pattern list expanded as ActingWeb does."""
+    rules = permissions.get("properties") or {}
+    if isinstance(rules, list):
+        return {"patterns": rules, "operations": ["read", "write"]}
+    return rules
+
+
+_mcp_rules = property_rules(MCP_CLIENT_PERMISSIONS)
+
+# The actor itself reads every property
+_owner_rules: Dict[str, Any] = {"patterns": ["*"], "operations": ["read"]}
+
+
+def mcp_property_projection() -> permission_matcher.Projection:
+    """Storage projection of the properties mcp_client may read."""
+    return permission_matcher.projection(_mcp_rules, "read")
+
+
+def owner_property_projection() -> permission_matcher.Projection:
+    """Storage projection of every property, for the actor's own reads."""
+    return permission_matcher.projection(_owner_rules, "read")
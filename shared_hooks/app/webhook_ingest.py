@@ -0,0 +1,462 @@
+"""
+Webhook ingestion queue with fast acknowledgement.
+
+External providers (Twilio, Stripe, ...) retry webhooks that are not
+acknowledged quickly, which amplifies load exactly when the app is slow.
+Instead of writing actor properties inside the provider's request, callback
+hooks hand the raw event to the WebhookIngestor, which:
+
+1. Drops duplicates (same callback and provider event id, e.g. MessageSid or
+   a Stripe event id) using a bounded in-memory dedup index. An event id is
+   only kept if the event was journaled (or applied, inline), so an ingest
+   that failed is processed again when the provider retries it.
+2. Appends the event to a local append-only journal (JSON lines) and returns,
+   so the hook can acknowledge at once.
+3. Applies the event on a background consumer pool. Events for the same actor
+   always go to the same consumer, so they are applied in arrival order.
+
+Applied events are marked in the journal. Each process writes its own
+journal, named after its pid and a random id, as a series of segment files
+(``<journal>-<n>.jsonl``). A new segment is started once the current one
+is larger than JOURNAL_MAX_BYTES, and a segment whose events have all been
+applied (or given up) is deleted once a newer one exists, so the journal
+doesn't grow while events keep arriving. The process holds an exclusive
+lock (flock) on each segment until it is deleted or the process exits.
+Events that were journaled but not applied when a process died are picked
+up by the next process that starts ingesting: every segment whose lock can
+be taken belongs to a process that is gone, whatever its pid has been
+reused for since.
+
+The journal must outlive the process and its host's reboots to be of any
+use, so run.sh refuses to start the production profiles (and SERVER=asgi)
+without WEBHOOK_JOURNAL_DIR; the /tmp default is for development.
+
+Events that still fail after APPLY_ATTEMPTS attempts are dead letters: they
+are written to ``dead-<journal>.jsonl`` next to the journal, which is never
+recovered or truncated, for inspection and replay.
+
+The dedup index is per process, so apply functions should still be
+idempotent (e.g. skip an SMS whose MessageSid is already stored).
+
+On AWS Lambda there is no background work after the response, so events are
+applied inline (still deduplicated).
+
+Usage:
+    webhook_ingestor.register("sms_webhook", apply_sms_message, app.get_config)
+
+    @app.callback_hook("sms_webhook")
+    def handle_sms_webhook(actor, name, data):
+        outcome = webhook_ingestor.ingest(actor, name, data.get("MessageSid", ""), data)
+        return {"status": "received", ...}
+"""
+
+import fcntl
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Directory for journal files (one journal per process); required by run.sh outside the dev profile
+JOURNAL_DIR = os.getenv("WEBHOOK_JOURNAL_DIR", "/tmp/actingweb_webhooks")
+
+# fsync every appended event (survives OS crashes, costs a disk flush per webhook)
+JOURNAL_FSYNC = os.getenv("WEBHOOK_JOURNAL_FSYNC", "false").lower() == "true"
+
+# A new journal segment is started once the current one is larger than this
+JOURNAL_MAX_BYTES = int(os.getenv("WEBHOOK_JOURNAL_MAX_BYTES", str(16 * 1024 * 1024)))
+
+# Consumer threads per process; events for one actor always use the same consumer
+CONSUMERS = int(os.getenv("WEBHOOK_CONSUMERS", "2"))
+
+# Provider event ids remembered for duplicate detection
+DEDUP_SIZE = int(os.getenv("WEBHOOK_DEDUP_SIZE", "100000"))
+
+# Attempts to apply an event before it is given up
+APPLY_ATTEMPTS = 3
+
+# Background threads do not survive the end of a Lambda invocation
+RUN_INLINE = bool(os.getenv("AWS_LAMBDA_FUNCTION_NAME"))
+
+ApplyFunc = Callable[[Any, Dict[str, Any]], None]
+
+
+class DedupIndex:
+    """Bounded set of recently seen keys; the oldest keys are forgotten first."""
+
+    def __init__(self, max_size: int = DEDUP_SIZE):
+        self.max_size = max_size
+        self._keys: "OrderedDict[Tuple[str, str], None]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, key: Tuple[str, str]) -> bool:
+        """Remember key; return False if it was already present."""
+        with self._lock:
+            if key in self._keys:
+                self._keys.move_to_end(key)
+                return False
+            self._keys[key] = None
+            if len(self._keys) > self.max_size:
+                self._keys.popitem(last=False)
+            return True
+
+    def discard(self, key: Tuple[str, str]) -> None:
+        """Forget key, so the same event is accepted again."""
+        with self._lock:
+            self._keys.pop(key, None)
+
+
+class _Segment:
+    """One locked file of a journal, and how many of its events are not done yet."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.outstanding = 0
+        self.file = open(path, "a", encoding="utf-8")
+        # Held until the segment is deleted or the process exits; recover_orphans() skips locked segments
+        fcntl.flock(self.file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+    def write(self, entry: Dict[str, Any]) -> None:
+        self.file.write(json.dumps(entry, separators=(",", ":"), default=str) + "\n")
+        self.file.flush()
+        if JOURNAL_FSYNC:
+            os.fsync(self.file.fileno())
+
+    def delete(self) -> None:
+        # Unlinked before the lock is released, so no other process can take it over
+        os.remove(self.path)
+        self.file.close()
+
+
+class WebhookJournal:
+    """
+    Append-only JSON-lines journal of received webhook events, in segments.
+
+    Lines are either events ({"seq": n, "actor_id", "callback", "event_id",
+    "data", "received_at"}), applied markers ({"applied": n}) or markers of
+    events moved to the dead letter file ({"dead": n}). A marker is written
+    to the segment holding its event, so each segment replays on its own.
+    """
+
+    def __init__(self, directory: str = JOURNAL_DIR, max_bytes: int = JOURNAL_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.name = f"webhooks-{os.getpid()}-{uuid.uuid4().hex[:12]}"
+        self.dead_letter_path = os.path.join(directory, f"dead-{self.name}.jsonl")
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._segment_count = 0
+        # Segments with outstanding events, and the one being appended to (last)
+        self._segments: List[_Segment] = []
+        # seq -> segment holding the event, until the event is done
+        self._event_segments: Dict[int, _Segment] = {}
+        os.makedirs(directory, exist_ok=True)
+        self._rotate()
+
+    @property
+    def path(self) -> str:
+        """The segment events are appended to."""
+        return self._segments[-1].path
+
+    @property
+    def paths(self) -> List[str]:
+        """Every segment this journal still holds."""
+        with self._lock:
+            return [segment.path for segment in self._segments]
+
+    def _rotate(self) -> None:
+        # Caller holds self._lock (or is __init__)
+        self._segment_count += 1
+        path = os.path.join(self.directory, f"{self.name}-{self._segment_count:06d}.jsonl")
+        self._segments.append(_Segment(path))
+        self._delete_done()
+
+    def _delete_done(self) -> None:
+        # Caller holds self._lock; the current segment is kept even when done
+        for segment in self._segments[:-1]:
+            if segment.outstanding == 0:
+                try:
+                    segment.delete()
+                except OSError as e:
+                    logger.warning("Could not delete applied webhook journal segment %s: %s", segment.path, e)
+                    continue
+                self._segments.remove(segment)
+
+    def append(self, actor_id: str, callback: str, event_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Journal an event and return it with its sequence number."""
+        with self._lock:
+            if self._segments[-1].file.tell() > self.max_bytes:
+                self._rotate()
+            self._seq += 1
+            event = {
+                "seq": self._seq,
+                "actor_id": actor_id,
+                "callback": callback,
+                "event_id": event_id,
+                "data": data,
+                "received_at": datetime.now().isoformat(),
+            }
+            segment = self._segments[-1]
+            segment.write(event)
+            segment.outstanding += 1
+            self._event_segments[event["seq"]] = segment
+            return event
+
+    def mark_applied(self, seq: int) -> None:
+        """Record that an event was applied, deleting its segment once all of it is done."""
+        with self._lock:
+            self._mark_done({"applied": seq})
+
+    def mark_dead(self, event: Dict[str, Any], error: str) -> None:
+        """Move an event that could not be applied to the dead letter file."""
+        with self._lock:
+            with open(self.dead_letter_path, "a", encoding="utf-8") as dead:
+                dead.write(
+                    json.dumps({**event, "error": error, "failed_at": datetime.now().isoformat()}, default=str) + "\n"
+                )
+                dead.flush()
+                if JOURNAL_FSYNC:
+                    os.fsync(dead.fileno())
+            self._mark_done({"dead": event["seq"]})
+
+    def _mark_done(self, entry: Dict[str, Any]) -> None:
+        # Caller holds self._lock
+        seq = entry.get("applied", entry.get("dead"))
+        segment = self._event_segments.get(seq)
+        if segment is None:
+            return
+        segment.write(entry)
+        del self._event_segments[seq]
+        segment.outstanding -= 1
+        if segment.outstanding == 0 and segment is not self._segments[-1]:
+            self._delete_done()
+
+    def recover_orphans(self) -> List[Dict[str, Any]]:
+        """
+        Take over unapplied events from journals of processes that are gone.
+
+        The events are re-journaled here and the orphaned files removed.
+        """
+        recovered: List[Dict[str, Any]] = []
+        own = set(self.paths)
+        for name in sorted(os.listdir(self.directory)):
+            if not (name.startswith("webhooks-") and name.endswith(".jsonl")):
+                continue
+            path = os.path.join(self.directory, name)
+            if path in own:
+                continue
+            orphan = _take_orphan(path)
+            if orphan is None:
+                continue
+            try:
+                for event in _unapplied_events(orphan):
+                    recovered.append(
+                        self.append(event["actor_id"], event["callback"], event["event_id"], event["data"])
+                    )
+                os.remove(path)
+            except OSError as e:
+                logger.warning("Could not recover webhook journal %s: %s", path, e)
+            finally:
+                orphan.close()
+        if recovered:
+            logger.info("Recovered %s unapplied webhook event(s) from orphaned journals", len(recovered))
+        return recovered
+
+
+def _take_orphan(path: str) -> Optional[Any]:
+    """
+    Open and lock another process's journal if that process is gone.
+
+    Returns the locked file, or None if the journal is in use (or was just
+    taken over and removed by another process).
+    """
+    try:
+        journal = open(path, encoding="utf-8")
+    except OSError:
+        return None
+    try:
+        fcntl.flock(journal.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        # Another process may have recovered and removed it before we locked it
+        if os.fstat(journal.fileno()).st_ino != os.stat(path).st_ino:
+            raise OSError("journal was replaced")
+    except OSError:
+        journal.close()
+        return None
+    return journal
+
+
+def _unapplied_events(journal: Any) -> List[Dict[str, Any]]:
+    events: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+    for line in journal:
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            continue  # Torn last line from a crash
+        if "applied" in entry:
+            events.pop(entry["applied"], None)
+        elif "dead" in entry:
+            events.pop(entry["dead"], None)
+        elif "seq" in entry:
+            events[entry["seq"]] = entry
+    return list(events.values())
+
+
+class WebhookIngestor:
+    """
+    Accepts webhook events, journals them and applies them in the background.
+
+    Journal and consumer threads are created on first use in each process,
+    because uwsgi forks workers after the app is imported.
+    """
+
+    def __init__(self, consumers: int = CONSUMERS, run_inline: bool = RUN_INLINE):
+        self.consumers = consumers
+        self.run_inline = run_inline
+        self.dedup = DedupIndex()
+        self._handlers: Dict[str, ApplyFunc] = {}
+        self._get_config: Optional[Callable[[], Any]] = None
+        self._journal: Optional[WebhookJournal] = None
+        self._queues: List["queue.Queue[Dict[str, Any]]"] = []
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+        self.accepted = 0
+        self.duplicates = 0
+        self.failed = 0
+        self.dead_letters = 0
+
+    def register(self, callback: str, apply: ApplyFunc, get_config: Callable[[], Any]) -> None:
+        """
+        Register the function that applies events for a callback.
+
+        apply(actor, data) runs on a consumer thread with a freshly loaded
+        ActorInterface. get_config returns the ActingWeb config used to load it.
+        """
+        self._handlers[callback] = apply
+        self._get_config = get_config
+
+    def _start(self) -> None:
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._journal = WebhookJournal()
+            self._queues = [queue.Queue() for _ in range(self.consumers)]
+            for index, shard in enumerate(self._queues):
+                threading.Thread(
+                    target=self._consume, args=(shard,), name=f"aw-webhook-{index}", daemon=True
+                ).start()
+            self._pid = os.getpid()
+            for event in self._journal.recover_orphans():
+                self._enqueue(event)
+
+    def _enqueue(self, event: Dict[str, Any]) -> None:
+        shard = zlib.crc32(event["actor_id"].encode("utf-8")) % len(self._queues)
+        self._queues[shard].put(event)
+
+    def ingest(self, actor: Any, callback: str, event_id: str, data: Dict[str, Any]) -> str:
+        """
+        Accept a webhook event for later processing.
+
+        Args:
+            actor: ActorInterface the callback was invoked on
+            callback: Callback name (selects the registered apply function)
+            event_id: Provider event id used for deduplication ("" disables it)
+            data: Raw event payload
+
+        Returns:
+            "accepted" or "duplicate"
+        """
+        key = (callback, event_id)
+        # Claimed up front so a concurrent retry is dropped, released again if the ingest fails
+        if event_id and not self.dedup.add(key):
+            self.duplicates += 1
+            logger.info("Dropped duplicate %s event %s for actor %s", callback, event_id, actor.id)
+            return "duplicate"
+        try:
+            if self.run_inline:
+                self._apply_handler(callback, actor, data)
+            else:
+                self._start()
+                assert self._journal is not None
+                self._enqueue(self._journal.append(actor.id, callback, event_id, data))
+        except Exception:
+            if event_id:
+                self.dedup.discard(key)
+            raise
+        self.accepted += 1
+        return "accepted"
+
+    def _consume(self, shard: "queue.Queue[Dict[str, Any]]") -> None:
+        while True:
+            event = shard.get()
+            error = self._apply_event(event)
+            if self._journal is None:
+                continue
+            try:
+                if error is None:
+                    self._journal.mark_applied(event["seq"])
+                else:
+                    self._journal.mark_dead(event, error)
+            except OSError as e:
+                # Left unapplied in the journal; the next process recovers it
+                logger.error("Could not update webhook journal for event %s: %s", event["seq"], e)
+
+    def _apply_event(self, event: Dict[str, Any]) -> Optional[str]:
+        """Apply an event with retries; return the last error if it could not be applied."""
+        from actingweb.interface.actor_interface import ActorInterface
+
+        error = ""
+        for attempt in range(1, APPLY_ATTEMPTS + 1):
+            try:
+                config = self._get_config() if self._get_config else None
+                actor = ActorInterface.get_by_id(event["actor_id"], config)
+                if actor is None:
+                    logger.warning("Dropping %s event for unknown actor %s", event["callback"], event["actor_id"])
+                    return None
+                self._apply_handler(event["callback"], actor, event["data"])
+                return None
+            except Exception as e:
+                error = str(e) or type(e).__name__
+                logger.warning(
+                    "Applying %s event %s failed (attempt %s/%s): %s",
+                    event["callback"], event["seq"], attempt, APPLY_ATTEMPTS, e,
+                )
+                if attempt < APPLY_ATTEMPTS:
+                    time.sleep(0.1 * 2 ** attempt)
+        self.failed += 1
+        self.dead_letters += 1
+        logger.error(
+            "Giving up on %s event %s for actor %s, kept as dead letter",
+            event["callback"], event["seq"], event["actor_id"],
+        )
+        return error
+
+    def _apply_handler(self, callback: str, actor: Any, data: Dict[str, Any]) -> None:
+        handler = self._handlers.get(callback)
+        if handler is None:
+            logger.warning("No webhook handler registered for %s", callback)
+            return
+        handler(actor, data)
+
+    def stats(self) -> Dict[str, int]:
+        """Return ingestion counters for monitoring."""
+        return {
+            "accepted": self.accepted,
+            "duplicates": self.duplicates,
+            "failed": self.failed,
+            "dead_letters": self.dead_letters,
+            "queued": sum(q.qsize() for q in self._queues),
+        }
+
+
+# Process-wide ingestor shared by all callback hooks
+webhook_ingestor = WebhookIngestor()
@@ -22,6 +22,8 @@ from datetime import datetime
 from typing import Any
 from actingweb.interface.actor_interface import ActorInterface
 
+from ..app.result_cache import invalidate_actor
+
 logger = logging.getLogger(__name__)
 
 
@@ -44,7 +46,7 @@ def register_lifecycle_hooks(app):
             actor: The newly created ActorInterface instance
             **kwargs: Additional context (may include creator info, request data)
         """
-        logger.info(f"New actor created: {actor.id} for {actor.creator}")
+        logger.info("New actor created: %s for %s", actor.id, actor.creator)
 
         # Set initial properties
         if actor.properties is not None:
@@ -72,7 +74,7 @@ def register_lifecycle_hooks(app):
             actor: The ActorInterface instance being deleted
             **kwargs: Additional context
         """
-        logger.info(f"Actor {actor.id} is being deleted")
+        logger.info("Actor %s is being deleted", actor.id)
 
         # Custom cleanup could be performed here
         # The framework handles standard cleanup automatically
@@ -98,11 +100,12 @@ def register_lifecycle_hooks(app):
             True to allow the OAuth flow to continue
             False to reject the authentication (not common)
         """
-        logger.info(f"OAuth successful for actor {actor.id}")
+        logger.info("OAuth successful for actor %s", actor.id)
 
         # Store OAuth success timestamp
         if actor.properties is not None:
             actor.properties.oauth_success_at = datetime.now().isoformat()
             actor.properties.last_login = datetime.now().isoformat()
+            invalidate_actor(actor.id)
 
         return True
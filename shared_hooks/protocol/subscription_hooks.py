@@ -19,6 +19,8 @@ import logging
 from typing import Any, Dict
 from actingweb.interface.actor_interface import ActorInterface
 
+from ..app.result_cache import invalidate_actor
+
 logger = logging.getLogger(__name__)
 
 
@@ -66,8 +68,12 @@ def register_subscription_hooks(app):
         target = subscription.get("target", "unknown")
 
         logger.debug(
-            f"Received subscription data: id={subscription_id}, "
-            f"target={target}, peer={peer_id}, data={data}"
+            "Received subscription data: id=%s, target=%s, peer=%s, data=%s",
+            subscription_id,
+            target,
+            peer_id,
+            data,
+            extra={"subscription_id": subscription_id, "peer_id": peer_id},
         )
 
         # Process subscription data based on target type
@@ -77,14 +83,15 @@ def register_subscription_hooks(app):
                 for key, value in data.items():
                     # Store peer property updates with prefix to avoid conflicts
                     actor.properties[f"peer_{peer_id}_{key}"] = value
-                logger.info(f"Stored {len(data)} property updates from peer {peer_id}")
+                invalidate_actor(actor.id)
+                logger.info("Stored %s property updates from peer %s", len(data), peer_id)
 
         elif target == "trust":
             # Handle trust relationship changes
-            logger.info(f"Trust update from peer {peer_id}: {data}")
+            logger.info("Trust update from peer %s: %s", peer_id, data)
 
         else:
             # Unknown target type - log but still acknowledge
-            logger.warning(f"Unknown subscription target '{target}' from peer {peer_id}")
+            logger.warning("Unknown subscription target '%s' from peer %s", target, peer_id)
 
         return True
@@ -13,12 +13,18 @@ These hooks are useful for:
 - Triggering workflows when new trust relationships are established
 - Performing cleanup when trust relationships are removed
 - Integrating with external systems for trust management
+
+Both hooks drop the trust from the peer authentication cache (trust_cache.py).
 """
 
 import logging
 from typing import Any
 from actingweb.interface.actor_interface import ActorInterface
 
+from trust_cache import trust_cache
+
+from ..app.result_cache import invalidate_actor
+
 logger = logging.getLogger(__name__)
 
 
@@ -55,12 +61,17 @@ def register_trust_hooks(app):
             **kwargs: Additional context
         """
         logger.info(
-            f"Trust relationship approved: {actor.id} <-> {peer_id} (relationship: {relationship})"
+            "Trust relationship approved: %s <-> %s (relationship: %s)", actor.id, peer_id, relationship
         )
 
+        # get_status reports trust counts
+        invalidate_actor(actor.id)
+        # Peer authentication must see the approval
+        trust_cache.evict(actor.id, peer_id)
+
         # Log trust relationship details
         if trust_data:
-            logger.debug(f"Trust relationship details: {trust_data}")
+            logger.debug("Trust relationship details: %s", trust_data)
 
         # You can add custom logic here, such as:
         # - Send welcome message to the peer
@@ -96,7 +107,10 @@ def register_trust_hooks(app):
             **kwargs: Additional context
         """
         logger.info(
-            f"Trust relationship deleted: {actor.id} <-> {peer_id} (relationship: {relationship})"
+            "Trust relationship deleted: %s <-> %s (relationship: %s)", actor.id, peer_id, relationship
         )
 
+        invalidate_actor(actor.id)
+        trust_cache.evict(actor.id, peer_id)
+
         # Custom cleanup logic can be added here
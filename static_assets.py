@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Content-hashed, precompressed static assets.
+
+The build step copies every file in static/ to static/dist/ under a name that
+contains a hash of its content (style.css -> style.3f2a9c1b7e4d.css). Text
+assets also get precompressed .gz and, if the brotli package is installed,
+.br variants. static/dist/manifest.json maps the original names to the hashed
+ones:
+
+    python static_assets.py build
+
+run.sh runs the build before starting the server. Templates keep referring
+to ``/static/style.css``. When they are loaded, references to files in the
+manifest are rewritten to ``/static/dist/<hashed name>``, so a changed file
+gets a new URL and its old URL can be cached forever.
+
+Serving:
+
+- Under uwsgi, ``static-map`` in uwsgi.ini serves /static/dist from C. It
+  picks the .br/.gz variant the client accepts, and offload threads send
+  the file, so Python workers never see these requests.
+- Without uwsgi (``python application.py``, uvicorn, Lambda), the routes
+  added by init_flask/init_fastapi serve the same files and variants.
+
+Either way the responses are ``Cache-Control: public, max-age=31536000,
+immutable``. Under uwsgi, that header needs a build with PCRE (internal
+routing); without PCRE, uwsgi sends a one-year Expires header instead.
+
+Without a build (no manifest), templates keep the plain /static URLs, served
+as before.
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import re
+import shutil
+import sys
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import jinja2
+
+from compression import negotiate
+
+try:
+    import brotli  # type: ignore[import-not-found]
+
+    BROTLI_AVAILABLE = True
+except ImportError:
+    brotli = None
+    BROTLI_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+
+# Build output, relative to STATIC_DIR and under the /static URL prefix
+DIST_NAME = "dist"
+
+DIST_DIR = os.path.join(STATIC_DIR, DIST_NAME)
+
+MANIFEST_NAME = "manifest.json"
+
+# Hex digits of the content hash in file names
+HASH_LENGTH = 12
+
+# Extensions worth compressing; images and fonts are compressed already
+COMPRESSIBLE_EXTENSIONS = {".css", ".js", ".mjs", ".svg", ".json", ".html", ".txt", ".xml", ".map", ".ico"}
+
+# A variant is kept only if it saves at least this fraction of the size
+MIN_SAVING = 0.05
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+# Variants in order of preference: (Content-Encoding, file suffix)
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+_STATIC_REF = re.compile(r"(?P<prefix>[\"'(])/static/(?P<name>[^\"'()?#\s]+)")
+
+_lock = threading.Lock()
+_manifest: Optional[Dict[str, str]] = None
+
+
+def hashed_name(name: str, content: bytes) -> str:
+    """Return name with a content hash before its extension."""
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{hashlib.sha256(content).hexdigest()[:HASH_LENGTH]}{ext}"
+
+
+def _compress(content: bytes) -> Dict[str, bytes]:
+    variants = {".gz": gzip.compress(content, compresslevel=9, mtime=0)}
+    if BROTLI_AVAILABLE:
+        variants[".br"] = brotli.compress(content, quality=11)
+    return {
+        suffix: data for suffix, data in variants.items() if len(data) <= len(content) * (1 - MIN_SAVING)
+    }
+
+
+def build(static_dir: str = STATIC_DIR, dist_dir: str = DIST_DIR) -> Dict[str, str]:
+    """
+    Fingerprint and precompress the files in static_dir into dist_dir.
+
+    dist_dir is rebuilt from scratch, so assets that no longer exist don't
+    linger. Returns the manifest ({original name: hashed name}).
+    """
+    global _manifest
+    staging = f"{dist_dir}.tmp-{os.getpid()}"
+    shutil.rmtree(staging, ignore_errors=True)
+    manifest: Dict[str, str] = {}
+    for root, dirs, files in os.walk(static_dir):
+        dirs[:] = sorted(d for d in dirs if os.path.join(root, d) != dist_dir and not d.startswith("."))
+        for filename in sorted(files):
+            if filename.startswith("."):
+                continue
+            source = os.path.join(root, filename)
+            name = os.path.relpath(source, static_dir).replace(os.sep, "/")
+            with open(source, "rb") as f:
+                content = f.read()
+            target_name = hashed_name(name, content)
+            target = os.path.join(staging, target_name)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, "wb") as f:
+                f.write(content)
+            if os.path.splitext(name)[1].lower() in COMPRESSIBLE_EXTENSIONS:
+                for suffix, data in _compress(content).items():
+                    with open(target + suffix, "wb") as f:
+                        f.write(data)
+            manifest[name] = target_name
+    os.makedirs(staging, exist_ok=True)
+    with open(os.path.join(staging, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    # Swap in the new build; a running server keeps reading the old files
+    # until the rename
+    previous = f"{dist_dir}.old-{os.getpid()}"
+    if os.path.isdir(dist_dir):
+        os.rename(dist_dir, previous)
+    os.rename(staging, dist_dir)
+    shutil.rmtree(previous, ignore_errors=True)
+    with _lock:
+        _manifest = None
+    return manifest
+
+
+def manifest() -> Dict[str, str]:
+    """Return the build manifest ({} without a build); loaded once per process."""
+    global _manifest
+    with _lock:
+        if _manifest is None:
+            try:
+                with open(os.path.join(DIST_DIR, MANIFEST_NAME)) as f:
+                    _manifest = json.load(f)
+            except (OSError, ValueError):
+                logger.info("No static asset build in %s; serving unversioned /static URLs", DIST_DIR)
+                _manifest = {}
+        return _manifest
+
+
+def asset_url(name: str) -> str:
+    """Return the URL of a static asset, versioned if it is in the build."""
+    hashed = manifest().get(name)
+    return f"/static/{DIST_NAME}/{hashed}" if hashed else f"/static/{name}"
+
+
+def rewrite(source: str) -> str:
+    """Point /static references in a template at the versioned assets."""
+    assets = manifest()
+    if not assets:
+        return source
+
+    def _replace(match: "re.Match[str]") -> str:
+        hashed = assets.get(match.group("name"))
+        if hashed is None:
+            return match.group(0)
+        return f"{match.group('prefix')}/static/{DIST_NAME}/{hashed}"
+
+    return _STATIC_REF.sub(_replace, source)
+
+
+class AssetLoader(jinja2.BaseLoader):
+    """Wraps a Jinja loader and rewrites static asset references on load."""
+
+    def __init__(self, loader: jinja2.BaseLoader):
+        self.loader = loader
+
+    def get_source(
+        self, environment: jinja2.Environment, template: str
+    ) -> Tuple[str, Optional[str], Optional[Callable[[], bool]]]:
+        source, filename, uptodate = self.loader.get_source(environment, template)
+        return rewrite(source), filename, uptodate
+
+    def list_templates(self) -> List[str]:
+        return self.loader.list_templates()
+
+
+def install(environment: jinja2.Environment) -> None:
+    """Rewrite static asset references in the templates of a Jinja environment."""
+    if environment.loader is not None and not isinstance(environment.loader, AssetLoader):
+        environment.loader = AssetLoader(environment.loader)
+        if environment.cache is not None:
+            environment.cache.clear()
+
+
+def resolve(filename: str, accept_encoding: str) -> Optional[Tuple[str, Optional[str]]]:
+    """
+    Find a built asset and the best precompressed variant for a client.
+
+    Returns:
+        (path, content encoding or None), or None if there is no such asset
+    """
+    path = os.path.realpath(os.path.join(DIST_DIR, filename))
+    if not path.startswith(os.path.realpath(DIST_DIR) + os.sep) or not os.path.isfile(path):
+        return None
+    variants = {encoding: path + suffix for encoding, suffix in ENCODINGS if os.path.isfile(path + suffix)}
+    encoding = negotiate(accept_encoding, variants)
+    if encoding is None:
+        return path, None
+    return variants[encoding], encoding
+
+
+def _headers(encoding: Optional[str]) -> Dict[str, str]:
+    headers = {"Cache-Control": IMMUTABLE, "Vary": "Accept-Encoding"}
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return headers
+
+
+def _content_type(filename: str) -> str:
+    return mimetypes.guess_type(filename)[0] or "application/octet-stream"
+
+
+def init_flask(flask_app: Any) -> None:
+    """Serve /static/dist from a Flask app and rewrite asset references in its templates."""
+    from flask import abort, request, send_file
+
+    install(flask_app.jinja_env)
+
+    # More specific than Flask's /static/<path:filename>, so it wins for /static/dist
+    @flask_app.route(f"/static/{DIST_NAME}/<path:filename>")
+    def versioned_static(filename: str) -> Any:
+        found = resolve(filename, request.headers.get("Accept-Encoding", ""))
+        if found is None:
+            abort(404)
+        path, encoding = found
+        response = send_file(path, mimetype=_content_type(filename), conditional=True, etag=True)
+        response.headers.update(_headers(encoding))
+        return response
+
+
+def init_fastapi(fastapi_app: Any) -> None:
+    """
+    Serve /static/dist from the ASGI app (see asgi.py). Call before mounting
+    /static; asset references are rewritten with install().
+    """
+    from starlette.requests import Request
+    from starlette.responses import FileResponse, Response
+
+    @fastapi_app.get(f"/static/{DIST_NAME}/{{filename:path}}", include_in_schema=False)
+    async def versioned_static(filename: str, request: Request) -> Any:
+        found = resolve(filename, request.headers.get("accept-encoding", ""))
+        if found is None:
+            return Response(status_code=404)
+        path, encoding = found
+        return FileResponse(path, media_type=_content_type(filename), headers=_headers(encoding))
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("build", help="fingerprint and precompress static/ into static/dist/")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        built = build()
+        for name, target in sorted(built.items()):
+            variants = [suffix for _, suffix in ENCODINGS if os.path.isfile(os.path.join(DIST_DIR, target + suffix))]
+            print(f"{name} -> {DIST_NAME}/{target} {' '.join(variants)}".rstrip())
+        if not BROTLI_AVAILABLE:
+            print("brotli is not installed; only gzip variants were built")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
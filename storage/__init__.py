@@ -0,0 +1,99 @@
+"""
+Storage backends for the ActingWeb demo.
+
+ActingWeb loads its database modules by name from the ``actingweb.db``
+package (``actingweb.db.<DATABASE_BACKEND>.actor``, ``.property`` and so
+on). This package holds backends that ship with the app rather than with
+ActingWeb and registers them under that namespace, so ActingWeb loads them
+exactly like its own:
+
+    import storage
+
+    database = storage.install(os.getenv("DATABASE_BACKEND", "dynamodb"))
+    aw_app = ActingWebApp(..., database=database)
+
+Backends:
+    dynamodb, postgresql: ActingWeb's own (nothing to register)
+    memory: In-process tables, no network or external service (storage/memory)
+    sqlite: One local SQLite file in WAL mode, for single-node deployments (storage/sqlite)
+
+install() must run before the ActingWeb config is created.
+"""
+
+import importlib
+import logging
+import sys
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Modules ActingWeb's Config imports from a backend package
+BACKEND_MODULES = (
+    "actor",
+    "peertrustee",
+    "property",
+    "attribute",
+    "subscription",
+    "subscription_diff",
+    "trust",
+    "subscription_suspension",
+)
+
+# Backends provided by this package: DATABASE_BACKEND value -> package
+APP_BACKENDS = {
+    "memory": "storage.memory",
+    "sqlite": "storage.sqlite",
+}
+
+
+def install(database: str) -> str:
+    """
+    Make a backend loadable by ActingWeb.
+
+    Args:
+        database: DATABASE_BACKEND value
+
+    Returns:
+        The name to pass to ActingWebApp(database=...)
+    """
+    database = (database or "dynamodb").lower()
+    package_name = APP_BACKENDS.get(database)
+    if package_name is None:
+        return database
+
+    import actingweb.db
+
+    namespace = "actingweb.db." + database
+    package = importlib.import_module(package_name)
+    sys.modules[namespace] = package
+    setattr(actingweb.db, database, package)
+    for name in BACKEND_MODULES:
+        sys.modules[namespace + "." + name] = importlib.import_module(package_name + "." + name)
+    logger.info("Storage backend %s registered as %s", package_name, namespace)
+    return database
+
+
+def stats(database: str) -> Dict[str, Any]:
+    """Return storage counters of an app backend (empty for ActingWeb's own)."""
+    package_name = APP_BACKENDS.get(database)
+    if package_name is None:
+        return {}
+    return importlib.import_module(package_name).stats()
+
+
+def purge_actors(database: str, keep_prefix: str) -> Optional[List[Dict[str, Any]]]:
+    """
+    Bulk-delete every actor whose id doesn't start with keep_prefix.
+
+    The delete happens in the storage layer: ActingWeb's actor delete
+    hooks don't run and peers aren't notified.
+
+    Returns:
+        The deleted actors as {id, creator}, or None if the backend has no
+        bulk delete (delete actors one by one instead)
+    """
+    package_name = APP_BACKENDS.get(database)
+    if package_name is None:
+        return None
+    purge = getattr(importlib.import_module(package_name), "purge_actors", None)
+    return purge(keep_prefix) if purge else None
@@ -0,0 +1,142 @@
+"""
+Attribute writes that ActingWeb's attribute interface can't express.
+
+create_attr() creates an attribute only if it does not exist yet. ActingWeb
+offers compare-and-swap on an existing attribute (conditional_update_attr),
+which never creates one, and set_attr(), which overwrites whatever is there,
+so two writers creating the same attribute would silently overwrite each
+other. Per backend:
+
+    memory:     Table.insert() under the table lock
+    sqlite:     INSERT ... ON CONFLICT DO NOTHING
+    dynamodb:   PutItem with an attribute_not_exists condition
+    postgresql: INSERT ... ON CONFLICT DO NOTHING
+
+An expired attribute (ttl_timestamp in the past) still blocks the create
+until the backend purges it, as the row is still there.
+
+Any other backend has no atomic create, and a read-then-write fallback
+would let two creators overwrite each other. check() is called at startup
+and refuses such a backend, instead of create_attr() failing inside a
+request (the payment webhook, the revocation marker).
+"""
+
+import logging
+from datetime import datetime
+from typing import Any, Optional
+
+from actingweb.db import get_attribute
+
+logger = logging.getLogger(__name__)
+
+
+def _create_dynamodb(actor_id: str, bucket: str, name: str, data: Any, timestamp: Optional[datetime]) -> bool:
+    from actingweb.db.dynamodb.attribute import Attribute
+    from pynamodb.exceptions import PutError
+
+    item = Attribute(
+        id=actor_id,
+        bucket_name=bucket + ":" + name,
+        bucket=bucket,
+        name=name,
+        data=data,
+        timestamp=timestamp,
+    )
+    try:
+        item.save(condition=Attribute.bucket_name.does_not_exist())
+    except PutError as e:
+        if getattr(e, "cause_response_code", None) == "ConditionalCheckFailedException":
+            return False
+        raise
+    return True
+
+
+def _create_postgresql(actor_id: str, bucket: str, name: str, data: Any, timestamp: Optional[datetime]) -> bool:
+    import json
+
+    from actingweb.db.postgresql.connection import get_connection
+
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO attributes (id, bucket_name, bucket, name, data, timestamp, ttl_timestamp)
+                VALUES (%s, %s, %s, %s, %s, %s, NULL)
+                ON CONFLICT (id, bucket_name) DO NOTHING
+                """,
+                (actor_id, bucket + ":" + name, bucket, name, json.dumps(data), timestamp),
+            )
+            created = cur.rowcount > 0
+        conn.commit()
+    return created
+
+
+# Backends whose attribute class has no create_attr of its own
+_CREATORS = {
+    "dynamodb": _create_dynamodb,
+    "postgresql": _create_postgresql,
+}
+
+
+def supported(config: Any) -> bool:
+    """True if create_attr() works on the configured backend."""
+    if getattr(config, "database", None) in _CREATORS:
+        return True
+    db_attribute = getattr(getattr(config, "DbAttribute", None), "DbAttribute", None)
+    return db_attribute is not None and callable(getattr(db_attribute, "create_attr", None))
+
+
+def check(config: Any) -> None:
+    """
+    Refuse to start on a backend create_attr() doesn't support.
+
+    Raises:
+        RuntimeError: The backend has no create-if-absent write
+    """
+    if not supported(config):
+        raise RuntimeError(
+            f"The {getattr(config, 'database', None)} backend can't create attributes atomically "
+            "(storage/attributes.py); payment and revocation state would be lost to concurrent writers"
+        )
+
+
+def create_attr(
+    config: Any,
+    actor_id: str,
+    bucket: str,
+    name: str,
+    data: Any,
+    timestamp: Optional[datetime] = None,
+) -> bool:
+    """
+    Create an attribute unless it already exists.
+
+    Args:
+        config: ActingWeb config
+        actor_id: The actor ID
+        bucket: Bucket name
+        name: Attribute name
+        data: Data to store (JSON-serializable, not empty)
+        timestamp: Optional timestamp
+
+    Returns:
+        True if this call created the attribute, False if it already existed
+
+    Raises:
+        Exception: On a backend fault (not a conflict).
+    """
+    if not actor_id or not bucket or not name or not data:
+        return False
+    from actingweb.db.utils import sanitize_json_data
+
+    data = sanitize_json_data(data, log_source="attribute")
+    db_attribute = get_attribute(config)
+    native = getattr(db_attribute, "create_attr", None)
+    if native is not None:
+        return bool(native(actor_id=actor_id, bucket=bucket, name=name, data=data, timestamp=timestamp))
+    database = getattr(config, "database", None)
+    creator = _CREATORS.get(database)  # type: ignore[arg-type]
+    if creator is None:
+        # check() refuses such a backend at startup
+        raise NotImplementedError(f"create_attr is not supported by the {database} backend")
+    return creator(actor_id, bucket, name, data, timestamp)
@@ -0,0 +1,130 @@
+"""
+Storage backend benchmark.
+
+Runs the same workload through ActingWeb's database classes on each named
+backend and prints operations per second:
+
+    python -m storage.benchmark sqlite memory
+    AWS_DB_HOST=http://localhost:8000 python -m storage.benchmark dynamodb sqlite
+
+The dynamodb run needs a DynamoDB endpoint; with AWS_DB_HOST pointing at
+DynamoDB Local (docker-compose.yml) it compares the local backends against
+the DynamoDB code path without touching AWS. The sqlite run uses a
+temporary file unless SQLITE_DB_PATH is set.
+
+Workload per actor: create, set properties (one of them indexed), reverse
+lookup by email, read single properties, fetch all properties (what
+PropertyStore.to_dict() does), create and list trusts, then delete.
+"""
+
+import argparse
+import importlib
+import os
+import sys
+import tempfile
+import time
+import uuid
+from typing import Any, Callable, Dict, List
+
+PROPERTIES_PER_ACTOR = 10
+
+
+def _modules(database: str) -> Dict[str, Any]:
+    import storage
+
+    name = storage.install(database)
+    if name == "dynamodb":
+        from dynamodb_clients import configure_pynamodb
+
+        configure_pynamodb()
+    return {module: importlib.import_module(f"actingweb.db.{name}.{module}") for module in ("actor", "property", "trust")}
+
+
+def _timed(results: Dict[str, float], step: str, count: int, fn: Callable[[], None]) -> None:
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    results[step] = count / elapsed if elapsed else float("inf")
+
+
+def run(database: str, actors: int) -> Dict[str, float]:
+    """Run the workload on a backend and return {step: operations per second}."""
+    db = _modules(database)
+    run_id = uuid.uuid4().hex[:8]
+    ids: List[str] = [f"bench{run_id}{n:06d}" for n in range(actors)]
+    results: Dict[str, float] = {}
+
+    def create() -> None:
+        for actor_id in ids:
+            db["actor"].DbActor().create(actor_id=actor_id, creator=f"{actor_id}@example.com", passphrase="secret")
+
+    def set_properties() -> None:
+        for actor_id in ids:
+            prop = db["property"].DbProperty()
+            prop.set(actor_id=actor_id, name="email", value=f"{actor_id}@example.com")
+            for n in range(PROPERTIES_PER_ACTOR - 1):
+                prop.set(actor_id=actor_id, name=f"prop{n}", value=f"value {n}")
+
+    def reverse_lookup() -> None:
+        for actor_id in ids:
+            found = db["property"].DbProperty().get_actor_id_from_property(name="email", value=f"{actor_id}@example.com")
+            assert found == actor_id, f"{database}: lookup of {actor_id} returned {found}"
+
+    def get_property() -> None:
+        for actor_id in ids:
+            for n in range(PROPERTIES_PER_ACTOR - 1):
+                db["property"].DbProperty().get(actor_id=actor_id, name=f"prop{n}")
+
+    def fetch_all() -> None:
+        for actor_id in ids:
+            db["property"].DbPropertyList().fetch(actor_id=actor_id)
+
+    def trusts() -> None:
+        for actor_id in ids:
+            db["trust"].DbTrust().create(
+                actor_id=actor_id, peerid="peer" + actor_id, baseuri="https://peer.example.com/", secret=actor_id
+            )
+            db["trust"].DbTrustList().fetch(actor_id=actor_id)
+
+    def delete() -> None:
+        for actor_id in ids:
+            props = db["property"].DbPropertyList()
+            props.fetch(actor_id=actor_id)
+            props.delete()
+            trust_list = db["trust"].DbTrustList()
+            trust_list.fetch(actor_id=actor_id)
+            trust_list.delete()
+            actor = db["actor"].DbActor()
+            actor.get(actor_id=actor_id)
+            actor.delete()
+
+    _timed(results, "create actor", actors, create)
+    _timed(results, "set property", actors * PROPERTIES_PER_ACTOR, set_properties)
+    _timed(results, "reverse lookup", actors, reverse_lookup)
+    _timed(results, "get property", actors * (PROPERTIES_PER_ACTOR - 1), get_property)
+    _timed(results, "fetch properties", actors, fetch_all)
+    _timed(results, "create+list trust", actors, trusts)
+    _timed(results, "delete actor", actors, delete)
+    return results
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("backends", nargs="+", help="DATABASE_BACKEND values, e.g. sqlite memory dynamodb")
+    parser.add_argument("--actors", type=int, default=200, help="actors per run (default 200)")
+    args = parser.parse_args(argv)
+
+    if "sqlite" in args.backends and not os.getenv("SQLITE_DB_PATH"):
+        os.environ["SQLITE_DB_PATH"] = os.path.join(tempfile.mkdtemp(prefix="aw-bench-"), "bench.sqlite3")
+
+    table: Dict[str, Dict[str, float]] = {backend: run(backend, args.actors) for backend in args.backends}
+
+    steps = list(next(iter(table.values())))
+    print(f"{'ops/sec':<20}" + "".join(f"{backend:>14}" for backend in args.backends))
+    for step in steps:
+        print(f"{step:<20}" + "".join(f"{table[backend][step]:>14,.0f}" for backend in args.backends))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
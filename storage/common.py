@@ -0,0 +1,100 @@
+"""
+Record encoding shared by the app's storage backends.
+
+The memory and sqlite backends store the same values and must hand them to
+ActingWeb in the same shape as its own backends: serialized property values,
+JSON attribute data with ActingWeb's TTL deadline, and trust dicts with
+timezone-aware timestamps and canonical connection methods.
+"""
+
+import json
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+# Properties with a reverse lookup when INDEXED_PROPERTIES is not set
+DEFAULT_INDEXED_PROPERTIES = ["oauthId", "email", "externalUserId"]
+
+# Optional trust columns, included in trust dicts only when set
+TRUST_OPTIONAL_COLUMNS = (
+    "peer_identifier",
+    "established_via",
+    "client_name",
+    "client_version",
+    "client_platform",
+    "oauth_client_id",
+    "aw_supported",
+    "aw_version",
+)
+
+TRUST_BASE_COLUMNS = (
+    "id", "peerid", "baseuri", "type", "relationship", "secret", "desc",
+    "approved", "peer_approved", "verified", "verification_token",
+)  # fmt: skip
+
+
+def serialize_property(value: Any) -> Optional[str]:
+    """Serialize a property value the way the other backends do (None means delete)."""
+    from actingweb.db.utils import sanitize_json_data
+
+    if value is not None and not isinstance(value, str):
+        try:
+            value = json.dumps(sanitize_json_data(value, log_source="property"))
+        except (TypeError, ValueError):
+            value = str(value)
+    elif isinstance(value, str):
+        value = sanitize_json_data(value, log_source="property")
+    return value or None
+
+
+def lookup_settings(use_lookup_table: Optional[bool], indexed_properties: Optional[List[str]]) -> Tuple[bool, List[str]]:
+    """Resolve the property lookup table settings, defaulting to the environment."""
+    if use_lookup_table is None:
+        use_lookup_table = os.getenv("USE_PROPERTY_LOOKUP_TABLE", "true").lower() == "true"
+    if indexed_properties is None:
+        env_props = os.getenv("INDEXED_PROPERTIES", "")
+        indexed_properties = [p.strip() for p in env_props.split(",") if p.strip()] or DEFAULT_INDEXED_PROPERTIES
+    return use_lookup_table, list(indexed_properties)
+
+
+def ttl_deadline(ttl_seconds: int) -> int:
+    """Return the ttl_timestamp for a TTL, with ActingWeb's clock-skew buffer."""
+    from actingweb.constants import TTL_CLOCK_SKEW_BUFFER
+
+    return int(time.time()) + ttl_seconds + TTL_CLOCK_SKEW_BUFFER
+
+
+def encode_attribute(data: Any) -> str:
+    """Encode attribute data as JSON, sanitized as ActingWeb's backends do."""
+    from actingweb.db.utils import sanitize_json_data
+
+    return json.dumps(sanitize_json_data(data, log_source="attribute"))
+
+
+def parse_timestamp(value: Union[str, datetime]) -> datetime:
+    """Parse an ISO timestamp (a trailing Z included) unless it already is a datetime."""
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except (AttributeError, ValueError) as e:
+        raise ValueError(f"Invalid ISO timestamp format: {value}") from e
+
+
+def trust_to_dict(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the trust dict the other backends return from a stored row."""
+    from actingweb.db.utils import ensure_timezone_aware_iso
+    from actingweb.trust import canonical_connection_method
+
+    result = {column: row[column] for column in TRUST_BASE_COLUMNS}
+    result.update({column: row[column] for column in TRUST_OPTIONAL_COLUMNS if row[column]})
+    if row["created_at"]:
+        result["created_at"] = result["last_connected_at"] = ensure_timezone_aware_iso(row["created_at"])
+    if row["last_accessed"]:
+        result["last_accessed"] = result["last_connected_at"] = ensure_timezone_aware_iso(row["last_accessed"])
+    if row["last_connected_via"]:
+        result["last_connected_via"] = canonical_connection_method(row["last_connected_via"])
+    if row["capabilities_fetched_at"]:
+        result["capabilities_fetched_at"] = ensure_timezone_aware_iso(row["capabilities_fetched_at"])
+    return result
@@ -0,0 +1,36 @@
+"""
+In-memory storage backend for ActingWeb.
+
+Implements ActingWeb's database protocols (actingweb.db.protocols) on
+columnar tables held in the process (see tables.py). There is no network,
+no external service and no JVM, so the whole app can be run, load-tested
+and benchmarked on its own:
+
+    DATABASE_BACKEND=memory python application.py
+
+Behaviour follows the PostgreSQL backend: the same dict shapes, reverse
+lookups of indexed properties through a lookup table, atomic conditional
+writes, and TTL-expired attributes hidden from strict reads and purged by
+delete_expired().
+
+Data lives only as long as the process, and each process has its own
+copy. Run a single worker (uwsgi ``processes = 1``) when requests must see
+each other's writes.
+"""
+
+from typing import Any, Dict
+
+from . import tables
+
+__all__ = ["reset", "stats"]
+
+
+def reset() -> None:
+    """Remove all data (for tests and benchmark runs)."""
+    for table in tables.ALL_TABLES:
+        table.clear()
+
+
+def stats() -> Dict[str, Any]:
+    """Return row counts per table."""
+    return {"backend": "memory", "tables": {table.name: table.stats() for table in tables.ALL_TABLES}}
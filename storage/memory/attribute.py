@@ -0,0 +1,213 @@
+"""
+In-memory implementation of attribute database operations.
+
+Attribute data is stored JSON-encoded, so callers get their own copy on
+every read (as from a real database) and conditional updates compare
+values the way PostgreSQL compares JSONB.
+"""
+
+import json
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Union
+
+from ..common import encode_attribute as _encode
+from ..common import ttl_deadline
+from .tables import attributes
+
+logger = logging.getLogger(__name__)
+
+
+def _value(row: Dict[str, Any]) -> Dict[str, Any]:
+    return {"data": json.loads(row["data"]), "timestamp": row["timestamp"]}
+
+
+class DbAttribute:
+    """DbAttribute does all the db operations for attribute buckets."""
+
+    @staticmethod
+    def get_bucket(actor_id: Optional[str] = None, bucket: Optional[str] = None) -> Optional[Dict[str, Dict[str, Any]]]:
+        """Return {name: {"data", "timestamp"}} for a bucket ({} if empty)."""
+        if not actor_id or not bucket:
+            return None
+        return {row["name"]: _value(row) for row in attributes.find(("id", "bucket"), actor_id, bucket)}
+
+    @staticmethod
+    def get_attr(
+        actor_id: Optional[str] = None, bucket: Optional[str] = None, name: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Return {"data", "timestamp"} of an attribute, or None."""
+        if not actor_id or not bucket or not name:
+            return None
+        row = attributes.get(actor_id, bucket, name)
+        return _value(row) if row else None
+
+    @staticmethod
+    def get_attr_strict(
+        actor_id: Optional[str] = None, bucket: Optional[str] = None, name: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Like get_attr, but expired attributes count as absent."""
+        if not actor_id or not bucket or not name:
+            return None
+        row = attributes.get(actor_id, bucket, name)
+        if not row or (row["ttl_timestamp"] is not None and row["ttl_timestamp"] <= int(time.time())):
+            return None
+        return _value(row)
+
+    @staticmethod
+    def set_attr(
+        actor_id: Optional[str] = None,
+        bucket: Optional[str] = None,
+        name: Optional[str] = None,
+        data: Any = None,
+        timestamp: Optional[datetime] = None,
+        ttl_seconds: Optional[int] = None,
+    ) -> bool:
+        """Set an attribute (empty data deletes it)."""
+        if not actor_id or not name or not bucket:
+            return False
+        if not data:
+            attributes.delete(actor_id, bucket, name)
+            return True
+        attributes.put({
+            "id": actor_id,
+            "bucket": bucket,
+            "name": name,
+            "data": _encode(data),
+            "timestamp": timestamp,
+            "ttl_timestamp": ttl_deadline(ttl_seconds) if ttl_seconds is not None else None,
+        })
+        return True
+
+    @staticmethod
+    def create_attr(
+        actor_id: Optional[str] = None,
+        bucket: Optional[str] = None,
+        name: Optional[str] = None,
+        data: Any = None,
+        timestamp: Optional[datetime] = None,
+    ) -> bool:
+        """Create an attribute unless it exists; True only if this call created it."""
+        if not actor_id or not bucket or not name or not data:
+            return False
+        return attributes.insert({
+            "id": actor_id,
+            "bucket": bucket,
+            "name": name,
+            "data": _encode(data),
+            "timestamp": timestamp,
+            "ttl_timestamp": None,
+        })
+
+    def delete_attr(
+        self, actor_id: Optional[str] = None, bucket: Optional[str] = None, name: Optional[str] = None
+    ) -> bool:
+        """Delete an attribute."""
+        return self.set_attr(actor_id=actor_id, bucket=bucket, name=name, data=None)
+
+    @staticmethod
+    def delete_attr_conditional(
+        actor_id: Optional[str] = None, bucket: Optional[str] = None, name: Optional[str] = None
+    ) -> bool:
+        """Delete an attribute; True only if this call removed it."""
+        if not actor_id or not bucket or not name:
+            return False
+        return attributes.delete(actor_id, bucket, name)
+
+    @staticmethod
+    def conditional_update_attr(
+        actor_id: Optional[str] = None,
+        bucket: Optional[str] = None,
+        name: Optional[str] = None,
+        old_data: Any = None,
+        new_data: Any = None,
+        timestamp: Optional[datetime] = None,
+        ttl_seconds: Optional[int] = None,
+    ) -> bool:
+        """Update an attribute only if its data equals old_data (compare-and-swap)."""
+        if not actor_id or not bucket or not name:
+            return False
+        expected = json.loads(_encode(old_data))
+        changes: Dict[str, Any] = {"data": _encode(new_data), "timestamp": timestamp}
+        if ttl_seconds is not None:
+            changes["ttl_timestamp"] = ttl_deadline(ttl_seconds)
+        with attributes.lock:
+            row = attributes.get(actor_id, bucket, name)
+            if row is None or json.loads(row["data"]) != expected:
+                return False
+            return attributes.update((actor_id, bucket, name), changes)
+
+    @staticmethod
+    def delete_bucket(actor_id: Optional[str] = None, bucket: Optional[str] = None) -> bool:
+        """Delete all attributes in a bucket."""
+        if not actor_id or not bucket:
+            return False
+        attributes.delete_where(("id", "bucket"), actor_id, bucket)
+        return True
+
+    @staticmethod
+    def delete_expired(now_epoch: Optional[int] = None, buckets: Optional[List[str]] = None) -> int:
+        """Delete attributes whose ttl_timestamp is before now_epoch. Returns the count."""
+        cutoff = int(time.time()) if now_epoch is None else now_epoch
+        wanted = set(buckets) if buckets else None
+        with attributes.lock:
+            expired = attributes.scan(
+                lambda row: row["ttl_timestamp"] is not None
+                and row["ttl_timestamp"] < cutoff
+                and (wanted is None or row["bucket"] in wanted)
+            )
+            return attributes.delete_rows((row["id"], row["bucket"], row["name"]) for row in expired)
+
+    @staticmethod
+    def delete_by_chain(
+        actor_id: Optional[str] = None,
+        buckets: Optional[List[str]] = None,
+        chain_id: Optional[str] = None,
+        defer_name: Optional[str] = None,
+    ) -> int:
+        """Delete attributes whose data["chain_id"] equals chain_id. Returns the count."""
+        if not actor_id or not chain_id or not buckets:
+            return 0
+
+        def in_chain(row: Dict[str, Any]) -> bool:
+            data = json.loads(row["data"])
+            return isinstance(data, dict) and data.get("chain_id") == chain_id
+
+        # Deleted under one lock, so defer_name needs no special ordering
+        with attributes.lock:
+            return sum(attributes.delete_where(("id", "bucket"), actor_id, bucket, where=in_chain) for bucket in buckets)
+
+
+class DbAttributeBucketList:
+    """DbAttributeBucketList handles all the attribute buckets of an actor."""
+
+    @staticmethod
+    def fetch(actor_id: Optional[str] = None) -> Optional[Dict[str, Dict[str, Dict[str, Any]]]]:
+        """Return {bucket: {name: {"data", "timestamp"}}} for an actor, or None if it has none."""
+        if not actor_id:
+            return None
+        ret: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for row in attributes.partition_rows(actor_id):
+            ret.setdefault(row["bucket"], {})[row["name"]] = _value(row)
+        return ret or None
+
+    @staticmethod
+    def fetch_timestamps(actor_id: Optional[str] = None) -> Union[Dict[str, Any], bool, None]:
+        """Return {bucket: latest timestamp} for an actor, or None if it has no attributes."""
+        if not actor_id:
+            return None
+        ret: Dict[str, Any] = {}
+        for row in attributes.partition_rows(actor_id):
+            current = ret.get(row["bucket"])
+            if row["bucket"] not in ret or (row["timestamp"] is not None and (current is None or row["timestamp"] > current)):
+                ret[row["bucket"]] = row["timestamp"]
+        return ret or None
+
+    @staticmethod
+    def delete(actor_id: Optional[str] = None) -> bool:
+        """Delete all attributes of an actor."""
+        if not actor_id:
+            return False
+        attributes.delete_where(attributes.partition, actor_id)
+        return True
@@ -0,0 +1,309 @@
+"""
+In-memory implementation of property database operations.
+
+Indexed properties (with_indexed_properties) are kept in a lookup table
+mapping (name, value) to the actor that set it, as in the other backends:
+the first actor to claim a value owns it. Without the lookup table, reverse
+lookups use the properties table's (name, value) index.
+"""
+
+import logging
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from ..common import lookup_settings, serialize_property
+from .tables import properties, property_lookup
+
+logger = logging.getLogger(__name__)
+
+
+def _claim_lookup(actor_id: str, name: str, old_value: Optional[str], new_value: Optional[str]) -> None:
+    """Move an actor's lookup entry from old_value to new_value."""
+    if old_value == new_value:
+        return
+    if old_value:
+        property_lookup.delete(name, old_value, expect={"actor_id": actor_id})
+    if new_value and not property_lookup.insert({"name": name, "value": new_value, "actor_id": actor_id}):
+        logger.warning(
+            "LOOKUP_CONFLICT: property=%s value_len=%s actor=%s - value already claimed by another actor",
+            name,
+            len(new_value),
+            actor_id,
+        )
+
+
+class DbProperty:
+    """DbProperty does all the db operations for property objects."""
+
+    handle: Optional[Dict[str, Any]]
+
+    def __init__(
+        self,
+        use_lookup_table: Optional[bool] = None,
+        indexed_properties: Optional[List[str]] = None,
+    ) -> None:
+        self.handle = None
+        self._use_lookup_table, self._indexed_properties = lookup_settings(use_lookup_table, indexed_properties)
+
+    def _should_index_property(self, name: str) -> bool:
+        return self._use_lookup_table and name in self._indexed_properties and not name.startswith("list:")
+
+    def get(self, actor_id: Optional[str] = None, name: Optional[str] = None) -> Optional[str]:
+        """Get property value, or None if the property doesn't exist."""
+        if not actor_id or not name:
+            return None
+        row = properties.get(actor_id, name)
+        if row is None:
+            return None
+        self.handle = row
+        return row["value"]
+
+    def get_actor_id_from_property(self, name: Optional[str] = None, value: Optional[str] = None) -> Optional[str]:
+        """Reverse lookup: find the actor that has this property value."""
+        if not name or not value:
+            return None
+        if self._use_lookup_table:
+            if name not in self._indexed_properties:
+                logger.warning(
+                    "Reverse lookup requested for non-indexed property '%s' — add it to "
+                    "with_indexed_properties() (or INDEXED_PROPERTIES) to enable reverse lookup; "
+                    "returning None",
+                    name,
+                )
+                return None
+            entry = property_lookup.get(name, value)
+            if entry is None:
+                return None
+            row = properties.get(entry["actor_id"], name)
+            if row is None:
+                logger.warning("Lookup found actor %s but property %s doesn't exist", entry["actor_id"], name)
+                return None
+        else:
+            rows = properties.find(("name", "value"), name, value)
+            if not rows:
+                return None
+            row = rows[0]
+        self.handle = row
+        return row["id"]
+
+    def set(self, actor_id: Optional[str] = None, name: Optional[str] = None, value: Any = None) -> bool:
+        """Set property value (an empty value deletes the property)."""
+        if not name:
+            return False
+        value = serialize_property(value)
+        if value is None:
+            if self.get(actor_id=actor_id, name=name):
+                self.delete()
+            return True
+        if not actor_id:
+            return False
+        with properties.lock:
+            old = properties.get(actor_id, name)
+            properties.put({"id": actor_id, "name": name, "value": value})
+            if self._should_index_property(name):
+                _claim_lookup(actor_id, name, old["value"] if old else None, value)
+        self.handle = {"id": actor_id, "name": name, "value": value}
+        return True
+
+    def delete(self) -> bool:
+        """Delete property using self.handle."""
+        if not self.handle:
+            return False
+        actor_id, name = self.handle.get("id"), self.handle.get("name")
+        if not actor_id or not name:
+            logger.error("DbProperty handle missing id or name field")
+            return False
+        with properties.lock:
+            old = properties.get(actor_id, name)
+            properties.delete(actor_id, name)
+            if old and self._should_index_property(name):
+                _claim_lookup(actor_id, name, old["value"], None)
+        self.handle = None
+        return True
+
+    def get_range(
+        self,
+        actor_id: Optional[str] = None,
+        lower: Optional[str] = None,
+        upper: Optional[str] = None,
+        keys_only: bool = False,
+        consistent_read: bool = True,
+    ) -> Dict[str, str]:
+        """Return {name: value} for the actor's properties with lower <= name <= upper."""
+        if not actor_id or lower is None or upper is None:
+            return {}
+        return {
+            row["name"]: "" if keys_only else row["value"]
+            for row in properties.partition_rows(actor_id)
+            if lower <= row["name"] <= upper
+        }
+
+    def get_prefix(
+        self,
+        actor_id: Optional[str] = None,
+        prefix: Optional[str] = None,
+        keys_only: bool = False,
+        consistent_read: bool = True,
+    ) -> Dict[str, str]:
+        """Return {name: value} for the actor's properties whose name starts with prefix."""
+        if not actor_id or not prefix:
+            return {}
+        return {
+            row["name"]: "" if keys_only else row["value"]
+            for row in properties.partition_rows(actor_id)
+            if row["name"].startswith(prefix)
+        }
+
+    def create_if_not_exists(self, actor_id: Optional[str] = None, name: Optional[str] = None, value: Any = None) -> bool:
+        """Create a property only if it doesn't exist. Returns False if it does."""
+        if not actor_id or not name:
+            return False
+        serialized = serialize_property(value)
+        if serialized is None:
+            return False
+        created = properties.insert({"id": actor_id, "name": name, "value": serialized})
+        if created:
+            self.handle = {"id": actor_id, "name": name, "value": serialized}
+        return created
+
+    def delete_if_value_equals(self, actor_id: Optional[str] = None, name: Optional[str] = None, value: Any = None) -> bool:
+        """Delete a property only if it holds exactly value."""
+        if not actor_id or not name or value is None:
+            return False
+        deleted = properties.delete(actor_id, name, expect={"value": value})
+        if deleted and self.handle and self.handle.get("id") == actor_id and self.handle.get("name") == name:
+            self.handle = None
+        return deleted
+
+    def set_if_value_equals(
+        self,
+        actor_id: Optional[str] = None,
+        name: Optional[str] = None,
+        expected: Any = None,
+        value: Any = None,
+    ) -> bool:
+        """Set a property only if it holds exactly expected (compare-and-swap)."""
+        if not actor_id or not name or expected is None or value is None:
+            return False
+        updated = properties.update((actor_id, name), {"value": value}, expect={"value": expected})
+        if updated:
+            self.handle = {"id": actor_id, "name": name, "value": value}
+        return updated
+
+    def get_last_in_range(
+        self,
+        actor_id: Optional[str] = None,
+        lower: Optional[str] = None,
+        upper: Optional[str] = None,
+    ) -> Optional[str]:
+        """Return the greatest property name in [lower, upper], or None."""
+        if not actor_id or lower is None or upper is None:
+            return None
+        names = [row["name"] for row in properties.partition_rows(actor_id) if lower <= row["name"] <= upper]
+        return max(names) if names else None
+
+    def batch_delete(self, actor_id: Optional[str] = None, names: Optional[List[str]] = None) -> None:
+        """Delete the named properties of an actor (missing names are ignored)."""
+        if not actor_id or not names:
+            return
+        properties.delete_rows((actor_id, name) for name in names)
+
+
+class DbPropertyList:
+    """DbPropertyList does all the db operations for list of property objects."""
+
+    handle: Any
+    actor_id: Optional[str]
+    props: Optional[Dict[str, str]]
+
+    def __init__(
+        self,
+        use_lookup_table: Optional[bool] = None,
+        indexed_properties: Optional[List[str]] = None,
+    ) -> None:
+        self.handle = None
+        self.actor_id = None
+        self.props = None
+        self._use_lookup_table, self._indexed_properties = lookup_settings(use_lookup_table, indexed_properties)
+
+    def fetch(self, actor_id: Optional[str] = None) -> Optional[Dict[str, str]]:
+        """Return all properties of an actor except list: properties ({} if none)."""
+        if not actor_id:
+            return None
+        self.actor_id = actor_id
+        self.props = {
+            row["name"]: row["value"]
+            for row in properties.partition_rows(actor_id)
+            if not row["name"].startswith("list:")
+        }
+        return self.props
+
+    def fetch_projected(
+        self,
+        actor_id: Optional[str] = None,
+        exclude_names: Sequence[str] = (),
+        exclude_prefixes: Sequence[str] = (),
+        include_prefixes: Optional[Sequence[str]] = None,
+    ) -> Optional[Dict[str, str]]:
+        """fetch() restricted by name: values of the rows left out are never copied."""
+        if not actor_id:
+            return None
+        self.actor_id = actor_id
+        excluded = frozenset(exclude_names)
+        skip = ("list:", *exclude_prefixes)
+        include = tuple(include_prefixes) if include_prefixes is not None else None
+        return {
+            row["name"]: row["value"]
+            for row in properties.partition_rows(actor_id)
+            if not row["name"].startswith(skip)
+            and row["name"] not in excluded
+            and (include is None or row["name"].startswith(include))
+        }
+
+    def fetch_projected_page(
+        self,
+        actor_id: Optional[str] = None,
+        exclude_names: Sequence[str] = (),
+        exclude_prefixes: Sequence[str] = (),
+        include_prefixes: Optional[Sequence[str]] = None,
+        after: Optional[str] = None,
+        limit: int = 50,
+    ) -> Tuple[List[Tuple[str, str]], Optional[str]]:
+        """
+        fetch_projected() one page at a time: rows named after ``after``, in name order.
+
+        Returns:
+            (rows, name to continue after or None when there are no more rows)
+        """
+        rows = self.fetch_projected(actor_id, exclude_names, exclude_prefixes, include_prefixes) or {}
+        names = sorted(name for name in rows if not after or name > after)[:limit]
+        return [(name, rows[name]) for name in names], names[-1] if len(names) == limit else None
+
+    def fetch_all_including_lists(self, actor_id: Optional[str] = None) -> Optional[Dict[str, str]]:
+        """Return all properties of an actor including list: properties (None if none)."""
+        if not actor_id:
+            return None
+        self.actor_id = actor_id
+        return {row["name"]: row["value"] for row in properties.partition_rows(actor_id)} or None
+
+    def fetch_list_names(self, actor_id: Optional[str] = None) -> List[str]:
+        """Return the names of the actor's list properties (values are never copied)."""
+        if not actor_id:
+            return []
+        return sorted(
+            row["name"][5:-5]
+            for row in properties.partition_rows(actor_id)
+            if row["name"].startswith("list:") and row["name"].endswith("-meta")
+        )
+
+    def delete(self) -> bool:
+        """Delete all properties of the actor, and their lookup entries."""
+        if not self.actor_id:
+            return False
+        with properties.lock:
+            if self._use_lookup_table:
+                for row in properties.partition_rows(self.actor_id):
+                    if row["name"] in self._indexed_properties:
+                        _claim_lookup(self.actor_id, row["name"], row["value"], None)
+            properties.delete_where(properties.partition, self.actor_id)
+        self.handle = None
+        return True
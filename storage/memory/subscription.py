@@ -0,0 +1,157 @@
+"""In-memory implementation of subscription database operations."""
+
+import logging
+from typing import Any, Dict, List, Optional
+
+from .tables import subscriptions
+
+logger = logging.getLogger(__name__)
+
+
+def _to_dict(row: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": row["id"],
+        "peerid": row["peerid"],
+        "subscriptionid": row["subid"],
+        "granularity": row["granularity"] or "",
+        "target": row["target"] or "",
+        "subtarget": row["subtarget"] or "",
+        "resource": row["resource"] or "",
+        "sequence": row["seqnr"],
+        "callback": row["callback"],
+    }
+
+
+class DbSubscription:
+    """DbSubscription does all the db operations for subscription objects."""
+
+    handle: Optional[Dict[str, Any]]
+
+    def __init__(self) -> None:
+        self.handle = None
+
+    def get(
+        self,
+        actor_id: Optional[str] = None,
+        peerid: Optional[str] = None,
+        subid: Optional[str] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """Retrieve a subscription, or None."""
+        if not actor_id:
+            return None
+        if not peerid or not subid:
+            logger.debug("Attempt to get subscription without peerid or subid")
+            return None
+        row = subscriptions.get(actor_id, peerid, subid)
+        if row is None:
+            return None
+        self.handle = _to_dict(row)
+        return self.handle
+
+    def create(
+        self,
+        actor_id: Optional[str] = None,
+        peerid: Optional[str] = None,
+        subid: Optional[str] = None,
+        granularity: Optional[str] = None,
+        target: Optional[str] = None,
+        subtarget: Optional[str] = None,
+        resource: Optional[str] = None,
+        seqnr: int = 0,
+        callback: bool = False,
+    ) -> bool:
+        """Create a subscription. Returns False if it exists."""
+        if not actor_id or not peerid or not subid:
+            return False
+        row = {
+            "id": actor_id,
+            "peerid": peerid,
+            "subid": subid,
+            "granularity": granularity,
+            "target": target,
+            "subtarget": subtarget,
+            "resource": resource,
+            "seqnr": seqnr,
+            "callback": callback,
+        }
+        if not subscriptions.insert(row):
+            return False
+        self.handle = _to_dict(row)
+        return True
+
+    def modify(
+        self,
+        peerid: Optional[str] = None,
+        subid: Optional[str] = None,
+        granularity: Optional[str] = None,
+        target: Optional[str] = None,
+        subtarget: Optional[str] = None,
+        resource: Optional[str] = None,
+        seqnr: Optional[int] = None,
+        callback: Optional[bool] = None,
+    ) -> bool:
+        """Modify the subscription in self.handle (peerid and subid identify it, they don't change)."""
+        if not self.handle:
+            logger.debug("Attempted modification of DbSubscription without db handle")
+            return False
+        changes: Dict[str, Any] = {
+            column: value
+            for column, value in (
+                ("granularity", granularity),
+                ("target", target),
+                ("subtarget", subtarget),
+                ("resource", resource),
+            )
+            if value
+        }
+        if seqnr is not None:
+            changes["seqnr"] = seqnr
+        if callback is not None:
+            changes["callback"] = callback
+        if not changes:
+            return True
+        pk = (self.handle["id"], self.handle["peerid"], self.handle["subscriptionid"])
+        with subscriptions.lock:
+            if not subscriptions.update(pk, changes):
+                return False
+            self.handle = _to_dict(subscriptions.get(*pk) or {})
+        return True
+
+    def delete(self) -> bool:
+        """Delete the subscription in self.handle."""
+        if not self.handle:
+            logger.debug("Attempted delete of DbSubscription with no handle set.")
+            return False
+        subscriptions.delete(self.handle["id"], self.handle["peerid"], self.handle["subscriptionid"])
+        self.handle = None
+        return True
+
+
+class DbSubscriptionList:
+    """DbSubscriptionList does all the db operations for list of subscription objects."""
+
+    handle: Any
+    actor_id: Optional[str]
+    subscriptions: List[Dict[str, Any]]
+
+    def __init__(self) -> None:
+        self.handle = None
+        self.actor_id = None
+        self.subscriptions = []
+
+    def fetch(self, actor_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Return all subscriptions of an actor."""
+        if not actor_id:
+            return []
+        self.actor_id = actor_id
+        rows = sorted(subscriptions.partition_rows(actor_id), key=lambda row: (row["peerid"], row["subid"]))
+        self.subscriptions = [_to_dict(row) for row in rows]
+        return self.subscriptions
+
+    def delete(self) -> bool:
+        """Delete all subscriptions of the actor."""
+        if not self.actor_id:
+            return False
+        subscriptions.delete_where(subscriptions.partition, self.actor_id)
+        self.handle = None
+        return True
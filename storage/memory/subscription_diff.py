@@ -0,0 +1,130 @@
+"""In-memory implementation of subscription diff database operations."""
+
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from .tables import subscription_diffs
+
+logger = logging.getLogger(__name__)
+
+
+def _by_seqnr(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return sorted(rows, key=lambda row: row["seqnr"])
+
+
+class DbSubscriptionDiff:
+    """DbSubscriptionDiff does all the db operations for subscription diff objects."""
+
+    handle: Optional[Dict[str, Any]]
+
+    def __init__(self) -> None:
+        self.handle = None
+
+    def get(
+        self,
+        actor_id: Optional[str] = None,
+        subid: Optional[str] = None,
+        seqnr: Optional[int] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """Retrieve a diff by seqnr, or the subscription's oldest diff if no seqnr is given."""
+        if not self.handle:
+            if not actor_id:
+                return None
+            if not subid:
+                logger.debug("Attempt to get subscriptiondiff without subid")
+                return None
+            if seqnr is not None:
+                row = subscription_diffs.get(actor_id, subid, seqnr)
+            else:
+                rows = _by_seqnr(subscription_diffs.find(("id", "subid"), actor_id, subid))
+                row = rows[0] if rows else None
+            if row is None:
+                return None
+            self.handle = row
+        return {
+            "id": self.handle["id"],
+            "subscriptionid": self.handle["subid"],
+            "timestamp": self.handle["timestamp"],
+            "data": self.handle["diff"],
+            "sequence": self.handle["seqnr"],
+        }
+
+    def create(
+        self,
+        actor_id: Optional[str] = None,
+        subid: Optional[str] = None,
+        diff: str = "",
+        seqnr: int = 1,
+    ) -> bool:
+        """Store a diff."""
+        if not actor_id or not subid:
+            logger.debug("Attempt to create subscriptiondiff without actorid or subid")
+            return False
+        row = {"id": actor_id, "subid": subid, "seqnr": seqnr, "timestamp": datetime.utcnow(), "diff": diff}
+        subscription_diffs.put(row)
+        self.handle = row
+        return True
+
+    def delete(self) -> bool:
+        """Delete the diff in self.handle."""
+        if not self.handle:
+            return False
+        subscription_diffs.delete(self.handle["id"], self.handle["subid"], self.handle["seqnr"])
+        self.handle = None
+        return True
+
+
+class DbSubscriptionDiffList:
+    """DbSubscriptionDiffList does all the db operations for list of diff objects."""
+
+    handle: Any
+    diffs: List[Dict[str, Any]]
+    actor_id: Optional[str]
+    subid: Optional[str]
+
+    def __init__(self) -> None:
+        self.handle = None
+        self.diffs = []
+        self.actor_id = None
+        self.subid = None
+
+    def fetch(self, actor_id: Optional[str] = None, subid: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Return the diffs of an actor (or of one subscription), ordered by seqnr."""
+        if not actor_id:
+            return []
+        self.actor_id = actor_id
+        self.subid = subid
+        if subid:
+            rows = subscription_diffs.find(("id", "subid"), actor_id, subid)
+        else:
+            rows = subscription_diffs.partition_rows(actor_id)
+        self.diffs = [
+            {
+                "id": row["id"],
+                "subscriptionid": row["subid"],
+                "timestamp": row["timestamp"],
+                "diff": row["diff"],
+                "sequence": row["seqnr"],
+            }
+            for row in _by_seqnr(rows)
+        ]
+        return self.diffs
+
+    def delete(self, seqnr: Optional[int] = None) -> bool:
+        """Delete the fetched diffs, up to and including seqnr if given."""
+        if not self.actor_id:
+            return False
+        if not seqnr or not isinstance(seqnr, int):
+            seqnr = 0
+        limit = seqnr
+
+        def in_range(row: Dict[str, Any]) -> bool:
+            return limit == 0 or row["seqnr"] <= limit
+
+        if self.subid:
+            subscription_diffs.delete_where(("id", "subid"), self.actor_id, self.subid, where=in_range)
+        else:
+            subscription_diffs.delete_where(subscription_diffs.partition, self.actor_id, where=in_range)
+        self.handle = None
+        return True
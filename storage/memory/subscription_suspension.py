@@ -0,0 +1,56 @@
+"""In-memory implementation of subscription suspension state."""
+
+import logging
+from datetime import UTC, datetime
+from typing import List, Optional, Tuple
+
+from .tables import subscription_suspensions
+
+logger = logging.getLogger(__name__)
+
+
+class DbSubscriptionSuspension:
+    """Suspended targets/subtargets of one actor (a target-level suspension covers its subtargets)."""
+
+    def __init__(self, actor_id: str) -> None:
+        self._actor_id = actor_id
+
+    def is_suspended(self, target: str, subtarget: Optional[str] = None) -> bool:
+        """Check if a target/subtarget is currently suspended."""
+        return (
+            subscription_suspensions.get(self._actor_id, target, "") is not None
+            or subscription_suspensions.get(self._actor_id, target, subtarget or "") is not None
+        )
+
+    def suspend(self, target: str, subtarget: Optional[str] = None) -> bool:
+        """Suspend diff registration. Returns False if already suspended."""
+        inserted = subscription_suspensions.insert({
+            "id": self._actor_id,
+            "target": target,
+            "subtarget": subtarget or "",
+            "suspended_at": datetime.now(UTC),
+        })
+        if inserted:
+            logger.info(
+                "Suspended subscriptions for %s/%s%s", self._actor_id, target, "/" + subtarget if subtarget else ""
+            )
+        return inserted
+
+    def resume(self, target: str, subtarget: Optional[str] = None) -> bool:
+        """Resume diff registration. Returns False if it wasn't suspended."""
+        deleted = subscription_suspensions.delete(self._actor_id, target, subtarget or "")
+        if deleted:
+            logger.info(
+                "Resumed subscriptions for %s/%s%s", self._actor_id, target, "/" + subtarget if subtarget else ""
+            )
+        return deleted
+
+    def get_all_suspended(self) -> List[Tuple[str, Optional[str]]]:
+        """Return all suspended (target, subtarget) pairs."""
+        rows = sorted(subscription_suspensions.partition_rows(self._actor_id), key=lambda row: row["suspended_at"])
+        return [(row["target"], row["subtarget"] or None) for row in rows]
+
+    def delete_all(self) -> bool:
+        """Remove all suspensions of the actor."""
+        subscription_suspensions.delete_where(subscription_suspensions.partition, self._actor_id)
+        return True
@@ -0,0 +1,256 @@
+"""
+Columnar in-process tables for the memory backend.
+
+Each table keeps one list per column (a dict of arrays) instead of one dict
+per row, so a row costs a slot in each list rather than a dict with its own
+hash table. Rows are addressed by slot number:
+
+- the primary key maps to a slot; deleted slots are reused
+- every table is indexed on its partition column (the first key column,
+  the actor id), so per-actor reads and deletes touch only that actor's rows
+- further indexes map the values of other column groups to slots, e.g.
+  trusts by (actor id, secret) or actors by creator
+
+Each table has a re-entrant lock. Every method holds it, and callers that
+need several operations to be atomic (conditional writes) hold it as well.
+Rows are returned as new dicts, never as references into the table.
+"""
+
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+Key = Tuple[Any, ...]
+Row = Dict[str, Any]
+
+
+class Table:
+    """A table stored as one list per column, with hash indexes."""
+
+    def __init__(
+        self,
+        name: str,
+        columns: Sequence[str],
+        key: Sequence[str],
+        indexes: Sequence[Sequence[str]] = (),
+    ):
+        self.name = name
+        self.columns = tuple(columns)
+        self.key = tuple(key)
+        self.partition = (self.key[0],)
+        self.lock = threading.RLock()
+        self._data: Dict[str, List[Any]] = {column: [] for column in self.columns}
+        self._slots: Dict[Key, int] = {}
+        self._free: List[int] = []
+        # index columns -> index value -> primary key -> slot
+        self._indexes: Dict[Tuple[str, ...], Dict[Key, Dict[Key, int]]] = {self.partition: {}}
+        for columns in indexes:
+            self._indexes[tuple(columns)] = {}
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def _row(self, slot: int) -> Row:
+        return {column: values[slot] for column, values in self._data.items()}
+
+    def _index_add(self, pk: Key, slot: int) -> None:
+        for columns, index in self._indexes.items():
+            value = tuple(self._data[column][slot] for column in columns)
+            index.setdefault(value, {})[pk] = slot
+
+    def _index_remove(self, pk: Key, slot: int) -> None:
+        for columns, index in self._indexes.items():
+            value = tuple(self._data[column][slot] for column in columns)
+            entries = index.get(value)
+            if entries is not None:
+                entries.pop(pk, None)
+                if not entries:
+                    del index[value]
+
+    def _matches(self, slot: int, expect: Optional[Row]) -> bool:
+        return not expect or all(self._data[column][slot] == value for column, value in expect.items())
+
+    def get(self, *pk: Any) -> Optional[Row]:
+        """Return the row with this primary key, or None."""
+        with self.lock:
+            slot = self._slots.get(pk)
+            return None if slot is None else self._row(slot)
+
+    def insert(self, row: Row) -> bool:
+        """Add a row unless its primary key exists. Returns False if it does."""
+        pk = tuple(row[column] for column in self.key)
+        with self.lock:
+            if pk in self._slots:
+                return False
+            if self._free:
+                slot = self._free.pop()
+                for column, values in self._data.items():
+                    values[slot] = row.get(column)
+            else:
+                slot = len(self._data[self.key[0]])
+                for column, values in self._data.items():
+                    values.append(row.get(column))
+            self._slots[pk] = slot
+            self._index_add(pk, slot)
+            return True
+
+    def put(self, row: Row) -> None:
+        """Insert or replace a row."""
+        pk = tuple(row[column] for column in self.key)
+        with self.lock:
+            if pk in self._slots:
+                self.delete(*pk)
+            self.insert(row)
+
+    def update(self, pk: Key, changes: Row, expect: Optional[Row] = None) -> bool:
+        """
+        Change columns of an existing row.
+
+        Args:
+            pk: Primary key
+            changes: Column values to set (key columns can't change)
+            expect: Column values the row must hold for the update to happen
+
+        Returns:
+            False if the row doesn't exist or doesn't match expect
+        """
+        with self.lock:
+            slot = self._slots.get(pk)
+            if slot is None or not self._matches(slot, expect):
+                return False
+            self._index_remove(pk, slot)
+            for column, value in changes.items():
+                self._data[column][slot] = value
+            self._index_add(pk, slot)
+            return True
+
+    def delete(self, *pk: Any, expect: Optional[Row] = None) -> bool:
+        """Remove a row. Returns False if it doesn't exist or doesn't match expect."""
+        with self.lock:
+            slot = self._slots.get(pk)
+            if slot is None or not self._matches(slot, expect):
+                return False
+            self._index_remove(pk, slot)
+            del self._slots[pk]
+            for values in self._data.values():
+                values[slot] = None
+            self._free.append(slot)
+            return True
+
+    def find(self, columns: Sequence[str], *values: Any) -> List[Row]:
+        """Return the rows whose indexed columns hold these values."""
+        with self.lock:
+            entries = self._indexes[tuple(columns)].get(values)
+            return [self._row(slot) for slot in entries.values()] if entries else []
+
+    def partition_rows(self, partition: Any) -> List[Row]:
+        """Return all rows of one partition (actor)."""
+        return self.find(self.partition, partition)
+
+    def delete_where(
+        self,
+        columns: Sequence[str],
+        *values: Any,
+        where: Optional[Callable[[Row], bool]] = None,
+    ) -> int:
+        """Delete the rows an index finds (optionally filtered). Returns the count."""
+        with self.lock:
+            entries = self._indexes[tuple(columns)].get(values)
+            if not entries:
+                return 0
+            doomed = [pk for pk, slot in entries.items() if where is None or where(self._row(slot))]
+            for pk in doomed:
+                self.delete(*pk)
+            return len(doomed)
+
+    def scan(self, where: Optional[Callable[[Row], bool]] = None) -> List[Row]:
+        """Return every row (optionally filtered), in no particular order."""
+        with self.lock:
+            rows = (self._row(slot) for slot in self._slots.values())
+            return [row for row in rows if where is None or where(row)]
+
+    def delete_rows(self, pks: Iterable[Key]) -> int:
+        """Delete rows by primary key. Returns the number deleted."""
+        with self.lock:
+            return sum(1 for pk in list(pks) if self.delete(*pk))
+
+    def clear(self) -> None:
+        """Remove all rows."""
+        with self.lock:
+            for values in self._data.values():
+                values.clear()
+            self._slots.clear()
+            self._free.clear()
+            for index in self._indexes.values():
+                index.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Return row and slot counts."""
+        with self.lock:
+            return {
+                "rows": len(self._slots),
+                "slots": len(self._data[self.key[0]]),
+                "free_slots": len(self._free),
+            }
+
+
+actors = Table("actors", ("id", "creator", "passphrase"), key=("id",), indexes=[("creator",)])
+
+properties = Table("properties", ("id", "name", "value"), key=("id", "name"), indexes=[("name", "value")])
+
+# Reverse lookups for indexed properties: the first actor to claim a value owns it
+property_lookup = Table("property_lookup", ("name", "value", "actor_id"), key=("name", "value"))
+
+attributes = Table(
+    "attributes",
+    ("id", "bucket", "name", "data", "timestamp", "ttl_timestamp"),
+    key=("id", "bucket", "name"),
+    indexes=[("id", "bucket")],
+)
+
+TRUST_COLUMNS = (
+    "id", "peerid", "baseuri", "type", "relationship", "secret", "desc",
+    "approved", "peer_approved", "verified", "verification_token",
+    "peer_identifier", "established_via", "created_at", "last_accessed",
+    "last_connected_via", "client_name", "client_version", "client_platform",
+    "oauth_client_id", "aw_supported", "aw_version", "capabilities_fetched_at",
+)  # fmt: skip
+
+trusts = Table("trusts", TRUST_COLUMNS, key=("id", "peerid"), indexes=[("id", "secret")])
+
+peertrustees = Table(
+    "peertrustees",
+    ("id", "peerid", "baseuri", "type", "passphrase"),
+    key=("id", "peerid"),
+    indexes=[("id", "type")],
+)
+
+subscriptions = Table(
+    "subscriptions",
+    ("id", "peerid", "subid", "granularity", "target", "subtarget", "resource", "seqnr", "callback"),
+    key=("id", "peerid", "subid"),
+)
+
+subscription_diffs = Table(
+    "subscription_diffs",
+    ("id", "subid", "seqnr", "timestamp", "diff"),
+    key=("id", "subid", "seqnr"),
+    indexes=[("id", "subid")],
+)
+
+subscription_suspensions = Table(
+    "subscription_suspensions",
+    ("id", "target", "subtarget", "suspended_at"),
+    key=("id", "target", "subtarget"),
+)
+
+ALL_TABLES = (
+    actors,
+    properties,
+    property_lookup,
+    attributes,
+    trusts,
+    peertrustees,
+    subscriptions,
+    subscription_diffs,
+    subscription_suspensions,
+)
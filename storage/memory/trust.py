@@ -0,0 +1,233 @@
+"""In-memory implementation of trust database operations."""
+
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Union
+
+from ..common import parse_timestamp, trust_to_dict
+from .tables import trusts
+
+logger = logging.getLogger(__name__)
+
+
+class DbTrust:
+    """
+    DbTrust does all the db operations for trust objects.
+
+    The actor_id must always be set.
+    """
+
+    handle: Optional[Dict[str, Any]]
+
+    def __init__(self) -> None:
+        self.handle = None
+
+    def get(
+        self,
+        actor_id: Optional[str] = None,
+        peerid: Optional[str] = None,
+        token: Optional[str] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """Retrieve a trust by peerid, or by secret token if no peerid is given."""
+        if not actor_id:
+            return None
+        if peerid:
+            row = trusts.get(actor_id, peerid)
+        elif token:
+            rows = trusts.find(("id", "secret"), actor_id, token)
+            row = rows[0] if rows else None
+        else:
+            return None
+        if row is None:
+            return None
+        self.handle = trust_to_dict(row)
+        return self.handle
+
+    def create(
+        self,
+        actor_id: Optional[str] = None,
+        peerid: Optional[str] = None,
+        baseuri: str = "",
+        peer_type: str = "",
+        relationship: str = "",
+        secret: str = "",
+        approved: bool = False,
+        verified: bool = False,
+        peer_approved: bool = False,
+        verification_token: str = "",
+        desc: str = "",
+        peer_identifier: Optional[str] = None,
+        established_via: Optional[str] = None,
+        created_at: Union[str, datetime, None] = None,
+        last_accessed: Union[str, datetime, None] = None,
+        last_connected_via: Optional[str] = None,
+        client_name: Optional[str] = None,
+        client_version: Optional[str] = None,
+        client_platform: Optional[str] = None,
+        oauth_client_id: Optional[str] = None,
+        aw_supported: Optional[str] = None,
+        aw_version: Optional[str] = None,
+        capabilities_fetched_at: Union[str, datetime, None] = None,
+    ) -> bool:
+        """Create a trust (replacing any existing trust with the peer)."""
+        from actingweb.trust import canonical_connection_method
+
+        if not actor_id or not peerid:
+            return False
+        created = parse_timestamp(created_at) if created_at else datetime.utcnow()
+        row = {
+            "id": actor_id,
+            "peerid": peerid,
+            "baseuri": baseuri,
+            "type": peer_type,
+            "relationship": relationship,
+            "secret": secret,
+            "desc": desc,
+            "approved": approved,
+            "peer_approved": peer_approved,
+            "verified": verified,
+            "verification_token": verification_token,
+            "peer_identifier": peer_identifier,
+            "established_via": established_via,
+            "created_at": created,
+            "last_accessed": parse_timestamp(last_accessed) if last_accessed else created,
+            "last_connected_via": canonical_connection_method(last_connected_via or established_via),
+            "client_name": client_name,
+            "client_version": client_version,
+            "client_platform": client_platform,
+            "oauth_client_id": oauth_client_id,
+            "aw_supported": aw_supported,
+            "aw_version": aw_version,
+            "capabilities_fetched_at": parse_timestamp(capabilities_fetched_at) if capabilities_fetched_at else None,
+        }
+        with trusts.lock:
+            existing = trusts.get(actor_id, peerid)
+            if existing:
+                # As an upsert in the other backends, re-creating keeps created_at
+                row["created_at"] = existing["created_at"]
+            trusts.put(row)
+        self.handle = trust_to_dict(row)
+        return True
+
+    def modify(
+        self,
+        baseuri: Optional[str] = None,
+        secret: Optional[str] = None,
+        desc: Optional[str] = None,
+        approved: Optional[bool] = None,
+        verified: Optional[bool] = None,
+        verification_token: Optional[str] = None,
+        peer_approved: Optional[bool] = None,
+        peer_identifier: Optional[str] = None,
+        established_via: Optional[str] = None,
+        created_at: Union[str, datetime, None] = None,
+        last_accessed: Union[str, datetime, None] = None,
+        last_connected_via: Optional[str] = None,
+        client_name: Optional[str] = None,
+        client_version: Optional[str] = None,
+        client_platform: Optional[str] = None,
+        oauth_client_id: Optional[str] = None,
+        aw_supported: Optional[str] = None,
+        aw_version: Optional[str] = None,
+        capabilities_fetched_at: Union[str, datetime, None] = None,
+    ) -> bool:
+        """Modify the trust in self.handle. None (or empty strings) leave fields unchanged."""
+        from actingweb.trust import canonical_connection_method
+
+        if not self.handle:
+            logger.debug("Attempted modification of DbTrust without db handle")
+            return False
+        changes: Dict[str, Any] = {}
+        # Empty strings don't overwrite these
+        for column, value in (
+            ("baseuri", baseuri),
+            ("secret", secret),
+            ("desc", desc),
+            ("verification_token", verification_token),
+        ):
+            if value:
+                changes[column] = value
+        for column, value in (
+            ("approved", approved),
+            ("verified", verified),
+            ("peer_approved", peer_approved),
+            ("peer_identifier", peer_identifier),
+            ("established_via", established_via),
+            ("client_name", client_name),
+            ("client_version", client_version),
+            ("client_platform", client_platform),
+            ("oauth_client_id", oauth_client_id),
+            ("aw_supported", aw_supported),
+            ("aw_version", aw_version),
+        ):
+            if value is not None:
+                changes[column] = value
+        if last_connected_via is not None:
+            changes["last_connected_via"] = canonical_connection_method(last_connected_via)
+        for column, value in (
+            ("created_at", created_at),
+            ("last_accessed", last_accessed),
+            ("capabilities_fetched_at", capabilities_fetched_at),
+        ):
+            if value is not None:
+                try:
+                    changes[column] = parse_timestamp(value)
+                except ValueError as e:
+                    logger.warning("Invalid %s timestamp: %s", column, e)
+        if not changes:
+            return True
+        with trusts.lock:
+            pk = (self.handle["id"], self.handle["peerid"])
+            if not trusts.update(pk, changes):
+                return False
+            self.handle = trust_to_dict(trusts.get(*pk) or {})
+        return True
+
+    def delete(self) -> bool:
+        """Delete the trust in self.handle."""
+        if not self.handle:
+            return False
+        trusts.delete(self.handle["id"], self.handle["peerid"])
+        self.handle = None
+        return True
+
+    @staticmethod
+    def is_token_in_db(actor_id: Optional[str] = None, token: Optional[str] = None) -> bool:
+        """Return True if the actor has a trust with this secret token."""
+        if not actor_id or not token:
+            return False
+        return bool(trusts.find(("id", "secret"), actor_id, token))
+
+
+class DbTrustList:
+    """
+    DbTrustList does all the db operations for list of trust objects.
+
+    The actor_id must always be set.
+    """
+
+    handle: Any
+    actor_id: Optional[str]
+    trusts: List[Dict[str, Any]]
+
+    def __init__(self) -> None:
+        self.handle = None
+        self.actor_id = None
+        self.trusts = []
+
+    def fetch(self, actor_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Return all trusts of an actor, ordered by peerid."""
+        if not actor_id:
+            return []
+        self.actor_id = actor_id
+        rows = sorted(trusts.partition_rows(actor_id), key=lambda row: row["peerid"])
+        self.trusts = [trust_to_dict(row) for row in rows]
+        return self.trusts
+
+    def delete(self) -> bool:
+        """Delete all trusts of the actor."""
+        if not self.actor_id:
+            return False
+        trusts.delete_where(trusts.partition, self.actor_id)
+        self.handle = None
+        return True
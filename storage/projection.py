@@ -0,0 +1,236 @@
+"""
+Property reads restricted to the names a trust type may read.
+
+fetch_properties() reads an actor's plain properties (like
+PropertyStore.to_dict()) through a permission_matcher.Projection, so the
+storage read itself leaves out what the rules never allow:
+
+    memory:     excluded rows are skipped in the table scan (values never copied)
+    sqlite:     exclusions and include prefixes are part of the WHERE clause
+    dynamodb:   include prefixes become begins_with key conditions; other
+                exclusions are dropped as items come back (DynamoDB can only
+                restrict the sort key in the key condition)
+    postgresql: whole-actor fetch(), filtered afterwards
+
+Every backend's result is filtered by the projection's own rules as well,
+so globs the storage read can't express are enforced exactly.
+
+fetch_properties_page() reads the same properties one page at a time in
+name order, continuing after a cursor name, so listing a page doesn't read
+(and sort) every property of the actor:
+
+    memory:     rows after the cursor, sorted in the table scan
+    sqlite:     ``name > ? ORDER BY name LIMIT ?`` on the primary key
+    dynamodb:   key conditions ``name > cursor`` (or ``between`` inside an
+                include prefix) with a query limit
+    postgresql: not supported; callers read the whole listing instead
+
+fetch_list_names() reads only the names of an actor's list properties (from
+their ``list:{name}-meta`` rows), where PropertyListStore.list_all() reads
+every row of the actor, list items included:
+
+    memory, sqlite: the metadata rows only
+    dynamodb:       a ``begins_with("list:")`` query, metadata names kept
+    postgresql:     every row of the actor, as list_all()
+"""
+
+import logging
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from actingweb.db import get_property_list
+
+logger = logging.getLogger(__name__)
+
+# More include prefixes than this read the whole actor instead (one DynamoDB query each)
+MAX_INCLUDE_QUERIES = 8
+
+# Fewest rows asked from storage per page read (more rows than the page, as some get filtered out)
+MIN_PAGE_READ = 50
+
+# Above every name that starts with a prefix (DynamoDB compares UTF-8 bytes, as Python compares code points)
+_PREFIX_END = "\U0010ffff"
+
+# (name, stored value) rows in name order, and the name to continue after (None when exhausted)
+PageRead = Tuple[List[Tuple[str, str]], Optional[str]]
+
+
+def _fetch_dynamodb(
+    actor_id: str,
+    exclude_names: Sequence[str],
+    exclude_prefixes: Sequence[str],
+    include_prefixes: Optional[Sequence[str]],
+) -> Optional[Dict[str, str]]:
+    from actingweb.db.dynamodb.property import Property
+
+    if include_prefixes is None or len(include_prefixes) > MAX_INCLUDE_QUERIES:
+        return None
+    excluded = frozenset(exclude_names)
+    skip = ("list:", *exclude_prefixes)
+    props: Dict[str, str] = {}
+    for prefix in include_prefixes:
+        if not prefix:
+            return None
+        for item in Property.query(actor_id, range_key_condition=Property.name.startswith(prefix)):
+            if not item.name.startswith(skip) and item.name not in excluded:
+                props[item.name] = item.value
+    return props
+
+
+def _fetch_dynamodb_page(
+    actor_id: str,
+    exclude_names: Sequence[str],
+    exclude_prefixes: Sequence[str],
+    include_prefixes: Optional[Sequence[str]],
+    after: Optional[str],
+    limit: int,
+) -> Optional[PageRead]:
+    from actingweb.db.dynamodb.property import Property
+
+    if include_prefixes is not None and len(include_prefixes) > MAX_INCLUDE_QUERIES:
+        return None
+    conditions: List[Any] = []
+    for prefix in include_prefixes if include_prefixes is not None else [None]:
+        if prefix is None:
+            conditions.append(Property.name > after if after else None)
+        elif not prefix:
+            return None
+        elif not after or after < prefix:
+            conditions.append(Property.name.startswith(prefix))
+        elif after.startswith(prefix):
+            # Inclusive; the cursor row itself is skipped below
+            conditions.append(Property.name.between(after, prefix + _PREFIX_END))
+        # Otherwise every name with this prefix sorts before the cursor
+    read: List[Tuple[str, str]] = []
+    exhausted = True
+    for condition in conditions:
+        items = [(item.name, item.value) for item in Property.query(actor_id, range_key_condition=condition, limit=limit)]
+        exhausted = exhausted and len(items) < limit
+        read.extend(item for item in items if not after or item[0] > after)
+    exhausted = exhausted and len(read) <= limit
+    read = sorted(read)[:limit]
+    excluded = frozenset(exclude_names)
+    skip = ("list:", *exclude_prefixes)
+    rows = [(name, value) for name, value in read if not name.startswith(skip) and name not in excluded]
+    return rows, None if exhausted or not read else read[-1][0]
+
+
+def _list_name(row_name: str) -> Optional[str]:
+    if row_name.startswith("list:") and row_name.endswith("-meta"):
+        return row_name[5:-5]
+    return None
+
+
+def fetch_list_names(config: Any, actor_id: str) -> List[str]:
+    """
+    Read the names of an actor's list properties.
+
+    Args:
+        config: ActingWeb config
+        actor_id: Actor whose list properties to name
+
+    Returns:
+        List property names, sorted
+    """
+    if not actor_id:
+        return []
+    db_list = get_property_list(config)
+    fetch_names = getattr(db_list, "fetch_list_names", None)
+    if fetch_names is not None:
+        return list(fetch_names(actor_id))
+    if getattr(config, "database", None) == "dynamodb":
+        from actingweb.db.dynamodb.property import Property
+
+        row_names = (item.name for item in Property.query(actor_id, range_key_condition=Property.name.startswith("list:")))
+    else:
+        row_names = iter((db_list.fetch_all_including_lists(actor_id) or {}).keys())
+    return sorted(name for name in map(_list_name, row_names) if name is not None)
+
+
+def fetch_properties(config: Any, actor_id: str, projection: Any, prefix: str = "") -> Dict[str, str]:
+    """
+    Read the properties of an actor that a projection allows.
+
+    Args:
+        config: ActingWeb config
+        actor_id: Actor whose properties to read
+        projection: permission_matcher.Projection of the reader's property rules
+        prefix: Only names starting with this
+
+    Returns:
+        {name: stored value}, list: properties excluded
+    """
+    include = projection.include_for(prefix)
+    if not actor_id or include == ():
+        return {}
+    kwargs = {
+        "exclude_names": projection.exclude_names,
+        "exclude_prefixes": projection.exclude_prefixes,
+        "include_prefixes": include,
+    }
+    db_list = get_property_list(config)
+    fetch_projected = getattr(db_list, "fetch_projected", None)
+    props: Optional[Dict[str, str]] = None
+    if fetch_projected is not None:
+        props = fetch_projected(actor_id, **kwargs)
+    elif getattr(config, "database", None) == "dynamodb":
+        props = _fetch_dynamodb(actor_id, **kwargs)
+    if props is None:
+        props = db_list.fetch(actor_id) or {}
+    return {name: value for name, value in props.items() if name.startswith(prefix) and projection.allows(name)}
+
+
+def fetch_properties_page(
+    config: Any,
+    actor_id: str,
+    projection: Any,
+    prefix: str = "",
+    after: Optional[str] = None,
+    limit: int = MIN_PAGE_READ,
+    keep: Optional[Callable[[str, str], bool]] = None,
+) -> Optional[Tuple[List[Tuple[str, str]], Optional[str]]]:
+    """
+    Read one page of the properties a projection allows, in name order.
+
+    Args:
+        config: ActingWeb config
+        actor_id: Actor whose properties to read
+        projection: permission_matcher.Projection of the reader's property rules
+        prefix: Only names starting with this
+        after: Only names after this one (the previous page's cursor)
+        limit: Rows per page
+        keep: Further filter on (name, stored value)
+
+    Returns:
+        (rows as (name, stored value), cursor of the next page or None), or
+        None if the backend can't read in name order
+    """
+    include = projection.include_for(prefix)
+    if not actor_id or include == ():
+        return [], None
+    kwargs = {
+        "exclude_names": projection.exclude_names,
+        "exclude_prefixes": projection.exclude_prefixes,
+        "include_prefixes": include,
+    }
+    read_page = getattr(get_property_list(config), "fetch_projected_page", None)
+    if read_page is None and getattr(config, "database", None) != "dynamodb":
+        return None
+    batch = max(limit + 1, MIN_PAGE_READ)
+    rows: List[Tuple[str, str]] = []
+    resume = after
+    while True:
+        if read_page is not None:
+            page = read_page(actor_id, after=resume, limit=batch, **kwargs)
+        else:
+            page = _fetch_dynamodb_page(actor_id, after=resume, limit=batch, **kwargs)
+        if page is None:
+            return None
+        read, resume = page
+        for name, value in read:
+            if name.startswith(prefix) and projection.allows(name) and (keep is None or keep(name, value)):
+                rows.append((name, value))
+                # One row past the page tells whether there is a next page
+                if len(rows) > limit:
+                    return rows[:limit], rows[limit - 1][0]
+        if resume is None:
+            return rows, None
@@ -0,0 +1,49 @@
+"""
+SQLite storage backend for ActingWeb.
+
+A persistent backend for single-node deployments: one database file on
+local disk, no database server. Implements ActingWeb's database protocols
+(actingweb.db.protocols) with the same behaviour as the PostgreSQL backend:
+
+    DATABASE_BACKEND=sqlite SQLITE_DB_PATH=/var/lib/actingweb/db.sqlite3 python application.py
+
+The database runs in WAL mode, so readers never block the writer and all
+uwsgi workers on the node can share the file. Reads go through mmap
+(SQLITE_MMAP_SIZE), tables are clustered on their primary keys and the
+reverse lookups of indexed properties (oauthId, email, externalUserId) are
+primary-key reads on the lookup table. See connection.py for the schema
+and settings.
+
+Deleting an actor row cascades to everything the actor owns, so
+purge_actors() removes any number of actors in one statement.
+"""
+
+from typing import Any, Dict, List
+
+from .connection import TABLES, database
+
+__all__ = ["purge_actors", "reset", "stats"]
+
+_PURGE = "DELETE FROM actors WHERE substr(id, 1, length(?)) <> ? RETURNING id, creator"
+
+
+def purge_actors(keep_prefix: str) -> List[Dict[str, Any]]:
+    """
+    Delete all actors whose id doesn't start with keep_prefix, and their data.
+
+    Returns:
+        The deleted actors as {id, creator}
+    """
+    return [dict(row) for row in database.query(_PURGE, (keep_prefix, keep_prefix))]
+
+
+def reset() -> None:
+    """Remove all data (for tests and benchmark runs)."""
+    with database.transaction():
+        for table in TABLES:
+            database.execute(f"DELETE FROM {table}")
+
+
+def stats() -> Dict[str, Any]:
+    """Return database file sizes and connection counts."""
+    return {"backend": "sqlite", **database.stats()}
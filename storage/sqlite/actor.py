@@ -0,0 +1,103 @@
+"""SQLite implementation of actor database operations."""
+
+import logging
+from typing import Any, Dict, List, Optional, Union
+
+from .connection import database
+
+logger = logging.getLogger(__name__)
+
+_GET = "SELECT id, creator, passphrase FROM actors WHERE id = ?"
+# Answered from the actors_creator covering index
+_BY_CREATOR = "SELECT id, creator, passphrase FROM actors WHERE creator = ?"
+_INSERT = "INSERT OR IGNORE INTO actors (id, creator, passphrase) VALUES (?, ?, ?)"
+_UPDATE = "UPDATE actors SET creator = coalesce(?, creator), passphrase = coalesce(?, passphrase) WHERE id = ?"
+# Cascades to everything the actor owns (actors_cascade trigger)
+_DELETE = "DELETE FROM actors WHERE id = ?"
+_LIST = "SELECT id, creator FROM actors ORDER BY id"
+
+
+def _normalize_creator(creator: str) -> str:
+    # Email in creator needs to be lower case
+    return creator.lower() if "@" in creator else creator
+
+
+class DbActor:
+    """DbActor does all the db operations for actor objects."""
+
+    handle: Optional[Dict[str, Any]]
+
+    def __init__(self) -> None:
+        self.handle = None
+
+    def get(self, actor_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Retrieve actor by ID: {id, creator, passphrase}, or None."""
+        if not actor_id:
+            return None
+        row = database.query_one(_GET, (actor_id,))
+        if row is None:
+            return None
+        self.handle = dict(row)
+        return dict(row)
+
+    def get_by_creator(self, creator: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+        """Return the actors with this creator (possibly empty), or None if no creator given."""
+        if not creator:
+            return None
+        return [dict(row) for row in database.query(_BY_CREATOR, (_normalize_creator(creator),))]
+
+    def create(
+        self,
+        actor_id: Optional[str] = None,
+        creator: Optional[str] = None,
+        passphrase: Optional[str] = None,
+    ) -> bool:
+        """Create new actor. Returns False if the actor exists."""
+        if not actor_id:
+            return False
+        row = {"id": actor_id, "creator": _normalize_creator(creator or ""), "passphrase": passphrase or ""}
+        if database.execute(_INSERT, (row["id"], row["creator"], row["passphrase"])).rowcount == 0:
+            logger.warning("Trying to create actor that exists(%s)", actor_id)
+            return False
+        self.handle = row
+        return True
+
+    def modify(self, creator: Optional[str] = None, passphrase: Optional[bytes] = None) -> bool:
+        """Modify existing actor using self.handle."""
+        if not self.handle:
+            logger.debug("Attempted modification of DbActor without db handle")
+            return False
+        changes: Dict[str, Any] = {}
+        if creator:
+            changes["creator"] = _normalize_creator(creator)
+        if passphrase:
+            changes["passphrase"] = passphrase.decode("utf-8")
+        if not changes:
+            return True
+        cursor = database.execute(_UPDATE, (changes.get("creator"), changes.get("passphrase"), self.handle["id"]))
+        if cursor.rowcount == 0:
+            return False
+        self.handle.update(changes)
+        return True
+
+    def delete(self) -> bool:
+        """Delete actor using self.handle."""
+        if not self.handle:
+            logger.debug("Attempted delete of DbActor without db handle")
+            return False
+        database.execute(_DELETE, (self.handle["id"],))
+        self.handle = None
+        return True
+
+
+class DbActorList:
+    """DbActorList does all the db operations for list of actor objects."""
+
+    handle: Any
+
+    def __init__(self) -> None:
+        self.handle = None
+
+    def fetch(self) -> Union[List[Dict[str, Any]], bool]:
+        """Fetch all actors ({id, creator}, ordered by id), or False if there are none."""
+        return [dict(row) for row in database.query(_LIST)] or False
@@ -0,0 +1,223 @@
+"""
+SQLite implementation of attribute database operations.
+
+Attribute data is stored as JSON text. Expired attributes are found through
+a partial index on ttl_timestamp that only holds rows with a TTL.
+"""
+
+import json
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Union
+
+from ..common import encode_attribute as _encode
+from ..common import ttl_deadline
+from .connection import database, decode_time, encode_time
+
+logger = logging.getLogger(__name__)
+
+_GET = "SELECT data, timestamp, ttl_timestamp FROM attributes WHERE id = ? AND bucket = ? AND name = ?"
+_BUCKET = "SELECT name, data, timestamp FROM attributes WHERE id = ? AND bucket = ?"
+_UPSERT = (
+    "INSERT INTO attributes (id, bucket, name, data, timestamp, ttl_timestamp) VALUES (?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT (id, bucket, name) DO UPDATE SET "
+    "data = excluded.data, timestamp = excluded.timestamp, ttl_timestamp = excluded.ttl_timestamp"
+)
+_INSERT = (
+    "INSERT INTO attributes (id, bucket, name, data, timestamp, ttl_timestamp) VALUES (?, ?, ?, ?, ?, NULL) "
+    "ON CONFLICT (id, bucket, name) DO NOTHING"
+)
+_UPDATE = (
+    "UPDATE attributes SET data = ?, timestamp = ?, ttl_timestamp = coalesce(?, ttl_timestamp) "
+    "WHERE id = ? AND bucket = ? AND name = ?"
+)
+_DELETE = "DELETE FROM attributes WHERE id = ? AND bucket = ? AND name = ?"
+_DELETE_BUCKET = "DELETE FROM attributes WHERE id = ? AND bucket = ?"
+_DELETE_EXPIRED = "DELETE FROM attributes WHERE ttl_timestamp IS NOT NULL AND ttl_timestamp < ?"
+_DELETE_EXPIRED_IN = _DELETE_EXPIRED + " AND bucket IN (SELECT value FROM json_each(?))"
+_DELETE_CHAIN = (
+    "DELETE FROM attributes WHERE id = ? AND bucket IN (SELECT value FROM json_each(?)) "
+    "AND json_type(data) = 'object' AND json_extract(data, '$.chain_id') = ?"
+)
+_ACTOR = "SELECT bucket, name, data, timestamp FROM attributes WHERE id = ?"
+_TIMESTAMPS = "SELECT bucket, max(timestamp) FROM attributes WHERE id = ? GROUP BY bucket"
+_DELETE_ACTOR = "DELETE FROM attributes WHERE id = ?"
+
+
+def _value(data: str, timestamp: Optional[str]) -> Dict[str, Any]:
+    return {"data": json.loads(data), "timestamp": decode_time(timestamp)}
+
+
+class DbAttribute:
+    """DbAttribute does all the db operations for attribute buckets."""
+
+    @staticmethod
+    def get_bucket(actor_id: Optional[str] = None, bucket: Optional[str] = None) -> Optional[Dict[str, Dict[str, Any]]]:
+        """Return {name: {"data", "timestamp"}} for a bucket ({} if empty)."""
+        if not actor_id or not bucket:
+            return None
+        return {name: _value(data, ts) for name, data, ts in database.query(_BUCKET, (actor_id, bucket))}
+
+    @staticmethod
+    def get_attr(
+        actor_id: Optional[str] = None, bucket: Optional[str] = None, name: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Return {"data", "timestamp"} of an attribute, or None."""
+        if not actor_id or not bucket or not name:
+            return None
+        row = database.query_one(_GET, (actor_id, bucket, name))
+        return _value(row["data"], row["timestamp"]) if row else None
+
+    @staticmethod
+    def get_attr_strict(
+        actor_id: Optional[str] = None, bucket: Optional[str] = None, name: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Like get_attr, but expired attributes count as absent."""
+        if not actor_id or not bucket or not name:
+            return None
+        row = database.query_one(_GET, (actor_id, bucket, name))
+        if not row or (row["ttl_timestamp"] is not None and row["ttl_timestamp"] <= int(time.time())):
+            return None
+        return _value(row["data"], row["timestamp"])
+
+    @staticmethod
+    def set_attr(
+        actor_id: Optional[str] = None,
+        bucket: Optional[str] = None,
+        name: Optional[str] = None,
+        data: Any = None,
+        timestamp: Optional[datetime] = None,
+        ttl_seconds: Optional[int] = None,
+    ) -> bool:
+        """Set an attribute (empty data deletes it)."""
+        if not actor_id or not name or not bucket:
+            return False
+        if not data:
+            database.execute(_DELETE, (actor_id, bucket, name))
+            return True
+        database.execute(
+            _UPSERT,
+            (
+                actor_id,
+                bucket,
+                name,
+                _encode(data),
+                encode_time(timestamp),
+                ttl_deadline(ttl_seconds) if ttl_seconds is not None else None,
+            ),
+        )
+        return True
+
+    @staticmethod
+    def create_attr(
+        actor_id: Optional[str] = None,
+        bucket: Optional[str] = None,
+        name: Optional[str] = None,
+        data: Any = None,
+        timestamp: Optional[datetime] = None,
+    ) -> bool:
+        """Create an attribute unless it exists; True only if this call created it."""
+        if not actor_id or not bucket or not name or not data:
+            return False
+        cursor = database.execute(_INSERT, (actor_id, bucket, name, _encode(data), encode_time(timestamp)))
+        return cursor.rowcount > 0
+
+    def delete_attr(
+        self, actor_id: Optional[str] = None, bucket: Optional[str] = None, name: Optional[str] = None
+    ) -> bool:
+        """Delete an attribute."""
+        return self.set_attr(actor_id=actor_id, bucket=bucket, name=name, data=None)
+
+    @staticmethod
+    def delete_attr_conditional(
+        actor_id: Optional[str] = None, bucket: Optional[str] = None, name: Optional[str] = None
+    ) -> bool:
+        """Delete an attribute; True only if this call removed it."""
+        if not actor_id or not bucket or not name:
+            return False
+        return database.execute(_DELETE, (actor_id, bucket, name)).rowcount > 0
+
+    @staticmethod
+    def conditional_update_attr(
+        actor_id: Optional[str] = None,
+        bucket: Optional[str] = None,
+        name: Optional[str] = None,
+        old_data: Any = None,
+        new_data: Any = None,
+        timestamp: Optional[datetime] = None,
+        ttl_seconds: Optional[int] = None,
+    ) -> bool:
+        """Update an attribute only if its data equals old_data (compare-and-swap)."""
+        if not actor_id or not bucket or not name:
+            return False
+        expected = json.loads(_encode(old_data))
+        ttl = ttl_deadline(ttl_seconds) if ttl_seconds is not None else None
+        # Compared as decoded JSON (key order and spacing don't matter), with
+        # the write lock held from the read to the update
+        with database.transaction():
+            row = database.query_one(_GET, (actor_id, bucket, name))
+            if row is None or json.loads(row["data"]) != expected:
+                return False
+            cursor = database.execute(
+                _UPDATE, (_encode(new_data), encode_time(timestamp), ttl, actor_id, bucket, name)
+            )
+            return cursor.rowcount > 0
+
+    @staticmethod
+    def delete_bucket(actor_id: Optional[str] = None, bucket: Optional[str] = None) -> bool:
+        """Delete all attributes in a bucket."""
+        if not actor_id or not bucket:
+            return False
+        database.execute(_DELETE_BUCKET, (actor_id, bucket))
+        return True
+
+    @staticmethod
+    def delete_expired(now_epoch: Optional[int] = None, buckets: Optional[List[str]] = None) -> int:
+        """Delete attributes whose ttl_timestamp is before now_epoch. Returns the count."""
+        cutoff = int(time.time()) if now_epoch is None else now_epoch
+        if buckets:
+            return database.execute(_DELETE_EXPIRED_IN, (cutoff, json.dumps(buckets))).rowcount
+        return database.execute(_DELETE_EXPIRED, (cutoff,)).rowcount
+
+    @staticmethod
+    def delete_by_chain(
+        actor_id: Optional[str] = None,
+        buckets: Optional[List[str]] = None,
+        chain_id: Optional[str] = None,
+        defer_name: Optional[str] = None,
+    ) -> int:
+        """Delete attributes whose data["chain_id"] equals chain_id. Returns the count."""
+        if not actor_id or not chain_id or not buckets:
+            return 0
+        # One statement, so defer_name needs no special ordering
+        return database.execute(_DELETE_CHAIN, (actor_id, json.dumps(buckets), chain_id)).rowcount
+
+
+class DbAttributeBucketList:
+    """DbAttributeBucketList handles all the attribute buckets of an actor."""
+
+    @staticmethod
+    def fetch(actor_id: Optional[str] = None) -> Optional[Dict[str, Dict[str, Dict[str, Any]]]]:
+        """Return {bucket: {name: {"data", "timestamp"}}} for an actor, or None if it has none."""
+        if not actor_id:
+            return None
+        ret: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for bucket, name, data, ts in database.query(_ACTOR, (actor_id,)):
+            ret.setdefault(bucket, {})[name] = _value(data, ts)
+        return ret or None
+
+    @staticmethod
+    def fetch_timestamps(actor_id: Optional[str] = None) -> Union[Dict[str, Any], bool, None]:
+        """Return {bucket: latest timestamp} for an actor, or None if it has no attributes."""
+        if not actor_id:
+            return None
+        return {bucket: decode_time(ts) for bucket, ts in database.query(_TIMESTAMPS, (actor_id,))} or None
+
+    @staticmethod
+    def delete(actor_id: Optional[str] = None) -> bool:
+        """Delete all attributes of an actor."""
+        if not actor_id:
+            return False
+        database.execute(_DELETE_ACTOR, (actor_id,))
+        return True
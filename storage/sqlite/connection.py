@@ -0,0 +1,302 @@
+"""
+SQLite connections and schema for the sqlite backend.
+
+Every thread gets its own connection (sqlite3 connections must not be
+shared between threads), created on first use and re-created after a fork.
+Connections run in autocommit mode. A single statement is its own
+transaction, and multi-statement writes use transaction(), which takes the
+write lock up front (BEGIN IMMEDIATE) so that two writers never deadlock
+while upgrading a read lock.
+
+All SQL is written as module-level constants with ``?`` parameters.
+sqlite3 keeps a per-connection cache of compiled statements keyed by the
+SQL text, so every statement is prepared once per connection and reused.
+
+Settings:
+    SQLITE_DB_PATH: Database file (default: actingweb.sqlite3)
+    SQLITE_MMAP_SIZE: Bytes of the file read through mmap (default 256 MiB)
+    SQLITE_CACHE_KB: Page cache per connection in KiB (default 16384)
+    SQLITE_BUSY_TIMEOUT: Milliseconds to wait for the write lock (default 5000)
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DB_PATH = os.getenv("SQLITE_DB_PATH", "actingweb.sqlite3")
+
+MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+
+CACHE_KB = int(os.getenv("SQLITE_CACHE_KB", "16384"))
+
+BUSY_TIMEOUT = int(os.getenv("SQLITE_BUSY_TIMEOUT", "5000"))
+
+# Compiled statements kept per connection
+STATEMENT_CACHE = 256
+
+SCHEMA_VERSION = 1
+
+# Tables are WITHOUT ROWID, so each is one B-tree clustered on its primary
+# key: reading an actor's properties, a bucket or a trust is a range scan
+# over adjacent rows with no second lookup. Secondary indexes include every
+# column their queries return (covering), so they never touch the table.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS actors (
+    id TEXT PRIMARY KEY,
+    creator TEXT NOT NULL DEFAULT '',
+    passphrase TEXT NOT NULL DEFAULT ''
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS actors_creator ON actors (creator, id, passphrase);
+
+CREATE TABLE IF NOT EXISTS properties (
+    id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (id, name)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS properties_value ON properties (name, value, id);
+
+CREATE TABLE IF NOT EXISTS property_lookup (
+    name TEXT NOT NULL,
+    value TEXT NOT NULL,
+    actor_id TEXT NOT NULL,
+    PRIMARY KEY (name, value)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS property_lookup_actor ON property_lookup (actor_id);
+
+CREATE TABLE IF NOT EXISTS attributes (
+    id TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    name TEXT NOT NULL,
+    data TEXT NOT NULL,
+    timestamp TEXT,
+    ttl_timestamp INTEGER,
+    PRIMARY KEY (id, bucket, name)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS attributes_ttl ON attributes (ttl_timestamp, bucket)
+    WHERE ttl_timestamp IS NOT NULL;
+
+CREATE TABLE IF NOT EXISTS trusts (
+    id TEXT NOT NULL,
+    peerid TEXT NOT NULL,
+    baseuri TEXT NOT NULL DEFAULT '',
+    type TEXT NOT NULL DEFAULT '',
+    relationship TEXT NOT NULL DEFAULT '',
+    secret TEXT NOT NULL DEFAULT '',
+    "desc" TEXT NOT NULL DEFAULT '',
+    approved INTEGER NOT NULL DEFAULT 0,
+    peer_approved INTEGER NOT NULL DEFAULT 0,
+    verified INTEGER NOT NULL DEFAULT 0,
+    verification_token TEXT NOT NULL DEFAULT '',
+    peer_identifier TEXT,
+    established_via TEXT,
+    created_at TEXT,
+    last_accessed TEXT,
+    last_connected_via TEXT,
+    client_name TEXT,
+    client_version TEXT,
+    client_platform TEXT,
+    oauth_client_id TEXT,
+    aw_supported TEXT,
+    aw_version TEXT,
+    capabilities_fetched_at TEXT,
+    PRIMARY KEY (id, peerid)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS trusts_secret ON trusts (id, secret);
+
+CREATE TABLE IF NOT EXISTS peertrustees (
+    id TEXT NOT NULL,
+    peerid TEXT NOT NULL,
+    baseuri TEXT NOT NULL DEFAULT '',
+    type TEXT NOT NULL DEFAULT '',
+    passphrase TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (id, peerid)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS peertrustees_type ON peertrustees (id, type, peerid, baseuri, passphrase);
+
+CREATE TABLE IF NOT EXISTS subscriptions (
+    id TEXT NOT NULL,
+    peerid TEXT NOT NULL,
+    subid TEXT NOT NULL,
+    granularity TEXT,
+    target TEXT,
+    subtarget TEXT,
+    resource TEXT,
+    seqnr INTEGER NOT NULL DEFAULT 0,
+    callback INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (id, peerid, subid)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS subscription_diffs (
+    id TEXT NOT NULL,
+    subid TEXT NOT NULL,
+    seqnr INTEGER NOT NULL,
+    timestamp TEXT,
+    diff TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (id, subid, seqnr)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS subscription_diffs_seqnr ON subscription_diffs (id, seqnr);
+
+CREATE TABLE IF NOT EXISTS subscription_suspensions (
+    id TEXT NOT NULL,
+    target TEXT NOT NULL,
+    subtarget TEXT NOT NULL DEFAULT '',
+    suspended_at TEXT NOT NULL,
+    PRIMARY KEY (id, target, subtarget)
+) WITHOUT ROWID;
+
+-- Deleting an actor row removes everything the actor owns, so a bulk
+-- delete of actors is one statement
+CREATE TRIGGER IF NOT EXISTS actors_cascade AFTER DELETE ON actors
+BEGIN
+    DELETE FROM properties WHERE id = OLD.id;
+    DELETE FROM property_lookup WHERE actor_id = OLD.id;
+    DELETE FROM attributes WHERE id = OLD.id;
+    DELETE FROM trusts WHERE id = OLD.id;
+    DELETE FROM peertrustees WHERE id = OLD.id;
+    DELETE FROM subscriptions WHERE id = OLD.id;
+    DELETE FROM subscription_diffs WHERE id = OLD.id;
+    DELETE FROM subscription_suspensions WHERE id = OLD.id;
+END;
+"""
+
+TABLES = (
+    "actors",
+    "properties",
+    "property_lookup",
+    "attributes",
+    "trusts",
+    "peertrustees",
+    "subscriptions",
+    "subscription_diffs",
+    "subscription_suspensions",
+)
+
+
+def encode_time(value: Optional[datetime]) -> Optional[str]:
+    """Store a datetime as ISO 8601 text."""
+    return value.isoformat() if value is not None else None
+
+
+def decode_time(value: Optional[str]) -> Optional[datetime]:
+    """Read back a datetime stored by encode_time()."""
+    return datetime.fromisoformat(value) if value else None
+
+
+class SQLiteDatabase:
+    """
+    Per-thread connections to one SQLite file.
+
+    The schema is created on the first connection of each process.
+    """
+
+    def __init__(self, path: str = DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._pid: Optional[int] = None
+        self._connections = 0
+
+    def _open(self) -> sqlite3.Connection:
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(
+            self.path,
+            timeout=BUSY_TIMEOUT / 1000,
+            isolation_level=None,
+            cached_statements=STATEMENT_CACHE,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode = WAL")
+        # In WAL mode NORMAL is durable against application crashes; only
+        # a power loss can lose the last transactions
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+        conn.execute(f"PRAGMA cache_size = -{CACHE_KB}")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT}")
+        return conn
+
+    def _ensure_schema(self, conn: sqlite3.Connection) -> None:
+        if conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+            return
+        # Every statement is IF NOT EXISTS, so processes starting together
+        # can race here safely
+        try:
+            conn.executescript("BEGIN IMMEDIATE;" + SCHEMA + f"PRAGMA user_version = {SCHEMA_VERSION}; COMMIT;")
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        logger.info("SQLite schema ready in %s", self.path)
+
+    def connection(self) -> sqlite3.Connection:
+        """Return this thread's connection."""
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    # Connections inherited across fork must not be used
+                    self._local = threading.local()
+                    self._connections = 0
+                    self._pid = os.getpid()
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._open()
+            with self._lock:
+                self._ensure_schema(conn)
+                self._connections += 1
+            self._local.conn = conn
+        return conn
+
+    def execute(self, sql: str, params: Any = ()) -> sqlite3.Cursor:
+        """Run one statement (its own transaction unless inside transaction())."""
+        return self.connection().execute(sql, params)
+
+    def query(self, sql: str, params: Any = ()) -> List[sqlite3.Row]:
+        """Run a query and return all rows."""
+        return self.connection().execute(sql, params).fetchall()
+
+    def query_one(self, sql: str, params: Any = ()) -> Optional[sqlite3.Row]:
+        """Run a query and return the first row, or None."""
+        return self.connection().execute(sql, params).fetchone()
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Run a block as one write transaction (nested use joins the outer one)."""
+        conn = self.connection()
+        if conn.in_transaction:
+            yield conn
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def stats(self) -> Dict[str, Any]:
+        """Return file sizes and connection counts."""
+
+        def size(path: str) -> int:
+            try:
+                return os.path.getsize(path)
+            except OSError:
+                return 0
+
+        return {
+            "path": self.path,
+            "db_bytes": size(self.path),
+            "wal_bytes": size(self.path + "-wal"),
+            "connections": self._connections,
+        }
+
+
+# Process-wide database
+database = SQLiteDatabase()
@@ -0,0 +1,155 @@
+"""SQLite implementation of peer trustee database operations."""
+
+import logging
+from typing import Any, Dict, List, Optional, Union
+
+from .connection import database
+
+logger = logging.getLogger(__name__)
+
+_SELECT = "SELECT id, peerid, baseuri, type, passphrase FROM peertrustees"
+_GET = _SELECT + " WHERE id = ? AND peerid = ?"
+# At most two rows are needed to tell "one" from "several"
+_BY_TYPE = _SELECT + " WHERE id = ? AND type = ? LIMIT 2"
+_LIST = _SELECT + " WHERE id = ? ORDER BY peerid"
+_UPSERT = (
+    "INSERT INTO peertrustees (id, peerid, baseuri, type, passphrase) VALUES (?, ?, ?, ?, ?) "
+    "ON CONFLICT (id, peerid) DO UPDATE SET "
+    "baseuri = excluded.baseuri, type = excluded.type, passphrase = excluded.passphrase"
+)
+_UPDATE = (
+    "UPDATE peertrustees SET type = coalesce(?, type), baseuri = coalesce(?, baseuri), "
+    "passphrase = coalesce(?, passphrase) WHERE id = ? AND peerid = ?"
+)
+_DELETE = "DELETE FROM peertrustees WHERE id = ? AND peerid = ?"
+_DELETE_ALL = "DELETE FROM peertrustees WHERE id = ?"
+
+
+class DbPeerTrustee:
+    """DbPeerTrustee does all the db operations for peer trustee objects."""
+
+    handle: Optional[Dict[str, Any]]
+
+    def __init__(self) -> None:
+        self.handle = None
+
+    def get(
+        self,
+        actor_id: Optional[str] = None,
+        peer_type: Optional[str] = None,
+        peerid: Optional[str] = None,
+    ) -> Union[Dict[str, Any], bool, None]:
+        """
+        Retrieve a peer trustee by peerid, or by type if no peerid is given.
+
+        Returns:
+            The peer trustee, None if not found, or False if several peers
+            have the type
+        """
+        if not actor_id:
+            return None
+        if peerid:
+            row = database.query_one(_GET, (actor_id, peerid))
+        elif peer_type:
+            rows = database.query(_BY_TYPE, (actor_id, peer_type))
+            if len(rows) > 1:
+                logger.error(
+                    "Found more than one peer of this peer trustee type(%s). "
+                    "Unable to determine which, need peerid lookup.",
+                    peer_type,
+                )
+                return False
+            row = rows[0] if rows else None
+        else:
+            logger.debug("Attempt to get DbPeerTrustee without peerid or type")
+            return None
+        if row is None:
+            return None
+        self.handle = dict(row)
+        return dict(row)
+
+    def create(
+        self,
+        actor_id: Optional[str] = None,
+        peerid: Optional[str] = None,
+        peer_type: Optional[str] = None,
+        baseuri: Optional[str] = None,
+        passphrase: Optional[str] = None,
+    ) -> bool:
+        """Create a peer trustee (replacing any existing one for the peer)."""
+        if not actor_id or not peerid or not peer_type:
+            logger.debug("actor_id, peerid, and type are mandatory when creating peertrustee in db")
+            return False
+        row = {"id": actor_id, "peerid": peerid, "baseuri": baseuri or "", "type": peer_type, "passphrase": passphrase or ""}
+        database.execute(_UPSERT, (actor_id, peerid, row["baseuri"], peer_type, row["passphrase"]))
+        self.handle = row
+        return True
+
+    def modify(
+        self,
+        peer_type: Optional[str] = None,
+        baseuri: Optional[str] = None,
+        passphrase: Optional[str] = None,
+    ) -> bool:
+        """Modify the peer trustee in self.handle."""
+        if not self.handle:
+            logger.debug("Attempted modification of DbPeerTrustee without db handle")
+            return False
+        changes = {
+            column: value
+            for column, value in (("type", peer_type), ("baseuri", baseuri), ("passphrase", passphrase))
+            if value
+        }
+        if not changes:
+            return True
+        cursor = database.execute(
+            _UPDATE,
+            (
+                changes.get("type"),
+                changes.get("baseuri"),
+                changes.get("passphrase"),
+                self.handle["id"],
+                self.handle["peerid"],
+            ),
+        )
+        if cursor.rowcount == 0:
+            return False
+        self.handle.update(changes)
+        return True
+
+    def delete(self) -> bool:
+        """Delete the peer trustee in self.handle."""
+        if not self.handle:
+            return False
+        database.execute(_DELETE, (self.handle["id"], self.handle["peerid"]))
+        self.handle = None
+        return True
+
+
+class DbPeerTrusteeList:
+    """DbPeerTrusteeList does all the db operations for list of peer trustee objects."""
+
+    handle: Any
+    actor_id: Optional[str]
+    peertrustees: List[Dict[str, Any]]
+
+    def __init__(self) -> None:
+        self.handle = None
+        self.actor_id = None
+        self.peertrustees = []
+
+    def fetch(self, actor_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Return all peer trustees of an actor."""
+        if not actor_id:
+            return []
+        self.actor_id = actor_id
+        self.peertrustees = [dict(row) for row in database.query(_LIST, (actor_id,))]
+        return self.peertrustees
+
+    def delete(self) -> bool:
+        """Delete all peer trustees of the actor."""
+        if not self.actor_id:
+            return False
+        database.execute(_DELETE_ALL, (self.actor_id,))
+        self.handle = None
+        return True
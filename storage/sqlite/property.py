@@ -0,0 +1,350 @@
+"""
+SQLite implementation of property database operations.
+
+Indexed properties (with_indexed_properties, by default oauthId, email and
+externalUserId) are kept in a lookup table keyed by (name, value), as in
+the other backends: the first actor to claim a value owns it, and a reverse
+lookup is one primary-key read. Without the lookup table, reverse lookups
+are answered from the properties_value covering index.
+
+Whole-actor reads (fetch(), used by PropertyStore.to_dict()) and deletes
+are single statements over the actor's adjacent rows.
+"""
+
+import logging
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from ..common import lookup_settings, serialize_property
+from .connection import database
+
+logger = logging.getLogger(__name__)
+
+_GET = "SELECT value FROM properties WHERE id = ? AND name = ?"
+_UPSERT = (
+    "INSERT INTO properties (id, name, value) VALUES (?, ?, ?) "
+    "ON CONFLICT (id, name) DO UPDATE SET value = excluded.value"
+)
+_INSERT = "INSERT OR IGNORE INTO properties (id, name, value) VALUES (?, ?, ?)"
+_DELETE = "DELETE FROM properties WHERE id = ? AND name = ? RETURNING value"
+_DELETE_NAME = "DELETE FROM properties WHERE id = ? AND name = ?"
+_DELETE_IF = "DELETE FROM properties WHERE id = ? AND name = ? AND value = ?"
+_UPDATE_IF = "UPDATE properties SET value = ? WHERE id = ? AND name = ? AND value = ?"
+# Names compare bytewise (BINARY collation), like the other backends' sort keys
+_RANGE = "SELECT name, value FROM properties WHERE id = ? AND name BETWEEN ? AND ?"
+_PREFIX = "SELECT name, value FROM properties WHERE id = ? AND name >= ? AND substr(name, 1, ?) = ?"
+_LAST_IN_RANGE = "SELECT max(name) FROM properties WHERE id = ? AND name BETWEEN ? AND ?"
+# substr rather than LIKE, which ignores case
+_FETCH = "SELECT name, value FROM properties WHERE id = ? AND substr(name, 1, 5) <> 'list:'"
+_FETCH_ALL = "SELECT name, value FROM properties WHERE id = ?"
+# List metadata rows ("list:{name}-meta"), a primary key range scan
+_LIST_META = "SELECT name FROM properties WHERE id = ? AND name >= 'list:' AND name < 'list;' AND substr(name, -5) = '-meta'"
+_DELETE_ALL = "DELETE FROM properties WHERE id = ?"
+_BY_VALUE = "SELECT id FROM properties WHERE name = ? AND value = ? LIMIT 1"
+
+_LOOKUP_GET = "SELECT actor_id FROM property_lookup WHERE name = ? AND value = ?"
+_LOOKUP_CLAIM = "INSERT OR IGNORE INTO property_lookup (name, value, actor_id) VALUES (?, ?, ?)"
+_LOOKUP_RELEASE = "DELETE FROM property_lookup WHERE name = ? AND value = ? AND actor_id = ?"
+_LOOKUP_RELEASE_ACTOR = "DELETE FROM property_lookup WHERE actor_id = ?"
+
+
+def _claim_lookup(actor_id: str, name: str, old_value: Optional[str], new_value: Optional[str]) -> None:
+    """Move an actor's lookup entry from old_value to new_value (inside a transaction)."""
+    if old_value == new_value:
+        return
+    if old_value:
+        database.execute(_LOOKUP_RELEASE, (name, old_value, actor_id))
+    if new_value and database.execute(_LOOKUP_CLAIM, (name, new_value, actor_id)).rowcount == 0:
+        logger.warning(
+            "LOOKUP_CONFLICT: property=%s value_len=%s actor=%s - value already claimed by another actor",
+            name,
+            len(new_value),
+            actor_id,
+        )
+
+
+def _projected_query(
+    actor_id: str,
+    exclude_names: Sequence[str],
+    exclude_prefixes: Sequence[str],
+    include_prefixes: Optional[Sequence[str]],
+) -> Tuple[str, List[Any]]:
+    """_FETCH restricted by name: (sql, params)."""
+    sql = [_FETCH]
+    params: List[Any] = [actor_id]
+    names = list(dict.fromkeys(exclude_names))
+    if names:
+        sql.append(f"AND name NOT IN ({', '.join('?' * len(names))})")
+        params.extend(names)
+    for prefix in exclude_prefixes:
+        sql.append("AND substr(name, 1, ?) <> ?")
+        params.extend((len(prefix), prefix))
+    if include_prefixes is not None:
+        sql.append("AND (" + " OR ".join("substr(name, 1, ?) = ?" for _ in include_prefixes) + ")")
+        for prefix in include_prefixes:
+            params.extend((len(prefix), prefix))
+    return " ".join(sql), params
+
+
+class DbProperty:
+    """DbProperty does all the db operations for property objects."""
+
+    handle: Optional[Dict[str, Any]]
+
+    def __init__(
+        self,
+        use_lookup_table: Optional[bool] = None,
+        indexed_properties: Optional[List[str]] = None,
+    ) -> None:
+        self.handle = None
+        self._use_lookup_table, self._indexed_properties = lookup_settings(use_lookup_table, indexed_properties)
+
+    def _should_index_property(self, name: str) -> bool:
+        return self._use_lookup_table and name in self._indexed_properties and not name.startswith("list:")
+
+    def get(self, actor_id: Optional[str] = None, name: Optional[str] = None) -> Optional[str]:
+        """Get property value, or None if the property doesn't exist."""
+        if not actor_id or not name:
+            return None
+        row = database.query_one(_GET, (actor_id, name))
+        if row is None:
+            return None
+        self.handle = {"id": actor_id, "name": name, "value": row[0]}
+        return row[0]
+
+    def get_actor_id_from_property(self, name: Optional[str] = None, value: Optional[str] = None) -> Optional[str]:
+        """Reverse lookup: find the actor that has this property value."""
+        if not name or not value:
+            return None
+        if self._use_lookup_table:
+            if name not in self._indexed_properties:
+                logger.warning(
+                    "Reverse lookup requested for non-indexed property '%s' — add it to "
+                    "with_indexed_properties() (or INDEXED_PROPERTIES) to enable reverse lookup; "
+                    "returning None",
+                    name,
+                )
+                return None
+            entry = database.query_one(_LOOKUP_GET, (name, value))
+            if entry is None:
+                return None
+            actor_id = entry[0]
+            row = database.query_one(_GET, (actor_id, name))
+            if row is None:
+                logger.warning("Lookup found actor %s but property %s doesn't exist", actor_id, name)
+                return None
+            self.handle = {"id": actor_id, "name": name, "value": row[0]}
+            return actor_id
+        row = database.query_one(_BY_VALUE, (name, value))
+        if row is None:
+            return None
+        self.handle = {"id": row[0], "name": name, "value": value}
+        return row[0]
+
+    def set(self, actor_id: Optional[str] = None, name: Optional[str] = None, value: Any = None) -> bool:
+        """Set property value (an empty value deletes the property)."""
+        if not name:
+            return False
+        value = serialize_property(value)
+        if value is None:
+            if self.get(actor_id=actor_id, name=name):
+                self.delete()
+            return True
+        if not actor_id:
+            return False
+        if self._should_index_property(name):
+            with database.transaction():
+                old = database.query_one(_GET, (actor_id, name))
+                database.execute(_UPSERT, (actor_id, name, value))
+                _claim_lookup(actor_id, name, old[0] if old else None, value)
+        else:
+            database.execute(_UPSERT, (actor_id, name, value))
+        self.handle = {"id": actor_id, "name": name, "value": value}
+        return True
+
+    def delete(self) -> bool:
+        """Delete property using self.handle."""
+        if not self.handle:
+            return False
+        actor_id, name = self.handle.get("id"), self.handle.get("name")
+        if not actor_id or not name:
+            logger.error("DbProperty handle missing id or name field")
+            return False
+        with database.transaction():
+            old = database.query(_DELETE, (actor_id, name))
+            if old and self._should_index_property(name):
+                _claim_lookup(actor_id, name, old[0][0], None)
+        self.handle = None
+        return True
+
+    def get_range(
+        self,
+        actor_id: Optional[str] = None,
+        lower: Optional[str] = None,
+        upper: Optional[str] = None,
+        keys_only: bool = False,
+        consistent_read: bool = True,
+    ) -> Dict[str, str]:
+        """Return {name: value} for the actor's properties with lower <= name <= upper."""
+        if not actor_id or lower is None or upper is None:
+            return {}
+        rows = database.query(_RANGE, (actor_id, lower, upper))
+        return {name: "" if keys_only else value for name, value in rows}
+
+    def get_prefix(
+        self,
+        actor_id: Optional[str] = None,
+        prefix: Optional[str] = None,
+        keys_only: bool = False,
+        consistent_read: bool = True,
+    ) -> Dict[str, str]:
+        """Return {name: value} for the actor's properties whose name starts with prefix."""
+        if not actor_id or not prefix:
+            return {}
+        rows = database.query(_PREFIX, (actor_id, prefix, len(prefix), prefix))
+        return {name: "" if keys_only else value for name, value in rows}
+
+    def create_if_not_exists(self, actor_id: Optional[str] = None, name: Optional[str] = None, value: Any = None) -> bool:
+        """Create a property only if it doesn't exist. Returns False if it does."""
+        if not actor_id or not name:
+            return False
+        serialized = serialize_property(value)
+        if serialized is None:
+            return False
+        created = database.execute(_INSERT, (actor_id, name, serialized)).rowcount > 0
+        if created:
+            self.handle = {"id": actor_id, "name": name, "value": serialized}
+        return created
+
+    def delete_if_value_equals(self, actor_id: Optional[str] = None, name: Optional[str] = None, value: Any = None) -> bool:
+        """Delete a property only if it holds exactly value."""
+        if not actor_id or not name or value is None:
+            return False
+        deleted = database.execute(_DELETE_IF, (actor_id, name, value)).rowcount > 0
+        if deleted and self.handle and self.handle.get("id") == actor_id and self.handle.get("name") == name:
+            self.handle = None
+        return deleted
+
+    def set_if_value_equals(
+        self,
+        actor_id: Optional[str] = None,
+        name: Optional[str] = None,
+        expected: Any = None,
+        value: Any = None,
+    ) -> bool:
+        """Set a property only if it holds exactly expected (compare-and-swap)."""
+        if not actor_id or not name or expected is None or value is None:
+            return False
+        updated = database.execute(_UPDATE_IF, (value, actor_id, name, expected)).rowcount > 0
+        if updated:
+            self.handle = {"id": actor_id, "name": name, "value": value}
+        return updated
+
+    def get_last_in_range(
+        self,
+        actor_id: Optional[str] = None,
+        lower: Optional[str] = None,
+        upper: Optional[str] = None,
+    ) -> Optional[str]:
+        """Return the greatest property name in [lower, upper], or None."""
+        if not actor_id or lower is None or upper is None:
+            return None
+        row = database.query_one(_LAST_IN_RANGE, (actor_id, lower, upper))
+        return row[0] if row else None
+
+    def batch_delete(self, actor_id: Optional[str] = None, names: Optional[List[str]] = None) -> None:
+        """Delete the named properties of an actor (missing names are ignored)."""
+        if not actor_id or not names:
+            return
+        with database.transaction() as conn:
+            conn.executemany(_DELETE_NAME, [(actor_id, name) for name in names])
+
+
+class DbPropertyList:
+    """DbPropertyList does all the db operations for list of property objects."""
+
+    handle: Any
+    actor_id: Optional[str]
+    props: Optional[Dict[str, str]]
+
+    def __init__(
+        self,
+        use_lookup_table: Optional[bool] = None,
+        indexed_properties: Optional[List[str]] = None,
+    ) -> None:
+        self.handle = None
+        self.actor_id = None
+        self.props = None
+        self._use_lookup_table, self._indexed_properties = lookup_settings(use_lookup_table, indexed_properties)
+
+    def fetch(self, actor_id: Optional[str] = None) -> Optional[Dict[str, str]]:
+        """Return all properties of an actor except list: properties ({} if none)."""
+        if not actor_id:
+            return None
+        self.actor_id = actor_id
+        self.props = dict(database.query(_FETCH, (actor_id,)))
+        return self.props
+
+    def fetch_projected(
+        self,
+        actor_id: Optional[str] = None,
+        exclude_names: Sequence[str] = (),
+        exclude_prefixes: Sequence[str] = (),
+        include_prefixes: Optional[Sequence[str]] = None,
+    ) -> Optional[Dict[str, str]]:
+        """fetch() restricted by name in the WHERE clause: rows left out are never read."""
+        if not actor_id:
+            return None
+        self.actor_id = actor_id
+        if include_prefixes is not None and not include_prefixes:
+            return {}
+        sql, params = _projected_query(actor_id, exclude_names, exclude_prefixes, include_prefixes)
+        return dict(database.query(sql, tuple(params)))
+
+    def fetch_projected_page(
+        self,
+        actor_id: Optional[str] = None,
+        exclude_names: Sequence[str] = (),
+        exclude_prefixes: Sequence[str] = (),
+        include_prefixes: Optional[Sequence[str]] = None,
+        after: Optional[str] = None,
+        limit: int = 50,
+    ) -> Tuple[List[Tuple[str, str]], Optional[str]]:
+        """
+        fetch_projected() one page at a time: rows named after ``after``, in name order.
+
+        Returns:
+            (rows, name to continue after or None when there are no more rows)
+        """
+        if not actor_id or (include_prefixes is not None and not include_prefixes):
+            return [], None
+        self.actor_id = actor_id
+        sql, params = _projected_query(actor_id, exclude_names, exclude_prefixes, include_prefixes)
+        if after:
+            sql += " AND name > ?"
+            params.append(after)
+        rows = [(name, value) for name, value in database.query(sql + " ORDER BY name LIMIT ?", (*params, limit))]
+        return rows, rows[-1][0] if len(rows) == limit else None
+
+    def fetch_all_including_lists(self, actor_id: Optional[str] = None) -> Optional[Dict[str, str]]:
+        """Return all properties of an actor including list: properties (None if none)."""
+        if not actor_id:
+            return None
+        self.actor_id = actor_id
+        return dict(database.query(_FETCH_ALL, (actor_id,))) or None
+
+    def fetch_list_names(self, actor_id: Optional[str] = None) -> List[str]:
+        """Return the names of the actor's list properties, read from their metadata rows only."""
+        if not actor_id:
+            return []
+        return sorted(name[5:-5] for (name,) in database.query(_LIST_META, (actor_id,)))
+
+    def delete(self) -> bool:
+        """Delete all properties of the actor, and their lookup entries."""
+        if not self.actor_id:
+            return False
+        with database.transaction():
+            database.execute(_DELETE_ALL, (self.actor_id,))
+            if self._use_lookup_table:
+                database.execute(_LOOKUP_RELEASE_ACTOR, (self.actor_id,))
+        self.handle = None
+        return True
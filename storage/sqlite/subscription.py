@@ -0,0 +1,168 @@
+"""SQLite implementation of subscription database operations."""
+
+import logging
+from typing import Any, Dict, List, Optional
+
+from .connection import database
+
+logger = logging.getLogger(__name__)
+
+_SELECT = "SELECT id, peerid, subid, granularity, target, subtarget, resource, seqnr, callback FROM subscriptions"
+_GET = _SELECT + " WHERE id = ? AND peerid = ? AND subid = ?"
+_LIST = _SELECT + " WHERE id = ? ORDER BY peerid, subid"
+_INSERT = (
+    "INSERT OR IGNORE INTO subscriptions "
+    "(id, peerid, subid, granularity, target, subtarget, resource, seqnr, callback) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+_UPDATE = (
+    "UPDATE subscriptions SET granularity = coalesce(?, granularity), target = coalesce(?, target), "
+    "subtarget = coalesce(?, subtarget), resource = coalesce(?, resource), seqnr = coalesce(?, seqnr), "
+    "callback = coalesce(?, callback) WHERE id = ? AND peerid = ? AND subid = ? "
+    "RETURNING id, peerid, subid, granularity, target, subtarget, resource, seqnr, callback"
+)
+_DELETE = "DELETE FROM subscriptions WHERE id = ? AND peerid = ? AND subid = ?"
+_DELETE_ALL = "DELETE FROM subscriptions WHERE id = ?"
+
+
+def _to_dict(row: Any) -> Dict[str, Any]:
+    return {
+        "id": row["id"],
+        "peerid": row["peerid"],
+        "subscriptionid": row["subid"],
+        "granularity": row["granularity"] or "",
+        "target": row["target"] or "",
+        "subtarget": row["subtarget"] or "",
+        "resource": row["resource"] or "",
+        "sequence": row["seqnr"],
+        "callback": bool(row["callback"]),
+    }
+
+
+class DbSubscription:
+    """DbSubscription does all the db operations for subscription objects."""
+
+    handle: Optional[Dict[str, Any]]
+
+    def __init__(self) -> None:
+        self.handle = None
+
+    def get(
+        self,
+        actor_id: Optional[str] = None,
+        peerid: Optional[str] = None,
+        subid: Optional[str] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """Retrieve a subscription, or None."""
+        if not actor_id:
+            return None
+        if not peerid or not subid:
+            logger.debug("Attempt to get subscription without peerid or subid")
+            return None
+        row = database.query_one(_GET, (actor_id, peerid, subid))
+        if row is None:
+            return None
+        self.handle = _to_dict(row)
+        return self.handle
+
+    def create(
+        self,
+        actor_id: Optional[str] = None,
+        peerid: Optional[str] = None,
+        subid: Optional[str] = None,
+        granularity: Optional[str] = None,
+        target: Optional[str] = None,
+        subtarget: Optional[str] = None,
+        resource: Optional[str] = None,
+        seqnr: int = 0,
+        callback: bool = False,
+    ) -> bool:
+        """Create a subscription. Returns False if it exists."""
+        if not actor_id or not peerid or not subid:
+            return False
+        row = {
+            "id": actor_id,
+            "peerid": peerid,
+            "subid": subid,
+            "granularity": granularity,
+            "target": target,
+            "subtarget": subtarget,
+            "resource": resource,
+            "seqnr": seqnr,
+            "callback": callback,
+        }
+        params = (actor_id, peerid, subid, granularity, target, subtarget, resource, seqnr, int(callback))
+        if database.execute(_INSERT, params).rowcount == 0:
+            return False
+        self.handle = _to_dict(row)
+        return True
+
+    def modify(
+        self,
+        peerid: Optional[str] = None,
+        subid: Optional[str] = None,
+        granularity: Optional[str] = None,
+        target: Optional[str] = None,
+        subtarget: Optional[str] = None,
+        resource: Optional[str] = None,
+        seqnr: Optional[int] = None,
+        callback: Optional[bool] = None,
+    ) -> bool:
+        """Modify the subscription in self.handle (peerid and subid identify it, they don't change)."""
+        if not self.handle:
+            logger.debug("Attempted modification of DbSubscription without db handle")
+            return False
+        params = (
+            granularity or None,
+            target or None,
+            subtarget or None,
+            resource or None,
+            seqnr,
+            int(callback) if callback is not None else None,
+            self.handle["id"],
+            self.handle["peerid"],
+            self.handle["subscriptionid"],
+        )
+        rows = database.query(_UPDATE, params)
+        if not rows:
+            return False
+        self.handle = _to_dict(rows[0])
+        return True
+
+    def delete(self) -> bool:
+        """Delete the subscription in self.handle."""
+        if not self.handle:
+            logger.debug("Attempted delete of DbSubscription with no handle set.")
+            return False
+        database.execute(_DELETE, (self.handle["id"], self.handle["peerid"], self.handle["subscriptionid"]))
+        self.handle = None
+        return True
+
+
+class DbSubscriptionList:
+    """DbSubscriptionList does all the db operations for list of subscription objects."""
+
+    handle: Any
+    actor_id: Optional[str]
+    subscriptions: List[Dict[str, Any]]
+
+    def __init__(self) -> None:
+        self.handle = None
+        self.actor_id = None
+        self.subscriptions = []
+
+    def fetch(self, actor_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Return all subscriptions of an actor."""
+        if not actor_id:
+            return []
+        self.actor_id = actor_id
+        self.subscriptions = [_to_dict(row) for row in database.query(_LIST, (actor_id,))]
+        return self.subscriptions
+
+    def delete(self) -> bool:
+        """Delete all subscriptions of the actor."""
+        if not self.actor_id:
+            return False
+        database.execute(_DELETE_ALL, (self.actor_id,))
+        self.handle = None
+        return True
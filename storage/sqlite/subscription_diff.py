@@ -0,0 +1,135 @@
+"""SQLite implementation of subscription diff database operations."""
+
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from .connection import database, decode_time, encode_time
+
+logger = logging.getLogger(__name__)
+
+_SELECT = "SELECT id, subid, seqnr, timestamp, diff FROM subscription_diffs"
+_GET = _SELECT + " WHERE id = ? AND subid = ? AND seqnr = ?"
+_OLDEST = _SELECT + " WHERE id = ? AND subid = ? ORDER BY seqnr LIMIT 1"
+_UPSERT = (
+    "INSERT INTO subscription_diffs (id, subid, seqnr, timestamp, diff) VALUES (?, ?, ?, ?, ?) "
+    "ON CONFLICT (id, subid, seqnr) DO UPDATE SET timestamp = excluded.timestamp, diff = excluded.diff"
+)
+_DELETE = "DELETE FROM subscription_diffs WHERE id = ? AND subid = ? AND seqnr = ?"
+_LIST = _SELECT + " WHERE id = ? ORDER BY seqnr"
+_LIST_SUB = _SELECT + " WHERE id = ? AND subid = ? ORDER BY seqnr"
+# seqnr 0 means all diffs
+_DELETE_UPTO = "DELETE FROM subscription_diffs WHERE id = ? AND (? = 0 OR seqnr <= ?)"
+_DELETE_SUB_UPTO = "DELETE FROM subscription_diffs WHERE id = ? AND subid = ? AND (? = 0 OR seqnr <= ?)"
+
+
+class DbSubscriptionDiff:
+    """DbSubscriptionDiff does all the db operations for subscription diff objects."""
+
+    handle: Optional[Dict[str, Any]]
+
+    def __init__(self) -> None:
+        self.handle = None
+
+    def get(
+        self,
+        actor_id: Optional[str] = None,
+        subid: Optional[str] = None,
+        seqnr: Optional[int] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """Retrieve a diff by seqnr, or the subscription's oldest diff if no seqnr is given."""
+        if not self.handle:
+            if not actor_id:
+                return None
+            if not subid:
+                logger.debug("Attempt to get subscriptiondiff without subid")
+                return None
+            if seqnr is not None:
+                row = database.query_one(_GET, (actor_id, subid, seqnr))
+            else:
+                row = database.query_one(_OLDEST, (actor_id, subid))
+            if row is None:
+                return None
+            self.handle = dict(row)
+            self.handle["timestamp"] = decode_time(row["timestamp"])
+        return {
+            "id": self.handle["id"],
+            "subscriptionid": self.handle["subid"],
+            "timestamp": self.handle["timestamp"],
+            "data": self.handle["diff"],
+            "sequence": self.handle["seqnr"],
+        }
+
+    def create(
+        self,
+        actor_id: Optional[str] = None,
+        subid: Optional[str] = None,
+        diff: str = "",
+        seqnr: int = 1,
+    ) -> bool:
+        """Store a diff."""
+        if not actor_id or not subid:
+            logger.debug("Attempt to create subscriptiondiff without actorid or subid")
+            return False
+        row = {"id": actor_id, "subid": subid, "seqnr": seqnr, "timestamp": datetime.utcnow(), "diff": diff}
+        database.execute(_UPSERT, (actor_id, subid, seqnr, encode_time(row["timestamp"]), diff))
+        self.handle = row
+        return True
+
+    def delete(self) -> bool:
+        """Delete the diff in self.handle."""
+        if not self.handle:
+            return False
+        database.execute(_DELETE, (self.handle["id"], self.handle["subid"], self.handle["seqnr"]))
+        self.handle = None
+        return True
+
+
+class DbSubscriptionDiffList:
+    """DbSubscriptionDiffList does all the db operations for list of diff objects."""
+
+    handle: Any
+    diffs: List[Dict[str, Any]]
+    actor_id: Optional[str]
+    subid: Optional[str]
+
+    def __init__(self) -> None:
+        self.handle = None
+        self.diffs = []
+        self.actor_id = None
+        self.subid = None
+
+    def fetch(self, actor_id: Optional[str] = None, subid: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Return the diffs of an actor (or of one subscription), ordered by seqnr."""
+        if not actor_id:
+            return []
+        self.actor_id = actor_id
+        self.subid = subid
+        if subid:
+            rows = database.query(_LIST_SUB, (actor_id, subid))
+        else:
+            rows = database.query(_LIST, (actor_id,))
+        self.diffs = [
+            {
+                "id": row["id"],
+                "subscriptionid": row["subid"],
+                "timestamp": decode_time(row["timestamp"]),
+                "diff": row["diff"],
+                "sequence": row["seqnr"],
+            }
+            for row in rows
+        ]
+        return self.diffs
+
+    def delete(self, seqnr: Optional[int] = None) -> bool:
+        """Delete the fetched diffs, up to and including seqnr if given."""
+        if not self.actor_id:
+            return False
+        if not seqnr or not isinstance(seqnr, int):
+            seqnr = 0
+        if self.subid:
+            database.execute(_DELETE_SUB_UPTO, (self.actor_id, self.subid, seqnr, seqnr))
+        else:
+            database.execute(_DELETE_UPTO, (self.actor_id, seqnr, seqnr))
+        self.handle = None
+        return True
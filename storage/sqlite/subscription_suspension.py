@@ -0,0 +1,59 @@
+"""SQLite implementation of subscription suspension state."""
+
+import logging
+from datetime import UTC, datetime
+from typing import List, Optional, Tuple
+
+from .connection import database
+
+logger = logging.getLogger(__name__)
+
+# A target-level suspension (subtarget '') covers its subtargets
+_IS_SUSPENDED = (
+    "SELECT 1 FROM subscription_suspensions WHERE id = ? AND target = ? AND subtarget IN ('', ?) LIMIT 1"
+)
+_INSERT = "INSERT OR IGNORE INTO subscription_suspensions (id, target, subtarget, suspended_at) VALUES (?, ?, ?, ?)"
+_DELETE = "DELETE FROM subscription_suspensions WHERE id = ? AND target = ? AND subtarget = ?"
+_LIST = "SELECT target, subtarget FROM subscription_suspensions WHERE id = ? ORDER BY suspended_at"
+_DELETE_ALL = "DELETE FROM subscription_suspensions WHERE id = ?"
+
+
+class DbSubscriptionSuspension:
+    """Suspended targets/subtargets of one actor (a target-level suspension covers its subtargets)."""
+
+    def __init__(self, actor_id: str) -> None:
+        self._actor_id = actor_id
+
+    def is_suspended(self, target: str, subtarget: Optional[str] = None) -> bool:
+        """Check if a target/subtarget is currently suspended."""
+        return database.query_one(_IS_SUSPENDED, (self._actor_id, target, subtarget or "")) is not None
+
+    def suspend(self, target: str, subtarget: Optional[str] = None) -> bool:
+        """Suspend diff registration. Returns False if already suspended."""
+        cursor = database.execute(
+            _INSERT, (self._actor_id, target, subtarget or "", datetime.now(UTC).isoformat())
+        )
+        inserted = cursor.rowcount > 0
+        if inserted:
+            logger.info(
+                "Suspended subscriptions for %s/%s%s", self._actor_id, target, "/" + subtarget if subtarget else ""
+            )
+        return inserted
+
+    def resume(self, target: str, subtarget: Optional[str] = None) -> bool:
+        """Resume diff registration. Returns False if it wasn't suspended."""
+        deleted = database.execute(_DELETE, (self._actor_id, target, subtarget or "")).rowcount > 0
+        if deleted:
+            logger.info(
+                "Resumed subscriptions for %s/%s%s", self._actor_id, target, "/" + subtarget if subtarget else ""
+            )
+        return deleted
+
+    def get_all_suspended(self) -> List[Tuple[str, Optional[str]]]:
+        """Return all suspended (target, subtarget) pairs."""
+        return [(target, subtarget or None) for target, subtarget in database.query(_LIST, (self._actor_id,))]
+
+    def delete_all(self) -> bool:
+        """Remove all suspensions of the actor."""
+        database.execute(_DELETE_ALL, (self._actor_id,))
+        return True
@@ -0,0 +1,281 @@
+"""SQLite implementation of trust database operations."""
+
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Union
+
+from ..common import parse_timestamp, trust_to_dict
+from .connection import database, decode_time, encode_time
+
+logger = logging.getLogger(__name__)
+
+_COLUMNS = (
+    "id", "peerid", "baseuri", "type", "relationship", "secret", "desc",
+    "approved", "peer_approved", "verified", "verification_token",
+    "peer_identifier", "established_via", "created_at", "last_accessed", "last_connected_via",
+    "client_name", "client_version", "client_platform", "oauth_client_id",
+    "aw_supported", "aw_version", "capabilities_fetched_at",
+)  # fmt: skip
+
+_BOOLEANS = ("approved", "peer_approved", "verified")
+_TIMESTAMPS = ("created_at", "last_accessed", "capabilities_fetched_at")
+
+_SELECT = "SELECT " + ", ".join(f'"{column}"' for column in _COLUMNS) + " FROM trusts"
+_GET = _SELECT + " WHERE id = ? AND peerid = ?"
+_BY_SECRET = _SELECT + " WHERE id = ? AND secret = ? LIMIT 1"
+_HAS_SECRET = "SELECT 1 FROM trusts WHERE id = ? AND secret = ? LIMIT 1"
+_LIST = _SELECT + " WHERE id = ? ORDER BY peerid"
+# As an upsert in the other backends, re-creating a trust keeps created_at
+_UPSERT = (
+    "INSERT INTO trusts ("
+    + ", ".join(f'"{column}"' for column in _COLUMNS)
+    + ") VALUES ("
+    + ", ".join("?" for _ in _COLUMNS)
+    + ") ON CONFLICT (id, peerid) DO UPDATE SET "
+    + ", ".join(f'"{column}" = excluded."{column}"' for column in _COLUMNS[2:] if column != "created_at")
+)
+_DELETE = "DELETE FROM trusts WHERE id = ? AND peerid = ?"
+_DELETE_ALL = "DELETE FROM trusts WHERE id = ?"
+
+
+def _to_dict(row: Any) -> Dict[str, Any]:
+    """Build the trust dict the other backends return from a stored row."""
+    values = dict(row)
+    for column in _BOOLEANS:
+        values[column] = bool(values[column])
+    for column in _TIMESTAMPS:
+        values[column] = decode_time(values[column])
+    return trust_to_dict(values)
+
+
+def _encode(column: str, value: Any) -> Any:
+    if column in _TIMESTAMPS:
+        return encode_time(value)
+    if column in _BOOLEANS:
+        return int(bool(value))
+    return value
+
+
+class DbTrust:
+    """
+    DbTrust does all the db operations for trust objects.
+
+    The actor_id must always be set.
+    """
+
+    handle: Optional[Dict[str, Any]]
+
+    def __init__(self) -> None:
+        self.handle = None
+
+    def get(
+        self,
+        actor_id: Optional[str] = None,
+        peerid: Optional[str] = None,
+        token: Optional[str] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """Retrieve a trust by peerid, or by secret token if no peerid is given."""
+        if not actor_id:
+            return None
+        if peerid:
+            row = database.query_one(_GET, (actor_id, peerid))
+        elif token:
+            row = database.query_one(_BY_SECRET, (actor_id, token))
+        else:
+            return None
+        if row is None:
+            return None
+        self.handle = _to_dict(row)
+        return self.handle
+
+    def create(
+        self,
+        actor_id: Optional[str] = None,
+        peerid: Optional[str] = None,
+        baseuri: str = "",
+        peer_type: str = "",
+        relationship: str = "",
+        secret: str = "",
+        approved: bool = False,
+        verified: bool = False,
+        peer_approved: bool = False,
+        verification_token: str = "",
+        desc: str = "",
+        peer_identifier: Optional[str] = None,
+        established_via: Optional[str] = None,
+        created_at: Union[str, datetime, None] = None,
+        last_accessed: Union[str, datetime, None] = None,
+        last_connected_via: Optional[str] = None,
+        client_name: Optional[str] = None,
+        client_version: Optional[str] = None,
+        client_platform: Optional[str] = None,
+        oauth_client_id: Optional[str] = None,
+        aw_supported: Optional[str] = None,
+        aw_version: Optional[str] = None,
+        capabilities_fetched_at: Union[str, datetime, None] = None,
+    ) -> bool:
+        """Create a trust (replacing any existing trust with the peer)."""
+        from actingweb.trust import canonical_connection_method
+
+        if not actor_id or not peerid:
+            return False
+        created = parse_timestamp(created_at) if created_at else datetime.utcnow()
+        row = {
+            "id": actor_id,
+            "peerid": peerid,
+            "baseuri": baseuri,
+            "type": peer_type,
+            "relationship": relationship,
+            "secret": secret,
+            "desc": desc,
+            "approved": approved,
+            "peer_approved": peer_approved,
+            "verified": verified,
+            "verification_token": verification_token,
+            "peer_identifier": peer_identifier,
+            "established_via": established_via,
+            "created_at": created,
+            "last_accessed": parse_timestamp(last_accessed) if last_accessed else created,
+            "last_connected_via": canonical_connection_method(last_connected_via or established_via),
+            "client_name": client_name,
+            "client_version": client_version,
+            "client_platform": client_platform,
+            "oauth_client_id": oauth_client_id,
+            "aw_supported": aw_supported,
+            "aw_version": aw_version,
+            "capabilities_fetched_at": parse_timestamp(capabilities_fetched_at) if capabilities_fetched_at else None,
+        }
+        with database.transaction():
+            database.execute(_UPSERT, [_encode(column, row[column]) for column in _COLUMNS])
+            stored = database.query_one(_GET, (actor_id, peerid))
+        self.handle = _to_dict(stored)
+        return True
+
+    def modify(
+        self,
+        baseuri: Optional[str] = None,
+        secret: Optional[str] = None,
+        desc: Optional[str] = None,
+        approved: Optional[bool] = None,
+        verified: Optional[bool] = None,
+        verification_token: Optional[str] = None,
+        peer_approved: Optional[bool] = None,
+        peer_identifier: Optional[str] = None,
+        established_via: Optional[str] = None,
+        created_at: Union[str, datetime, None] = None,
+        last_accessed: Union[str, datetime, None] = None,
+        last_connected_via: Optional[str] = None,
+        client_name: Optional[str] = None,
+        client_version: Optional[str] = None,
+        client_platform: Optional[str] = None,
+        oauth_client_id: Optional[str] = None,
+        aw_supported: Optional[str] = None,
+        aw_version: Optional[str] = None,
+        capabilities_fetched_at: Union[str, datetime, None] = None,
+    ) -> bool:
+        """Modify the trust in self.handle. None (or empty strings) leave fields unchanged."""
+        from actingweb.trust import canonical_connection_method
+
+        if not self.handle:
+            logger.debug("Attempted modification of DbTrust without db handle")
+            return False
+        changes: Dict[str, Any] = {}
+        # Empty strings don't overwrite these
+        for column, value in (
+            ("baseuri", baseuri),
+            ("secret", secret),
+            ("desc", desc),
+            ("verification_token", verification_token),
+        ):
+            if value:
+                changes[column] = value
+        for column, value in (
+            ("approved", approved),
+            ("verified", verified),
+            ("peer_approved", peer_approved),
+            ("peer_identifier", peer_identifier),
+            ("established_via", established_via),
+            ("client_name", client_name),
+            ("client_version", client_version),
+            ("client_platform", client_platform),
+            ("oauth_client_id", oauth_client_id),
+            ("aw_supported", aw_supported),
+            ("aw_version", aw_version),
+        ):
+            if value is not None:
+                changes[column] = value
+        if last_connected_via is not None:
+            changes["last_connected_via"] = canonical_connection_method(last_connected_via)
+        for column, value in (
+            ("created_at", created_at),
+            ("last_accessed", last_accessed),
+            ("capabilities_fetched_at", capabilities_fetched_at),
+        ):
+            if value is not None:
+                try:
+                    changes[column] = parse_timestamp(value)
+                except ValueError as e:
+                    logger.warning("Invalid %s timestamp: %s", column, e)
+        if not changes:
+            return True
+        # Column names come from the fixed lists above, never from callers
+        sql = (
+            "UPDATE trusts SET "
+            + ", ".join(f'"{column}" = ?' for column in changes)
+            + " WHERE id = ? AND peerid = ? RETURNING "
+            + ", ".join(f'"{column}"' for column in _COLUMNS)
+        )
+        params = [_encode(column, value) for column, value in changes.items()]
+        rows = database.query(sql, params + [self.handle["id"], self.handle["peerid"]])
+        if not rows:
+            return False
+        self.handle = _to_dict(rows[0])
+        return True
+
+    def delete(self) -> bool:
+        """Delete the trust in self.handle."""
+        if not self.handle:
+            return False
+        database.execute(_DELETE, (self.handle["id"], self.handle["peerid"]))
+        self.handle = None
+        return True
+
+    @staticmethod
+    def is_token_in_db(actor_id: Optional[str] = None, token: Optional[str] = None) -> bool:
+        """Return True if the actor has a trust with this secret token."""
+        if not actor_id or not token:
+            return False
+        return database.query_one(_HAS_SECRET, (actor_id, token)) is not None
+
+
+class DbTrustList:
+    """
+    DbTrustList does all the db operations for list of trust objects.
+
+    The actor_id must always be set.
+    """
+
+    handle: Any
+    actor_id: Optional[str]
+    trusts: List[Dict[str, Any]]
+
+    def __init__(self) -> None:
+        self.handle = None
+        self.actor_id = None
+        self.trusts = []
+
+    def fetch(self, actor_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Return all trusts of an actor, ordered by peerid."""
+        if not actor_id:
+            return []
+        self.actor_id = actor_id
+        self.trusts = [_to_dict(row) for row in database.query(_LIST, (actor_id,))]
+        return self.trusts
+
+    def delete(self) -> bool:
+        """Delete all trusts of the actor."""
+        if not self.actor_id:
+            return False
+        database.execute(_DELETE_ALL, (self.actor_id,))
+        self.handle = None
+        return True
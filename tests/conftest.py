@@ -0,0 +1,68 @@
+"""
+Shared fixtures for the pytest suite.
+
+Tests run against the app's own storage backends, so they need neither
+DynamoDB Local nor network access:
+
+- config: an ActingWeb config, once on the memory backend and once on the
+  sqlite backend (a temporary database file); data is reset after each test
+- sqlite_config: the sqlite backend only, for what only it implements
+- actor: a fresh actor on config
+
+The Postman/Runscope collections in this directory are not run by pytest.
+"""
+
+import atexit
+import importlib
+import os
+import shutil
+import tempfile
+
+_TMP_DIR = tempfile.mkdtemp(prefix="actingweb-tests-")
+atexit.register(shutil.rmtree, _TMP_DIR, True)
+
+# Read at import time by application.py, storage/sqlite and webhook_ingest.py
+os.environ.setdefault("DATABASE_BACKEND", "memory")
+os.environ.setdefault("SQLITE_DB_PATH", os.path.join(_TMP_DIR, "actingweb.sqlite3"))
+os.environ.setdefault("WEBHOOK_JOURNAL_DIR", os.path.join(_TMP_DIR, "webhooks"))
+
+import pytest  # noqa: E402
+
+import storage  # noqa: E402
+
+BACKENDS = ("memory", "sqlite")
+
+# Registered up front: ActingWeb modules may load actingweb.db.<DATABASE_BACKEND> on import
+for _database in BACKENDS:
+    storage.install(_database)
+
+
+def make_config(database: str):
+    """An ActingWeb config on one of the app's storage backends."""
+    from actingweb.config import Config
+
+    return Config(database=database, fqdn="test.example", proto="http://")
+
+
+def reset(database: str) -> None:
+    importlib.import_module(storage.APP_BACKENDS[database]).reset()
+
+
+@pytest.fixture(params=BACKENDS)
+def config(request):
+    database = request.param
+    yield make_config(database)
+    reset(database)
+
+
+@pytest.fixture
+def sqlite_config():
+    yield make_config("sqlite")
+    reset("sqlite")
+
+
+@pytest.fixture
+def actor(config):
+    from actingweb.interface.actor_interface import ActorInterface
+
+    return ActorInterface.create(creator="owner@example.com", config=config)
@@ -0,0 +1,76 @@
+import json
+
+import pytest
+
+from shared_hooks.app import bulk_calculate
+from shared_hooks.app.bulk_calculate import NOT_FINITE, calculate_bulk, is_bulk_request
+
+ENGINES = ["python"] + (["numpy"] if bulk_calculate.NUMPY_AVAILABLE else [])
+
+
+@pytest.fixture(params=ENGINES)
+def engine(request, monkeypatch):
+    monkeypatch.setattr(bulk_calculate, "NUMPY_AVAILABLE", request.param == "numpy")
+    return request.param
+
+
+def test_column_payload(engine):
+    result = calculate_bulk({"a": [1, 2, 3], "b": [4, 5, 6], "operation": "multiply"})
+
+    assert result["results"] == [4.0, 10.0, 18.0]
+    assert result["error_mask"] == [False, False, False]
+    assert result["error_count"] == 0
+    assert result["engine"] == engine
+
+
+def test_scalars_are_broadcast(engine):
+    result = calculate_bulk({"a": [1, 2, 3], "b": 10, "operation": ["add", "subtract", "divide"]})
+
+    assert result["results"] == [11.0, -8.0, 0.3]
+
+
+def test_row_payload(engine):
+    result = calculate_bulk({"items": [{"a": 1, "b": 2, "operation": "add"}, {"a": 6, "b": 3, "operation": "divide"}]})
+
+    assert result["results"] == [3.0, 2.0]
+    assert result["count"] == 2
+
+
+def test_failed_elements_are_masked(engine):
+    result = calculate_bulk(
+        {
+            "a": [1, 1, 1e308, 4],
+            "b": [0, 1, 1e308, 2],
+            "operation": ["divide", "power", "multiply", "subtract"],
+        }
+    )
+
+    assert result["results"] == [None, None, None, 2.0]
+    assert result["error_mask"] == [True, True, True, False]
+    assert result["errors"] == ["Division by zero", "Unsupported operation: power", NOT_FINITE, None]
+    assert result["error_count"] == 3
+
+
+def test_non_finite_inputs_never_reach_json(engine):
+    result = calculate_bulk({"a": [float("inf"), float("nan")], "b": [1, 1], "operation": "add"})
+
+    assert result["error_mask"] == [True, True]
+    json.dumps(result, allow_nan=False)
+
+
+def test_malformed_payloads(engine):
+    assert "error" in calculate_bulk({"a": [1, 2], "b": [1, 2, 3]})
+    assert "error" in calculate_bulk({"items": "not a list"})
+    assert "error" in calculate_bulk({"a": ["x"], "b": [1]})
+
+
+def test_size_limit(engine, monkeypatch):
+    monkeypatch.setattr(bulk_calculate, "MAX_BULK_SIZE", 2)
+
+    assert "error" in calculate_bulk({"a": [1, 2, 3], "b": 1})
+
+
+def test_is_bulk_request():
+    assert is_bulk_request({"a": [1], "b": 2})
+    assert is_bulk_request({"items": []})
+    assert not is_bulk_request({"a": 1, "b": 2, "operation": "add"})
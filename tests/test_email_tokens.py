@@ -0,0 +1,87 @@
+import threading
+import time
+
+from shared_hooks.app.email_tokens import EmailTokenStore, token_hash
+
+
+def test_token_is_single_use(config):
+    store = EmailTokenStore()
+    token = store.issue("actor-1", config, email="user@example.com")
+
+    assert store.resolve(token, config)["email"] == "user@example.com"
+    record = store.consume(token, config)
+    assert record["actor_id"] == "actor-1"
+    assert store.consume(token, config) is None
+    assert store.resolve(token, config) is None
+
+
+def test_concurrent_consume_accepts_the_token_once(config):
+    store = EmailTokenStore()
+    token = store.issue("actor-1", config)
+    barrier = threading.Barrier(8)
+    accepted = []
+
+    def consume():
+        barrier.wait()
+        if store.consume(token, config) is not None:
+            accepted.append(1)
+
+    threads = [threading.Thread(target=consume) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(accepted) == 1
+
+
+def test_token_of_another_actor_is_rejected_and_kept(config):
+    store = EmailTokenStore()
+    token = store.issue("actor-1", config)
+
+    assert store.consume(token, config, actor_id="actor-2") is None
+    assert store.consume(token, config, actor_id="actor-1") is not None
+
+
+def test_unknown_and_empty_tokens(config):
+    store = EmailTokenStore()
+
+    assert store.consume("", config) is None
+    assert store.consume("not-a-token", config) is None
+
+
+def test_only_the_hash_is_stored(config):
+    from actingweb.attribute import Attributes
+    from actingweb.constants import ACTINGWEB_SYSTEM_ACTOR
+
+    token = EmailTokenStore().issue("actor-1", config)
+    bucket = Attributes(actor_id=ACTINGWEB_SYSTEM_ACTOR, bucket="email_verify_tokens", config=config).get_bucket()
+
+    assert token_hash(token) in bucket
+    assert token not in bucket
+
+
+def test_expired_tokens_are_rejected_and_swept(config):
+    store = EmailTokenStore()
+    token = store.issue("actor-1", config, ttl=1)
+
+    deadline = time.monotonic() + 5
+    while store.stats()["swept"] == 0 and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+    assert store.stats() == {"scheduled": 0, "swept": 1}
+    assert store.consume(token, config) is None
+
+
+def test_expiry_is_checked_on_lookup(config):
+    from actingweb.attribute import Attributes
+    from actingweb.constants import ACTINGWEB_SYSTEM_ACTOR
+
+    store = EmailTokenStore()
+    token = store.issue("actor-1", config)
+    # The record outlived its expiry (sweeper and storage TTL not caught up yet)
+    Attributes(actor_id=ACTINGWEB_SYSTEM_ACTOR, bucket="email_verify_tokens", config=config).set_attr(
+        name=token_hash(token), data={"actor_id": "actor-1", "email": "", "expires_at": time.time() - 1}
+    )
+
+    assert store.consume(token, config) is None
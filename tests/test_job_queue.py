@@ -0,0 +1,102 @@
+import threading
+import time
+
+from shared_hooks.app.job_queue import JobQueue
+
+
+def wait_for(queue, job_id, actor_id, config=None, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.get(job_id, actor_id, config)
+        if job and job["status"] in ("succeeded", "failed"):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def test_job_runs_in_the_background():
+    queue = JobQueue(workers=1)
+    release = threading.Event()
+
+    job = queue.submit("send_notification", "actor-1", lambda: release.wait(5) and {"status": "sent"})
+
+    assert job["status"] == "queued"
+    assert job["job_id"].startswith("job-")
+    release.set()
+    finished = wait_for(queue, job["job_id"], "actor-1")
+    assert finished["status"] == "succeeded"
+    assert finished["result"] == {"status": "sent"}
+
+
+def test_failed_job_records_the_error():
+    queue = JobQueue(workers=1)
+
+    def fail():
+        raise RuntimeError("provider down")
+
+    job = queue.submit("send_notification", "actor-1", fail)
+
+    finished = wait_for(queue, job["job_id"], "actor-1")
+    assert finished["status"] == "failed"
+    assert finished["error"] == "provider down"
+
+
+def test_jobs_are_only_visible_to_their_actor():
+    queue = JobQueue(run_inline=True)
+
+    job = queue.submit("send_notification", "actor-1", lambda: {"status": "sent"})
+
+    assert queue.get(job["job_id"], "actor-2") is None
+    assert queue.get("job-unknown", "actor-1") is None
+
+
+def test_inline_jobs_return_their_final_status():
+    queue = JobQueue(run_inline=True)
+
+    job = queue.submit("send_notification", "actor-1", lambda x: {"value": x}, 7)
+
+    assert job["status"] == "succeeded"
+    assert job["result"] == {"value": 7}
+
+
+def test_full_queue_rejects_jobs():
+    queue = JobQueue(workers=1, max_pending=1)
+    release = threading.Event()
+    started = threading.Event()
+
+    def block():
+        started.set()
+        release.wait(5)
+        return {}
+
+    running = queue.submit("a", "actor-1", block)
+    started.wait(5)
+    queued = queue.submit("a", "actor-1", dict)
+    rejected = queue.submit("a", "actor-1", dict)
+    release.set()
+
+    assert running is not None and queued is not None
+    assert rejected is None
+    wait_for(queue, queued["job_id"], "actor-1")
+
+
+def test_externally_completed_job():
+    queue = JobQueue(run_inline=True)
+
+    job = queue.create("send_notification", "actor-1")
+    queue.complete(job["job_id"], result={"status": "sent"})
+
+    assert queue.get(job["job_id"], "actor-1")["status"] == "succeeded"
+
+
+def test_finished_jobs_are_found_by_other_processes(actor):
+    queue = JobQueue(run_inline=True)
+    job = queue.submit("send_notification", actor.id, lambda: {"status": "sent"}, config=actor.config)
+
+    # A process that never saw the job reads the persisted record
+    other = JobQueue(run_inline=True)
+
+    assert other.get(job["job_id"], actor.id) is None
+    stored = other.get(job["job_id"], actor.id, actor.config)
+    assert stored["status"] == "succeeded"
+    assert stored["result"] == {"status": "sent"}
@@ -0,0 +1,81 @@
+import threading
+
+from shared_hooks.app import action_hooks
+from shared_hooks.app.notifications import BATCH_SIZE, MAX_RECIPIENTS, DeliveryEngine, StubProvider, group_key
+
+
+def stub_engine(**kwargs):
+    stub = StubProvider()
+    return DeliveryEngine(providers={"email": stub, "sms": stub}, **kwargs), stub
+
+
+def test_large_broadcast_takes_a_few_provider_calls(monkeypatch):
+    engine, stub = stub_engine()
+    monkeypatch.setattr(action_hooks, "delivery_engine", engine)
+    recipients = [f"+1555{n:07d}" for n in range(MAX_RECIPIENTS)]
+
+    summary = action_hooks.broadcast_notification(recipients, "hello", "sms")
+
+    expected_calls = -(-MAX_RECIPIENTS // BATCH_SIZE)
+    assert summary["status"] == "sent"
+    assert (summary["count"], summary["sent"], summary["failed"]) == (MAX_RECIPIENTS, MAX_RECIPIENTS, 0)
+    assert summary["provider_calls"] == len(stub.batches) == expected_calls
+    assert all(size <= BATCH_SIZE for _, size in stub.batches)
+
+
+def test_deliver_groups_by_channel_and_domain_and_keeps_input_order():
+    engine, stub = stub_engine(batch_size=2)
+    notifications = [
+        {"recipient": "a@one.example", "message": "m", "type": "email"},
+        {"recipient": "+15550000001", "message": "m", "type": "sms"},
+        {"recipient": "b@TWO.example", "message": "m", "type": "email"},
+        {"recipient": "c@one.example", "message": "m", "type": "email"},
+        {"recipient": "d@one.example", "message": "", "type": "email"},
+    ]
+
+    results = engine.deliver(notifications)
+
+    assert [r["recipient"] for r in results] == [n["recipient"] for n in notifications]
+    assert [r["status"] for r in results] == ["sent", "sent", "sent", "sent", "failed"]
+    assert sorted(stub.batches) == [("email", 1), ("email", 1), ("email", 2), ("sms", 1)]
+    assert group_key(notifications[2]) == ("email", "two.example")
+
+
+def test_unsupported_channel_fails_without_a_provider_call():
+    engine, stub = stub_engine()
+
+    results = engine.deliver([{"recipient": "x", "message": "m", "type": "fax"}])
+
+    assert results[0]["status"] == "failed"
+    assert stub.batches == []
+
+
+def test_submit_batches_buffered_notifications():
+    engine, stub = stub_engine(batch_size=3, flush_interval=60)
+    done = threading.Event()
+    results = []
+
+    def callback(result):
+        results.append(result)
+        if len(results) == 3:
+            done.set()
+
+    for n in range(3):
+        assert engine.submit({"recipient": f"u{n}@example.com", "message": "m", "type": "email"}, callback)
+
+    # A full batch is flushed without waiting for the flush interval
+    assert done.wait(5)
+    assert stub.batches == [("email", 3)]
+    assert engine.stats() == {"buffered": 0, "provider_calls": 1, "delivered": 3}
+
+
+def test_submit_rejects_when_buffers_are_full():
+    engine, stub = stub_engine(flush_interval=60, max_buffered=2)
+    notification = {"recipient": "u@example.com", "message": "m", "type": "email"}
+
+    assert engine.submit(notification) and engine.submit(notification)
+    assert not engine.submit(notification)
+
+    engine.flush()
+    assert stub.batches == [("email", 2)]
+    assert engine.submit(notification)
@@ -0,0 +1,147 @@
+import itertools
+import threading
+import time
+
+from shared_hooks.app.payment_ledger import (
+    CAS_ATTEMPTS,
+    EVENT_BUCKET,
+    PaymentLedger,
+    _event_name,
+    empty_state,
+    fold,
+    public_state,
+    record_payment_event,
+    to_event,
+)
+
+
+def webhook(event_id, event_type, created, **obj):
+    return {"id": event_id, "type": event_type, "created": created, "data": {"object": obj}}
+
+
+EVENTS = [
+    to_event(webhook("evt_1", "payment_intent.payment_failed", 100, id="pi_1", amount=500, currency="usd")),
+    to_event(webhook("evt_2", "payment_intent.succeeded", 200, id="pi_1", amount_received=500, currency="usd")),
+    to_event(webhook("evt_3", "charge.refunded", 300, id="ch_1", amount_refunded=200)),
+    to_event(webhook("evt_4", "charge.refunded", 400, id="ch_1", amount_refunded=300)),
+]
+
+
+def fold_all(events):
+    state = empty_state()
+    for seq, event in events:
+        state = fold(state, dict(event, seq=seq))
+    return state
+
+
+def test_fold_is_order_insensitive():
+    numbered = list(enumerate(EVENTS, start=1))
+    expected = public_state(fold_all(numbered))
+
+    for order in itertools.permutations(numbered):
+        assert public_state(fold_all(order)) == expected
+
+    assert expected["status"] == "refunded"
+    assert expected["amount_paid"] == 500
+    # Stripe reports the cumulative refund of a charge; refunds of one charge aren't added up
+    assert expected["amount_refunded"] == 300
+
+
+def test_late_event_does_not_override_a_newer_one():
+    succeeded, failed = EVENTS[1], EVENTS[0]
+
+    state = fold_all([(1, succeeded), (2, failed)])
+
+    assert state["status"] == "paid"
+    assert state["counts"] == {"payment_intent.succeeded": 1, "payment_intent.payment_failed": 1}
+
+
+def test_refunds_of_different_charges_add_up():
+    state = fold_all(
+        [
+            (1, to_event(webhook("evt_a", "charge.refunded", 1, id="ch_a", amount_refunded=100))),
+            (2, to_event(webhook("evt_b", "charge.refunded", 2, id="ch_b", amount_refunded=250))),
+        ]
+    )
+
+    assert state["amount_refunded"] == 350
+
+
+def test_unrelated_events_are_ignored():
+    assert to_event({"type": "customer.created", "id": "evt_x"}) is None
+
+
+def test_append_assigns_sequence_numbers_and_skips_duplicates(config, actor):
+    ledger = PaymentLedger(actor.id, config)
+
+    first = ledger.append(EVENTS[0])
+    second = ledger.append(EVENTS[1])
+
+    assert (first["seq"], second["seq"]) == (1, 2)
+    assert ledger.append(EVENTS[0]) is None
+    assert [event["event_id"] for event in ledger.history()] == ["evt_1", "evt_2"]
+    assert ledger.state()["status"] == "paid"
+
+
+def test_concurrent_appends_never_reuse_a_sequence_number(config, actor, monkeypatch):
+    # Each failed compare-and-swap means another writer succeeded, so with
+    # fewer writers than CAS_ATTEMPTS every append gets through
+    events = [
+        to_event(webhook(f"evt_{n}", "payment_intent.succeeded", n, id=f"pi_{n}", amount_received=10))
+        for n in range(CAS_ATTEMPTS)
+    ]
+    read_state = PaymentLedger._read_state
+    reads = []
+
+    def slow_read_state(self):
+        # Every writer reads the snapshot before any of them writes it
+        reads.append(1)
+        state = read_state(self)
+        time.sleep(0.01)
+        return state
+
+    monkeypatch.setattr(PaymentLedger, "_read_state", slow_read_state)
+    barrier = threading.Barrier(len(events))
+    results = []
+
+    def append(event):
+        barrier.wait()
+        results.append(PaymentLedger(actor.id, config).append(event))
+
+    threads = [threading.Thread(target=append, args=(event,)) for event in events]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    ledger = PaymentLedger(actor.id, config)
+    history = ledger.history()
+    assert len(results) == len(events) and all(results)
+    assert len(reads) > len(events)  # Some writers lost a compare-and-swap and retried
+    assert [event["seq"] for event in history] == list(range(1, len(events) + 1))
+    assert {event["event_id"] for event in history} == {event["event_id"] for event in events}
+    assert ledger.state()["amount_paid"] == 10 * len(events)
+
+
+def test_replay_restores_a_log_item_lost_in_a_crash(config, actor):
+    from actingweb.attribute import Attributes
+
+    ledger = PaymentLedger(actor.id, config)
+    ledger.append(EVENTS[0])
+    ledger.append(EVENTS[1])
+    # Crash after the snapshot write, before the event log write
+    Attributes(actor_id=actor.id, bucket=EVENT_BUCKET, config=config).delete_attr(name=_event_name(2))
+
+    state = PaymentLedger(actor.id, config).replay()
+
+    assert state["status"] == "paid"
+    assert [event["seq"] for event in PaymentLedger(actor.id, config).history()] == [1, 2]
+
+
+def test_record_payment_event_updates_the_property_view(actor):
+    state = record_payment_event(actor, webhook("evt_p", "payment_intent.succeeded", 1_700_000_000, amount=900))
+
+    assert state["status"] == "paid"
+    assert actor.properties.get("payment_status") == "paid"
+    assert actor.properties.get("last_payment_at")
+    assert record_payment_event(actor, webhook("evt_p", "payment_intent.succeeded", 1_700_000_000)) is None
@@ -0,0 +1,100 @@
+import pytest
+from actingweb.db import get_property
+
+import permission_matcher
+from shared_hooks.app.trust_types import mcp_property_projection, owner_property_projection
+from storage import projection
+from storage.projection import fetch_list_names, fetch_properties, fetch_properties_page
+
+NAMES = [f"item{n:02d}" for n in range(25)] + ["email", "_secret", "notes", "access_token"]
+
+
+@pytest.fixture
+def populated(actor):
+    for name in NAMES:
+        get_property(actor.config).set(actor_id=actor.id, name=name, value=f"value of {name}")
+    actor.property_lists.todo.append("first")
+    actor.property_lists.done.append("second")
+    return actor
+
+
+def read_all_pages(actor, view, limit, **kwargs):
+    names, cursors = [], []
+    after = None
+    while True:
+        page = fetch_properties_page(actor.config, actor.id, view, after=after, limit=limit, **kwargs)
+        assert page is not None
+        rows, after = page
+        assert len(rows) <= limit
+        names.extend(name for name, _ in rows)
+        cursors.append(after)
+        if after is None:
+            return names, cursors
+
+
+@pytest.mark.parametrize("limit", [1, 7, 50])
+def test_pages_cover_every_property_once(populated, limit, monkeypatch):
+    # Small storage reads, so a page spans several of them
+    monkeypatch.setattr(projection, "MIN_PAGE_READ", 2)
+
+    names, cursors = read_all_pages(populated, owner_property_projection(), limit)
+
+    assert names == sorted(NAMES)
+    assert cursors[:-1] == [names[i * limit + limit - 1] for i in range(len(cursors) - 1)]
+
+
+def test_pages_leave_out_what_the_rules_exclude(populated):
+    view = mcp_property_projection()
+
+    names, _ = read_all_pages(populated, view, 10)
+
+    assert "email" not in names and "_secret" not in names and "access_token" not in names
+    assert names == sorted(name for name in NAMES if view.allows(name))
+
+
+def test_page_continues_after_a_cursor(populated):
+    rows, cursor = fetch_properties_page(
+        populated.config, populated.id, owner_property_projection(), after="item05", limit=3
+    )
+
+    assert [name for name, _ in rows] == ["item06", "item07", "item08"]
+    assert cursor == "item08"
+
+
+def test_pages_within_a_prefix(populated):
+    names, _ = read_all_pages(populated, owner_property_projection(), 4, prefix="item1")
+
+    assert names == [f"item1{n}" for n in range(10)]
+
+
+def test_pages_of_include_prefix_rules(populated):
+    view = permission_matcher.projection({"patterns": ["item2*", "notes"], "operations": ["read"]}, "read")
+
+    names, _ = read_all_pages(populated, view, 2)
+
+    assert names == ["item20", "item21", "item22", "item23", "item24", "notes"]
+
+
+def test_keep_filters_rows_before_paging(populated):
+    rows, cursor = fetch_properties_page(
+        populated.config,
+        populated.id,
+        owner_property_projection(),
+        limit=5,
+        keep=lambda name, value: name.endswith("3"),
+    )
+
+    assert [name for name, _ in rows] == ["item03", "item13", "item23"]
+    assert cursor is None
+
+
+def test_fetch_properties_applies_the_projection(populated):
+    props = fetch_properties(populated.config, populated.id, mcp_property_projection())
+
+    assert set(props) == {name for name in NAMES if name not in ("email", "_secret", "access_token")}
+    assert props["notes"] == "value of notes"
+
+
+def test_list_names(populated):
+    assert fetch_list_names(populated.config, populated.id) == ["done", "todo"]
+    assert fetch_list_names(populated.config, "") == []
@@ -0,0 +1,183 @@
+from types import SimpleNamespace
+
+import pytest
+from flask import Flask
+
+import consistency
+from shared_hooks.app import result_cache as rc
+from shared_hooks.app.result_cache import ResultCache, cached, idempotent, invalidate_actor, result_cache
+
+ACTOR = SimpleNamespace(id="actor-1")
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    result_cache.clear()
+    yield
+    result_cache.clear()
+
+
+def counting_hook(result=None):
+    calls = []
+
+    def hook(actor, name, data):
+        calls.append(dict(data))
+        return result if result is not None else {"sum": data.get("a", 0) + data.get("b", 0)}
+
+    return hook, calls
+
+
+def test_cached_result_is_served_for_reordered_params():
+    hook, calls = counting_hook()
+    wrapped = cached(hook)
+
+    assert wrapped(ACTOR, "calculate", {"a": 1, "b": 2}) == {"sum": 3}
+    assert wrapped(ACTOR, "calculate", {"b": 2, "a": 1}) == {"sum": 3}
+    assert len(calls) == 1
+
+
+def test_cached_result_is_a_copy():
+    wrapped = cached(counting_hook()[0])
+    wrapped(ACTOR, "calculate", {"a": 1})["sum"] = 99
+
+    assert wrapped(ACTOR, "calculate", {"a": 1}) == {"sum": 1}
+
+
+def test_invalidation_drops_only_that_actors_results():
+    hook, calls = counting_hook()
+    wrapped = cached(hook)
+    other = SimpleNamespace(id="actor-2")
+    wrapped(ACTOR, "calculate", {"a": 1})
+    wrapped(other, "calculate", {"a": 1})
+
+    invalidate_actor(ACTOR.id)
+    wrapped(ACTOR, "calculate", {"a": 1})
+    wrapped(other, "calculate", {"a": 1})
+
+    assert len(calls) == 3
+
+
+def test_result_computed_during_invalidation_is_not_stored():
+    calls = []
+
+    def hook(actor, name, data):
+        calls.append(1)
+        if len(calls) == 1:
+            # A property write lands while the first call is computing
+            invalidate_actor(actor.id)
+        return {"value": len(calls)}
+
+    wrapped = cached(hook)
+
+    assert wrapped(ACTOR, "calculate", {}) == {"value": 1}
+    assert wrapped(ACTOR, "calculate", {}) == {"value": 2}
+    assert wrapped(ACTOR, "calculate", {}) == {"value": 2}
+
+
+def test_errors_are_not_cached():
+    hook, calls = counting_hook(result={"error": "transient"})
+    wrapped = cached(hook)
+    wrapped(ACTOR, "calculate", {})
+    wrapped(ACTOR, "calculate", {})
+
+    assert len(calls) == 2
+
+
+def test_oversized_results_are_not_cached(monkeypatch):
+    monkeypatch.setattr(rc, "MAX_RESULT_BYTES", 10)
+    hook, calls = counting_hook(result={"results": list(range(100))})
+    wrapped = cached(hook)
+    wrapped(ACTOR, "calculate", {})
+    wrapped(ACTOR, "calculate", {})
+
+    assert len(calls) == 2
+
+
+def test_cache_is_bounded_by_entries_and_bytes():
+    cache = ResultCache(max_entries=2, max_bytes=10_000)
+    for i in range(3):
+        cache.put("a", "calculate", str(i), {"i": i}, ttl=60)
+
+    assert cache.get("a", "calculate", "0") == (False, None)
+    assert cache.get("a", "calculate", "2") == (True, {"i": 2})
+
+    small = ResultCache(max_entries=100, max_bytes=20)
+    small.put("a", "calculate", "0", {"value": "x" * 8}, ttl=60)
+    small.put("a", "calculate", "1", {"value": "y" * 8}, ttl=60)
+
+    assert small.stats()["entries"] == 1
+    assert small.stats()["bytes"] <= 20
+
+
+def test_expired_results_are_recomputed():
+    cache = ResultCache()
+    cache.put("a", "calculate", "f", {"v": 1}, ttl=-1)
+
+    assert cache.get("a", "calculate", "f") == (False, None)
+
+
+def test_first_read_after_invalidation_is_strongly_consistent():
+    seen = []
+
+    def hook(actor, name, data):
+        seen.append(consistency.current())
+        return {"ok": True}
+
+    wrapped = cached(hook)
+    with consistency.eventually_consistent():
+        wrapped(ACTOR, "calculate", {"n": 1})
+        invalidate_actor(ACTOR.id)
+        wrapped(ACTOR, "calculate", {"n": 2})
+
+    assert seen == ["eventual", "strong"]
+
+
+def test_idempotency_key_replays_the_first_result():
+    app = Flask(__name__)
+    hook, calls = counting_hook()
+    wrapped = idempotent(hook)
+
+    with app.test_request_context(headers={"Idempotency-Key": "key-1"}):
+        first = wrapped(ACTOR, "send_notification", {"a": 1})
+        second = wrapped(ACTOR, "send_notification", {"a": 1})
+        conflict = wrapped(ACTOR, "send_notification", {"a": 2})
+    with app.test_request_context():
+        wrapped(ACTOR, "send_notification", {"a": 1})
+
+    assert first == second == {"sum": 1}
+    assert "error" in conflict
+    assert len(calls) == 2
+
+
+def test_failed_idempotent_call_runs_again_on_retry():
+    app = Flask(__name__)
+    hook, calls = counting_hook(result={"error": "provider down"})
+    wrapped = idempotent(hook)
+
+    with app.test_request_context(headers={"Idempotency-Key": "key-2"}):
+        wrapped(ACTOR, "send_notification", {})
+        wrapped(ACTOR, "send_notification", {})
+
+    assert len(calls) == 2
+
+
+def test_property_writes_invalidate_through_install():
+    calls = []
+    write = rc._invalidating(lambda self, actor_id: calls.append(actor_id))
+    before = result_cache.generation(ACTOR.id)
+
+    write(None, ACTOR.id)
+
+    assert calls == [ACTOR.id]
+    assert result_cache.generation(ACTOR.id) == before + 1
+
+
+def test_install_wraps_property_handlers_once():
+    from actingweb.handlers.properties import PropertiesHandler
+
+    rc.install()
+    wrapped = PropertiesHandler.put
+    rc.install()
+
+    assert getattr(wrapped, "_result_cache", False)
+    assert PropertiesHandler.put is wrapped
@@ -0,0 +1,156 @@
+import threading
+import time
+
+import pytest
+from actingweb.db import get_actor, get_attribute, get_property, get_property_list, get_trust, get_trust_list
+
+import storage
+from storage.attributes import create_attr, supported
+
+
+def test_actor_lifecycle(config):
+    db = get_actor(config)
+
+    assert db.create(actor_id="a1", creator="Owner@Example.com", passphrase="pw")
+    assert not get_actor(config).create(actor_id="a1", creator="other@example.com")
+    assert get_actor(config).get("a1")["passphrase"] == "pw"
+    assert [row["id"] for row in get_actor(config).get_by_creator("owner@example.com")] == ["a1"]
+
+    db.modify(passphrase=b"new")
+    assert get_actor(config).get("a1")["passphrase"] == "new"
+
+    db.delete()
+    assert get_actor(config).get("a1") is None
+
+
+def test_properties_and_reverse_lookup(config):
+    get_actor(config).create(actor_id="a1", creator="c")
+    prop = get_property(config)
+
+    assert prop.set(actor_id="a1", name="email", value="user@example.com")
+    assert get_property(config).get(actor_id="a1", name="email") == "user@example.com"
+    assert get_property(config).get_actor_id_from_property(name="email", value="user@example.com") == "a1"
+
+    # An empty value deletes the property and its lookup entry
+    get_property(config).set(actor_id="a1", name="email", value="")
+    assert get_property(config).get(actor_id="a1", name="email") is None
+    assert get_property(config).get_actor_id_from_property(name="email", value="user@example.com") is None
+
+
+def test_conditional_property_writes(config):
+    get_actor(config).create(actor_id="a1", creator="c")
+    prop = get_property(config)
+
+    assert prop.create_if_not_exists(actor_id="a1", name="lock", value="1")
+    assert not prop.create_if_not_exists(actor_id="a1", name="lock", value="2")
+    assert not prop.set_if_value_equals(actor_id="a1", name="lock", value="3", expected="2")
+    assert prop.set_if_value_equals(actor_id="a1", name="lock", value="3", expected="1")
+    assert not prop.delete_if_value_equals(actor_id="a1", name="lock", value="1")
+    assert prop.delete_if_value_equals(actor_id="a1", name="lock", value="3")
+    assert prop.get(actor_id="a1", name="lock") is None
+
+
+def test_property_ranges_and_listing(config):
+    get_actor(config).create(actor_id="a1", creator="c")
+    for name in ("b", "c1", "c2", "d"):
+        get_property(config).set(actor_id="a1", name=name, value=name.upper())
+
+    assert get_property(config).get_prefix(actor_id="a1", prefix="c") == {"c1": "C1", "c2": "C2"}
+    assert get_property(config).get_range(actor_id="a1", lower="b", upper="c1") == {"b": "B", "c1": "C1"}
+    assert get_property_list(config).fetch(actor_id="a1") == {"b": "B", "c1": "C1", "c2": "C2", "d": "D"}
+
+
+def test_attribute_create_and_compare_and_swap(config):
+    assert supported(config)
+    attrs = get_attribute(config)
+
+    assert create_attr(config, "a1", "bucket", "item", {"v": 1})
+    assert not create_attr(config, "a1", "bucket", "item", {"v": 2})
+    assert not attrs.conditional_update_attr(actor_id="a1", bucket="bucket", name="item", old_data={"v": 2}, new_data={"v": 3})
+    assert attrs.conditional_update_attr(actor_id="a1", bucket="bucket", name="item", old_data={"v": 1}, new_data={"v": 3})
+    assert attrs.get_attr(actor_id="a1", bucket="bucket", name="item")["data"] == {"v": 3}
+    assert attrs.delete_attr_conditional(actor_id="a1", bucket="bucket", name="item")
+    assert not attrs.delete_attr_conditional(actor_id="a1", bucket="bucket", name="item")
+
+
+def test_concurrent_create_attr_has_one_winner(config):
+    barrier = threading.Barrier(8)
+    created = []
+
+    def create(n):
+        barrier.wait()
+        if create_attr(config, "a1", "bucket", "once", {"writer": n}):
+            created.append(n)
+
+    threads = [threading.Thread(target=create, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(created) == 1
+    stored = get_attribute(config).get_attr(actor_id="a1", bucket="bucket", name="once")
+    assert stored["data"] == {"writer": created[0]}
+
+
+def test_expired_attributes(config):
+    from actingweb.constants import TTL_CLOCK_SKEW_BUFFER
+
+    attrs = get_attribute(config)
+    # The deadline includes ActingWeb's clock-skew buffer
+    attrs.set_attr(actor_id="a1", bucket="tokens", name="old", data={"v": 1}, ttl_seconds=-TTL_CLOCK_SKEW_BUFFER - 10)
+    attrs.set_attr(actor_id="a1", bucket="tokens", name="new", data={"v": 2}, ttl_seconds=3600)
+
+    assert attrs.get_attr_strict(actor_id="a1", bucket="tokens", name="old") is None
+    assert attrs.delete_expired(now_epoch=int(time.time())) == 1
+    assert set(attrs.get_bucket(actor_id="a1", bucket="tokens")) == {"new"}
+
+
+def test_trusts(config):
+    get_actor(config).create(actor_id="a1", creator="c")
+    trust = get_trust(config)
+
+    assert trust.create(actor_id="a1", peerid="p1", baseuri="http://peer/p1", relationship="friend", secret="s1")
+    assert get_trust(config).get(actor_id="a1", token="s1")["peerid"] == "p1"
+    assert get_trust(config).is_token_in_db(actor_id="a1", token="s1")
+    assert [row["peerid"] for row in get_trust_list(config).fetch(actor_id="a1")] == ["p1"]
+
+    trust.delete()
+    assert get_trust(config).get(actor_id="a1", peerid="p1") is None
+
+
+def test_sqlite_purge_actors_removes_their_data(sqlite_config):
+    config = sqlite_config
+    for actor_id in ("_actingweb_system", "a1", "a2"):
+        get_actor(config).create(actor_id=actor_id, creator=actor_id)
+        get_property(config).set(actor_id=actor_id, name="p", value="v")
+
+    purged = storage.purge_actors(config.database, keep_prefix="_actingweb_")
+
+    assert sorted(row["id"] for row in purged) == ["a1", "a2"]
+    assert get_actor(config).get("_actingweb_system") is not None
+    assert get_property(config).get(actor_id="a1", name="p") is None
+    assert get_property(config).get(actor_id="_actingweb_system", name="p") == "v"
+
+
+def test_sqlite_data_outlives_the_connection(sqlite_config):
+    from storage.sqlite.connection import SQLiteDatabase, database
+
+    get_actor(sqlite_config).create(actor_id="a1", creator="c")
+    get_property(sqlite_config).set(actor_id="a1", name="p", value="v")
+
+    # A new process (here: a new connection to the same file) sees the data
+    reopened = SQLiteDatabase(database.path)
+    assert reopened.query_one("SELECT value FROM properties WHERE id = ? AND name = ?", ("a1", "p"))["value"] == "v"
+
+    seen = []
+    thread = threading.Thread(target=lambda: seen.append(get_property(sqlite_config).get(actor_id="a1", name="p")))
+    thread.start()
+    thread.join()
+    assert seen == ["v"]
+
+
+@pytest.mark.parametrize("database", ["dynamodb", "postgresql"])
+def test_install_leaves_actingweb_backends_alone(database):
+    assert storage.install(database) == database
+    assert storage.stats(database) == {}
@@ -0,0 +1,156 @@
+import json
+import os
+import subprocess
+import sys
+import textwrap
+import time
+
+import pytest
+
+from shared_hooks.app.webhook_ingest import WebhookIngestor, WebhookJournal
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def crash_after_journaling(directory, script):
+    """Run script against a journal in a separate process that dies without cleanup."""
+    code = textwrap.dedent(
+        f"""
+        import os
+        from shared_hooks.app.webhook_ingest import WebhookJournal
+        journal = WebhookJournal({str(directory)!r})
+        """
+    ) + textwrap.dedent(script) + "\nos._exit(1)\n"
+    subprocess.run([sys.executable, "-c", code], cwd=REPO_ROOT, check=False, timeout=30)
+
+
+def test_unapplied_events_are_replayed_after_a_crash(tmp_path):
+    crash_after_journaling(
+        tmp_path,
+        """
+        for n in range(1, 4):
+            journal.append("actor-1", "sms_webhook", f"SM{n}", {"n": n})
+        journal.mark_applied(2)
+        # The process dies halfway through writing a line
+        with open(journal.path, "a") as f:
+            f.write('{"seq": 4, "actor_')
+        """,
+    )
+
+    journal = WebhookJournal(str(tmp_path))
+    recovered = journal.recover_orphans()
+
+    assert [event["data"]["n"] for event in recovered] == [1, 3]
+    assert [event["event_id"] for event in recovered] == ["SM1", "SM3"]
+    # Re-journaled under the new process's sequence numbers, orphan removed
+    assert [event["seq"] for event in recovered] == [1, 2]
+    assert sorted(os.listdir(tmp_path)) == [os.path.basename(journal.path)]
+    assert WebhookJournal(str(tmp_path)).recover_orphans() == []
+
+
+def test_dead_letters_are_not_replayed(tmp_path):
+    crash_after_journaling(
+        tmp_path,
+        """
+        event = journal.append("actor-1", "sms_webhook", "SM1", {"n": 1})
+        journal.mark_dead(event, "actor store unavailable")
+        """,
+    )
+
+    journal = WebhookJournal(str(tmp_path))
+
+    assert journal.recover_orphans() == []
+    dead = [name for name in os.listdir(tmp_path) if name.startswith("dead-")]
+    assert len(dead) == 1
+    with open(tmp_path / dead[0]) as f:
+        assert json.loads(f.readline())["error"] == "actor store unavailable"
+
+
+def test_live_journals_are_not_taken_over(tmp_path):
+    live = WebhookJournal(str(tmp_path))
+    live.append("actor-1", "sms_webhook", "SM1", {})
+
+    assert WebhookJournal(str(tmp_path)).recover_orphans() == []
+    assert os.path.exists(live.path)
+
+
+def test_applied_segments_are_deleted(tmp_path):
+    journal = WebhookJournal(str(tmp_path), max_bytes=1)
+    events = [journal.append("actor-1", "sms_webhook", f"SM{n}", {"n": n}) for n in range(3)]
+
+    assert len(journal.paths) == 3
+    journal.mark_applied(events[1]["seq"])
+    journal.mark_applied(events[0]["seq"])
+
+    # The segment being appended to is kept, even with nothing outstanding
+    assert journal.paths == [journal.path]
+    assert sorted(os.listdir(tmp_path)) == [os.path.basename(journal.path)]
+
+
+def test_segments_replay_on_their_own(tmp_path):
+    crash_after_journaling(
+        tmp_path,
+        """
+        journal.max_bytes = 1
+        for n in range(3):
+            journal.append("actor-1", "sms_webhook", f"SM{n}", {"n": n})
+        journal.mark_applied(3)
+        """,
+    )
+
+    recovered = WebhookJournal(str(tmp_path)).recover_orphans()
+
+    assert [event["data"]["n"] for event in recovered] == [0, 1]
+
+
+def test_duplicates_are_dropped_inline():
+    ingestor = WebhookIngestor(run_inline=True)
+    applied = []
+    ingestor.register("sms_webhook", lambda actor, data: applied.append(data), lambda: None)
+    actor = type("Actor", (), {"id": "actor-1"})()
+
+    assert ingestor.ingest(actor, "sms_webhook", "SM1", {"n": 1}) == "accepted"
+    assert ingestor.ingest(actor, "sms_webhook", "SM1", {"n": 1}) == "duplicate"
+    assert ingestor.ingest(actor, "sms_webhook", "", {"n": 2}) == "accepted"
+    assert ingestor.ingest(actor, "sms_webhook", "", {"n": 2}) == "accepted"
+    assert applied == [{"n": 1}, {"n": 2}, {"n": 2}]
+
+
+def test_failed_ingest_is_accepted_on_retry():
+    ingestor = WebhookIngestor(run_inline=True)
+    attempts = []
+
+    def apply(actor, data):
+        attempts.append(data)
+        if len(attempts) == 1:
+            raise OSError("disk full")
+
+    ingestor.register("sms_webhook", apply, lambda: None)
+    actor = type("Actor", (), {"id": "actor-1"})()
+
+    with pytest.raises(OSError):
+        ingestor.ingest(actor, "sms_webhook", "SM1", {})
+
+    assert ingestor.ingest(actor, "sms_webhook", "SM1", {}) == "accepted"
+    assert len(attempts) == 2
+
+
+def test_events_are_applied_in_the_background(actor):
+    ingestor = WebhookIngestor(consumers=2)
+    applied = []
+
+    def apply(target, data):
+        target.properties.last = data["value"]
+        applied.append(data["value"])
+
+    ingestor.register("sms_webhook", apply, lambda: actor.config)
+
+    for n in range(5):
+        assert ingestor.ingest(actor, "sms_webhook", f"SM{n}", {"value": str(n)}) == "accepted"
+
+    deadline = time.monotonic() + 5
+    while len(applied) < 5 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    # One actor's events are applied by one consumer, in arrival order
+    assert applied == ["0", "1", "2", "3", "4"]
+    assert actor.properties.get("last") == "4"
@@ -0,0 +1,331 @@
+"""
+Trust records for peer authentication, cached per process, revoked in all.
+
+Every actor-to-actor request (subscription callbacks, proxied property
+reads, trust updates) authenticates the peer with its trust secret as a
+bearer token. ActingWeb's Auth.check_token_auth() then:
+
+- reads the trust record by (actor, secret) from storage, and
+- writes the trust's last_accessed/last_connected_via back to storage.
+
+Permission checks for the peer then read the trust row again to resolve
+its trust type (PermissionEvaluator._lookup_trust_type_from_database).
+
+install() caches trust records keyed by (actor, peer):
+
+- An entry holds the relationship, approval and verification state and the
+  other trust fields, plus the SHA-256 of the secret; the secret itself
+  and the verification token are not kept. A bearer token is matched by
+  its hash, and the record is handed out with the presented token as its
+  secret.
+- Entries expire after TRUST_CACHE_TTL seconds. They are dropped when
+  the trust is created, approved, re-keyed or deleted through
+  ActingWeb's Trust class, and by the trust_approved and trust_deleted
+  hooks (shared_hooks/protocol/trust_hooks.py).
+- Each eviction also rewrites the actor's revocation marker in storage,
+  and an entry is only served while the actor's marker is the one it was
+  filled under (auth_revocation.py). Other workers notice within
+  AUTH_REVOCATION_CHECK_INTERVAL seconds (default 2).
+- Trust usage is written at most once per TRUST_USAGE_INTERVAL seconds
+  per trust and connection method, instead of on every request.
+- The trust type lookup for permission checks reads the same entries, for
+  all peers (this replaces the OAuth2-client-only memo mcp_auth_cache.py
+  used to keep).
+
+Unknown tokens are not remembered, so a new trust authenticates at once.
+
+Settings:
+    TRUST_CACHE: on (default) or off (every request reads the trust)
+    TRUST_CACHE_TTL: Seconds a trust record is reused (default 60)
+    TRUST_USAGE_INTERVAL: Seconds between trust usage writes per trust (default 60, 0 writes every time)
+    TRUST_CACHE_MAX_ENTRIES: Trusts cached per process (default 10000)
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import auth_revocation
+
+logger = logging.getLogger(__name__)
+
+# "on" caches trust records, "off" leaves peer authentication to ActingWeb
+TRUST_CACHE = os.getenv("TRUST_CACHE", "on").lower()
+
+TRUST_CACHE_TTL = float(os.getenv("TRUST_CACHE_TTL", "60"))
+
+TRUST_USAGE_INTERVAL = float(os.getenv("TRUST_USAGE_INTERVAL", "60"))
+
+TRUST_CACHE_MAX_ENTRIES = int(os.getenv("TRUST_CACHE_MAX_ENTRIES", "10000"))
+
+# Trust fields not kept in the cache
+SECRET_FIELDS = ("secret", "verification_token")
+
+# Trust.modify() arguments that change how a peer authenticates or what it may do
+AUTH_FIELDS = ("baseuri", "secret", "approved", "verified", "verification_token", "peer_approved")
+
+_stats = {
+    "hits": 0,
+    "misses": 0,
+    "evicted": 0,
+    "revoked": 0,
+    "trust_type_hits": 0,
+    "trust_type_misses": 0,
+    "usage_skipped": 0,
+}
+
+
+def secret_hash(secret: str) -> str:
+    """Cache key of a trust secret."""
+    return hashlib.sha256(secret.encode("utf-8")).hexdigest()
+
+
+class TrustCache:
+    """Trust records by (actor, peer), indexed by secret hash."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        # (actor_id, peer_id) -> (record without secrets, secret hash, expires, revocation marker)
+        self._peers: Dict[Tuple[str, str], Tuple[Dict[str, Any], str, float, Optional[str]]] = {}
+        # (actor_id, secret hash) -> peer_id
+        self._secrets: Dict[Tuple[str, str], str] = {}
+        # Bumped by every eviction; a read that overlapped one is not stored
+        self._generation = 0
+
+    def generation(self) -> int:
+        return self._generation
+
+    def _live(self, actor_id: str, peer_id: str) -> Optional[Tuple[Dict[str, Any], str, float, Optional[str]]]:
+        entry = self._peers.get((actor_id, peer_id))
+        if entry is None or time.time() >= entry[2]:
+            return None
+        if not auth_revocation.matches(actor_id, entry[3]):
+            # Revoked through another worker (or the marker is unreadable)
+            with self._lock:
+                if self._peers.get((actor_id, peer_id)) is entry:
+                    self._drop((actor_id, peer_id))
+                    _stats["revoked"] += 1
+            return None
+        return entry
+
+    def by_token(self, actor_id: str, token: str) -> Optional[Dict[str, Any]]:
+        """The trust record whose secret is this token (a copy, with the token as secret)."""
+        key = secret_hash(token)
+        peer_id = self._secrets.get((actor_id, key))
+        entry = self._live(actor_id, peer_id) if peer_id is not None else None
+        if entry is None or entry[1] != key:
+            _stats["misses"] += 1
+            return None
+        _stats["hits"] += 1
+        return {**entry[0], "secret": token}
+
+    def by_peer(self, actor_id: str, peer_id: str) -> Optional[Dict[str, Any]]:
+        """The trust record of a peer, without its secrets."""
+        entry = self._live(actor_id, peer_id)
+        return None if entry is None else entry[0]
+
+    def put(self, actor_id: str, record: Dict[str, Any], generation: int, marker: Optional[str]) -> None:
+        """
+        Cache a trust record read from storage, unless an eviction ran since generation.
+
+        marker is the actor's revocation marker from before the read
+        (auth_revocation.stamp()); None means don't cache.
+        """
+        peer_id = record.get("peerid")
+        secret = record.get("secret")
+        if not peer_id or not secret or marker is None:
+            return
+        key = secret_hash(secret)
+        cached = {name: value for name, value in record.items() if name not in SECRET_FIELDS}
+        now = time.time()
+        with self._lock:
+            if generation != self._generation:
+                return
+            if (actor_id, peer_id) not in self._peers and len(self._peers) >= TRUST_CACHE_MAX_ENTRIES:
+                self._prune(now)
+            old = self._peers.get((actor_id, peer_id))
+            if old is not None:
+                self._secrets.pop((actor_id, old[1]), None)
+            self._peers[(actor_id, peer_id)] = (cached, key, now + TRUST_CACHE_TTL, marker)
+            self._secrets[(actor_id, key)] = peer_id
+
+    def touch(self, actor_id: str, peer_id: str, fields: Dict[str, Any]) -> None:
+        """Update usage fields of a cached record after they were written."""
+        entry = self._peers.get((actor_id, peer_id))
+        if entry is not None:
+            entry[0].update(fields)
+
+    def _prune(self, now: float) -> None:
+        """Drop expired entries, or the oldest half if none have expired."""
+        expired = [key for key, entry in self._peers.items() if entry[2] <= now]
+        if not expired:
+            expired = sorted(self._peers, key=lambda key: self._peers[key][2])[: len(self._peers) // 2]
+        for key in expired:
+            self._drop(key)
+
+    def _drop(self, key: Tuple[str, str]) -> None:
+        entry = self._peers.pop(key, None)
+        if entry is not None:
+            self._secrets.pop((key[0], entry[1]), None)
+            _stats["evicted"] += 1
+
+    def evict(self, actor_id: Optional[str], peer_id: Optional[str]) -> None:
+        """Forget the trust between an actor and a peer, in every worker."""
+        with self._lock:
+            self._generation += 1
+            if actor_id and peer_id:
+                self._drop((actor_id, peer_id))
+        auth_revocation.revoke(actor_id)
+
+    def evict_actor(self, actor_id: str) -> None:
+        """Forget all trusts of an actor, in every worker."""
+        with self._lock:
+            self._generation += 1
+            for key in [key for key in self._peers if key[0] == actor_id]:
+                self._drop(key)
+        auth_revocation.revoke(actor_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._peers.clear()
+            self._secrets.clear()
+
+    def __len__(self) -> int:
+        return len(self._peers)
+
+
+trust_cache = TrustCache()
+
+# (actor_id, peer_id, connection method) -> last usage write
+_usage_written: Dict[Tuple[str, str, str], float] = {}
+
+
+def _peer_of(trust: Any) -> Optional[str]:
+    return trust.peerid or (trust.trust or {}).get("peerid")
+
+
+def _cached_get(original: Any) -> Any:
+    def get(self: Any) -> Optional[Dict[str, Any]]:
+        if self.trust or not self.handle or not self.actor_id or self.peerid or not self.token:
+            return original(self)
+        cached = trust_cache.by_token(self.actor_id, self.token)
+        if cached is not None:
+            self.trust = cached
+            return cached
+        generation = trust_cache.generation()
+        marker = auth_revocation.stamp(self.actor_id)
+        record = original(self)
+        if record and record.get("secret") == self.token:
+            trust_cache.put(self.actor_id, record, generation, marker)
+        return record
+
+    get._trust_cache = True  # type: ignore[attr-defined]
+    return get
+
+
+def _evicting(original: Any, auth_fields_only: bool = False) -> Any:
+    """Drop the trust's entry after a Trust method (for modify(), only when an auth field changes)."""
+
+    def method(self: Any, *args: Any, **kwargs: Any) -> Any:
+        peer_id = _peer_of(self)
+        try:
+            return original(self, *args, **kwargs)
+        finally:
+            if not auth_fields_only or args or any(kwargs.get(name) is not None for name in AUTH_FIELDS):
+                trust_cache.evict(self.actor_id, peer_id or _peer_of(self))
+
+    method.__name__ = original.__name__
+    method._trust_cache = True  # type: ignore[attr-defined]
+    return method
+
+
+def _throttled_usage(original: Any) -> Any:
+    def _record_trust_usage(self: Any, trust_record: Any, via_hint: Optional[str] = None) -> None:
+        if not self.actor or not trust_record or not trust_record.get("peerid"):
+            return original(self, trust_record, via_hint)
+        key = (self.actor.id, trust_record["peerid"], via_hint or "")
+        now = time.time()
+        if now - _usage_written.get(key, 0.0) < TRUST_USAGE_INTERVAL and trust_record.get("created_at"):
+            _stats["usage_skipped"] += 1
+            return None
+        if len(_usage_written) >= TRUST_CACHE_MAX_ENTRIES:
+            _usage_written.clear()
+        _usage_written[key] = now
+        original(self, trust_record, via_hint)
+        trust_cache.touch(
+            self.actor.id,
+            trust_record["peerid"],
+            {
+                name: trust_record[name]
+                for name in ("last_accessed", "last_connected_at", "last_connected_via", "created_at", "established_via")
+                if name in trust_record
+            },
+        )
+        return None
+
+    _record_trust_usage._trust_cache = True  # type: ignore[attr-defined]
+    return _record_trust_usage
+
+
+def _cached_trust_type_lookup(original: Any) -> Any:
+    from actingweb.db import get_trust
+
+    def _lookup_trust_type_from_database(self: Any, actor_id: str, peer_id: str) -> Optional[str]:
+        cached = trust_cache.by_peer(actor_id, peer_id)
+        if cached is not None and cached.get("relationship"):
+            _stats["trust_type_hits"] += 1
+            return str(cached["relationship"])
+        _stats["trust_type_misses"] += 1
+        if not self.config or not hasattr(self.config, "DbTrust"):
+            return original(self, actor_id, peer_id)
+        generation = trust_cache.generation()
+        marker = auth_revocation.stamp(actor_id)
+        try:
+            record = get_trust(self.config).get(actor_id=actor_id, peerid=peer_id)
+        except Exception as e:
+            logger.error("Error looking up trust relationship %s:%s: %s", actor_id, peer_id, e)
+            return None
+        if not isinstance(record, dict) or not record.get("relationship"):
+            return None
+        trust_cache.put(actor_id, record, generation, marker)
+        return str(record["relationship"])
+
+    _lookup_trust_type_from_database._trust_cache = True  # type: ignore[attr-defined]
+    return _lookup_trust_type_from_database
+
+
+def install() -> bool:
+    """
+    Cache trust records for peer authentication and trust type lookups.
+
+    Returns:
+        False if disabled by TRUST_CACHE=off
+    """
+    if TRUST_CACHE == "off":
+        return False
+    from actingweb.auth import Auth
+    from actingweb.permission_evaluator import PermissionEvaluator
+    from actingweb.trust import Trust
+
+    patches = (
+        (Trust, "get", _cached_get),
+        (Trust, "create", _evicting),
+        (Trust, "delete", _evicting),
+        (Trust, "modify", lambda f: _evicting(f, auth_fields_only=True)),
+        (Auth, "_record_trust_usage", _throttled_usage),
+        (PermissionEvaluator, "_lookup_trust_type_from_database", _cached_trust_type_lookup),
+    )
+    for cls, attribute, wrap in patches:
+        original = getattr(cls, attribute)
+        if not getattr(original, "_trust_cache", False):
+            setattr(cls, attribute, wrap(original))
+    return True
+
+
+def stats() -> Dict[str, Any]:
+    """Return trust cache counters for monitoring."""
+    return {"enabled": TRUST_CACHE != "off", "trusts": len(trust_cache), **_stats}
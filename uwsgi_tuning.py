@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+uwsgi sizing tool.
+
+recommend: measures each read-only method hook through the full request path
+(auth, ActingWeb handler, hook, storage) in-process, and suggests uwsgi
+processes and threads from the measured latency:
+
+    DATABASE_BACKEND=dynamodb AWS_DB_HOST=http://localhost:8000 python uwsgi_tuning.py recommend
+
+bench: load-tests a running server and reports throughput and latency, to
+compare the profiles in uwsgi.ini:
+
+    SERVER_PROFILE=production ./run.sh &
+    python uwsgi_tuning.py bench --url http://localhost:5000 --concurrency 16 --duration 20
+
+Sizing model. A request spends part of its time on the CPU, holding the
+GIL, and the rest waiting on I/O (DynamoDB, outbound HTTP). One process
+keeps a core busy if it has enough threads to cover the waits:
+threads = wall time / CPU time. More threads than that only queue on the
+GIL. Processes add cores: one per core, or enough threads in total for the
+concurrency of a target request rate (Little's law: rate x wall time),
+whichever is larger. Measure with the backend you deploy with; the memory
+backend has no I/O and always suggests one thread.
+"""
+
+import argparse
+import base64
+import http.client
+import json
+import math
+import os
+import statistics
+import sys
+import threading
+import time
+import urllib.parse
+from typing import Any, Dict, List, Optional, Tuple
+
+# Threads beyond this per process mostly add GIL contention
+MAX_THREADS = 16
+
+# Headroom over the computed concurrency
+HEADROOM = 1.25
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def sample_payload(input_schema: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Build a request body from a hook's input schema (defaults, placeholders for required fields)."""
+    payload: Dict[str, Any] = {}
+    properties = (input_schema or {}).get("properties", {})
+    for name, spec in properties.items():
+        if "default" in spec:
+            payload[name] = spec["default"]
+    for name in (input_schema or {}).get("required", []):
+        if name not in payload:
+            kind = properties.get(name, {}).get("type")
+            payload[name] = 1 if kind in ("integer", "number") else "test"
+    return payload
+
+
+def measure(requests_per_hook: int, hooks: Optional[List[str]] = None) -> Dict[str, Dict[str, float]]:
+    """
+    Call method hooks through the Flask app and time them.
+
+    The result cache is cleared before every call, so each call runs the
+    hook and its storage reads instead of returning a cached result.
+
+    Returns:
+        {hook: {"wall_ms", "cpu_ms", "p95_ms"}} with medians over the calls
+    """
+    import application
+    from actingweb.interface.hooks import get_hook_metadata
+
+    from shared_hooks.app.result_cache import result_cache
+
+    client = application.app.test_client()
+    response = client.post("/", json={"creator": "uwsgi-tuning@example.com"}, headers={"Accept": "application/json"})
+    created = response.get_json() or {}
+    if "id" not in created:
+        raise RuntimeError(f"Could not create a test actor: {response.status_code} {response.data[:200]!r}")
+    credentials = base64.b64encode(f"{created['creator']}:{created['passphrase']}".encode()).decode()
+    headers = {"Authorization": f"Basic {credentials}"}
+
+    method_hooks = getattr(application.aw_app.hooks, "_method_hooks", {})
+    results: Dict[str, Dict[str, float]] = {}
+    try:
+        for name, funcs in sorted(method_hooks.items()):
+            metadata = get_hook_metadata(funcs[0])
+            if hooks is not None:
+                if name not in hooks:
+                    continue
+            elif not (metadata.annotations or {}).get("readOnlyHint"):
+                continue
+            payload = sample_payload(metadata.input_schema)
+            walls: List[float] = []
+            cpus: List[float] = []
+            for _ in range(requests_per_hook):
+                result_cache.clear()
+                wall, cpu = time.perf_counter(), time.thread_time()
+                client.post(f"/{created['id']}/methods/{name}", json=payload, headers=headers)
+                cpus.append((time.thread_time() - cpu) * 1000)
+                walls.append((time.perf_counter() - wall) * 1000)
+            results[name] = {
+                "wall_ms": statistics.median(walls),
+                "cpu_ms": statistics.median(cpus),
+                "p95_ms": _percentile(walls, 0.95),
+            }
+    finally:
+        client.delete(f"/{created['id']}", headers=headers)
+    return results
+
+
+def recommend(
+    latencies: Dict[str, Dict[str, float]], cores: int, target_rps: Optional[float] = None
+) -> Dict[str, Any]:
+    """Suggest processes and threads from per-hook latency (equal traffic per hook)."""
+    wall = statistics.mean(entry["wall_ms"] for entry in latencies.values()) / 1000
+    cpu = max(statistics.mean(entry["cpu_ms"] for entry in latencies.values()) / 1000, 1e-6)
+    threads = max(1, min(MAX_THREADS, math.ceil(wall / cpu)))
+    processes = max(2, cores)
+    if target_rps:
+        concurrency = target_rps * wall * HEADROOM
+        processes = max(processes, math.ceil(concurrency / threads))
+    return {
+        "processes": processes,
+        "threads": threads,
+        "profile": "high-load" if processes > 4 or threads > 4 else "production",
+        "wall_ms": wall * 1000,
+        "cpu_ms": cpu * 1000,
+        "max_rps": cores / cpu,
+    }
+
+
+def _worker(url: str, headers: Dict[str, str], deadline: float, out: List[Tuple[float, int]]) -> None:
+    parsed = urllib.parse.urlsplit(url)
+    conn_class = http.client.HTTPSConnection if parsed.scheme == "https" else http.client.HTTPConnection
+    conn = conn_class(parsed.netloc, timeout=30)
+    path = parsed.path or "/"
+    if parsed.query:
+        path += "?" + parsed.query
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        status = 0
+        # uwsgi's http-socket may close the connection after a response; reconnect once
+        for _ in range(2):
+            try:
+                conn.request("GET", path, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                status = response.status
+                break
+            except (OSError, http.client.HTTPException):
+                conn.close()
+        out.append(((time.perf_counter() - start) * 1000, status))
+
+
+def bench(base_url: str, path: Optional[str], concurrency: int, duration: float) -> Dict[str, Any]:
+    """
+    Load-test a running server with keep-alive connections.
+
+    Without a path, creates an actor and reads its properties (auth, storage
+    and serialization on every request), then deletes the actor.
+    """
+    headers: Dict[str, str] = {}
+    created: Dict[str, Any] = {}
+    if path is None:
+        parsed = urllib.parse.urlsplit(base_url)
+        conn = http.client.HTTPConnection(parsed.netloc, timeout=30)
+        body = json.dumps({"creator": f"bench-{os.getpid()}@example.com"})
+        conn.request("POST", "/", body=body, headers={"Content-Type": "application/json", "Accept": "application/json"})
+        created = json.loads(conn.getresponse().read() or b"{}")
+        if "id" not in created:
+            raise RuntimeError("Could not create a test actor; pass --path to benchmark another endpoint")
+        credentials = base64.b64encode(f"{created['creator']}:{created['passphrase']}".encode()).decode()
+        headers["Authorization"] = f"Basic {credentials}"
+        path = f"/{created['id']}/properties"
+
+    samples: List[List[Tuple[float, int]]] = [[] for _ in range(concurrency)]
+    deadline = time.perf_counter() + duration
+    threads = [
+        threading.Thread(target=_worker, args=(base_url.rstrip("/") + path, headers, deadline, samples[n]))
+        for n in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    if created:
+        conn = http.client.HTTPConnection(urllib.parse.urlsplit(base_url).netloc, timeout=30)
+        conn.request("DELETE", f"/{created['id']}", headers=headers)
+        conn.getresponse().read()
+
+    results = [sample for worker in samples for sample in worker]
+    ok = [latency for latency, status in results if 200 <= status < 400]
+    return {
+        "requests": len(results),
+        "errors": len(results) - len(ok),
+        "rps": len(ok) / duration,
+        "p50_ms": _percentile(ok, 0.50) if ok else 0.0,
+        "p95_ms": _percentile(ok, 0.95) if ok else 0.0,
+        "p99_ms": _percentile(ok, 0.99) if ok else 0.0,
+    }
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    rec = commands.add_parser("recommend", help="measure hook latency and suggest processes/threads")
+    rec.add_argument("--requests", type=int, default=50, help="calls per hook (default 50)")
+    rec.add_argument("--hooks", nargs="+", help="method hooks to measure (default: all read-only hooks)")
+    rec.add_argument("--cores", type=int, default=os.cpu_count() or 1, help="CPU cores of the target host")
+    rec.add_argument("--target-rps", type=float, help="requests per second the host must serve")
+
+    load = commands.add_parser("bench", help="load-test a running server")
+    load.add_argument("--url", default="http://localhost:5000", help="server base URL")
+    load.add_argument("--path", help="endpoint to GET (default: a test actor's properties)")
+    load.add_argument("--concurrency", type=int, default=16)
+    load.add_argument("--duration", type=float, default=20.0, help="seconds")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "bench":
+        result = bench(args.url, args.path, args.concurrency, args.duration)
+        print(
+            f"{result['requests']} requests, {result['errors']} errors, {result['rps']:.0f} req/s, "
+            f"p50 {result['p50_ms']:.1f} ms, p95 {result['p95_ms']:.1f} ms, p99 {result['p99_ms']:.1f} ms"
+        )
+        return 0
+
+    latencies = measure(args.requests, args.hooks)
+    if not latencies:
+        print("No method hooks measured")
+        return 1
+    print(f"{'hook':<24}{'wall ms':>10}{'cpu ms':>10}{'p95 ms':>10}")
+    for name, entry in latencies.items():
+        print(f"{name:<24}{entry['wall_ms']:>10.2f}{entry['cpu_ms']:>10.2f}{entry['p95_ms']:>10.2f}")
+    advice = recommend(latencies, args.cores, args.target_rps)
+    print(
+        f"\nMean {advice['wall_ms']:.2f} ms per request, {advice['cpu_ms']:.2f} ms on the CPU; "
+        f"about {advice['max_rps']:.0f} req/s on {args.cores} core(s)"
+    )
+    print(
+        f"Recommended: SERVER_PROFILE={advice['profile']} "
+        f"WSGI_PROCESSES={advice['processes']} WSGI_THREADS={advice['threads']}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,306 @@
+"""
+Render cache and ETags for the /www actor UI.
+
+ActingWeb renders the ``aw-actor-www-*.html`` templates (root, properties,
+trust, the demo page, ...) from scratch on every GET, after its handler has
+authenticated the request and loaded the values the page shows. This module
+caches the rendered pages:
+
+- Each template is analysed once: the variables it reads (jinja2.meta).
+  A page is keyed by the template and a SHA-256 digest of the canonical
+  JSON of exactly those variables' values, which are the part of the
+  actor's state the page shows (its properties, its trusts, its id). Any
+  change to that state is a new key, in every process, without
+  invalidation hooks.
+- Templates that only print the standard per-actor strings (``{{ id }}``,
+  ``{{ url }}``, ``{{ actor_root }}``, ``{{ actor_www }}``), like the 23 KB demo
+  page, are rendered once per process with placeholders, and each request
+  substitutes the escaped values.
+- Pages get a strong ETag derived from the template source and the key, and
+  a GET with a matching ``If-None-Match`` is answered with 304 Not Modified.
+
+The cache sits behind ActingWeb's handler, so authentication and the
+reads behind the page still happen on every request; a hit saves rendering
+and, on 304, the response body.
+
+Templates that read anything that isn't plain data (the request, the
+session, template globals) are never cached, nor are templates that
+extend or include others.
+
+Settings:
+    WWW_CACHE_MAX_ENTRIES: Cached pages per process (default 2048, 0 disables)
+"""
+
+import contextvars
+import hashlib
+import itertools
+import json
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import jinja2
+from jinja2 import meta, nodes
+from markupsafe import escape
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on cached pages; least recently used pages are evicted first
+WWW_CACHE_MAX_ENTRIES = int(os.getenv("WWW_CACHE_MAX_ENTRIES", "2048"))
+
+# Templates served under /{actor_id}/www
+WWW_TEMPLATE_PREFIX = "aw-actor-www-"
+
+# Per-actor strings that pre-rendered pages may contain as placeholders
+SHELL_VARIABLES = ("id", "url", "actor_root", "actor_www")
+
+# Nodes that pull in other templates, whose variables the analysis can't see
+_UNCACHEABLE_NODES = (nodes.Extends, nodes.Include, nodes.Import, nodes.FromImport)
+
+_WWW_PATH = re.compile(r"^/[^/]+/www(/|$)")
+
+_serials = itertools.count(1)
+
+# ETag of the www page rendered by the current request; the holder dict is
+# set per request so the value is visible to the response middleware
+_page: "contextvars.ContextVar[Optional[Dict[str, str]]]" = contextvars.ContextVar("www_page", default=None)
+
+
+class _Plan:
+    """What the render cache knows about one loaded template."""
+
+    def __init__(self, template: jinja2.Template):
+        self.serial = next(_serials)
+        self.variables: Tuple[str, ...] = ()
+        self.cacheable = False
+        self.shell: Optional[List[str]] = None
+        self.shell_variables: Tuple[str, ...] = ()
+        self.autoescape = False
+        self.digest = ""
+        try:
+            source, _filename, _uptodate = template.environment.loader.get_source(  # type: ignore[union-attr]
+                template.environment, template.name
+            )
+        except Exception as e:
+            logger.debug("Not caching %s: %s", template.name, e)
+            return
+        ast = template.environment.parse(source)
+        if any(True for _ in ast.find_all(_UNCACHEABLE_NODES)):
+            return
+        self.variables = tuple(sorted(meta.find_undeclared_variables(ast)))
+        self.digest = hashlib.sha256(source.encode()).hexdigest()
+        autoescape = template.environment.autoescape
+        self.autoescape = bool(autoescape(template.name) if callable(autoescape) else autoescape)
+        self.cacheable = True
+        if self.variables and set(self.variables) <= set(SHELL_VARIABLES) and _only_printed(ast, self.variables):
+            self.shell_variables = self.variables
+
+    def placeholder(self, name: str) -> str:
+        return f"\x00aw-{self.serial}-{name}\x00"
+
+
+def _only_printed(ast: nodes.Template, variables: Tuple[str, ...]) -> bool:
+    """True if every use of the variables is a bare ``{{ name }}``."""
+    printed = sum(
+        1
+        for output in ast.find_all(nodes.Output)
+        for child in output.nodes
+        if isinstance(child, nodes.Name) and child.name in variables
+    )
+    used = sum(1 for name in ast.find_all(nodes.Name) if name.name in variables)
+    return printed == used
+
+
+def _fingerprint(plan: _Plan, context: Dict[str, Any], environment: jinja2.Environment) -> Optional[str]:
+    """SHA-256 of the canonical JSON of the values the template reads, or None if they aren't plain data."""
+    values = []
+    for name in plan.variables:
+        if name in context:
+            values.append(context[name])
+        elif name in environment.globals:
+            # url_for, config, get_flashed_messages: depend on more than the context
+            return None
+        else:
+            values.append(None)
+    try:
+        canonical = json.dumps(values, sort_keys=True, separators=(",", ":"))
+    except (TypeError, ValueError):
+        return None
+    # Keys hold the digest, not the values: a page of properties would otherwise be kept twice
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class RenderCache:
+    """Thread-safe LRU of rendered www pages."""
+
+    def __init__(self, max_entries: int = WWW_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._pages: "OrderedDict[Tuple[int, str], str]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.shell_renders = 0
+        self.uncached = 0
+
+    def plan(self, template: jinja2.Template) -> _Plan:
+        plan = getattr(template, "_www_plan", None)
+        if plan is None:
+            plan = _Plan(template)
+            # Stored on the template object, so a reloaded template (dev
+            # autoreload) is analysed again and gets new cache keys
+            template._www_plan = plan  # type: ignore[attr-defined]
+        return plan
+
+    def render(self, template: jinja2.Template, context: Dict[str, Any], render: Any) -> str:
+        """Return the page for a context, rendering it with render(context) on a miss."""
+        plan = self.plan(template)
+        fingerprint = _fingerprint(plan, context, template.environment) if plan.cacheable else None
+        if fingerprint is None or self.max_entries <= 0:
+            self.uncached += 1
+            return render(context)
+        etag = hashlib.sha256(f"{plan.digest}\x00{template.name}\x00{fingerprint}".encode()).hexdigest()[:32]
+        holder = _page.get()
+        if holder is not None:
+            holder["etag"] = etag
+
+        if plan.shell_variables:
+            return self._fill_shell(plan, context, render)
+
+        key = (plan.serial, fingerprint)
+        with self._lock:
+            body = self._pages.get(key)
+            if body is not None:
+                self._pages.move_to_end(key)
+                self.hits += 1
+                return body
+            self.misses += 1
+        body = render(context)
+        with self._lock:
+            self._pages[key] = body
+            while len(self._pages) > self.max_entries:
+                self._pages.popitem(last=False)
+        return body
+
+    def _fill_shell(self, plan: _Plan, context: Dict[str, Any], render: Any) -> str:
+        shell = plan.shell
+        if shell is None:
+            rendered = render({name: plan.placeholder(name) for name in plan.shell_variables})
+            # [text, name, text, name, ..., text]
+            shell = re.split(f"\x00aw-{plan.serial}-(\\w+)\x00", rendered)
+            with self._lock:
+                plan.shell = shell
+                self.shell_renders += 1
+        else:
+            with self._lock:
+                self.hits += 1
+        values = {}
+        for name in plan.shell_variables:
+            # Missing values render as empty, like jinja's Undefined
+            value = context[name] if name in context else ""
+            values[name] = str(escape(value)) if plan.autoescape else str(value)
+        parts = list(shell)
+        for i in range(1, len(parts), 2):
+            parts[i] = values[parts[i]]
+        return "".join(parts)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._pages.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "pages": len(self._pages),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "shell_renders": self.shell_renders,
+                "uncached": self.uncached,
+            }
+
+
+render_cache = RenderCache()
+
+
+class CachingTemplate(jinja2.Template):
+    """Jinja template class that serves www templates from the render cache."""
+
+    def render(self, *args: Any, **kwargs: Any) -> str:
+        if not (self.name or "").startswith(WWW_TEMPLATE_PREFIX):
+            return super().render(*args, **kwargs)
+        context = dict(*args, **kwargs)
+        return render_cache.render(self, context, super().render)
+
+
+def install(environment: jinja2.Environment) -> None:
+    """Load templates of a Jinja environment as CachingTemplate."""
+    if environment.template_class is not CachingTemplate:
+        environment.template_class = CachingTemplate
+        # Templates loaded before this point keep their class; drop them
+        if environment.cache is not None:
+            environment.cache.clear()
+
+
+def _is_www_get(method: str, path: str) -> bool:
+    return method in ("GET", "HEAD") and bool(_WWW_PATH.match(path))
+
+
+def init_flask(flask_app: Any) -> None:
+    """Cache www pages of a Flask app and answer conditional GETs with 304."""
+    from flask import g, request
+
+    install(flask_app.jinja_env)
+
+    @flask_app.before_request
+    def _track_www_page() -> None:
+        if _is_www_get(request.method, request.path):
+            g.www_page_token = _page.set({})
+
+    @flask_app.after_request
+    def _add_www_etag(response: Any) -> Any:
+        holder = _page.get()
+        if holder and holder.get("etag") and response.status_code == 200:
+            response.set_etag(holder["etag"])
+            # The page needs authentication: browsers may keep it, but must revalidate
+            response.headers["Cache-Control"] = "private, no-cache"
+            response.make_conditional(request)
+        return response
+
+    @flask_app.teardown_request
+    def _reset_www_page(_exc: Optional[BaseException]) -> None:
+        token = g.pop("www_page_token", None)
+        if token is not None:
+            _page.reset(token)
+
+
+def init_fastapi(fastapi_app: Any, environment: jinja2.Environment) -> None:
+    """Cache www pages of the ASGI app (see asgi.py) and answer conditional GETs with 304."""
+    from starlette.responses import Response
+
+    install(environment)
+
+    @fastapi_app.middleware("http")
+    async def _add_www_etag(request: Any, call_next: Any) -> Any:
+        if not _is_www_get(request.method, request.url.path):
+            return await call_next(request)
+        holder: Dict[str, str] = {}
+        token = _page.set(holder)
+        try:
+            response = await call_next(request)
+        finally:
+            _page.reset(token)
+        if holder.get("etag") and response.status_code == 200:
+            etag = f'"{holder["etag"]}"'
+            response.headers["ETag"] = etag
+            response.headers["Cache-Control"] = "private, no-cache"
+            if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+                return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "private, no-cache"})
+        return response
+
+
+def stats() -> Dict[str, Any]:
+    """Return render cache counters for monitoring."""
+    return render_cache.stats()